@@ -1,257 +1,453 @@
-# pico_w_receptor_nrf.py
-from machine import UART, Pin, SPI
-import network
-import time
-import struct
-from nrf24l01 import NRF24L01
-
-# =================== CONFIGURACIÓN WiFi ===================
-WIFI_SSID = "RACE_2025"
-WIFI_PASS = "987654321"
-
-IP_SERVIDOR = "10.10.10.10"
-PUERTO = 5000
-CAR_ID = "CAR_GUIDO"
-TEAM_NAME = "A los pits"
-
-
-API_LAP_URL = "http://{}:{}/api/lap".format(IP_SERVIDOR, PUERTO)
-
-CAR_ID = "CAR_GUIDO"
-TEAM_NAME = "A los pits"
-
-# =================== CONFIGURACIÓN NRF24L01 ===================
-CHANNEL = 76
-ADDR = b"\xC3\xF0\xF0\xF0\xF0"
-PAYLOAD_SIZE = 32
-
-# Configuración SPI para NRF24L01 - SPI1, GP10-11-12, CE=13, CSN=14
-spi = SPI(1, sck=Pin(10), mosi=Pin(11), miso=Pin(12))
-csn = Pin(14, Pin.OUT, value=1)
-ce = Pin(13, Pin.OUT, value=0)
-
-SEND_PERIOD_S = 1   # cada segundo
-# =================== CONEXIÓN WiFi ===================
-def conectar_wifi():
-    wlan = network.WLAN(network.STA_IF)
-    wlan.active(True)
-    
-    if not wlan.isconnected():
-        print(f"📡 Conectando a WiFi: {WIFI_SSID}")
-        wlan.connect(WIFI_SSID, WIFI_PASS)
-        
-        timeout = 15
-        while not wlan.isconnected() and timeout > 0:
-            print(".", end="")
-            time.sleep(1)
-            timeout -= 1
-        
-        if wlan.isconnected():
-            print(f"\n✅ WiFi conectado!")
-            print(f"   IP: {wlan.ifconfig()[0]}")
-            print(f"   Red: {WIFI_SSID}")
-            return True
-        else:
-            print(f"\n❌ Error: No se pudo conectar a {WIFI_SSID}")
-            return False
-    else:
-        print(f"✅ WiFi ya conectado")
-        print(f"   IP: {wlan.ifconfig()[0]}")
-        return True
-    
-def send_lap(lap_time_ms, lap_number):
-    payload = {
-        "car_id": CAR_ID,
-        "team": TEAM_NAME,
-        "lap_time_ms": lap_time_ms,
-        "lap_number_debug": lap_number
-    }
-    try:
-        print("Enviando lap:", payload)
-        r = urequests.post(API_LAP_URL, json=payload)
-        print("Respuesta servidor:", r.status_code, r.text)
-        r.close()
-        LED.value(1)
-        time.sleep(0.05)
-        LED.value(0)
-    except Exception as e:
-        print("Error enviando lap:", e)
-
-def gen_progressive_lap_time(last_lap_ms):
-    # Primera vuelta entre 25 y 35 s
-    if last_lap_ms is None:
-        base = 25000
-        extra = urandom.getrandbits(10) % 10000  # 0–9999 ms
-        return base + extra
-    # Vueltas siguientes: añadir 0–5 s
-    extra = urandom.getrandbits(12) % 5001       # 0–5000 ms
-    return last_lap_ms + extra
-
-
-def envio():
-    connect_wifi()
-    print("Simulador listo: enviando vuelta cada", SEND_PERIOD_S, "s")
-
-    lap_counter = 0
-    last_lap_ms = None
-
-    while True:
-        lap_counter += 1
-        lap_time_ms = gen_progressive_lap_time(last_lap_ms)
-        last_lap_ms = lap_time_ms
-
-        print("Vuelta simulada {}: {} ms".format(lap_counter, lap_time_ms))
-        send_lap(lap_time_ms, lap_counter)
-
-        time.sleep(SEND_PERIOD_S)
-
-
-
-# =================== INICIALIZACIÓN NRF24L01 ===================
-def inicializar_nrf():
-    try:
-        # Constructor: NRF24L01(spi, csn, ce, channel, payload_size)
-        nrf = NRF24L01(spi, csn, ce, CHANNEL, PAYLOAD_SIZE)
-        
-        # Potencia máxima / velocidad baja (si el driver lo soporta)
-        try:
-            from nrf24l01 import POWER_3, SPEED_250K
-            nrf.set_power_speed(POWER_3, SPEED_250K)
-            print("Potencia=MAX, Velocidad=250 kbps")
-        except:
-            print("Driver sin set_power_speed, seguimos por defecto")
-
-        # Escuchar en PIPE 0 con la misma dirección que usa el transmisor
-        nrf.open_rx_pipe(0, ADDR)
-        nrf.start_listening()
-
-        print("📡 NRF24L01 listo en modo RX (canal", CHANNEL, ", payload", PAYLOAD_SIZE, "bytes)")
-        return nrf
-        
-    except Exception as e:
-        print(f"❌ Error inicializando NRF24L01: {e}")
-        return None
-
-# =================== CONFIGURACIÓN HARDWARE ===================
-# Configurar UART0 hacia PC (TX=GP0)
-uart_pc = UART(0, baudrate=1200, tx=Pin(0), rx=Pin(1))
-led = Pin("LED", Pin.OUT)
-
-# =================== PROGRAMA PRINCIPAL ===================
-print("🔴 Pico W - Receptor NRF24L01 + WiFi")
-print("Iniciando conexión WiFi...")
-
-# Conectar a WiFi
-wifi_ok = conectar_wifi()
-
-# Inicializar NRF24L01
-nrf = inicializar_nrf()
-
-if not nrf:
-    print("❌ No se puede continuar sin NRF24L01")
-else:
-    print("✅ Esperando datos NRF24L01...")
-
-counter = 0
-last_send_time = time.ticks_ms()
-SEND_INTERVAL_MS = 500  # Enviar cada 500ms (2Hz)
-
-while True:
-    try:
-        # ========== RECEPCIÓN NRF24L01 ==========
-        if nrf.any():
-            try:
-                data = nrf.recv()
-            except OSError as e:
-                # error leyendo FIFO
-                print("⚠ Error al recibir NRF:", e)
-                data = None
-
-            if data and len(data) == PAYLOAD_SIZE:
-                # Desempaquetar: <ii12h
-                try:
-                    (
-                        lat_i, lon_i,
-                        alt_i, spd_i,
-                        ax_i, ay_i, az_i,
-                        gx_i, gy_i, line_state_i,
-                        vbat_i, temp_i,
-                        pwm_servo_i, pwm_motor_i
-                    ) = struct.unpack("<ii12h", data)
-                except Exception as e:
-                    print("⚠ Error al decodificar struct:", e)
-                    print("   RAW:", data)
-                    time.sleep_ms(10)
-                    continue
-
-                # Convertir a unidades físicas
-                lat = lat_i / 100000.0      # grados
-                lon = lon_i / 100000.0
-                alt = alt_i                 # metros
-                spd = spd_i / 10.0          # km/h
-
-                ax = ax_i / 100.0           # m/s2
-                ay = ay_i / 100.0
-                az = az_i / 100.0
-
-                gx = gx_i / 100.0           # deg/s
-                gy = gy_i / 100.0
-                # line_state_i: 0 / 1
-
-                vbat = vbat_i / 100.0       # V
-                temp = temp_i / 10.0        # °C
-
-                # Texto legible para consola (formato igual a tu imagen)
-                linea_txt = (
-                    f"ServoPWM:{pwm_servo_i:4d}us | "
-                    f"MotorPWM:{pwm_motor_i:4d}us | "
-                    f"Batt:{vbat:4.2f}V | "
-                    f"ACC:X:{ax:+5.2f} Y:{ay:+5.2f} Z:{az:+5.2f} m/s2 | "
-                    f"GYRO:X:{gx:+5.2f} Y:{gy:+5.2f} Z:---   deg/s | "
-                    f"Linea:{line_state_i:d} | "
-                    f"GPS:({lat:+8.5f},{lon:+8.5f}) Alt:{alt:4d}m Spd:{spd:5.1f}km/h | "
-                    f"Temp:{temp:4.1f}C"
-                )
-
-                print(f"📡 #{counter:03d} DATOS NRF RECIBIDOS:")
-                print(linea_txt)
-                print("-" * 70)
-
-                # ========== ENVÍO A PAGINA WEB (CON FRECUENCIA REDUCIDA) ==========
-                current_time = time.ticks_ms()
-                if time.ticks_diff(current_time, last_send_time) >= SEND_INTERVAL_MS:
-                    # ENVIAR FORMATO CORRECTO PARA LA PÁGINA WEB
-                    trama_web = (
-                        f"ServoPWM:{pwm_servo_i}us | "
-                        f"MotorPWM:{pwm_motor_i}us | "
-                        f"Batt:{vbat:.2f}V | "
-                        f"ACC:X:{ax:+.2f} Y:{ay:+.2f} Z:{az:+.2f} m/s2 | "
-                        f"GYRO:X:{gx:+.2f} Y:{gy:+.2f} Z:--- deg/s | "
-                        f"Linea:{line_state_i} | "
-                        f"GPS:({lat:+.5f},{lon:+.5f}) Alt:{alt:.0f}m Spd:{spd:.1f}km/h | "
-                        f"Temp:{temp:.1f}C"
-                    )
-                    
-                    # Enviar por UART en el formato que el servidor web espera
-                    try:
-                        uart_pc.write(trama_web + '\n')
-                        print(f"📤 ENVIADO A WEB: {trama_web}")
-                        last_send_time = current_time
-                    except:
-                        print("❌ Error enviando por UART")
-
-                # LED indicador
-                led.value(1)
-                time.sleep(0.05)
-                led.value(0)
-
-                counter += 1
-                        
-        time.sleep(0.02)  # Pequeña pausa
-
-    except KeyboardInterrupt:
-        print("\n🛑 Recepción detenida")
-        break
-    except Exception as e:
-        print(f"❌ Error: {e}")
-        time.sleep(1)
\ No newline at end of file
+# pico_w_receptor_nrf.py
+from machine import UART, Pin, SPI, Timer
+import network
+import time
+import struct
+import socket
+import urandom
+from nrf24l01 import NRF24L01
+from subida_vueltas import SubidaVueltas
+from canales import FORMATO_STRUCT, FORMATO_TRAMA, ESCALAS, TAM_PAQUETE
+
+# =================== CONFIGURACIÓN WiFi ===================
+WIFI_SSID = "RACE_2025"
+WIFI_PASS = "987654321"
+
+IP_SERVIDOR = "10.10.10.10"
+PUERTO = 5000
+CAR_ID = "CAR_GUIDO"
+TEAM_NAME = "A los pits"
+
+# Subida de vueltas: cola en RAM (+ desborde a flash) por un socket reutilizado.
+# El servidor de la carrera solo acepta una vuelta por POST en API_LAP; los lotes
+# (LOTE_VUELTAS > 1) van a API_LAPS y solo los entiende servidor_vueltas.py
+API_LAP = "/api/lap"
+API_LAPS = "/api/laps"
+COLA_VUELTAS = 64
+LOTE_VUELTAS = 1
+ARCHIVO_DESBORDE = "cola_vueltas.txt"   # None = sin flash, se pierde la más vieja
+REINTENTO_WIFI_MS = 10000
+
+CAR_ID = "CAR_GUIDO"
+TEAM_NAME = "A los pits"
+
+# =================== CONFIGURACIÓN NRF24L01 ===================
+CHANNEL = 76
+ADDR = b"\xC3\xF0\xF0\xF0\xF0"
+PAYLOAD_SIZE = TAM_PAQUETE   # 32 bytes (canales.py)
+
+# Configuración SPI para NRF24L01 - SPI1, GP10-11-12, CE=13, CSN=14
+spi = SPI(1, sck=Pin(10), mosi=Pin(11), miso=Pin(12))
+csn = Pin(14, Pin.OUT, value=1)
+ce = Pin(13, Pin.OUT, value=0)
+
+SEND_PERIOD_S = 1   # cada segundo
+# =================== CONEXIÓN WiFi ===================
+wlan = network.WLAN(network.STA_IF)
+ultimo_intento_wifi = time.ticks_ms()
+
+def conectar_wifi():
+    wlan.active(True)
+    
+    if not wlan.isconnected():
+        print(f"📡 Conectando a WiFi: {WIFI_SSID}")
+        wlan.connect(WIFI_SSID, WIFI_PASS)
+        
+        timeout = 15
+        while not wlan.isconnected() and timeout > 0:
+            print(".", end="")
+            time.sleep(1)
+            timeout -= 1
+        
+        if wlan.isconnected():
+            print(f"\n✅ WiFi conectado!")
+            print(f"   IP: {wlan.ifconfig()[0]}")
+            print(f"   Red: {WIFI_SSID}")
+            return True
+        else:
+            print(f"\n❌ Error: No se pudo conectar a {WIFI_SSID}")
+            return False
+    else:
+        print(f"✅ WiFi ya conectado")
+        print(f"   IP: {wlan.ifconfig()[0]}")
+        return True
+    
+def mantener_wifi():
+    """Reintenta la conexión sin bloquear (wlan.connect vuelve enseguida en la Pico W)."""
+    global ultimo_intento_wifi
+    if wlan.isconnected():
+        return True
+    if time.ticks_diff(time.ticks_ms(), ultimo_intento_wifi) > REINTENTO_WIFI_MS:
+        ultimo_intento_wifi = time.ticks_ms()
+        try:
+            wlan.connect(WIFI_SSID, WIFI_PASS)
+        except OSError:
+            pass
+    return False
+
+subida = SubidaVueltas(IP_SERVIDOR, PUERTO, API_LAP if LOTE_VUELTAS == 1 else API_LAPS,
+                       capacidad=COLA_VUELTAS, lote_max=LOTE_VUELTAS, archivo_desborde=ARCHIVO_DESBORDE)
+
+def send_lap(lap_time_ms, lap_number):
+    """Encola la vuelta; la envía subida.atender() desde el bucle principal."""
+    subida.encolar({
+        "car_id": CAR_ID,
+        "team": TEAM_NAME,
+        "lap_time_ms": lap_time_ms,
+        "lap_number_debug": lap_number
+    })
+
+def gen_progressive_lap_time(last_lap_ms):
+    # Primera vuelta entre 25 y 35 s
+    if last_lap_ms is None:
+        base = 25000
+        extra = urandom.getrandbits(10) % 10000  # 0–9999 ms
+        return base + extra
+    # Vueltas siguientes: añadir 0–5 s
+    extra = urandom.getrandbits(12) % 5001       # 0–5000 ms
+    return last_lap_ms + extra
+
+
+def envio():
+    conectar_wifi()
+    print("Simulador listo: enviando vuelta cada", SEND_PERIOD_S, "s")
+
+    lap_counter = 0
+    last_lap_ms = None
+    proxima = time.ticks_ms()
+
+    while True:
+        if time.ticks_diff(time.ticks_ms(), proxima) >= 0:
+            lap_counter += 1
+            lap_time_ms = gen_progressive_lap_time(last_lap_ms)
+            last_lap_ms = lap_time_ms
+
+            print("Vuelta simulada {}: {} ms (en cola: {}, rechazadas: {})".format(
+                lap_counter, lap_time_ms, subida.pendientes(), subida.rechazadas))
+            send_lap(lap_time_ms, lap_counter)
+            proxima = time.ticks_add(proxima, SEND_PERIOD_S * 1000)
+
+        subida.atender(mantener_wifi())
+        time.sleep_ms(1)
+
+
+
+# =================== INICIALIZACIÓN NRF24L01 ===================
+def inicializar_nrf():
+    try:
+        # Constructor: NRF24L01(spi, csn, ce, channel, payload_size)
+        nrf = NRF24L01(spi, csn, ce, CHANNEL, PAYLOAD_SIZE)
+        
+        # Potencia máxima / velocidad baja (si el driver lo soporta)
+        try:
+            from nrf24l01 import POWER_3, SPEED_250K
+            nrf.set_power_speed(POWER_3, SPEED_250K)
+            print("Potencia=MAX, Velocidad=250 kbps")
+        except:
+            print("Driver sin set_power_speed, seguimos por defecto")
+
+        # Escuchar en PIPE 0 con la misma dirección que usa el transmisor
+        nrf.open_rx_pipe(0, ADDR)
+        nrf.start_listening()
+
+        print("📡 NRF24L01 listo en modo RX (canal", CHANNEL, ", payload", PAYLOAD_SIZE, "bytes)")
+        return nrf
+        
+    except Exception as e:
+        print(f"❌ Error inicializando NRF24L01: {e}")
+        return None
+
+# =================== CONFIGURACIÓN HARDWARE ===================
+# Configurar UART0 hacia PC (TX=GP0, RX=GP1 para la negociación de baudios)
+BAUD_BASE = 1200   # velocidad de arranque y de respaldo
+BAUDIOS_PERMITIDOS = (1200, 9600, 19200, 38400, 57600, 115200, 230400)
+TIMEOUT_CONFIRMACION_MS = 2000  # espera del @PING tras cambiar de velocidad
+ESPERA_TX_MS = 2500             # máximo hasta que sale el @ACK (un búfer de tx lleno a 1200 baudios)
+
+uart_pc = UART(0, baudrate=BAUD_BASE, tx=Pin(0), rx=Pin(1))
+led = Pin("LED", Pin.OUT)
+
+# =================== CONFIGURACIÓN REENVÍO ===================
+# DEBUG = True imprime cada trama por consola (USB). Imprimir por paquete
+# cuesta varios ms y limita la recepción, por eso va apagado por defecto.
+DEBUG = False
+
+# Política de reenvío hacia la PC:
+#   "ultima"   -> solo la más reciente, cuando la UART terminó de mandar (txdone);
+#                 si sigue ocupada se descarta la anterior. Nunca frena la recepción.
+#   "todas"    -> cada trama recibida se escribe en la UART
+#   "diezmado" -> una de cada DIEZMADO_N tramas
+# uart.write espera a que entre la trama en el búfer: a BAUD_BASE (1200) una trama de
+# texto tarda ~1,9 s, así que "todas" y "diezmado" solo sirven con el enlace negociado.
+MODO_REENVIO = "ultima"
+DIEZMADO_N = 5
+
+# Telemetría por UDP directo a SERVICIO_TELEMETRIA (sin el cuello de la UART).
+# Cada datagrama lleva UDP_LOTE payloads NRF crudos; se envía al llenarse o a
+# los UDP_ESPERA_MS del primer paquete. REENVIO_UART = False deja solo UDP.
+TELEMETRIA_UDP = True
+PUERTO_UDP = 5005
+UDP_LOTE = 8
+UDP_ESPERA_MS = 50
+REENVIO_UART = True
+
+LED_PULSO_MS = 50  # duración del parpadeo del LED (lo apaga un Timer, sin sleep)
+
+# =================== LED NO BLOQUEANTE ===================
+led_timer = Timer()
+
+def _apagar_led(t):
+    led.value(0)
+
+def pulso_led():
+    led.value(1)
+    led_timer.init(mode=Timer.ONE_SHOT, period=LED_PULSO_MS, callback=_apagar_led)
+
+# =================== REENVÍO A LA PC ===================
+counter = 0
+reenviadas = 0
+descartadas = 0
+trama_pendiente = None   # solo se usa en MODO_REENVIO = "ultima"
+
+def formatear_trama(data):
+    """Convierte el payload NRF en la trama de texto que espera la web."""
+    valores = struct.unpack(FORMATO_STRUCT, data)
+    return FORMATO_TRAMA.format(CAR_ID, *[v / e for v, e in zip(valores, ESCALAS)])
+
+def escribir_uart(trama):
+    global reenviadas, descartadas
+    if baud_pedido is not None:   # no meter tramas detrás del @ACK
+        descartadas += 1
+        return
+    try:
+        uart_pc.write(trama)
+        reenviadas += 1
+    except Exception as e:
+        print("❌ Error enviando por UART:", e)
+
+# =================== REENVÍO POR UDP ===================
+# Cabecera <2s16sIB: "TL", CAR_ID (relleno con \0), secuencia, cantidad; después
+# cantidad payloads NRF y, al final, cantidad edades <H: ms desde que llegó cada
+# payload hasta el envío (el servicio le da a cada trama su hora, no la del lote)
+CABECERA_UDP = "<2s16sIB"
+TAM_CABECERA_UDP = struct.calcsize(CABECERA_UDP)
+datagrama = bytearray(TAM_CABECERA_UDP + UDP_LOTE * (PAYLOAD_SIZE + 2))
+datagrama_mv = memoryview(datagrama)
+en_lote = 0
+seq_udp = 0
+t_lote = 0
+t_paquetes = [0] * UDP_LOTE   # ticks_ms de llegada de cada payload del lote
+sock_udp = None
+destino_udp = None
+datagramas_enviados = 0
+datagramas_fallidos = 0
+
+def enviar_lote_udp():
+    """Envía el lote armado (sin bloquear: si el WiFi no está, se pierde)."""
+    global en_lote, seq_udp, sock_udp, destino_udp, datagramas_enviados, datagramas_fallidos
+    if not en_lote:
+        return
+    struct.pack_into(CABECERA_UDP, datagrama, 0, b"TL", CAR_ID.encode(), seq_udp, en_lote)
+    fin = TAM_CABECERA_UDP + en_lote * PAYLOAD_SIZE
+    ahora = time.ticks_ms()
+    for i in range(en_lote):
+        struct.pack_into("<H", datagrama, fin + 2 * i, min(time.ticks_diff(ahora, t_paquetes[i]), 0xFFFF))
+    seq_udp = (seq_udp + 1) & 0xFFFFFFFF
+    try:
+        if sock_udp is None:
+            destino_udp = socket.getaddrinfo(IP_SERVIDOR, PUERTO_UDP)[0][-1]
+            sock_udp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock_udp.setblocking(False)
+        sock_udp.sendto(datagrama_mv[:fin + 2 * en_lote], destino_udp)
+        datagramas_enviados += 1
+    except OSError:
+        datagramas_fallidos += 1   # el servicio lo cuenta como perdido por la secuencia
+    en_lote = 0
+
+def agregar_udp(data):
+    global en_lote, t_lote
+    t_paquetes[en_lote] = time.ticks_ms()
+    if not en_lote:
+        t_lote = t_paquetes[0]
+    inicio = TAM_CABECERA_UDP + en_lote * PAYLOAD_SIZE
+    datagrama_mv[inicio:inicio + PAYLOAD_SIZE] = data
+    en_lote += 1
+    if en_lote == UDP_LOTE:
+        enviar_lote_udp()
+
+def vencer_lote_udp():
+    if en_lote and time.ticks_diff(time.ticks_ms(), t_lote) >= UDP_ESPERA_MS:
+        enviar_lote_udp()
+
+def procesar_paquete(data):
+    """Reenvía un paquete NRF por UDP y/o UART (según MODO_REENVIO)."""
+    global counter, trama_pendiente, descartadas
+
+    counter += 1
+    pulso_led()
+
+    if TELEMETRIA_UDP:
+        agregar_udp(data)   # crudo, sin formatear
+    if not (REENVIO_UART or DEBUG):
+        return
+
+    try:
+        trama = formatear_trama(data)
+    except Exception as e:
+        print("⚠ Error al decodificar struct:", e)
+        print("   RAW:", data)
+        return
+
+    if DEBUG:
+        print("📡 #{:03d} {}".format(counter, trama), end="")
+    if not REENVIO_UART:
+        return
+
+    if MODO_REENVIO == "todas":
+        escribir_uart(trama)
+    elif MODO_REENVIO == "ultima":
+        if trama_pendiente is not None:
+            descartadas += 1
+        trama_pendiente = trama
+    elif counter % DIEZMADO_N == 0:
+        escribir_uart(trama)
+    else:
+        descartadas += 1
+
+def vaciar_pendiente():
+    """En modo "ultima": escribe la trama guardada en cuanto la UART queda libre."""
+    global trama_pendiente
+    if trama_pendiente is not None and uart_pc.txdone():
+        escribir_uart(trama_pendiente)
+        trama_pendiente = None
+
+# =================== NEGOCIACIÓN DE BAUDIOS CON LA PC ===================
+# Protocolo (líneas ASCII que empiezan con "@", la web las ignora):
+#   PC   -> "@BAUD <b>"   propone una velocidad, a la velocidad actual
+#   Pico -> "@ACK <b>"    acepta, y ambos lados cambian a <b> (la Pico cuando terminó de mandarlo)
+#   PC   -> "@PING"       ya a la nueva velocidad
+#   Pico -> "@PONG"       confirma; sin @PING en TIMEOUT_CONFIRMACION_MS vuelve a BAUD_BASE
+#   Pico -> "@NAK <b>"    velocidad no soportada, se queda donde está
+baud_actual = BAUD_BASE
+baud_sin_confirmar = False
+t_cambio_baud = 0
+baud_pedido = None   # aceptada con @ACK; se aplica cuando la UART terminó de mandarlo
+t_pedido = 0
+buffer_pc = bytearray()
+
+def cambiar_baudios(baud):
+    global baud_actual
+    uart_pc.init(baudrate=baud, tx=Pin(0), rx=Pin(1))
+    baud_actual = baud
+
+def aplicar_baud_pedido():
+    """Cambia a baud_pedido cuando salió el @ACK (o a los ESPERA_TX_MS), sin espera activa."""
+    global baud_pedido, baud_sin_confirmar, t_cambio_baud
+    if baud_pedido is None:
+        return
+    if not uart_pc.txdone() and time.ticks_diff(time.ticks_ms(), t_pedido) < ESPERA_TX_MS:
+        return   # no cortar la respuesta
+    cambiar_baudios(baud_pedido)
+    baud_sin_confirmar = baud_pedido != BAUD_BASE
+    t_cambio_baud = time.ticks_ms()
+    baud_pedido = None
+    print("🔧 UART PC -> {} baudios (esperando @PING)".format(baud_actual))
+
+def atender_comando_pc(cmd):
+    global baud_sin_confirmar, baud_pedido, t_pedido
+    if cmd.startswith(b"@BAUD "):
+        try:
+            baud = int(cmd[6:])
+        except ValueError:
+            baud = 0
+        if baud in BAUDIOS_PERMITIDOS:
+            uart_pc.write(b"@ACK %d\n" % baud)
+            baud_pedido = baud
+            t_pedido = time.ticks_ms()
+        else:
+            uart_pc.write(b"@NAK %d\n" % baud)
+    elif cmd == b"@PING":
+        uart_pc.write(b"@PONG\n")
+        if baud_sin_confirmar:
+            baud_sin_confirmar = False
+            print("✅ UART PC confirmada a {} baudios".format(baud_actual))
+
+def atender_pc():
+    """Lee comandos de la PC sin bloquear, aplica el cambio aceptado y el respaldo a BAUD_BASE."""
+    global baud_sin_confirmar
+    n = uart_pc.any()
+    if n:
+        datos = uart_pc.read(n)
+        if datos:
+            buffer_pc.extend(datos)
+            while True:
+                fin = buffer_pc.find(b"\n")
+                if fin < 0:
+                    break
+                linea = bytes(buffer_pc[:fin])
+                del buffer_pc[:fin + 1]
+                inicio = linea.rfind(b"@")   # saltar basura recibida a otra velocidad
+                if inicio >= 0:
+                    atender_comando_pc(linea[inicio:].strip())
+            if len(buffer_pc) > 64:   # basura a otra velocidad: descartar
+                buffer_pc[:] = b""
+
+    aplicar_baud_pedido()
+    if baud_sin_confirmar and time.ticks_diff(time.ticks_ms(), t_cambio_baud) > TIMEOUT_CONFIRMACION_MS:
+        baud_sin_confirmar = False
+        cambiar_baudios(BAUD_BASE)
+        print("⚠ Sin @PING de la PC -> vuelta a {} baudios".format(BAUD_BASE))
+
+# =================== PROGRAMA PRINCIPAL ===================
+print("🔴 Pico W - Receptor NRF24L01 + WiFi")
+print("Iniciando conexión WiFi...")
+
+# Conectar a WiFi
+wifi_ok = conectar_wifi()
+
+# Inicializar NRF24L01
+nrf = inicializar_nrf()
+
+if not nrf:
+    print("❌ No se puede continuar sin NRF24L01")
+else:
+    print("✅ Esperando datos NRF24L01... (reenvío: {})".format(MODO_REENVIO))
+
+while True:
+    try:
+        # ========== RECEPCIÓN NRF24L01 (vaciar toda la FIFO) ==========
+        while nrf.any():
+            try:
+                data = nrf.recv()
+            except OSError as e:
+                # error leyendo FIFO
+                print("⚠ Error al recibir NRF:", e)
+                break
+
+            if data and len(data) == PAYLOAD_SIZE:
+                procesar_paquete(data)
+
+        # ========== ENVÍO A PAGINA WEB ==========
+        if MODO_REENVIO == "ultima":
+            vaciar_pendiente()
+        if TELEMETRIA_UDP:
+            vencer_lote_udp()
+
+        # ========== COMANDOS DE LA PC (negociación de baudios) ==========
+        atender_pc()
+
+        # ========== SUBIDA DE VUELTAS (no bloqueante) ==========
+        subida.atender(mantener_wifi())
+
+        time.sleep_ms(1)  # cede la CPU sin frenar la recepción
+
+    except KeyboardInterrupt:
+        print("\n🛑 Recepción detenida")
+        print("   Recibidas: {} | Reenviadas: {} | Descartadas: {}".format(
+            counter, reenviadas, descartadas))
+        if TELEMETRIA_UDP:
+            print("   UDP: {} datagramas | {} fallidos".format(datagramas_enviados, datagramas_fallidos))
+        break
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        time.sleep(1)
@@ -1,166 +1,266 @@
-# ================= RX: MÁXIMA EFICIENCIA CONTROL + UART(no verificad) =================
-from machine import Pin, SPI, PWM, ADC, UART
-import utime, struct
-from nrf24l01 import NRF24L01
-
-# ---- LED indicador (GP20) ----
-led = Pin(20, Pin.OUT)
-led.off()
-ultima_recepcion = utime.ticks_ms()
-TIEMPO_SIN_SEÑAL = 2000
-
-# ---- Servo dirección (GP15) ----
-servo = PWM(Pin(15))
-servo.freq(50)
-
-def mover_servo_instantaneo(angulo):
-    angulo = max(0, min(80, int(angulo)))
-    pulso_us = 500 + (angulo * 2000) // 180
-    servo.duty_ns(int(pulso_us * 1000))
-    return pulso_us
-
-# ---- Motor ESC (GP9) ----
-esc = PWM(Pin(9))
-esc.freq(50)
-
-def controlar_motor(velocidad):
-    velocidad = max(0, min(100, int(velocidad)))
-    centered = velocidad - 50
-    if abs(centered) < 5:
-        centered = 0
-    pulso_us = 1500 + centered * 10
-    esc.duty_ns(int(pulso_us * 1000))
-    return pulso_us
-
-# ---- FAILSAFE ----
-def failsafe():
-    pwm_m = controlar_motor(50)
-    pwm_s = mover_servo_instantaneo(40)
-    print(f"🛑 FAILSAFE -> Servo CENTRO ({pwm_s} us) | Motor NEUTRO ({pwm_m} us)")
-
-# ---- Radio NRF ----
-spi = SPI(0, sck=Pin(6), mosi=Pin(7), miso=Pin(4))
-csn = Pin(5, Pin.OUT, value=1)
-ce  = Pin(14, Pin.OUT, value=0)
-
-TX_ADDR = b'\xE1\xF0\xF0\xF0\xF0'
-RX_ADDR = b'\xD2\xF0\xF0\xF0\xF0'
-
-def iniciar_nrf():
-    global nrf
-    try:
-        nrf = NRF24L01(spi, csn, ce, payload_size=8)
-        nrf.open_tx_pipe(TX_ADDR)
-        nrf.open_rx_pipe(1, RX_ADDR)
-        nrf.set_power_speed(3, 2)
-        nrf.reg_write(0x01, 0x00)
-        nrf.reg_write(0x04, 0x00)
-        nrf.reg_write(0x05, 100)
-        nrf.reg_write(0x07, 0x70)
-        nrf.start_listening()
-        print("🔄 NRF reinicializado y escuchando...")
-    except Exception as e:
-        print("⚠ Error reiniciando NRF:", e)
-
-iniciar_nrf()
-print("📡 RX listo")
-
-failsafe()
-utime.sleep_ms(2000)
-
-SYNC_BYTE = 0xA5
-
-def verificar_checksum(sync, ang, vel, chk):
-    calc = (sync + (ang & 0xFF) + ((ang >> 8) & 0xFF)
-                 + (vel & 0xFF) + ((vel >> 8) & 0xFF)) & 0xFF
-    return chk == calc
-
-# -------------------------------------------------------------------
-# --- BATERÍA (divisor 20k/10k = factor 3.0)
-# -------------------------------------------------------------------
-adc_bat = ADC(26)
-FACTOR_DIVISOR = 3.0
-
-def leer_bateria():
-    raw = adc_bat.read_u16()
-    v_adc = raw * 3.3 / 65535
-    v_bat = v_adc * FACTOR_DIVISOR
-    return v_bat
-
-vbat_cache = leer_bateria()          # <-- valor inicial REAL
-ultimo_print_bat = utime.ticks_ms()
-# -------------------------------------------------------------------
-
-# ---- UART0: telemetría hacia Placa 3 (GP0 = TX) ----
-uart = UART(0, baudrate=115200, tx=Pin(0))
-ultimo_envio_uart = 0
-INTERVALO_UART = 20  # ms entre envíos UART (más rápido pero no bloqueante)
-
-# ---- Variables cache para UART eficiente ----
-angulo_actual = 40
-velocidad_actual = 50
-pwm_servo_actual = 1500
-pwm_motor_actual = 1500
-
-# ---- Bucle principal OPTIMIZADO ----
-while True:
-    ahora = utime.ticks_ms()
-    
-    # ⚡ PRIORIDAD 1: RECEPCIÓN Y CONTROL INMEDIATO
-    if nrf.any():
-        try:
-            datos = nrf.recv()
-            nrf.reg_write(0x07, 0x70)
-
-            if len(datos) == 8:
-                sync, angulo, velocidad, chk = struct.unpack("<BHHB", datos)
-
-                if sync == SYNC_BYTE and verificar_checksum(sync, angulo, velocidad, chk):
-                    # ⚡ CONTROL INMEDIATO (primero lo más importante)
-                    pwm_servo_actual = mover_servo_instantaneo(angulo)
-                    pwm_motor_actual = controlar_motor(velocidad)
-                    
-                    # Guardar estado para UART y display
-                    angulo_actual = angulo
-                    velocidad_actual = velocidad
-
-                    ultima_recepcion = ahora
-                    led.on()
-
-                    # 🖨️ MOSTRAR EN CONSOLA (igual que antes)
-                    print(f"📥 Servo:{angulo_actual:3d}° ({pwm_servo_actual} us) | "
-                          f"Motor:{velocidad_actual:3d}% ({pwm_motor_actual} us) | "
-                          f"Batt:{vbat_cache:.2f} V")
-
-        except Exception as e:
-            print("❌ Error RX:", e)
-
-    # ⚡ PRIORIDAD 2: UART NO BLOQUEANTE (después del control)
-    if utime.ticks_diff(ahora, ultimo_envio_uart) > INTERVALO_UART:
-        try:
-            # 📡 ENVIAR TELEMETRÍA A PLACA 3 (mismo formato)
-            linea = f"{angulo_actual},{velocidad_actual},{pwm_servo_actual},{pwm_motor_actual},{vbat_cache:.2f}\n"
-            uart.write(linea)
-            ultimo_envio_uart = ahora
-        except Exception as e:
-            print("⚠ Error UART TX:", e)
-
-    # ⚡ PRIORIDAD 3: ACTUALIZAR BATERÍA CADA 1s
-    if utime.ticks_diff(ahora, ultimo_print_bat) > 1000:
-        vbat_cache = leer_bateria()
-        print(f"🔋 Batt:{vbat_cache:.2f} V")
-        ultimo_print_bat = ahora
-
-    # ⚡ PRIORIDAD 4: VERIFICAR FAILSAFE
-    if utime.ticks_diff(ahora, ultima_recepcion) > TIEMPO_SIN_SEÑAL:
-        failsafe()
-        led.toggle()
-        print("❌ Señal perdida → FAILSAFE → reiniciando NRF")
-        iniciar_nrf()
-        utime.sleep_ms(300)
-        # Resetear variables después del failsafe
-        angulo_actual = 40
-        velocidad_actual = 50
-        continue
-
+# ================= RX: MÁXIMA EFICIENCIA CONTROL + UART(no verificad) =================
+from machine import Pin, SPI, PWM, ADC, UART
+import utime, struct
+from nrf24l01 import NRF24L01
+
+# ---- LED indicador (GP20) ----
+led = Pin(20, Pin.OUT)
+led.off()
+ultima_recepcion = utime.ticks_ms()
+TIEMPO_SIN_SEÑAL = 2000
+
+# ---- Modo de depuración ----
+# DEBUG = True imprime cada paquete y la batería (agrega jitter al control).
+# SONDA_LATENCIA = True mide recepción -> duty_ns y muestra un histograma.
+DEBUG = False
+SONDA_LATENCIA = False
+
+# ---- Tablas de pulsos precalculadas (solo enteros en el bucle) ----
+ANGULO_MAX = 80
+PULSO_SERVO_US = tuple(500 + (a * 2000) // 180 for a in range(ANGULO_MAX + 1))
+PULSO_SERVO_NS = tuple(p * 1000 for p in PULSO_SERVO_US)
+
+def _pulso_motor(velocidad):
+    centered = velocidad - 50
+    if abs(centered) < 5:
+        centered = 0
+    return 1500 + centered * 10
+
+PULSO_MOTOR_US = tuple(_pulso_motor(v) for v in range(101))
+PULSO_MOTOR_NS = tuple(p * 1000 for p in PULSO_MOTOR_US)
+
+# ---- Servo dirección (GP15) ----
+servo = PWM(Pin(15))
+servo.freq(50)
+
+def mover_servo_instantaneo(angulo):
+    if angulo > ANGULO_MAX:
+        angulo = ANGULO_MAX
+    elif angulo < 0:
+        angulo = 0
+    servo.duty_ns(PULSO_SERVO_NS[angulo])
+    return PULSO_SERVO_US[angulo]
+
+# ---- Motor ESC (GP9) ----
+esc = PWM(Pin(9))
+esc.freq(50)
+
+def controlar_motor(velocidad):
+    if velocidad > 100:
+        velocidad = 100
+    elif velocidad < 0:
+        velocidad = 0
+    esc.duty_ns(PULSO_MOTOR_NS[velocidad])
+    return PULSO_MOTOR_US[velocidad]
+
+# ---- Sonda de latencia: histograma recepción -> duty_ns ----
+ANCHO_CUBETA_US = 50
+N_CUBETAS = 40                      # última cubeta = ">= 1950 us"
+hist_latencia = [0] * N_CUBETAS
+latencia_max_us = 0
+INTERVALO_REPORTE_LAT = 5000        # ms
+ultimo_reporte_lat = utime.ticks_ms()
+
+def registrar_latencia(t_llegada):
+    global latencia_max_us
+    dt = utime.ticks_diff(utime.ticks_us(), t_llegada)
+    i = dt // ANCHO_CUBETA_US
+    if i >= N_CUBETAS:
+        i = N_CUBETAS - 1
+    hist_latencia[i] += 1
+    if dt > latencia_max_us:
+        latencia_max_us = dt
+
+def reportar_latencia():
+    global latencia_max_us
+    total = sum(hist_latencia)
+    if total == 0:
+        return
+    print("⏱ Latencia control ({} paquetes, máx {} us):".format(total, latencia_max_us))
+    for i in range(N_CUBETAS):
+        n = hist_latencia[i]
+        if n:
+            print("   {:4d}-{:4d} us: {:5d} {}".format(
+                i * ANCHO_CUBETA_US, (i + 1) * ANCHO_CUBETA_US - 1, n,
+                "#" * (n * 40 // total)))
+            hist_latencia[i] = 0
+    latencia_max_us = 0
+
+# ---- FAILSAFE ----
+def failsafe():
+    pwm_m = controlar_motor(50)
+    pwm_s = mover_servo_instantaneo(40)
+    print(f"🛑 FAILSAFE -> Servo CENTRO ({pwm_s} us) | Motor NEUTRO ({pwm_m} us)")
+
+# ---- Radio NRF ----
+spi = SPI(0, sck=Pin(6), mosi=Pin(7), miso=Pin(4))
+csn = Pin(5, Pin.OUT, value=1)
+ce  = Pin(14, Pin.OUT, value=0)
+
+TX_ADDR = b'\xE1\xF0\xF0\xF0\xF0'
+RX_ADDR = b'\xD2\xF0\xF0\xF0\xF0'
+
+def iniciar_nrf():
+    global nrf
+    try:
+        nrf = NRF24L01(spi, csn, ce, payload_size=8)
+        nrf.open_tx_pipe(TX_ADDR)
+        nrf.open_rx_pipe(1, RX_ADDR)
+        nrf.set_power_speed(3, 2)
+        nrf.reg_write(0x01, 0x00)
+        nrf.reg_write(0x04, 0x00)
+        nrf.reg_write(0x05, 100)
+        nrf.reg_write(0x07, 0x70)
+        nrf.start_listening()
+        print("🔄 NRF reinicializado y escuchando...")
+    except Exception as e:
+        print("⚠ Error reiniciando NRF:", e)
+
+iniciar_nrf()
+print("📡 RX listo")
+
+failsafe()
+utime.sleep_ms(2000)
+
+SYNC_BYTE = 0xA5
+
+# Paquete del TX: <BHHBBx = sync, ángulo, velocidad, secuencia, checksum, relleno
+def verificar_checksum(sync, ang, vel, seq, chk):
+    calc = (sync + (ang & 0xFF) + ((ang >> 8) & 0xFF)
+                 + (vel & 0xFF) + ((vel >> 8) & 0xFF) + seq) & 0xFF
+    return chk == calc
+
+# ---- Pérdida de paquetes (por huecos en la secuencia) ----
+ultimo_seq = -1
+paquetes_ok = 0
+paquetes_perdidos = 0
+
+def contar_secuencia(seq):
+    global ultimo_seq, paquetes_ok, paquetes_perdidos
+    if ultimo_seq >= 0:
+        paquetes_perdidos += (seq - ultimo_seq - 1) & 0xFF
+    ultimo_seq = seq
+    paquetes_ok += 1
+
+# -------------------------------------------------------------------
+# --- BATERÍA (divisor 20k/10k = factor 3.0)
+# -------------------------------------------------------------------
+adc_bat = ADC(26)
+FACTOR_DIVISOR = 3.0
+
+def leer_bateria():
+    raw = adc_bat.read_u16()
+    v_adc = raw * 3.3 / 65535
+    v_bat = v_adc * FACTOR_DIVISOR
+    return v_bat
+
+vbat_cache = leer_bateria()          # <-- valor inicial REAL
+vbat_cv = int(vbat_cache * 100)      # centésimas de V para la trama binaria
+ultimo_print_bat = utime.ticks_ms()
+# -------------------------------------------------------------------
+
+# ---- UART0: telemetría hacia Placa 3 (GP0 = TX) ----
+uart = UART(0, baudrate=115200, tx=Pin(0))
+ultimo_envio_uart = 0
+INTERVALO_UART = 20  # ms entre envíos UART (más rápido pero no bloqueante)
+
+# Trama binaria fija hacia Placa 3 (13 bytes, sin strings):
+#   0xAA 0x55 | <HHHHH angulo, velocidad, pwm_servo, pwm_motor, vbat_cv | checksum
+# checksum = suma de los 10 bytes de datos & 0xFF
+SYNC_UART_1 = 0xAA
+SYNC_UART_2 = 0x55
+TAM_TRAMA_UART = 13
+trama_uart = bytearray(TAM_TRAMA_UART)
+trama_uart[0] = SYNC_UART_1
+trama_uart[1] = SYNC_UART_2
+
+def armar_trama_uart(angulo, velocidad, pwm_servo, pwm_motor, vbat_cv):
+    struct.pack_into("<HHHHH", trama_uart, 2, angulo, velocidad, pwm_servo, pwm_motor, vbat_cv)
+    chk = 0
+    for i in range(2, TAM_TRAMA_UART - 1):
+        chk += trama_uart[i]
+    trama_uart[TAM_TRAMA_UART - 1] = chk & 0xFF
+    return trama_uart
+
+# ---- Variables cache para UART eficiente ----
+angulo_actual = 40
+velocidad_actual = 50
+pwm_servo_actual = 1500
+pwm_motor_actual = 1500
+
+# ---- Bucle principal OPTIMIZADO ----
+while True:
+    ahora = utime.ticks_ms()
+    
+    # ⚡ PRIORIDAD 1: RECEPCIÓN Y CONTROL INMEDIATO
+    if nrf.any():
+        t_llegada = utime.ticks_us()
+        try:
+            datos = nrf.recv()   # recv() ya limpia RX_DR en STATUS
+
+            if len(datos) == 8:
+                sync, angulo, velocidad, seq, chk = struct.unpack_from("<BHHBB", datos)
+
+                if sync == SYNC_BYTE and verificar_checksum(sync, angulo, velocidad, seq, chk):
+                    # ⚡ CONTROL INMEDIATO (primero lo más importante)
+                    pwm_servo_actual = mover_servo_instantaneo(angulo)
+                    pwm_motor_actual = controlar_motor(velocidad)
+                    if SONDA_LATENCIA:
+                        registrar_latencia(t_llegada)
+
+                    contar_secuencia(seq)
+
+                    # Guardar estado para UART y display
+                    angulo_actual = angulo
+                    velocidad_actual = velocidad
+
+                    ultima_recepcion = ahora
+                    led.on()
+
+                    # 🖨️ MOSTRAR EN CONSOLA (solo en DEBUG)
+                    if DEBUG:
+                        print(f"📥 Servo:{angulo_actual:3d}° ({pwm_servo_actual} us) | "
+                              f"Motor:{velocidad_actual:3d}% ({pwm_motor_actual} us) | "
+                              f"Batt:{vbat_cache:.2f} V")
+
+        except Exception as e:
+            print("❌ Error RX:", e)
+            nrf.reg_write(0x07, 0x70)   # limpiar flags solo si algo falló
+
+    # ⚡ PRIORIDAD 2: UART NO BLOQUEANTE (después del control)
+    if utime.ticks_diff(ahora, ultimo_envio_uart) > INTERVALO_UART:
+        try:
+            # 📡 ENVIAR TELEMETRÍA A PLACA 3 (trama binaria preasignada)
+            uart.write(armar_trama_uart(angulo_actual, velocidad_actual,
+                                        pwm_servo_actual, pwm_motor_actual, vbat_cv))
+            ultimo_envio_uart = ahora
+        except Exception as e:
+            print("⚠ Error UART TX:", e)
+
+    # ⚡ PRIORIDAD 3: ACTUALIZAR BATERÍA CADA 1s
+    if utime.ticks_diff(ahora, ultimo_print_bat) > 1000:
+        vbat_cache = leer_bateria()
+        vbat_cv = int(vbat_cache * 100)
+        if DEBUG:
+            print(f"🔋 Batt:{vbat_cache:.2f} V | RX ok:{paquetes_ok} perdidos:{paquetes_perdidos}")
+        ultimo_print_bat = ahora
+
+    # ⚡ SONDA DE LATENCIA: reporte periódico fuera del camino de control
+    if SONDA_LATENCIA and utime.ticks_diff(ahora, ultimo_reporte_lat) > INTERVALO_REPORTE_LAT:
+        reportar_latencia()
+        ultimo_reporte_lat = ahora
+
+    # ⚡ PRIORIDAD 4: VERIFICAR FAILSAFE
+    if utime.ticks_diff(ahora, ultima_recepcion) > TIEMPO_SIN_SEÑAL:
+        failsafe()
+        led.toggle()
+        print("❌ Señal perdida → FAILSAFE → reiniciando NRF")
+        iniciar_nrf()
+        utime.sleep_ms(300)
+        # Resetear variables después del failsafe
+        angulo_actual = 40
+        velocidad_actual = 50
+        ultimo_seq = -1   # tras el corte no contar el hueco como pérdida
+        continue
+
     utime.sleep_us(250)  # ⚡ Loop ligeramente más rápido
\ No newline at end of file
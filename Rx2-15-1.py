@@ -1,43 +1,86 @@
-# ==================== Placa 3 – Receptor UART de telemetría ====================
-from machine import UART, Pin
-import utime
-
-# UART0: RX en GP1 (desde GP0 TX de Placa 2)
-uart = UART(0, baudrate=115200, rx=Pin(1))
-
-print("📡 Placa 3 lista para recibir telemetría...")
-
-while True:
-    if uart.any():
-        try:
-            linea = uart.readline()
-            if not linea:
-                continue
-
-            # Convertir a texto
-            try:
-                texto = linea.decode().strip()
-            except:
-                continue
-
-            # Esperado: angulo,velocidad,pwm_servo,pwm_motor,voltaje
-            datos = texto.split(",")
-
-            if len(datos) == 5:
-                angulo    = int(datos[0])
-                velocidad = int(datos[1])
-                pwm_servo = int(datos[2])
-                pwm_motor = int(datos[3])
-                vbat      = float(datos[4])
-
-                # === Solo 3 columnas claras ===
-                print(f"Servo:{angulo:3d}° ({pwm_servo} us) | "
-                      f"Motor:{velocidad:3d}% ({pwm_motor} us) | "
-                      f"Batt:{vbat:0.2f} V")
-
-        except Exception as e:
-            # Evita fallos si llega alguna línea incompleta
-            print("⚠ Error UART:", e)
-
-    utime.sleep_ms(5)
-
+# ==================== Placa 3 – Receptor UART de telemetría ====================
+from machine import UART, Pin
+import utime, struct
+
+# UART0: RX en GP1 (desde GP0 TX de Placa 2)
+uart = UART(0, baudrate=115200, rx=Pin(1))
+
+# ---------------- TRAMA BINARIA DESDE PLACA 2 ----------------
+# 0xAA 0x55 | <HHHHH angulo, velocidad, pwm_servo, pwm_motor, vbat_cv | checksum
+SYNC_UART_1 = 0xAA
+SYNC_UART_2 = 0x55
+TAM_TRAMA_UART = 13
+
+class LectorTramas:
+    """Lee tramas binarias con readinto sobre un buffer fijo y se resincroniza solo."""
+
+    def __init__(self, uart, tam_buffer=64):
+        self.uart = uart
+        self.buf = bytearray(tam_buffer)
+        self.mv = memoryview(self.buf)
+        self.n = 0            # bytes válidos en buf
+        self.validas = 0
+        self.descartados = 0  # bytes saltados buscando sincronía o por checksum
+
+    def leer(self):
+        """Devuelve (angulo, velocidad, pwm_servo, pwm_motor, vbat_cv) de la
+        última trama válida disponible, o None si no llegó ninguna completa."""
+        libre = len(self.buf) - self.n
+        if libre:
+            leidos = self.uart.readinto(self.mv[self.n:], libre)
+            if leidos:
+                self.n += leidos
+
+        buf = self.buf
+        resultado = None
+        i = 0
+        while self.n - i >= TAM_TRAMA_UART:
+            if buf[i] != SYNC_UART_1 or buf[i + 1] != SYNC_UART_2:
+                i += 1
+                self.descartados += 1
+                continue
+            # Otro 0xAA 0x55 adentro (o en el checksum, si ya llegó el byte siguiente):
+            # esta trama vino cortada y ahí empieza la próxima. En una trama sana no
+            # aparece: los bytes altos de los cinco campos son <= 7.
+            fin = i + TAM_TRAMA_UART
+            chk = 0
+            cortada = fin < self.n and buf[fin - 1] == SYNC_UART_1 and buf[fin] == SYNC_UART_2
+            for k in range(i + 2, fin - 1):
+                chk += buf[k]
+                if buf[k] == SYNC_UART_1 and buf[k + 1] == SYNC_UART_2:
+                    cortada = True
+            if cortada or (chk & 0xFF) != buf[fin - 1]:
+                i += 1
+                self.descartados += 1
+                continue
+            resultado = struct.unpack_from("<HHHHH", buf, i + 2)
+            self.validas += 1
+            i += TAM_TRAMA_UART
+
+        if i:
+            # Mover el resto (trama incompleta) al inicio del buffer
+            resto = self.n - i
+            self.mv[0:resto] = self.mv[i:self.n]
+            self.n = resto
+        return resultado
+
+lector = LectorTramas(uart)
+
+print("📡 Placa 3 lista para recibir telemetría...")
+
+while True:
+    if uart.any():
+        try:
+            datos = lector.leer()
+            if datos is not None:
+                angulo, velocidad, pwm_servo, pwm_motor, vbat_cv = datos
+
+                # === Solo 3 columnas claras ===
+                print(f"Servo:{angulo:3d}° ({pwm_servo} us) | "
+                      f"Motor:{velocidad:3d}% ({pwm_motor} us) | "
+                      f"Batt:{vbat_cv / 100:0.2f} V")
+
+        except Exception as e:
+            print("⚠ Error UART:", e)
+
+    utime.sleep_ms(5)
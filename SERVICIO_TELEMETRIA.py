@@ -1,701 +1,2042 @@
-"""
-Script Python para PC - Telemetría Raspberry Pico 2
-Servidor Web Mejorado - BAUD RATE 1200 con Sensor de Línea
-"""
-import serial
-import json
-import webbrowser
-import threading
-from http.server import HTTPServer, BaseHTTPRequestHandler
-import time
-import re
-from datetime import datetime
-
-# ============ CONFIGURACIÓN ============
-PUERTO_COM = 'COM6'
-BAUDRATE = 1200  # Cambiado a 1200 baudios
-PUERTO_WEB = 8080
-
-# ============ DATOS GLOBALES ============
-telemetry_data = {
-    "gps": {"latitude": 0.0, "longitude": 0.0, "altitude": 0.0, "speed": 0.0},
-    "accelerometer": {"x": 0.0, "y": 0.0, "z": 0.0},
-    "gyroscope": {"x": 0.0, "y": 0.0, "z": 0.0},
-    "servo": {"angle": 0.0},
-    "motor": {"speed": 0.0},
-    "battery": {"voltage": 0.0},
-    "temperature": {"value": 0.0},
-    "line_sensor": {"value": 0, "status": "DESCONOCIDO"},  # Nuevo sensor de línea
-    "counter": {"value": 0},
-    "data_rate": {"hz": 0.0}
-}
-
-connection_status = {"connected": False}
-last_update_time = datetime.now()
-
-# ============ LECTURA DE PUERTO SERIE ============
-def leer_puerto_serie():
-    global telemetry_data, connection_status, last_update_time
-    
-    print(f"Conectando a {PUERTO_COM} a {BAUDRATE} baudios...")
-    
-    while True:
-        try:
-            with serial.Serial(PUERTO_COM, BAUDRATE, timeout=2) as ser:  # Timeout aumentado
-                print(f"✓ Puerto {PUERTO_COM} abierto a {BAUDRATE} baudios")
-                connection_status["connected"] = True
-                ser.reset_input_buffer()
-                
-                while True:
-                    if ser.in_waiting > 0:
-                        try:
-                            linea = ser.readline().decode('utf-8', errors='ignore').strip()
-                            if linea:
-                                print(f"📨 Recibido: {linea}")
-                                if parsear_telemetria(linea):
-                                    connection_status["connected"] = True
-                                    last_update_time = datetime.now()
-                        except Exception as e:
-                            print(f"Error lectura: {e}")
-                    
-                    time.sleep(0.05)  # Aumentado para 1200 baudios
-                    
-        except Exception as e:
-            print(f"✗ Error puerto: {e}")
-            connection_status["connected"] = False
-            time.sleep(3)  # Mayor tiempo de espera
-
-def parsear_telemetria(linea):
-    global telemetry_data
-    
-    try:
-        # Servo PWM
-        servo_match = re.search(r'ServoPWM:(\d+)us', linea)
-        if servo_match:
-            servo_us = int(servo_match.group(1))
-            servo_angle = ((servo_us - 1000) / 1000) * 180
-            telemetry_data["servo"]["angle"] = max(0, min(180, servo_angle))
-        
-        # Motor PWM
-        motor_match = re.search(r'MotorPWM:(\d+)us', linea)
-        if motor_match:
-            motor_us = int(motor_match.group(1))
-            motor_speed = ((motor_us - 1500) / 500) * 100
-            telemetry_data["motor"]["speed"] = max(-100, min(100, motor_speed))
-        
-        # Batería
-        batt_match = re.search(r'Batt:([\d.]+)V', linea)
-        if batt_match:
-            telemetry_data["battery"]["voltage"] = float(batt_match.group(1))
-        
-        # Acelerómetro
-        acc_match = re.search(r'ACC:X:([+-]?[\d.]+)\s+Y:([+-]?[\d.]+)\s+Z:([+-]?[\d.]+)\s+m/s2', linea)
-        if acc_match:
-            telemetry_data["accelerometer"]["x"] = float(acc_match.group(1))
-            telemetry_data["accelerometer"]["y"] = float(acc_match.group(2))
-            telemetry_data["accelerometer"]["z"] = float(acc_match.group(3))
-        
-        # Giroscopio
-        gyro_match = re.search(r'GYRO:X:([+-]?[\d.-]+)\s+Y:([+-]?[\d.-]+)\s+Z:([+-]?[\d.-]+)', linea)
-        if gyro_match:
-            gx = gyro_match.group(1)
-            gy = gyro_match.group(2)
-            gz = gyro_match.group(3)
-            if gx != '---':
-                telemetry_data["gyroscope"]["x"] = float(gx)
-            if gy != '---':
-                telemetry_data["gyroscope"]["y"] = float(gy)
-            if gz != '---':
-                telemetry_data["gyroscope"]["z"] = float(gz)
-        
-        # GPS
-        gps_match = re.search(r'GPS:\(([+-]?[\d.]+),([+-]?[\d.]+)\)\s+Alt:([\d.]+)m\s+Spd:([\d.]+)km/h', linea)
-        if gps_match:
-            telemetry_data["gps"]["latitude"] = float(gps_match.group(1))
-            telemetry_data["gps"]["longitude"] = float(gps_match.group(2))
-            telemetry_data["gps"]["altitude"] = float(gps_match.group(3))
-            telemetry_data["gps"]["speed"] = float(gps_match.group(4))
-        
-        # Temperatura
-        temp_match = re.search(r'Temp:([\d.]+)C', linea)
-        if temp_match:
-            telemetry_data["temperature"]["value"] = float(temp_match.group(1))
-        
-        # Sensor de Línea - Nuevo
-        line_match = re.search(r'Line:(\d)', linea)
-        if line_match:
-            line_value = int(line_match.group(1))
-            telemetry_data["line_sensor"]["value"] = line_value
-            # 0 = Sobre la línea, 1 = Fuera de la línea
-            if line_value == 0:
-                telemetry_data["line_sensor"]["status"] = "SOBRE LÍNEA"
-            else:
-                telemetry_data["line_sensor"]["status"] = "FUERA LÍNEA"
-        
-        return True
-        
-    except Exception as e:
-        print(f"✗ Error parseando: {e}")
-        return False
-
-# ============ SERVIDOR WEB ============
-class TelemetryHandler(BaseHTTPRequestHandler):
-    
-    def do_GET(self):
-        if self.path == '/':
-            self.serve_html()
-        elif self.path == '/telemetry':
-            self.serve_telemetry()
-        elif self.path == '/state':
-            self.serve_state()
-        else:
-            self.send_error(404)
-    
-    def serve_html(self):
-        try:
-            self.send_response(200)
-            self.send_header('Content-type', 'text/html; charset=utf-8')
-            self.end_headers()
-            
-            html = self.get_html_page()
-            self.wfile.write(html.encode('utf-8'))
-        except Exception as e:
-            print(f"✗ Error sirviendo HTML: {e}")
-    
-    def serve_telemetry(self):
-        try:
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.send_header('Cache-Control', 'no-cache, no-store, must-revalidate')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            
-            json_data = json.dumps(telemetry_data)
-            self.wfile.write(json_data.encode('utf-8'))
-        except Exception as e:
-            print(f"✗ Error sirviendo JSON: {e}")
-    
-    def serve_state(self):
-        try:
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.send_header('Cache-Control', 'no-cache')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            
-            estado = {
-                "connected": connection_status["connected"],
-                "last_update": last_update_time.isoformat(),
-                "telemetry": telemetry_data
-            }
-            json_data = json.dumps(estado)
-            self.wfile.write(json_data.encode('utf-8'))
-        except Exception as e:
-            print(f"✗ Error sirviendo estado: {e}")
-    
-    def log_message(self, format, *args):
-        pass
-    
-    def get_html_page(self):
-        return '''<!DOCTYPE html>
-<html lang="es">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>📡 Telemetría Raspberry Pico 2 - 1200 Baud</title>
-    <style>
-        * { margin: 0; padding: 0; box-sizing: border-box; }
-        
-        body { 
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-            background: linear-gradient(135deg, #0f172a 0%, #1e293b 100%);
-            color: #f1f5f9;
-            padding: 20px;
-            min-height: 100vh;
-        }
-        
-        .container { max-width: 1400px; margin: 0 auto; }
-        
-        header { text-align: center; margin-bottom: 30px; }
-        
-        h1 {
-            font-size: 2.5em;
-            background: linear-gradient(135deg, #10b981, #3b82f6);
-            -webkit-background-clip: text;
-            -webkit-text-fill-color: transparent;
-            background-clip: text;
-            margin-bottom: 10px;
-        }
-        
-        .subtitle { color: #94a3b8; font-size: 1.1em; }
-        
-        .baud-info {
-            background: rgba(245, 158, 11, 0.2);
-            padding: 10px 20px;
-            border-radius: 10px;
-            margin: 10px auto;
-            display: inline-block;
-            border: 1px solid rgba(245, 158, 11, 0.5);
-            color: #f59e0b;
-            font-weight: bold;
-        }
-        
-        .speed-warning {
-            background: rgba(239, 68, 68, 0.2);
-            padding: 8px 16px;
-            border-radius: 8px;
-            margin: 5px auto;
-            display: inline-block;
-            border: 1px solid rgba(239, 68, 68, 0.5);
-            color: #ef4444;
-            font-size: 0.9em;
-        }
-        
-        .status-card {
-            background: linear-gradient(145deg, #1e293b, #334155);
-            border-radius: 16px;
-            padding: 20px;
-            margin-bottom: 25px;
-            box-shadow: 0 8px 32px rgba(0, 0, 0, 0.3);
-            border: 1px solid rgba(255, 255, 255, 0.1);
-            display: flex;
-            align-items: center;
-            gap: 20px;
-            transition: all 0.3s ease;
-        }
-        
-        .status-card.connected {
-            background: linear-gradient(145deg, #065f46, #047857);
-            border-color: #10b981;
-        }
-        
-        .status-card.disconnected {
-            background: linear-gradient(145deg, #7f1d1d, #991b1b);
-            border-color: #ef4444;
-        }
-        
-        .line-status-card {
-            background: linear-gradient(145deg, #1e293b, #334155);
-            border-radius: 16px;
-            padding: 20px;
-            margin-bottom: 25px;
-            box-shadow: 0 8px 32px rgba(0, 0, 0, 0.3);
-            border: 1px solid rgba(255, 255, 255, 0.1);
-            display: flex;
-            align-items: center;
-            gap: 20px;
-            transition: all 0.3s ease;
-        }
-        
-        .line-status-card.on-line {
-            background: linear-gradient(145deg, #065f46, #047857);
-            border-color: #10b981;
-        }
-        
-        .line-status-card.off-line {
-            background: linear-gradient(145deg, #dc2626, #b91c1c);
-            border-color: #ef4444;
-        }
-        
-        .line-status-card.unknown {
-            background: linear-gradient(145deg, #475569, #374151);
-            border-color: #94a3b8;
-        }
-        
-        .status-icon { font-size: 2.5em; }
-        
-        .status-text h2 { font-size: 1.5em; margin-bottom: 5px; }
-        
-        .grid {
-            display: grid;
-            grid-template-columns: repeat(auto-fit, minmax(350px, 1fr));
-            gap: 25px;
-            margin-bottom: 25px;
-        }
-        
-        .card {
-            background: linear-gradient(145deg, #1e293b, #2d3748);
-            border-radius: 16px;
-            padding: 25px;
-            box-shadow: 0 8px 32px rgba(0, 0, 0, 0.3);
-            border: 1px solid rgba(255, 255, 255, 0.1);
-        }
-        
-        .card-header {
-            display: flex;
-            align-items: center;
-            gap: 12px;
-            margin-bottom: 20px;
-            padding-bottom: 15px;
-            border-bottom: 2px solid rgba(16, 185, 129, 0.3);
-        }
-        
-        .card-icon {
-            background: rgba(16, 185, 129, 0.2);
-            padding: 10px;
-            border-radius: 12px;
-            font-size: 1.5em;
-        }
-        
-        .card-title { font-size: 1.3em; font-weight: 600; }
-        
-        .data-row {
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-            padding: 12px 0;
-            border-bottom: 1px solid rgba(255, 255, 255, 0.05);
-        }
-        
-        .data-row:last-child { border-bottom: none; }
-        
-        .data-label { color: #94a3b8; font-weight: 500; }
-        
-        .data-value {
-            font-family: 'Courier New', monospace;
-            font-size: 1.1em;
-            font-weight: bold;
-            color: #10b981;
-        }
-        
-        .unit { color: #64748b; font-size: 0.9em; margin-left: 5px; }
-        
-        .map-button {
-            width: 100%;
-            background: linear-gradient(135deg, #10b981, #059669);
-            color: white;
-            border: none;
-            padding: 15px;
-            border-radius: 12px;
-            font-size: 1.1em;
-            font-weight: 600;
-            cursor: pointer;
-            margin-top: 15px;
-        }
-        
-        .map-button:disabled {
-            background: #475569;
-            cursor: not-allowed;
-        }
-        
-        .temp-bar {
-            width: 100%;
-            height: 8px;
-            background: #334155;
-            border-radius: 10px;
-            overflow: hidden;
-            margin-top: 10px;
-        }
-        
-        .temp-fill {
-            height: 100%;
-            background: linear-gradient(90deg, #3b82f6, #f59e0b);
-            transition: width 0.5s ease;
-            border-radius: 10px;
-        }
-        
-        footer {
-            text-align: center;
-            color: #64748b;
-            margin-top: 30px;
-            padding: 20px;
-            background: rgba(30, 41, 59, 0.5);
-            border-radius: 12px;
-        }
-        
-        .last-update { color: #94a3b8; font-size: 0.9em; margin-top: 10px; }
-    </style>
-</head>
-<body>
-    <div class="container">
-        <header>
-            <h1>📡 Telemetría Raspberry Pico 2</h1>
-            <p class="subtitle">Monitor en Tiempo Real - Puerto COM6</p>
-            <div class="baud-info">
-                <strong>Velocidad: 1200 baudios</strong>
-            </div>
-            <div class="speed-warning">
-                ⚠️ Velocidad baja - Actualización más lenta
-            </div>
-            <p class="last-update" id="lastUpdate">Esperando datos...</p>
-        </header>
-        
-        <div class="status-card disconnected" id="statusCard">
-            <div class="status-icon">📶</div>
-            <div class="status-text">
-                <h2 id="statusTitle">DESCONECTADO</h2>
-                <p id="statusDesc">Esperando conexión con el dispositivo</p>
-            </div>
-        </div>
-        
-        <!-- Nuevo Card para Sensor de Línea -->
-        <div class="line-status-card unknown" id="lineStatusCard">
-            <div class="status-icon" id="lineIcon">❓</div>
-            <div class="status-text">
-                <h2 id="lineTitle">SENSOR DE LÍNEA</h2>
-                <p id="lineDesc">Esperando datos del sensor...</p>
-            </div>
-        </div>
-        
-        <div class="grid">
-            <!-- GPS Card -->
-            <div class="card">
-                <div class="card-header">
-                    <div class="card-icon">📍</div>
-                    <div class="card-title">Posición GPS</div>
-                </div>
-                <div class="data-row">
-                    <span class="data-label">Latitud</span>
-                    <span class="data-value"><span id="lat">0.000000</span><span class="unit">°</span></span>
-                </div>
-                <div class="data-row">
-                    <span class="data-label">Longitud</span>
-                    <span class="data-value"><span id="lon">0.000000</span><span class="unit">°</span></span>
-                </div>
-                <div class="data-row">
-                    <span class="data-label">Altitud</span>
-                    <span class="data-value"><span id="alt">0.0</span><span class="unit">m</span></span>
-                </div>
-                <div class="data-row">
-                    <span class="data-label">Velocidad</span>
-                    <span class="data-value"><span id="spd">0.0</span><span class="unit">km/h</span></span>
-                </div>
-                <button class="map-button" id="mapButton" onclick="openGoogleMaps()">
-                    🗺️ Abrir en Google Maps
-                </button>
-            </div>
-            
-            <!-- Accelerometer Card -->
-            <div class="card">
-                <div class="card-header">
-                    <div class="card-icon">⚡</div>
-                    <div class="card-title">Acelerómetro</div>
-                </div>
-                <div class="data-row">
-                    <span class="data-label">Eje X</span>
-                    <span class="data-value"><span id="accx">0.000</span><span class="unit">m/s²</span></span>
-                </div>
-                <div class="data-row">
-                    <span class="data-label">Eje Y</span>
-                    <span class="data-value"><span id="accy">0.000</span><span class="unit">m/s²</span></span>
-                </div>
-                <div class="data-row">
-                    <span class="data-label">Eje Z</span>
-                    <span class="data-value"><span id="accz">0.000</span><span class="unit">m/s²</span></span>
-                </div>
-            </div>
-            
-            <!-- Gyroscope Card -->
-            <div class="card">
-                <div class="card-header">
-                    <div class="card-icon">🧭</div>
-                    <div class="card-title">Giroscopio</div>
-                </div>
-                <div class="data-row">
-                    <span class="data-label">Eje X</span>
-                    <span class="data-value"><span id="gyrox">0.000</span><span class="unit">°/s</span></span>
-                </div>
-                <div class="data-row">
-                    <span class="data-label">Eje Y</span>
-                    <span class="data-value"><span id="gyroy">0.000</span><span class="unit">°/s</span></span>
-                </div>
-                <div class="data-row">
-                    <span class="data-label">Eje Z</span>
-                    <span class="data-value"><span id="gyroz">0.000</span><span class="unit">°/s</span></span>
-                </div>
-            </div>
-            
-            <!-- Actuators Card -->
-            <div class="card">
-                <div class="card-header">
-                    <div class="card-icon">⚙️</div>
-                    <div class="card-title">Actuadores</div>
-                </div>
-                <div class="data-row">
-                    <span class="data-label">Ángulo Servo</span>
-                    <span class="data-value"><span id="servo">0</span><span class="unit">°</span></span>
-                </div>
-                <div class="data-row">
-                    <span class="data-label">Velocidad Motor</span>
-                    <span class="data-value"><span id="motor">0.0</span><span class="unit">%</span></span>
-                </div>
-                <div class="data-row">
-                    <span class="data-label">Batería</span>
-                    <span class="data-value"><span id="batt">0.00</span><span class="unit">V</span></span>
-                </div>
-            </div>
-            
-            <!-- Temperature Card -->
-            <div class="card">
-                <div class="card-header">
-                    <div class="card-icon">🌡️</div>
-                    <div class="card-title">Temperatura</div>
-                </div>
-                <div class="data-row">
-                    <span class="data-label">Temperatura Actual</span>
-                    <span class="data-value"><span id="temp">0.0</span><span class="unit">°C</span></span>
-                </div>
-                <div class="temp-bar">
-                    <div class="temp-fill" id="tempBar" style="width: 0%"></div>
-                </div>
-            </div>
-        </div>
-        
-        <footer>
-            <p>Sistema de Telemetría · Raspberry Pico 2 · 1200 Baudios</p>
-            <p>Recibiendo datos vía UART desde COM6</p>
-        </footer>
-    </div>
-
-    <script>
-        let gpsLat = 0, gpsLon = 0;
-        let updateInProgress = false;
-        
-        function updateUI(data) {
-            if (updateInProgress) return;
-            updateInProgress = true;
-            
-            // GPS
-            gpsLat = data.gps.latitude;
-            gpsLon = data.gps.longitude;
-            document.getElementById('lat').textContent = data.gps.latitude.toFixed(6);
-            document.getElementById('lon').textContent = data.gps.longitude.toFixed(6);
-            document.getElementById('alt').textContent = data.gps.altitude.toFixed(1);
-            document.getElementById('spd').textContent = data.gps.speed.toFixed(1);
-            
-            // Acelerómetro
-            document.getElementById('accx').textContent = data.accelerometer.x.toFixed(3);
-            document.getElementById('accy').textContent = data.accelerometer.y.toFixed(3);
-            document.getElementById('accz').textContent = data.accelerometer.z.toFixed(3);
-            
-            // Giroscopio
-            document.getElementById('gyrox').textContent = data.gyroscope.x.toFixed(3);
-            document.getElementById('gyroy').textContent = data.gyroscope.y.toFixed(3);
-            document.getElementById('gyroz').textContent = data.gyroscope.z.toFixed(3);
-            
-            // Actuadores
-            document.getElementById('servo').textContent = Math.round(data.servo.angle);
-            document.getElementById('motor').textContent = data.motor.speed.toFixed(1);
-            document.getElementById('batt').textContent = data.battery.voltage.toFixed(2);
-            
-            // Temperatura
-            const temp = data.temperature.value;
-            document.getElementById('temp').textContent = temp.toFixed(1);
-            const tempPercent = Math.min(100, (temp / 50) * 100);
-            document.getElementById('tempBar').style.width = tempPercent + '%';
-            
-            // Sensor de Línea - Nuevo
-            updateLineSensor(data.line_sensor);
-            
-            // Actualizar timestamp
-            const now = new Date();
-            document.getElementById('lastUpdate').textContent = 
-                'Última actualización: ' + now.toLocaleTimeString();
-            
-            updateInProgress = false;
-        }
-
-        function updateLineSensor(lineData) {
-            const card = document.getElementById('lineStatusCard');
-            const title = document.getElementById('lineTitle');
-            const desc = document.getElementById('lineDesc');
-            const icon = document.getElementById('lineIcon');
-            
-            const lineValue = lineData.value;
-            const status = lineData.status;
-            
-            if (status === "SOBRE LÍNEA") {
-                card.className = 'line-status-card on-line';
-                title.textContent = 'SOBRE LA LÍNEA ✓';
-                desc.textContent = 'El vehículo está siguiendo la línea correctamente';
-                icon.textContent = '✅';
-            } else if (status === "FUERA LÍNEA") {
-                card.className = 'line-status-card off-line';
-                title.textContent = 'FUERA DE LÍNEA ✗';
-                desc.textContent = 'El vehículo se ha salido de la línea';
-                icon.textContent = '❌';
-            } else {
-                card.className = 'line-status-card unknown';
-                title.textContent = 'SENSOR DE LÍNEA';
-                desc.textContent = 'Esperando datos del sensor...';
-                icon.textContent = '❓';
-            }
-        }
-
-        function updateStatus(connected) {
-            const card = document.getElementById('statusCard');
-            const title = document.getElementById('statusTitle');
-            const desc = document.getElementById('statusDesc');
-            const mapBtn = document.getElementById('mapButton');
-            
-            if (connected) {
-                card.className = 'status-card connected';
-                title.textContent = 'CONECTADO ✓';
-                desc.textContent = 'Recibiendo datos de telemetría en tiempo real';
-                mapBtn.disabled = false;
-            } else {
-                card.className = 'status-card disconnected';
-                title.textContent = 'DESCONECTADO ✗';
-                desc.textContent = 'No hay conexión con el dispositivo';
-                mapBtn.disabled = true;
-            }
-        }
-        
-        function openGoogleMaps() {
-            if (gpsLat === 0 && gpsLon === 0) {
-                alert('⚠️ No hay coordenadas GPS disponibles');
-                return;
-            }
-            const url = `https://www.google.com/maps?q=${gpsLat},${gpsLon}`;
-            window.open(url, '_blank');
-        }
-
-        // Polling optimizado para 1200 baudios (más lento)
-        function fetchData() {
-            fetch('/telemetry')
-                .then(response => {
-                    if (!response.ok) throw new Error('HTTP error');
-                    return response.json();
-                })
-                .then(data => {
-                    updateStatus(true);
-                    updateUI(data);
-                })
-                .catch(error => {
-                    updateStatus(false);
-                });
-        }
-
-        // Polling cada 2000ms (más lento para 1200 baudios)
-        setInterval(fetchData, 2000);
-
-        // Carga inicial
-        fetchData();
-    </script>
-</body>
-</html>'''
-
-def iniciar_servidor_web():
-    try:
-        server = HTTPServer(('localhost', PUERTO_WEB), TelemetryHandler)
-        print(f"🚀 Servidor web en: http://localhost:{PUERTO_WEB}")
-        print(f"📊 Velocidad: {BAUDRATE} baudios")
-        print("⏳ Esperando datos... (Velocidad baja - Paciencia)")
-        
-        webbrowser.open(f'http://localhost:{PUERTO_WEB}')
-        server.serve_forever()
-    except Exception as e:
-        print(f"❌ Error servidor: {e}")
-
-# ============ MAIN ============
-if __name__ == "__main__":
-    print("=" * 50)
-    print("SERVIDOR WEB TELEMETRÍA - 1200 BAUDIOS")
-    print("=" * 50)
-    print("⚠️  ADVERTENCIA: Velocidad muy baja")
-    print("⏰ Las actualizaciones serán más lentas")
-    print("📏 Sensor de línea incluido: 0=Sobre línea, 1=Fuera línea")
-    print("=" * 50)
-    
-    threading.Thread(target=leer_puerto_serie, daemon=True).start()
+"""
+Script Python para PC - Telemetría Raspberry Pico 2
+Servidor Web Mejorado - Baudios negociados (respaldo 1200) con Sensor de Línea
+"""
+import serial
+import json
+import webbrowser
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import time
+import re
+import socket
+import sys
+import struct
+import zlib
+import atexit
+import queue
+import os
+import math
+import ipaddress
+from collections import deque, namedtuple
+from operator import itemgetter
+from datetime import datetime
+from urllib.parse import urlsplit, parse_qs
+import servidor_vueltas
+import canales
+from tuberia import ColaAcotada, Publicador
+from sesiones import CodificadorSesion, EXTENSION as EXTENSION_SESION
+from perfilador import Trazador, muestrear_pilas, colapsadas
+import trazado
+import bateria
+import protocolo_ws
+
+# ============ CONFIGURACIÓN ============
+# Un puerto por receptor (RECEPTORR); cada auto se identifica por el "Car:" de su trama
+PUERTOS_COM = ['COM6']
+PUERTO_COM = PUERTOS_COM[0]
+BAUDRATE = 1200  # Velocidad de arranque y de respaldo (la que usa RECEPTORR al iniciar)
+HOST_WEB = '0.0.0.0'       # todas las interfaces (otras PCs o celulares en la red); 'localhost' = solo esta PC
+PUERTO_WEB = 8080
+AUTO_PRINCIPAL = None     # car_id de la página principal; None = el primero que llegue (serie o UDP)
+
+# Negociación de baudios con RECEPTORR (@BAUD / @ACK / @PING / @PONG)
+NEGOCIAR_BAUDIOS = True
+BAUDRATE_OBJETIVO = 115200
+BAUDIOS_PERMITIDOS = (1200, 9600, 19200, 38400, 57600, 115200, 230400)
+MARGEN_NEGOCIACION = 0.5   # s sumados a la espera por @ACK / @PONG (ver timeout_negociacion)
+VENTANA_TASA = 2.0         # segundos para medir tramas/s
+
+SERVIDOR_VUELTAS = True    # atender también /api/lap (RECEPTORR.send_lap) en PUERTO_VUELTAS
+PUERTO_VUELTAS = servidor_vueltas.PUERTO_VUELTAS
+
+# Transporte UDP alternativo (RECEPTORR con TELEMETRIA_UDP = True)
+UDP_ACTIVO = True
+HOST_UDP = '0.0.0.0'
+PUERTO_UDP = 5005
+
+HISTORIAL_MAX = 3000       # muestras guardadas por auto
+COLA_ENTRADA = 4096        # tramas crudas en espera del parser (si se llena se tira la más vieja)
+COLA_SUSCRIPTOR = 256      # tramas en espera por cada suscriptor (/stream, etc.)
+LOTE_STREAM = 0.1          # s: /stream?format=rows y /ws juntan las tramas de este lapso en un mensaje
+
+# Parser en procesos aparte (requiere numpy): 0 = hilo en este proceso.
+# Con N > 0 las líneas de texto se reparten por puerto entre N procesos que
+# escriben las muestras en memoria compartida (memoria_compartida.py).
+PROCESOS_PARSER = 0
+MAX_AUTOS_COMPARTIDOS = 32
+MUESTRAS_COMPARTIDAS = 1024   # muestras por auto en el anillo compartido
+COLA_PROCESO = 256            # lotes en espera por proceso
+# Grabación de sesiones comprimidas (sesiones.py): un .tlm por auto y arranque
+GRABAR_SESIONES = False
+CARPETA_SESIONES = 'sesiones'
+VOLCADO_SESION = 10.0      # segundos máximos sin escribir al disco (lo que se pierde si se corta)
+
+# Trazado fusionado GPS + IMU por auto (/track, trazado.py)
+TRAZADO_ACTIVO = True
+PUNTOS_TRAZADO = trazado.PUNTOS_MAX
+DEBUG = False              # True: imprime cada trama recibida (lento con varios autos)
+
+# /debug/profile y /debug/trace (no cuestan nada hasta que se piden)
+PERFIL_MAX_S = 60          # duración máxima de un muestreo o de una traza
+DEBUG_REMOTO = False       # True: /debug/* también desde otras máquinas (sin clave: cualquiera en la red)
+PERFIL_HZ = 100            # muestras por segundo del perfilador
+
+# ============ DATOS GLOBALES ============
+COLUMNAS_HISTORIAL = ("t",) + canales.NOMBRES   # valores físicos, en el orden del payload
+COLUMNAS_BATERIA = bateria.COLUMNAS              # estimadas (bateria.Estimador), a la derecha en /history
+
+# Trama ya parseada: inmutable (namedtuple, sin __dict__). Se comparte tal cual
+# entre el historial, la última trama de cada auto y los suscriptores.
+Trama = namedtuple("Trama", ("car_id",) + COLUMNAS_HISTORIAL)
+TRAMA_VACIA = Trama(None, 0.0, *[None if n == "line" else 0.0 for n in canales.NOMBRES])
+ESTADOS_LINEA = {0: "SOBRE LÍNEA", 1: "FUERA LÍNEA"}   # 0 = sobre la línea, 1 = fuera
+
+def telemetria_dict(trama, contador=0, hz=0.0, baudrate=BAUDRATE, estado_bateria=bateria.ESTADO_VACIO):
+    """Arma el JSON que espera la página a partir de una Trama."""
+    return {
+        "gps": {"latitude": trama.lat, "longitude": trama.lon, "altitude": trama.alt, "speed": trama.speed},
+        "accelerometer": {"x": trama.acc_x, "y": trama.acc_y, "z": trama.acc_z},
+        "gyroscope": {"x": trama.gyro_x, "y": trama.gyro_y, "z": 0.0},
+        "servo": {"angle": max(0, min(180, (trama.servo_pwm - 1000) / 1000 * 180))},
+        "motor": {"speed": max(-100, min(100, (trama.motor_pwm - 1500) / 500 * 100))},
+        "battery": {"voltage": trama.battery, **estado_bateria._asdict()},
+        "temperature": {"value": trama.temperature},
+        "line_sensor": {"value": int(trama.line or 0), "status": ESTADOS_LINEA.get(trama.line, "DESCONOCIDO")},
+        "counter": {"value": contador},
+        "data_rate": {"hz": hz, "baudrate": baudrate}
+    }
+
+def nueva_telemetria():
+    return telemetria_dict(TRAMA_VACIA)
+
+class EstadoAuto:
+    """Última trama, historial y métricas de un auto.
+
+    Solo el hilo del parser escribe; los handlers HTTP leen self.ultima, que
+    se reemplaza de una vez (nunca se modifica una trama publicada). En modo
+    multiproceso el historial es el anillo compartido: acá quedan solo la
+    última trama y el estado de batería de cada muestra.
+    """
+
+    def __init__(self, car_id, puerto):
+        self.car_id = car_id
+        self.puerto = puerto
+        self.ultima = TRAMA_VACIA._replace(car_id=car_id)
+        self.historial = deque(maxlen=HISTORIAL_MAX)
+        self.bateria = bateria.Estimador()
+        self.historial_bateria = deque(maxlen=HISTORIAL_MAX)   # (trama, bateria.Estado): /history las lee juntas
+        self.tramas = 0
+        self.hz = 0.0
+        self.baudrate = BAUDRATE
+        self._tramas_ventana = 0
+        self.anillo = None              # (AnilloCompartido, fila) en modo multiproceso
+        self.estados_bateria = None     # deque de (número de muestra del anillo, bateria.Estado)
+
+    def registrar(self, trama):
+        self.historial.append(trama)
+        self.historial_bateria.append((trama, self.bateria.agregar(trama.t, trama.battery, trama.motor_pwm)))
+        self.tramas += 1
+        self.ultima = trama
+
+    def registrar_filas(self, anillo, fila, filas, hasta):
+        """Muestras nuevas del anillo compartido (array estructurado), sin una Trama por fila."""
+        if self.anillo is None:
+            self.anillo = (anillo, fila)
+            self.estados_bateria = deque(maxlen=anillo.largo)
+        estados = map(self.bateria.agregar, filas["t"].tolist(), filas["battery"].tolist(),
+                      filas["motor_pwm"].tolist())
+        self.estados_bateria.extend(zip(range(hasta - len(filas), hasta), estados))
+        self.tramas += len(filas)
+        self.ultima = trama_de_fila(self.car_id, filas[-1].tolist())
+
+    def historial_filas(self, n):
+        """Las últimas n filas de /history (COLUMNAS_HISTORIAL + COLUMNAS_BATERIA)."""
+        if n <= 0:
+            return []
+        if self.anillo is None:
+            return [trama[1:] + estado for trama, estado in list(self.historial_bateria)[-n:]]
+        # Solo hasta la última muestra con estado de batería: los procesos pueden ir más adelante
+        estados = list(self.estados_bateria)[-n:]
+        if not estados:
+            return []
+        anillo, fila = self.anillo
+        filas, hasta = anillo.leer_desde(fila, estados[0][0], estados[-1][0] + 1)
+        estados = estados[len(estados) - len(filas):]   # las que el anillo ya pisó no se devuelven
+        indice_linea = COLUMNAS_HISTORIAL.index("line")
+        salida = []
+        for valores, (_, estado) in zip(filas.tolist(), estados):
+            if valores[indice_linea] != valores[indice_linea]:   # NaN = sin dato
+                valores = list(valores)
+                valores[indice_linea] = None
+            salida.append(tuple(valores) + estado)
+        return salida
+
+    @property
+    def telemetry(self):
+        return telemetria_dict(self.ultima, self.tramas, self.hz, self.baudrate, self.bateria.estado)
+
+    @property
+    def ultima_actualizacion(self):
+        return datetime.fromtimestamp(self.ultima.t) if self.tramas else None
+
+    def actualizar_tasa(self, segundos, baud):
+        self.hz = round((self.tramas - self._tramas_ventana) / segundos, 2)
+        self.baudrate = baud
+        self._tramas_ventana = self.tramas
+
+    def metricas(self):
+        estado_puerto = puertos_estado.get(self.puerto, {})
+        secuencia = secuencias_udp.get(self.car_id)
+        ultima = self.ultima_actualizacion
+        return {
+            "car_id": self.car_id,
+            "port": self.puerto,
+            "connected": estado_puerto.get("connected", False),
+            "frames": self.tramas,
+            "hz": self.hz,
+            "baudrate": self.baudrate,
+            "last_update": ultima.isoformat() if ultima else None,
+            "udp": secuencia.metricas() if secuencia else None,
+        }
+
+autos = {}                # car_id -> EstadoAuto
+autos_lock = threading.Lock()
+puertos_estado = {}       # puerto -> {"connected", "baudrate", "hz"}
+
+# AUTO_PRINCIPAL o el primer auto que aparezca, por cualquier transporte:
+# lo que sirven /telemetry, /state, /ws y /track (página principal)
+auto_principal = None
+connection_status = {"connected": False, "baudrate": BAUDRATE}
+last_update_time = datetime.now()
+
+def obtener_auto(car_id, puerto):
+    global auto_principal
+    auto = autos.get(car_id)
+    if auto is None:
+        with autos_lock:
+            auto = autos.get(car_id)
+            if auto is None:
+                auto = EstadoAuto(car_id, puerto)
+                if car_id == AUTO_PRINCIPAL or (auto_principal is None and AUTO_PRINCIPAL is None):
+                    auto_principal = auto
+                autos[car_id] = auto
+                print(f"🏎️ Nuevo auto: {car_id} en {puerto}")
+    return auto
+
+def telemetria_principal():
+    auto = auto_principal
+    return auto.telemetry if auto else nueva_telemetria()
+
+def principal_conectado():
+    """Estado del transporte por el que llega el auto principal (serie o UDP)."""
+    auto = auto_principal
+    if auto is None:
+        return connection_status["connected"]
+    return puertos_estado.get(auto.puerto, {}).get("connected", False)
+
+# ============ NEGOCIACIÓN DE BAUDIOS ============
+# La trama de texto más larga de RECEPTORR: car_id de 16 caracteres (el de la
+# cabecera UDP) y todos los canales en el mínimo de su tipo (~277 bytes)
+LARGO_TRAMA_MAX = len(canales.formatear("X" * 16, [(-2 ** 31 if tipo == "i" else -2 ** 15) / escala
+                                                  for _, tipo, escala, *_ in canales.CANALES]))
+
+def timeout_negociacion(baud):
+    """Segundos de espera por @ACK / @PONG a baud.
+
+    La respuesta puede salir detrás de una trama que ya se estaba enviando y
+    de la que quedó pendiente (MODO_REENVIO = "ultima"): a 1200 baudios una
+    trama sola tarda más de 2 s.
+    """
+    return 2 * LARGO_TRAMA_MAX * 10 / baud + MARGEN_NEGOCIACION
+
+def esperar_respuesta(ser, prefijo, timeout=None):
+    """Lee líneas hasta encontrar una que empiece con prefijo (las tramas se ignoran)."""
+    limite = time.monotonic() + (timeout_negociacion(ser.baudrate) if timeout is None else timeout)
+    linea = b""
+    while time.monotonic() < limite:
+        linea += ser.readline()
+        if not linea.endswith(b"\n"):
+            continue   # readline venció a mitad de la línea: se sigue juntando
+        texto, linea = linea.decode('utf-8', errors='ignore').strip(), b""
+        if texto.startswith(prefijo):
+            return texto
+    return None
+
+def proponer_baudios(ser, baud_actual, objetivo):
+    """Propone objetivo hablando a baud_actual. True si el receptor respondió @PONG."""
+    ser.baudrate = baud_actual
+    ser.reset_input_buffer()
+    ser.write(f"@BAUD {objetivo}\n".encode())
+    if esperar_respuesta(ser, f"@ACK {objetivo}") is None:
+        return False
+
+    ser.baudrate = objetivo
+    ser.reset_input_buffer()
+    ser.write(b"@PING\n")
+    return esperar_respuesta(ser, "@PONG") is not None
+
+def negociar_baudios(ser, objetivo=BAUDRATE_OBJETIVO):
+    """Lleva el enlace a objetivo; si falla queda en BAUDRATE. Devuelve la velocidad final."""
+    if objetivo == BAUDRATE:
+        return BAUDRATE
+
+    # El receptor arranca en BAUDRATE, pero si la PC se reinició puede seguir
+    # en una velocidad negociada antes: se prueba primero la base y luego el resto.
+    candidatos = [BAUDRATE] + [b for b in BAUDIOS_PERMITIDOS if b != BAUDRATE]
+    for baud in candidatos:
+        if proponer_baudios(ser, baud, objetivo):
+            print(f"✓ Enlace negociado a {objetivo} baudios")
+            return objetivo
+
+    print(f"⚠ Sin respuesta a @BAUD -> se queda en {BAUDRATE} baudios")
+    # Si el receptor quedó en objetivo sin recibir @PING, vuelve solo a la base
+    ser.baudrate = BAUDRATE
+    ser.reset_input_buffer()
+    return BAUDRATE
+
+# ============ PIPELINE ============
+# lectores (serie / UDP) --entrada--> parser --publicador--> suscriptores
+# Los lectores solo cortan bytes y los encolan; nunca esperan al parser.
+LINEA = 0       # item de entrada: (LINEA, puerto, t, bytes de una línea)
+DATAGRAMA = 1   # item de entrada: (DATAGRAMA, origen, t, bytes del datagrama)
+
+entrada = ColaAcotada("entrada", COLA_ENTRADA)
+publicador = Publicador()
+estadisticas_parser = {"parsed": 0, "errors": 0, "ignored": 0, "dropped": 0}
+
+# ============ LECTURA DE PUERTOS SERIE (un hilo por puerto) ============
+CAR_RE = re.compile(r'Car:(\S+)')
+
+def leer_puerto_serie(puerto=PUERTO_COM):
+    estado_puerto = puertos_estado.setdefault(puerto, {"connected": False, "baudrate": BAUDRATE, "hz": 0.0})
+    principal = puerto == PUERTOS_COM[0]
+    print(f"Conectando a {puerto} a {BAUDRATE} baudios...")
+    
+    while True:
+        try:
+            with serial.Serial(puerto, BAUDRATE, timeout=timeout_negociacion(BAUDRATE)) as ser:
+                print(f"✓ Puerto {puerto} abierto a {BAUDRATE} baudios")
+                baud = negociar_baudios(ser) if NEGOCIAR_BAUDIOS else BAUDRATE
+                estado_puerto["baudrate"] = baud
+                estado_puerto["connected"] = True
+                if principal:
+                    connection_status["baudrate"] = baud
+                    connection_status["connected"] = True
+                ser.reset_input_buffer()
+
+                # Tasa de líneas por segundo tras el cambio de velocidad
+                # (la de cada auto la calcula el parser)
+                tramas = 0
+                inicio_ventana = time.monotonic()
+                pendiente = b""
+                
+                while True:
+                    # Leer todo lo disponible de una vez (readline() de pyserial
+                    # lee byte a byte y domina el costo por trama)
+                    datos = ser.read(ser.in_waiting or 1)
+                    if datos:
+                        *lineas, pendiente = (pendiente + datos).split(b'\n')
+                        ahora = time.time()
+                        for linea in lineas:
+                            entrada.poner((LINEA, puerto, ahora, linea))
+                        tramas += len(lineas)
+
+                    ahora = time.monotonic()
+                    if ahora - inicio_ventana >= VENTANA_TASA:
+                        estado_puerto["hz"] = round(tramas / (ahora - inicio_ventana), 2)
+                        tramas = 0
+                        inicio_ventana = ahora
+                    
+        except Exception as e:
+            print(f"✗ Error puerto {puerto}: {e}")
+            estado_puerto["connected"] = False
+            if principal:
+                connection_status["connected"] = False
+            time.sleep(3)  # Mayor tiempo de espera
+
+CAMPO_RE = re.compile(r'(\w+):([+-]?[\d.]+)')
+
+def parsear_telemetria(linea, anterior=TRAMA_VACIA, t=None):
+    """Devuelve una Trama nueva con los campos de la línea; lo que no trae se copia de anterior.
+
+    La trama es la que arma canales.FORMATO_TRAMA: "Etiqueta:valor[unidad]" por canal.
+    """
+    valores = list(anterior)
+    valores[1] = time.time() if t is None else t
+    try:
+        for etiqueta, valor in CAMPO_RE.findall(linea):
+            indice = canales.POR_ETIQUETA.get(etiqueta)
+            if indice is not None:
+                valores[indice + 2] = float(valor)   # +2: car_id y t
+        return Trama(*valores)
+    except ValueError as e:
+        print(f"✗ Error parseando: {e}")
+        return None
+
+# ============ INGESTA UDP ============
+# Datagrama: cabecera <2s16sIB = "TL", car_id (relleno con \0), secuencia, cantidad
+# seguida de cantidad × payload NRF (canales.PAQUETE, el mismo que arma la placa 3)
+# y de cantidad × <H: edad en ms de cada payload al enviarse (los receptores
+# viejos no la mandan: ahí las tramas se reparten desde el datagrama anterior)
+CABECERA_UDP = struct.Struct("<2s16sIB")
+PAQUETE_NRF = canales.PAQUETE
+MAGIA_UDP = b"TL"
+ESPERA_LOTE_UDP = 0.05   # s: UDP_ESPERA_MS de RECEPTORR, lo que abarca un lote sin edades
+
+def trama_paquete_nrf(car_id, t, valores):
+    """Trama a partir de un payload ya desempaquetado (valores crudos del struct)."""
+    return Trama(car_id, t, *[v / e for v, e in zip(valores, canales.ESCALAS)])
+
+class SecuenciaUDP:
+    """Cuenta pérdidas, reordenados y duplicados de los datagramas de un auto.
+
+    Si el receptor se reinicia, su secuencia vuelve a 0: un salto hacia atrás
+    de más de REINICIO_SALTO, o cualquier salto hacia atrás después de
+    SILENCIO_REINICIO segundos sin datagramas, empieza a contar de nuevo.
+    """
+    VENTANA = 128            # secuencias recordadas para detectar duplicados
+    REINICIO_SALTO = 1024    # ~50 s de datagramas: ningún reordenamiento llega tan atrás
+    SILENCIO_REINICIO = 1.0  # s: la Pico tarda más que esto en volver a conectar el WiFi
+
+    def __init__(self):
+        self.mayor = None
+        self.primero = None
+        self.t_ultimo = None
+        self.recibidos = 0
+        self.tarde = 0          # llegaron después de uno más nuevo (se descartan)
+        self.viejos = 0         # fuera de la ventana: se cuentan como perdidos
+        self.duplicados = 0
+        self.reinicios = 0
+        self._esperados_antes = 0   # esperados de las secuencias anteriores a un reinicio
+        self._recientes = set()
+
+    def _reiniciado(self, seq, t):
+        if seq >= self.mayor:
+            return False
+        if seq < self.mayor - self.REINICIO_SALTO:
+            return True
+        return t is not None and self.t_ultimo is not None and t - self.t_ultimo > self.SILENCIO_REINICIO
+
+    def registrar(self, seq, t=None):
+        """True si el datagrama es más nuevo que todo lo recibido y debe aplicarse.
+
+        t (segundos) es la hora de llegada; sin t solo se detectan los reinicios por salto.
+        """
+        if self.mayor is not None and self._reiniciado(seq, t):
+            self._esperados_antes += self.mayor - self.primero + 1
+            self.reinicios += 1
+            self.mayor = None
+            self._recientes = set()
+        if t is not None:
+            self.t_ultimo = t
+        if self.mayor is None:
+            self.primero = self.mayor = seq
+        elif seq <= self.mayor - self.VENTANA:
+            self.viejos += 1
+            return False
+        if seq in self._recientes:
+            self.duplicados += 1
+            return False
+        self._recientes.add(seq)
+        self.recibidos += 1
+        if seq > self.mayor:
+            self.mayor = seq
+            if len(self._recientes) > 2 * self.VENTANA:
+                self._recientes = {s for s in self._recientes if s > seq - self.VENTANA}
+            return True
+        if seq < self.mayor:
+            self.tarde += 1
+            self.primero = min(self.primero, seq)
+            return False
+        return True   # el primero
+
+    def metricas(self):
+        esperados = self._esperados_antes + (0 if self.mayor is None else self.mayor - self.primero + 1)
+        return {"datagrams": self.recibidos, "lost": max(0, esperados - self.recibidos),
+                "reordered": self.tarde, "duplicates": self.duplicados, "stale": self.viejos,
+                "restarts": self.reinicios}
+
+secuencias_udp = {}   # car_id -> SecuenciaUDP
+
+def procesar_datagrama(datagrama, origen, t=None):
+    """Decodifica un datagrama y publica sus tramas. Devuelve cuántas publicó."""
+    if len(datagrama) < CABECERA_UDP.size:
+        return 0
+    magia, car_raw, seq, cantidad = CABECERA_UDP.unpack_from(datagrama)
+    if magia != MAGIA_UDP or len(datagrama) < CABECERA_UDP.size + cantidad * PAQUETE_NRF.size:
+        return 0
+    car_id = car_raw.rstrip(b"\0").decode('ascii', errors='ignore') or origen
+    auto = obtener_auto(car_id, origen)
+    secuencia = secuencias_udp.get(car_id)
+    if secuencia is None:
+        secuencia = secuencias_udp[car_id] = SecuenciaUDP()
+    if t is None:
+        t = time.time()
+    t_anterior = secuencia.t_ultimo
+    if not secuencia.registrar(seq, t):
+        return 0   # duplicado o más viejo que el estado actual
+
+    fin = CABECERA_UDP.size + cantidad * PAQUETE_NRF.size
+    if len(datagrama) >= fin + 2 * cantidad:
+        tiempos = [t - edad / 1000 for edad in struct.unpack_from(f"<{cantidad}H", datagrama, fin)]
+    else:
+        lapso = ESPERA_LOTE_UDP if t_anterior is None else min(t - t_anterior, 1.0)
+        tiempos = [t - lapso * (cantidad - 1 - k) / cantidad for k in range(cantidad)]
+    # Nunca antes que la última trama del auto (la latencia del WiFi varía entre lotes)
+    piso = auto.ultima.t if auto.tramas else 0.0
+    for t_trama, valores in zip(tiempos, PAQUETE_NRF.iter_unpack(datagrama[CABECERA_UDP.size:fin])):
+        piso = max(piso, t_trama)
+        publicar(auto, trama_paquete_nrf(car_id, piso, valores))
+    return cantidad
+
+def escuchar_udp(host=HOST_UDP, puerto=PUERTO_UDP):
+    origen = f"udp:{puerto}"
+    estado = puertos_estado.setdefault(origen, {"connected": False, "baudrate": 0, "hz": 0.0})
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+    sock.bind((host, puerto))
+    sock.settimeout(VENTANA_TASA)
+    print(f"📶 Telemetría UDP en {host}:{puerto}")
+    buffer = bytearray(2048)
+    tramas = 0
+    inicio_ventana = time.monotonic()
+    while True:
+        try:
+            n, _ = sock.recvfrom_into(buffer)
+            if n >= CABECERA_UDP.size:
+                entrada.poner((DATAGRAMA, origen, time.time(), bytes(buffer[:n])))
+                tramas += buffer[CABECERA_UDP.size - 1]   # cantidad de la cabecera
+            estado["connected"] = True
+        except socket.timeout:
+            estado["connected"] = False
+        except Exception as e:
+            print(f"Error UDP: {e}")
+        ahora = time.monotonic()
+        if ahora - inicio_ventana >= VENTANA_TASA:
+            estado["hz"] = round(tramas / (ahora - inicio_ventana), 2)
+            tramas = 0
+            inicio_ventana = ahora
+
+# ============ PARSER + PUBLICADOR ============
+def publicar(auto, trama):
+    """Reemplaza la última trama del auto y la reparte a los suscriptores."""
+    global last_update_time
+    auto.registrar(trama)
+    publicador.publicar(trama)
+    if auto is auto_principal:
+        last_update_time = datetime.fromtimestamp(trama.t)
+
+def procesar_linea(linea, puerto, t):
+    linea = linea.decode('utf-8', errors='ignore').strip()
+    if not linea or linea.startswith('@'):
+        return False
+    if DEBUG:
+        print(f"📨 [{puerto}] {linea}")
+    car = CAR_RE.search(linea)
+    auto = obtener_auto(car.group(1) if car else puerto, puerto)
+    trama = parsear_telemetria(linea, auto.ultima, t)
+    if trama is None:
+        return False
+    publicar(auto, trama)
+    return True
+
+def actualizar_tasas(segundos):
+    for auto in list(autos.values()):
+        baud = puertos_estado.get(auto.puerto, {}).get("baudrate", 0)
+        auto.actualizar_tasa(segundos, baud)
+
+def etapa_parser():
+    """Único consumidor de la cola de entrada: parsea, publica y calcula Hz por auto."""
+    inicio_ventana = time.monotonic()
+    while True:
+        for tipo, origen, t, dato in entrada.sacar_todo(timeout=VENTANA_TASA):
+            try:
+                if tipo == LINEA:
+                    ok = procesar_linea(dato, origen, t)
+                else:
+                    ok = procesar_datagrama(dato, origen, t) > 0
+                estadisticas_parser["parsed" if ok else "ignored"] += 1
+            except Exception as e:
+                estadisticas_parser["errors"] += 1
+                print(f"Error parser {origen}: {e}")
+
+        ahora = time.monotonic()
+        if ahora - inicio_ventana >= VENTANA_TASA:
+            actualizar_tasas(ahora - inicio_ventana)
+            inicio_ventana = ahora
+
+# ============ PARSER MULTIPROCESO ============
+def proceso_parser(parametros, cola):
+    """Proceso hijo: parsea lotes de líneas y escribe las muestras en el anillo compartido."""
+    from memoria_compartida import AnilloCompartido
+    anillo = AnilloCompartido(**parametros)
+    ultimas = {}   # car_id -> (fila del anillo, última Trama)
+    while True:
+        lote = cola.get()
+        if lote is None:
+            break
+        nuevas = {}   # fila del anillo -> [valores]
+        for puerto, t, linea in lote:
+            linea = linea.decode('utf-8', errors='ignore').strip()
+            if not linea or linea.startswith('@'):
+                continue
+            car = CAR_RE.search(linea)
+            car_id = car.group(1) if car else puerto
+            fila, anterior = ultimas.get(car_id, (None, None))
+            if fila is None:
+                fila = anillo.asignar(car_id, puerto)
+                if fila is None:
+                    continue   # anillo lleno
+                anterior = TRAMA_VACIA._replace(car_id=car_id)
+            trama = parsear_telemetria(linea, anterior, t)
+            if trama is None:
+                continue
+            ultimas[car_id] = (fila, trama)
+            nuevas.setdefault(fila, []).append(trama[1:])
+        for fila, valores in nuevas.items():
+            anillo.escribir(fila, valores)
+    anillo.cerrar()
+
+def trama_de_fila(car_id, valores):
+    """Trama a partir de una fila del anillo compartido (line NaN = sin dato)."""
+    linea = valores[COLUMNAS_HISTORIAL.index("line")]
+    if linea != linea:
+        valores = list(valores)
+        valores[COLUMNAS_HISTORIAL.index("line")] = None
+    return Trama(car_id, *valores)
+
+def recolectar(anillo, leidas, conocidos):
+    """Lleva las muestras nuevas del anillo a cada auto. Devuelve la lista de autos actualizada.
+
+    El historial (/history) se lee del anillo; solo se arma una Trama por
+    fila si hay suscriptores (/stream, /ws, grabador, trazado) que la pidan.
+    """
+    global last_update_time
+    if len(conocidos) != int(anillo.usados[0]):
+        conocidos = anillo.autos()
+    for fila, car_id, origen in conocidos:
+        muestras, leidas[fila] = anillo.leer_desde(fila, leidas.get(fila, 0))
+        if not len(muestras):
+            continue
+        auto = obtener_auto(car_id, origen)
+        auto.registrar_filas(anillo, fila, muestras, leidas[fila])
+        if publicador.hay_suscriptores():
+            for valores in muestras.tolist():
+                publicador.publicar(trama_de_fila(car_id, valores))
+        if auto is auto_principal:
+            last_update_time = datetime.fromtimestamp(auto.ultima.t)
+        estadisticas_parser["parsed"] += len(muestras)
+    return conocidos
+
+def etapa_multiproceso(colas, anillo):
+    """Reparte las líneas entre los procesos y publica lo que dejan en el anillo.
+
+    Los datagramas UDP ya vienen en binario y se decodifican acá mismo.
+    """
+    leidas = {}
+    conocidos = []
+    inicio_ventana = time.monotonic()
+    while True:
+        lotes = [[] for _ in colas]
+        for tipo, origen, t, dato in entrada.sacar_todo(timeout=0.005):
+            if tipo == LINEA:
+                lotes[zlib.crc32(origen.encode()) % len(colas)].append((origen, t, dato))
+            else:
+                try:
+                    procesar_datagrama(dato, origen, t)
+                except Exception as e:
+                    estadisticas_parser["errors"] += 1
+                    print(f"Error parser {origen}: {e}")
+        for lote, cola in zip(lotes, colas):
+            if lote:
+                try:
+                    cola.put_nowait(lote)
+                except queue.Full:
+                    estadisticas_parser["dropped"] += len(lote)
+
+        conocidos = recolectar(anillo, leidas, conocidos)
+
+        ahora = time.monotonic()
+        if ahora - inicio_ventana >= VENTANA_TASA:
+            actualizar_tasas(ahora - inicio_ventana)
+            inicio_ventana = ahora
+
+def metricas_pipeline():
+    return {"input": entrada.metricas(), "parser": dict(estadisticas_parser),
+            "publisher": publicador.metricas()}
+
+def iniciar_pipeline(procesos=None):
+    """Arranca el parser: un hilo, o procesos + memoria compartida si procesos > 0."""
+    procesos = PROCESOS_PARSER if procesos is None else procesos
+    if procesos <= 0:
+        threading.Thread(target=etapa_parser, name="parser", daemon=True).start()
+        return None
+    import multiprocessing
+    from memoria_compartida import AnilloCompartido
+    anillo = AnilloCompartido(COLUMNAS_HISTORIAL, MAX_AUTOS_COMPARTIDOS, MUESTRAS_COMPARTIDAS,
+                              lock=multiprocessing.Lock())
+    colas = []
+    for _ in range(procesos):
+        cola = multiprocessing.Queue(COLA_PROCESO)
+        cola.cancel_join_thread()   # al salir no esperar a que los procesos vacíen la cola
+        multiprocessing.Process(target=proceso_parser, args=(anillo.parametros(), cola), daemon=True).start()
+        colas.append(cola)
+    threading.Thread(target=etapa_multiproceso, args=(colas, anillo), name="parser-multiproceso", daemon=True).start()
+    atexit.register(anillo.cerrar)
+    print(f"⚙️ Parser en {procesos} procesos (memoria compartida {anillo.shm.name})")
+    return anillo
+
+# ============ GRABACIÓN DE SESIONES ============
+def nombre_sesion(car_id, carpeta=CARPETA_SESIONES):
+    seguro = re.sub(r'[^\w.-]', '_', car_id)
+    return os.path.join(carpeta, f"{seguro}_{datetime.now():%Y%m%d_%H%M%S}{EXTENSION_SESION}")
+
+def etapa_grabador(cola, carpeta=CARPETA_SESIONES):
+    """Suscriptor del publicador: escribe las tramas de cada auto en su .tlm."""
+    os.makedirs(carpeta, exist_ok=True)
+    grabadores = {}
+    lock = threading.Lock()
+
+    def cerrar_todo():
+        with lock:
+            for grabador in grabadores.values():
+                grabador.cerrar()
+    atexit.register(cerrar_todo)
+
+    ultimo_volcado = time.monotonic()
+    while True:
+        tramas = cola.sacar_todo(timeout=VOLCADO_SESION)
+        with lock:
+            for trama in tramas:
+                grabador = grabadores.get(trama.car_id)
+                if grabador is None:
+                    ruta = nombre_sesion(trama.car_id, carpeta)
+                    grabador = grabadores[trama.car_id] = CodificadorSesion.crear(ruta, trama.car_id)
+                    print(f"💾 Grabando {trama.car_id} en {ruta}")
+                grabador.agregar(trama[1:])
+            if time.monotonic() - ultimo_volcado >= VOLCADO_SESION:
+                for grabador in grabadores.values():
+                    grabador.volcar()
+                ultimo_volcado = time.monotonic()
+
+def iniciar_grabador(carpeta=CARPETA_SESIONES):
+    cola = publicador.suscribir("grabador", COLA_ENTRADA)
+    threading.Thread(target=etapa_grabador, args=(cola, carpeta), name="grabador", daemon=True).start()
+
+# ============ TRAZADO (GPS + IMU) ============
+trazados = {}   # car_id -> trazado.Fusion (solo la etapa de trazado agrega puntos)
+
+def etapa_trazado(cola):
+    """Suscriptor del publicador: fusiona GPS e IMU de cada auto entre fixes."""
+    while True:
+        for trama in cola.sacar_todo(timeout=VENTANA_TASA):
+            fusion = trazados.get(trama.car_id)
+            if fusion is None:
+                fusion = trazados[trama.car_id] = trazado.Fusion(PUNTOS_TRAZADO)
+            fusion.agregar_trama(trama)
+
+def iniciar_trazado():
+    cola = publicador.suscribir("trazado", COLA_ENTRADA)
+    threading.Thread(target=etapa_trazado, args=(cola,), name="trazado", daemon=True).start()
+
+# ============ SERVIDOR WEB ============
+def a_json(obj):
+    return json.dumps(obj).encode('utf-8')
+
+def numero_query(query, nombre, defecto, minimo, maximo):
+    """Parámetro numérico de la query llevado a [minimo, maximo]; ValueError si no es finito."""
+    valor = float(query.get(nombre, [defecto])[0])
+    if not math.isfinite(valor):
+        raise ValueError(f"{nombre} no es finito")
+    return min(max(valor, minimo), maximo)
+
+class TelemetryHandler(BaseHTTPRequestHandler):
+    
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == '/':
+            self.serve_html()
+        elif url.path == '/telemetry':
+            self.serve_telemetry()
+        elif url.path == '/state':
+            self.serve_state()
+        elif url.path == '/cars':
+            self.serve_cars()
+        elif url.path == '/stream':
+            self.serve_stream(parse_qs(url.query))
+        elif url.path == '/track':
+            self.serve_track(query=parse_qs(url.query))
+        elif url.path == '/ws':
+            self.serve_ws(parse_qs(url.query))
+        elif url.path == '/pipeline':
+            self.send_json(metricas_pipeline())
+        elif url.path.startswith('/debug/') and not self.debug_permitido():
+            self.send_error(403, "/debug solo desde esta PC (DEBUG_REMOTO = False)")
+        elif url.path == '/debug/profile':
+            self.serve_profile(parse_qs(url.query))
+        elif url.path.startswith('/debug/trace'):
+            self.serve_trace(url.path[len('/debug/trace'):], parse_qs(url.query))
+        elif url.path.startswith('/cars/'):
+            self.serve_car(url.path.split('/')[2:], parse_qs(url.query))
+        elif url.path == '/leaderboard':
+            servidor_vueltas.servir_tabla(self)
+        elif url.path == '/leaderboard/stream':
+            servidor_vueltas.servir_stream_tabla(self)
+        else:
+            self.send_error(404)
+    
+    def do_POST(self):
+        if urlsplit(self.path).path in ('/api/lap', '/api/laps'):
+            servidor_vueltas.atender_post_vuelta(self)
+        else:
+            self.send_error(404)
+    
+    def send_json(self, obj):
+        try:
+            self.send_response(200)
+            self.send_header('Content-type', 'application/json')
+            self.send_header('Cache-Control', 'no-cache, no-store, must-revalidate')
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.end_headers()
+            self.escribir(a_json(obj))
+        except Exception as e:
+            print(f"✗ Error sirviendo JSON: {e}")
+    
+    def escribir(self, datos):
+        self.wfile.write(datos)
+    
+    def serve_cars(self):
+        self.send_json([auto.metricas() for auto in list(autos.values())])
+    
+    def serve_car(self, partes, query):
+        """/cars/<id>/telemetry | /cars/<id>/state | /cars/<id>/history?n=N | /cars/<id>/track"""
+        auto = autos.get(partes[0]) if partes else None
+        recurso = partes[1] if len(partes) > 1 else 'telemetry'
+        if auto is None:
+            self.send_error(404, 'Auto desconocido')
+        elif recurso == 'telemetry':
+            self.send_json(auto.telemetry)
+        elif recurso == 'state':
+            self.send_json({"metrics": auto.metricas(), "telemetry": auto.telemetry})
+        elif recurso == 'history':
+            try:
+                n = int(query.get('n', ['300'])[0])
+            except ValueError:
+                n = 300
+            self.send_json({"columns": COLUMNAS_HISTORIAL + COLUMNAS_BATERIA, "rows": auto.historial_filas(n)})
+        elif recurso == 'track':
+            self.serve_track(auto.car_id, query)
+        else:
+            self.send_error(404)
+    
+    def serve_stream(self, query):
+        """SSE: cada trama publicada como JSON (/stream?car=<id> filtra un auto).
+
+        /stream?format=rows&fields=t,acc_x,...: lo que usan las gráficas de la
+        página. Un evento "columns" con los nombres y después un evento cada
+        LOTE_STREAM con las filas (listas, sin claves) de ese lapso; sin car,
+        solo el auto principal.
+        """
+        car = query.get('car', [None])[0]
+        filas = query.get('format', ['json'])[0] == 'rows'
+        if filas:
+            campos = query.get('fields', [','.join(COLUMNAS_HISTORIAL)])[0].split(',')
+            if not set(campos) <= set(COLUMNAS_HISTORIAL):
+                self.send_error(400, "fields desconocidos")
+                return
+            indices = [COLUMNAS_HISTORIAL.index(campo) + 1 for campo in campos]   # trama[0] es car_id
+            tomar = itemgetter(*indices) if len(indices) > 1 else lambda trama: (trama[indices[0]],)
+        cola = publicador.suscribir(f"sse:{self.client_address[0]}:{self.client_address[1]}",
+                                    COLA_SUSCRIPTOR)
+        try:
+            self.send_response(200)
+            self.send_header('Content-type', 'text/event-stream')
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.end_headers()
+            if filas:
+                self.escribir(b"event: columns\ndata: " + a_json(campos) + b"\n\n")
+            while True:
+                tramas = cola.sacar_todo(timeout=15.0)
+                if filas:
+                    if tramas:
+                        time.sleep(LOTE_STREAM)
+                        tramas += cola.sacar_todo(timeout=0)
+                    auto = car or (auto_principal.car_id if auto_principal else None)
+                    lote = [tomar(trama) for trama in tramas if auto is None or trama.car_id == auto]
+                    eventos = [b"data: " + a_json(lote) + b"\n\n"] if lote else []
+                else:
+                    eventos = [b"data: " + a_json(trama._asdict()) + b"\n\n"
+                               for trama in tramas if car is None or trama.car_id == car]
+                self.escribir(b"".join(eventos) or b": ping\n\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            publicador.desuscribir(cola)
+    
+    def serve_ws(self, query):
+        """/ws?car=&channels=&max_hz=&delta=: WebSocket con cuadros binarios (protocolo_ws).
+
+        Un hilo lee los mensajes del cliente (cambios de suscripción, ping,
+        cierre) y despierta a este, que es el único que codifica y escribe.
+        """
+        try:
+            suscripcion = protocolo_ws.Suscripcion.desde_query(query)
+        except ValueError as e:
+            self.send_error(400, str(e))
+            return
+        if not protocolo_ws.aceptar(self):
+            self.send_error(426, "Se esperaba un WebSocket")
+            return
+        self.close_connection = True
+        conexion = protocolo_ws.Conexion(self.rfile, self.wfile)
+        cola = publicador.suscribir(f"ws:{self.client_address[0]}:{self.client_address[1]}", COLA_SUSCRIPTOR)
+        pedidos = deque()   # mensajes del cliente; None = se cerró
+
+        def leer():
+            try:
+                while True:
+                    mensaje = conexion.recibir()
+                    pedidos.append(mensaje)
+                    cola.poner(None)   # despierta al que escribe
+                    if mensaje is None:
+                        return
+            except (OSError, ValueError):   # ValueError: el handler ya cerró el archivo
+                pedidos.append(None)
+                cola.poner(None)
+
+        threading.Thread(target=leer, name="ws-lector", daemon=True).start()
+        codificador = protocolo_ws.Codificador(suscripcion, time.time())
+        try:
+            conexion.enviar_texto(json.dumps(codificador.esquema()))
+            while True:
+                tramas = cola.sacar_todo(timeout=15.0)
+                if not tramas:
+                    conexion.enviar(protocolo_ws.PING, b"")
+                    continue
+                if not pedidos:
+                    time.sleep(LOTE_STREAM)
+                    tramas += cola.sacar_todo(timeout=0)
+                # Después de juntar el lote: un pedido que llegó durante la espera ya gastó su None
+                while pedidos:
+                    pedido = pedidos.popleft()
+                    if pedido is None:
+                        return
+                    try:
+                        suscripcion = protocolo_ws.Suscripcion.desde_mensaje(pedido, suscripcion)
+                    except ValueError as e:
+                        conexion.enviar_texto(json.dumps({"type": "error", "message": str(e)}))
+                        continue
+                    codificador = protocolo_ws.Codificador(suscripcion, time.time())
+                    conexion.enviar_texto(json.dumps(codificador.esquema()))
+                avisos, datos = codificador.codificar(
+                    [t for t in tramas if t is not None], auto_principal.car_id if auto_principal else None)
+                for aviso in avisos:
+                    conexion.enviar_texto(json.dumps(aviso))
+                if datos:
+                    conexion.enviar(protocolo_ws.BINARIO, datos)
+        except OSError:
+            pass
+        finally:
+            publicador.desuscribir(cola)
+            conexion.cerrar()
+    
+    def serve_track(self, car=None, query=None):
+        """/track?car=<id>&tolerance=M: trazado fusionado simplificado como polilínea codificada.
+
+        Sin car, el auto principal. La página lo dibuja en un canvas, sin
+        servicios de mapas; la polilínea es la de Google (precision decimales).
+        """
+        query = query or {}
+        if car is None:
+            car = query.get('car', [auto_principal.car_id if auto_principal else None])[0]
+        try:
+            tolerancia = min(max(float(query.get('tolerance', [str(trazado.TOLERANCIA)])[0]), 0.05), 50.0)
+        except ValueError:
+            self.send_error(400, "tolerance debe ser un número")
+            return
+        fusion = trazados.get(car)
+        if fusion is None:
+            self.send_json({"car_id": car, "points": 0, "polyline": "", "precision": trazado.PRECISION})
+            return
+        self.send_json(dict(fusion.trazado(tolerancia), car_id=car))
+    
+    def debug_permitido(self):
+        """/debug/* solo desde loopback: la traza envuelve funciones del camino caliente."""
+        if DEBUG_REMOTO:
+            return True
+        try:
+            ip = ipaddress.ip_address(self.client_address[0])
+        except ValueError:
+            return False
+        return (getattr(ip, 'ipv4_mapped', None) or ip).is_loopback
+
+    def serve_profile(self, query):
+        """/debug/profile?seconds=N&hz=H: pilas colapsadas de todos los hilos (flamegraph.pl, speedscope)."""
+        try:
+            segundos = numero_query(query, 'seconds', 5.0, 0.0, PERFIL_MAX_S)
+            hz = numero_query(query, 'hz', PERFIL_HZ, 1.0, 1000.0)
+        except ValueError:
+            self.send_error(400, "seconds/hz deben ser números")
+            return
+        try:
+            muestras = muestrear_pilas(segundos, hz)
+        except RuntimeError as e:
+            self.send_error(409, str(e))
+            return
+        try:
+            self.send_response(200)
+            self.send_header('Content-type', 'text/plain; charset=utf-8')
+            self.send_header('Content-Disposition', 'attachment; filename="perfil.folded"')
+            self.end_headers()
+            self.escribir(colapsadas(muestras).encode('utf-8'))
+        except Exception as e:
+            print(f"✗ Error sirviendo perfil: {e}")
+    
+    def serve_trace(self, accion, query):
+        """/debug/trace?seconds=N mide N segundos; /debug/trace/start y /stop lo dejan abierto."""
+        if accion == '/start':
+            if not trazador.activar():
+                self.send_error(409, "la traza ya está activa")
+                return
+            self.send_json({"tracing": True})
+        elif accion == '/stop':
+            trazador.desactivar()
+            self.send_json(trazador.chrome_trace())
+        elif accion == '':
+            try:
+                segundos = numero_query(query, 'seconds', 5.0, 0.0, PERFIL_MAX_S)
+            except ValueError:
+                self.send_error(400, "seconds debe ser un número")
+                return
+            if not trazador.activar():
+                self.send_error(409, "la traza ya está activa")
+                return
+            try:
+                time.sleep(segundos)
+            finally:
+                trazador.desactivar()
+            self.send_json(trazador.chrome_trace())
+        else:
+            self.send_error(404)
+    
+    def serve_html(self):
+        try:
+            self.send_response(200)
+            self.send_header('Content-type', 'text/html; charset=utf-8')
+            self.end_headers()
+            
+            html = self.get_html_page()
+            self.wfile.write(html.encode('utf-8'))
+        except Exception as e:
+            print(f"✗ Error sirviendo HTML: {e}")
+    
+    def serve_telemetry(self):
+        try:
+            self.send_response(200)
+            self.send_header('Content-type', 'application/json')
+            self.send_header('Cache-Control', 'no-cache, no-store, must-revalidate')
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.end_headers()
+            
+            self.escribir(a_json(telemetria_principal()))
+        except Exception as e:
+            print(f"✗ Error sirviendo JSON: {e}")
+    
+    def serve_state(self):
+        try:
+            self.send_response(200)
+            self.send_header('Content-type', 'application/json')
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.end_headers()
+            
+            estado = {
+                "connected": principal_conectado(),
+                "last_update": last_update_time.isoformat(),
+                "telemetry": telemetria_principal()
+            }
+            self.escribir(a_json(estado))
+        except Exception as e:
+            print(f"✗ Error sirviendo estado: {e}")
+    
+    def log_message(self, format, *args):
+        pass
+    
+    def get_html_page(self):
+        return '''<!DOCTYPE html>
+<html lang="es">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>📡 Telemetría Raspberry Pico 2</title>
+    <style>
+        * { margin: 0; padding: 0; box-sizing: border-box; }
+        
+        body { 
+            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
+            background: linear-gradient(135deg, #0f172a 0%, #1e293b 100%);
+            color: #f1f5f9;
+            padding: 20px;
+            min-height: 100vh;
+        }
+        
+        .container { max-width: 1400px; margin: 0 auto; }
+        
+        header { text-align: center; margin-bottom: 30px; }
+        
+        h1 {
+            font-size: 2.5em;
+            background: linear-gradient(135deg, #10b981, #3b82f6);
+            -webkit-background-clip: text;
+            -webkit-text-fill-color: transparent;
+            background-clip: text;
+            margin-bottom: 10px;
+        }
+        
+        .subtitle { color: #94a3b8; font-size: 1.1em; }
+        
+        .baud-info {
+            background: rgba(245, 158, 11, 0.2);
+            padding: 10px 20px;
+            border-radius: 10px;
+            margin: 10px auto;
+            display: inline-block;
+            border: 1px solid rgba(245, 158, 11, 0.5);
+            color: #f59e0b;
+            font-weight: bold;
+        }
+        
+        .speed-warning {
+            background: rgba(239, 68, 68, 0.2);
+            padding: 8px 16px;
+            border-radius: 8px;
+            margin: 5px auto;
+            display: inline-block;
+            border: 1px solid rgba(239, 68, 68, 0.5);
+            color: #ef4444;
+            font-size: 0.9em;
+        }
+        
+        .status-card {
+            background: linear-gradient(145deg, #1e293b, #334155);
+            border-radius: 16px;
+            padding: 20px;
+            margin-bottom: 25px;
+            box-shadow: 0 8px 32px rgba(0, 0, 0, 0.3);
+            border: 1px solid rgba(255, 255, 255, 0.1);
+            display: flex;
+            align-items: center;
+            gap: 20px;
+            transition: all 0.3s ease;
+        }
+        
+        .status-card.connected {
+            background: linear-gradient(145deg, #065f46, #047857);
+            border-color: #10b981;
+        }
+        
+        .status-card.disconnected {
+            background: linear-gradient(145deg, #7f1d1d, #991b1b);
+            border-color: #ef4444;
+        }
+        
+        .line-status-card {
+            background: linear-gradient(145deg, #1e293b, #334155);
+            border-radius: 16px;
+            padding: 20px;
+            margin-bottom: 25px;
+            box-shadow: 0 8px 32px rgba(0, 0, 0, 0.3);
+            border: 1px solid rgba(255, 255, 255, 0.1);
+            display: flex;
+            align-items: center;
+            gap: 20px;
+            transition: all 0.3s ease;
+        }
+        
+        .line-status-card.on-line {
+            background: linear-gradient(145deg, #065f46, #047857);
+            border-color: #10b981;
+        }
+        
+        .line-status-card.off-line {
+            background: linear-gradient(145deg, #dc2626, #b91c1c);
+            border-color: #ef4444;
+        }
+        
+        .line-status-card.unknown {
+            background: linear-gradient(145deg, #475569, #374151);
+            border-color: #94a3b8;
+        }
+        
+        .status-icon { font-size: 2.5em; }
+        
+        .status-text h2 { font-size: 1.5em; margin-bottom: 5px; }
+        
+        .grid {
+            display: grid;
+            grid-template-columns: repeat(auto-fit, minmax(350px, 1fr));
+            gap: 25px;
+            margin-bottom: 25px;
+        }
+        
+        .card {
+            background: linear-gradient(145deg, #1e293b, #2d3748);
+            border-radius: 16px;
+            padding: 25px;
+            box-shadow: 0 8px 32px rgba(0, 0, 0, 0.3);
+            border: 1px solid rgba(255, 255, 255, 0.1);
+        }
+        
+        .card-header {
+            display: flex;
+            align-items: center;
+            gap: 12px;
+            margin-bottom: 20px;
+            padding-bottom: 15px;
+            border-bottom: 2px solid rgba(16, 185, 129, 0.3);
+        }
+        
+        .card-icon {
+            background: rgba(16, 185, 129, 0.2);
+            padding: 10px;
+            border-radius: 12px;
+            font-size: 1.5em;
+        }
+        
+        .card-title { font-size: 1.3em; font-weight: 600; }
+        
+        .data-row {
+            display: flex;
+            justify-content: space-between;
+            align-items: center;
+            padding: 12px 0;
+            border-bottom: 1px solid rgba(255, 255, 255, 0.05);
+        }
+        
+        .data-row:last-child { border-bottom: none; }
+        
+        .data-label { color: #94a3b8; font-weight: 500; }
+        
+        .data-value {
+            font-family: 'Courier New', monospace;
+            font-size: 1.1em;
+            font-weight: bold;
+            color: #10b981;
+        }
+        
+        .unit { color: #64748b; font-size: 0.9em; margin-left: 5px; }
+        
+        .map-button {
+            width: 100%;
+            background: linear-gradient(135deg, #10b981, #059669);
+            color: white;
+            border: none;
+            padding: 15px;
+            border-radius: 12px;
+            font-size: 1.1em;
+            font-weight: 600;
+            cursor: pointer;
+            margin-top: 15px;
+        }
+        
+        .map-button:disabled {
+            background: #475569;
+            cursor: not-allowed;
+        }
+        
+        .track-canvas {
+            width: 100%;
+            height: 360px;
+            background: #0f172a;
+            border-radius: 12px;
+            display: block;
+        }
+        
+        .chart-grid {
+            display: grid;
+            grid-template-columns: repeat(auto-fit, minmax(300px, 1fr));
+            gap: 15px;
+        }
+        
+        .chart-canvas {
+            width: 100%;
+            height: 160px;
+            background: #0f172a;
+            border-radius: 12px;
+            display: block;
+        }
+        
+        .spark-canvas {
+            width: 100%;
+            height: 40px;
+            display: block;
+            margin-top: 10px;
+        }
+        
+        .temp-bar {
+            width: 100%;
+            height: 8px;
+            background: #334155;
+            border-radius: 10px;
+            overflow: hidden;
+            margin-top: 10px;
+        }
+        
+        .temp-fill {
+            height: 100%;
+            background: linear-gradient(90deg, #3b82f6, #f59e0b);
+            transition: width 0.5s ease;
+            border-radius: 10px;
+        }
+        
+        footer {
+            text-align: center;
+            color: #64748b;
+            margin-top: 30px;
+            padding: 20px;
+            background: rgba(30, 41, 59, 0.5);
+            border-radius: 12px;
+        }
+        
+        .last-update { color: #94a3b8; font-size: 0.9em; margin-top: 10px; }
+        
+        .leaderboard { width: 100%; border-collapse: collapse; font-family: 'Courier New', monospace; }
+        .leaderboard th { color: #94a3b8; text-align: left; padding: 8px; border-bottom: 2px solid rgba(16, 185, 129, 0.3); }
+        .leaderboard td { padding: 8px; border-bottom: 1px solid rgba(255, 255, 255, 0.05); }
+        .leaderboard td.time { color: #10b981; font-weight: bold; }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <header>
+            <h1>📡 Telemetría Raspberry Pico 2</h1>
+            <p class="subtitle">Monitor en Tiempo Real - Puerto COM6</p>
+            <div class="baud-info">
+                <strong>Velocidad: <span id="baud">1200</span> baudios · <span id="hz">0.0</span> tramas/s</strong>
+            </div>
+            <div class="speed-warning" id="speedWarning">
+                ⚠️ Velocidad baja - Actualización más lenta
+            </div>
+            <p class="last-update" id="lastUpdate">Esperando datos...</p>
+        </header>
+        
+        <div class="status-card disconnected" id="statusCard">
+            <div class="status-icon">📶</div>
+            <div class="status-text">
+                <h2 id="statusTitle">DESCONECTADO</h2>
+                <p id="statusDesc">Esperando conexión con el dispositivo</p>
+            </div>
+        </div>
+        
+        <!-- Nuevo Card para Sensor de Línea -->
+        <div class="line-status-card unknown" id="lineStatusCard">
+            <div class="status-icon" id="lineIcon">❓</div>
+            <div class="status-text">
+                <h2 id="lineTitle">SENSOR DE LÍNEA</h2>
+                <p id="lineDesc">Esperando datos del sensor...</p>
+            </div>
+        </div>
+        
+        <div class="grid">
+            <!-- GPS Card -->
+            <div class="card">
+                <div class="card-header">
+                    <div class="card-icon">📍</div>
+                    <div class="card-title">Posición GPS</div>
+                </div>
+                <div class="data-row">
+                    <span class="data-label">Latitud</span>
+                    <span class="data-value"><span id="lat">0.000000</span><span class="unit">°</span></span>
+                </div>
+                <div class="data-row">
+                    <span class="data-label">Longitud</span>
+                    <span class="data-value"><span id="lon">0.000000</span><span class="unit">°</span></span>
+                </div>
+                <div class="data-row">
+                    <span class="data-label">Altitud</span>
+                    <span class="data-value"><span id="alt">0.0</span><span class="unit">m</span></span>
+                </div>
+                <div class="data-row">
+                    <span class="data-label">Velocidad</span>
+                    <span class="data-value"><span id="spd">0.0</span><span class="unit">km/h</span></span>
+                </div>
+                <button class="map-button" id="mapButton" onclick="openGoogleMaps()">
+                    🗺️ Abrir en Google Maps
+                </button>
+            </div>
+            
+            <!-- Accelerometer Card -->
+            <div class="card">
+                <div class="card-header">
+                    <div class="card-icon">⚡</div>
+                    <div class="card-title">Acelerómetro</div>
+                </div>
+                <div class="data-row">
+                    <span class="data-label">Eje X</span>
+                    <span class="data-value"><span id="accx">0.000</span><span class="unit">m/s²</span></span>
+                </div>
+                <div class="data-row">
+                    <span class="data-label">Eje Y</span>
+                    <span class="data-value"><span id="accy">0.000</span><span class="unit">m/s²</span></span>
+                </div>
+                <div class="data-row">
+                    <span class="data-label">Eje Z</span>
+                    <span class="data-value"><span id="accz">0.000</span><span class="unit">m/s²</span></span>
+                </div>
+            </div>
+            
+            <!-- Gyroscope Card -->
+            <div class="card">
+                <div class="card-header">
+                    <div class="card-icon">🧭</div>
+                    <div class="card-title">Giroscopio</div>
+                </div>
+                <div class="data-row">
+                    <span class="data-label">Eje X</span>
+                    <span class="data-value"><span id="gyrox">0.000</span><span class="unit">°/s</span></span>
+                </div>
+                <div class="data-row">
+                    <span class="data-label">Eje Y</span>
+                    <span class="data-value"><span id="gyroy">0.000</span><span class="unit">°/s</span></span>
+                </div>
+                <div class="data-row">
+                    <span class="data-label">Eje Z</span>
+                    <span class="data-value"><span id="gyroz">0.000</span><span class="unit">°/s</span></span>
+                </div>
+            </div>
+            
+            <!-- Actuators Card -->
+            <div class="card">
+                <div class="card-header">
+                    <div class="card-icon">⚙️</div>
+                    <div class="card-title">Actuadores</div>
+                </div>
+                <div class="data-row">
+                    <span class="data-label">Ángulo Servo</span>
+                    <span class="data-value"><span id="servo">0</span><span class="unit">°</span></span>
+                </div>
+                <div class="data-row">
+                    <span class="data-label">Velocidad Motor</span>
+                    <span class="data-value"><span id="motor">0.0</span><span class="unit">%</span></span>
+                </div>
+                <div class="data-row">
+                    <span class="data-label">Batería</span>
+                    <span class="data-value"><span id="batt">0.00</span><span class="unit">V</span></span>
+                </div>
+            </div>
+            
+            <!-- Battery Card -->
+            <div class="card">
+                <div class="card-header">
+                    <div class="card-icon">🔋</div>
+                    <div class="card-title">Batería (estimada)</div>
+                </div>
+                <div class="data-row">
+                    <span class="data-label">En vacío</span>
+                    <span class="data-value"><span id="battOcv">--</span><span class="unit">V</span></span>
+                </div>
+                <div class="data-row">
+                    <span class="data-label">Caída a fondo</span>
+                    <span class="data-value"><span id="battSag">--</span><span class="unit">V</span></span>
+                </div>
+                <div class="data-row">
+                    <span class="data-label">Descarga</span>
+                    <span class="data-value"><span id="battRate">--</span><span class="unit">V/min</span></span>
+                </div>
+                <div class="data-row">
+                    <span class="data-label">Restante</span>
+                    <span class="data-value"><span id="battMin">--</span><span class="unit">min</span></span>
+                </div>
+                <canvas class="spark-canvas" id="sparkBatt"></canvas>
+            </div>
+            
+            <!-- Temperature Card -->
+            <div class="card">
+                <div class="card-header">
+                    <div class="card-icon">🌡️</div>
+                    <div class="card-title">Temperatura</div>
+                </div>
+                <div class="data-row">
+                    <span class="data-label">Temperatura Actual</span>
+                    <span class="data-value"><span id="temp">0.0</span><span class="unit">°C</span></span>
+                </div>
+                <div class="temp-bar">
+                    <div class="temp-fill" id="tempBar" style="width: 0%"></div>
+                </div>
+                <canvas class="spark-canvas" id="sparkTemp"></canvas>
+            </div>
+        </div>
+        
+        <!-- Gráficas en vivo (/stream?format=rows), últimos CHART_SECONDS segundos -->
+        <div class="card" style="margin-bottom: 25px;">
+            <div class="card-header">
+                <div class="card-icon">📈</div>
+                <div class="card-title">Gráficas en vivo</div>
+            </div>
+            <div class="chart-grid">
+                <canvas class="chart-canvas" id="chartAcc"></canvas>
+                <canvas class="chart-canvas" id="chartGyro"></canvas>
+                <canvas class="chart-canvas" id="chartPwm"></canvas>
+            </div>
+        </div>
+        
+        <!-- Trazado fusionado GPS + IMU (/track), dibujado sin servicios de mapas -->
+        <div class="card" style="margin-bottom: 25px;">
+            <div class="card-header">
+                <div class="card-icon">🛰️</div>
+                <div class="card-title">Trazado</div>
+            </div>
+            <canvas class="track-canvas" id="trackCanvas"></canvas>
+            <div class="data-row">
+                <span class="data-label" id="trackInfo">Esperando fix GPS...</span>
+            </div>
+        </div>
+        
+        <!-- Tabla de vueltas (/api/lap) -->
+        <div class="card" style="margin-bottom: 25px;">
+            <div class="card-header">
+                <div class="card-icon">🏁</div>
+                <div class="card-title">Tabla de Vueltas</div>
+            </div>
+            <table class="leaderboard">
+                <thead>
+                    <tr><th>#</th><th>Auto</th><th>Equipo</th><th>Mejor</th><th>Última</th><th>Vueltas</th><th>Dif.</th></tr>
+                </thead>
+                <tbody id="leaderboard">
+                    <tr><td colspan="7">Esperando vueltas...</td></tr>
+                </tbody>
+            </table>
+        </div>
+        
+        <footer>
+            <p>Sistema de Telemetría · Raspberry Pico 2 · UART con baudios negociados</p>
+            <p>Recibiendo datos vía UART desde COM6</p>
+        </footer>
+    </div>
+
+    <script>
+        let gpsLat = 0, gpsLon = 0;
+        
+        // Todo lo que toca el DOM se hace una vez por cuadro (requestAnimationFrame):
+        // los datos que llegan antes se acumulan, el último /telemetry reemplaza al anterior
+        let pendingData = null, chartsDirty = false, frameRequested = false;
+        
+        function scheduleFrame() {
+            if (!frameRequested) {
+                frameRequested = true;
+                requestAnimationFrame(renderFrame);
+            }
+        }
+        
+        function renderFrame() {
+            frameRequested = false;
+            if (pendingData) {
+                applyTelemetry(pendingData);
+                pendingData = null;
+            }
+            if (chartsDirty) {
+                chartsDirty = false;
+                drawCharts();
+            }
+        }
+        
+        // textContent solo si cambió (escribirlo siempre invalida el layout)
+        const textCache = {};
+        function setText(id, text) {
+            let entry = textCache[id];
+            if (!entry) entry = textCache[id] = {el: document.getElementById(id), text: null};
+            if (entry.text !== text) {
+                entry.el.textContent = text;
+                entry.text = text;
+            }
+        }
+        
+        function updateUI(data) {
+            pendingData = data;
+            scheduleFrame();
+        }
+        
+        function applyTelemetry(data) {
+            // GPS
+            gpsLat = data.gps.latitude;
+            gpsLon = data.gps.longitude;
+            setText('lat', data.gps.latitude.toFixed(6));
+            setText('lon', data.gps.longitude.toFixed(6));
+            setText('alt', data.gps.altitude.toFixed(1));
+            setText('spd', data.gps.speed.toFixed(1));
+            
+            // Acelerómetro
+            setText('accx', data.accelerometer.x.toFixed(3));
+            setText('accy', data.accelerometer.y.toFixed(3));
+            setText('accz', data.accelerometer.z.toFixed(3));
+            
+            // Giroscopio
+            setText('gyrox', data.gyroscope.x.toFixed(3));
+            setText('gyroy', data.gyroscope.y.toFixed(3));
+            setText('gyroz', data.gyroscope.z.toFixed(3));
+            
+            // Actuadores
+            setText('servo', String(Math.round(data.servo.angle)));
+            setText('motor', data.motor.speed.toFixed(1));
+            setText('batt', data.battery.voltage.toFixed(2));
+            
+            // Batería estimada (null mientras no hay lecturas suficientes)
+            const fijo = (v, d) => v === null || v === undefined ? '--' : v.toFixed(d);
+            setText('battOcv', fijo(data.battery.ocv, 2));
+            setText('battSag', fijo(data.battery.sag, 2));
+            setText('battRate', fijo(data.battery.rate, 3));
+            setText('battMin', fijo(data.battery.minutes, 0));
+            
+            // Temperatura
+            const temp = data.temperature.value;
+            setText('temp', temp.toFixed(1));
+            const tempPercent = Math.min(100, (temp / 50) * 100);
+            const tempBar = document.getElementById('tempBar');
+            const tempWidth = tempPercent + '%';
+            if (tempBar.style.width !== tempWidth) tempBar.style.width = tempWidth;
+            
+            // Sensor de Línea - Nuevo
+            updateLineSensor(data.line_sensor);
+            
+            // Enlace serie
+            setText('baud', String(data.data_rate.baudrate));
+            setText('hz', data.data_rate.hz.toFixed(1));
+            document.getElementById('speedWarning').style.display =
+                data.data_rate.baudrate > 1200 ? 'none' : 'inline-block';
+            
+            // Actualizar timestamp
+            const now = new Date();
+            setText('lastUpdate', 'Última actualización: ' + now.toLocaleTimeString());
+        }
+
+        function updateLineSensor(lineData) {
+            const card = document.getElementById('lineStatusCard');
+            const title = document.getElementById('lineTitle');
+            const desc = document.getElementById('lineDesc');
+            const icon = document.getElementById('lineIcon');
+            
+            const lineValue = lineData.value;
+            const status = lineData.status;
+            
+            if (status === "SOBRE LÍNEA") {
+                card.className = 'line-status-card on-line';
+                title.textContent = 'SOBRE LA LÍNEA ✓';
+                desc.textContent = 'El vehículo está siguiendo la línea correctamente';
+                icon.textContent = '✅';
+            } else if (status === "FUERA LÍNEA") {
+                card.className = 'line-status-card off-line';
+                title.textContent = 'FUERA DE LÍNEA ✗';
+                desc.textContent = 'El vehículo se ha salido de la línea';
+                icon.textContent = '❌';
+            } else {
+                card.className = 'line-status-card unknown';
+                title.textContent = 'SENSOR DE LÍNEA';
+                desc.textContent = 'Esperando datos del sensor...';
+                icon.textContent = '❓';
+            }
+        }
+
+        function updateStatus(connected) {
+            const card = document.getElementById('statusCard');
+            const title = document.getElementById('statusTitle');
+            const desc = document.getElementById('statusDesc');
+            const mapBtn = document.getElementById('mapButton');
+            
+            if (connected) {
+                card.className = 'status-card connected';
+                title.textContent = 'CONECTADO ✓';
+                desc.textContent = 'Recibiendo datos de telemetría en tiempo real';
+                mapBtn.disabled = false;
+            } else {
+                card.className = 'status-card disconnected';
+                title.textContent = 'DESCONECTADO ✗';
+                desc.textContent = 'No hay conexión con el dispositivo';
+                mapBtn.disabled = true;
+            }
+        }
+        
+        function openGoogleMaps() {
+            if (gpsLat === 0 && gpsLon === 0) {
+                alert('⚠️ No hay coordenadas GPS disponibles');
+                return;
+            }
+            const url = `https://www.google.com/maps?q=${gpsLat},${gpsLon}`;
+            window.open(url, '_blank');
+        }
+
+        // Polling del último estado
+        function fetchData() {
+            fetch('/telemetry')
+                .then(response => {
+                    if (!response.ok) throw new Error('HTTP error');
+                    return response.json();
+                })
+                .then(data => {
+                    updateStatus(true);
+                    updateUI(data);
+                })
+                .catch(error => {
+                    updateStatus(false);
+                });
+        }
+
+        // Polling cada 2000ms
+        setInterval(fetchData, 2000);
+        
+        // Gráficas en vivo: cada fila de /ws (o de /stream?format=rows) va a un anillo de typed
+        // arrays (sin objetos por muestra); se dibuja una vez por cuadro, con el mínimo
+        // y el máximo de cada columna de píxeles CSS, así el costo depende del ancho y
+        // no de cuántas muestras llegan
+        const CHART_SECONDS = 20;
+        const RING_SIZE = 4096;   // potencia de 2 (índice con &): 20 s a 200 Hz
+        const CHART_FIELDS = ['t', 'speed', 'acc_x', 'acc_y', 'acc_z', 'gyro_x', 'gyro_y',
+                              'battery', 'temperature', 'servo_pwm', 'motor_pwm'];
+        const ring = {count: 0, data: {}};   // count: filas recibidas desde el inicio
+        CHART_FIELDS.forEach(f => {
+            ring.data[f] = f === 't' ? new Float64Array(RING_SIZE) : new Float32Array(RING_SIZE);
+        });
+        const CHARTS = [
+            {id: 'chartAcc', title: 'Acelerómetro (m/s²)',
+             series: [['acc_x', '#ef4444'], ['acc_y', '#10b981'], ['acc_z', '#3b82f6']]},
+            {id: 'chartGyro', title: 'Giroscopio (°/s)', series: [['gyro_x', '#f59e0b'], ['gyro_y', '#a855f7']]},
+            {id: 'chartPwm', title: 'PWM (μs)', series: [['servo_pwm', '#38bdf8'], ['motor_pwm', '#f97316']]},
+            {id: 'sparkBatt', series: [['battery', '#10b981']], spark: true},
+            {id: 'sparkTemp', series: [['temperature', '#f59e0b']], spark: true},
+        ];
+        // Valores que el stream actualiza en cada cuadro (el resto, con /telemetry)
+        const LIVE_TEXT = [['accx', 'acc_x', 3], ['accy', 'acc_y', 3], ['accz', 'acc_z', 3],
+                           ['gyrox', 'gyro_x', 3], ['gyroy', 'gyro_y', 3], ['spd', 'speed', 1],
+                           ['batt', 'battery', 2], ['temp', 'temperature', 1]];
+        
+        function pushRow(row) {
+            const mask = RING_SIZE - 1;
+            const t = ring.data.t;
+            if (ring.count && row[0] < t[(ring.count - 1) & mask]) ring.count = 0;   // otra sesión
+            const i = ring.count & mask;
+            for (let k = 0; k < CHART_FIELDS.length; k++) ring.data[CHART_FIELDS[k]][i] = row[k];
+            ring.count++;
+        }
+        
+        function firstIndex(tStart) {
+            // Primera fila con t >= tStart (búsqueda binaria: t crece)
+            const t = ring.data.t, mask = RING_SIZE - 1;
+            let lo = Math.max(0, ring.count - RING_SIZE), hi = ring.count;
+            while (lo < hi) {
+                const mid = (lo + hi) >> 1;
+                if (t[mid & mask] < tStart) lo = mid + 1; else hi = mid;
+            }
+            return lo;
+        }
+        
+        function drawChart(chart, first, tEnd) {
+            if (!chart.ctx) {
+                chart.canvas = document.getElementById(chart.id);
+                chart.ctx = chart.canvas.getContext('2d');
+            }
+            const canvas = chart.canvas, ctx = chart.ctx;
+            const dpr = window.devicePixelRatio || 1;
+            const cols = Math.round(canvas.clientWidth);
+            const w = Math.round(cols * dpr), h = Math.round(canvas.clientHeight * dpr);
+            if (canvas.width !== w || canvas.height !== h || !chart.cols) {
+                canvas.width = w;
+                canvas.height = h;
+                chart.cols = chart.series.map(() => [new Float32Array(cols), new Float32Array(cols)]);
+            }
+            ctx.clearRect(0, 0, w, h);
+            if (!cols || first >= ring.count) return;
+            
+            // Mínimo y máximo por columna de píxeles (bucles simples: es lo caliente)
+            const t = ring.data.t, mask = RING_SIZE - 1, end = ring.count;
+            const xScale = (cols - 1) / CHART_SECONDS, tStart = tEnd - CHART_SECONDS;
+            let lo = Infinity, hi = -Infinity;
+            for (let s = 0; s < chart.series.length; s++) {
+                const mins = chart.cols[s][0], maxs = chart.cols[s][1];
+                const values = ring.data[chart.series[s][0]];
+                mins.fill(Infinity);
+                maxs.fill(-Infinity);
+                for (let n = first; n < end; n++) {
+                    const i = n & mask, v = values[i];
+                    const x = ((t[i] - tStart) * xScale) | 0;
+                    if (v < mins[x]) mins[x] = v;
+                    if (v > maxs[x]) maxs[x] = v;
+                }
+                for (let x = 0; x < cols; x++) {
+                    if (mins[x] < lo) lo = mins[x];
+                    if (maxs[x] > hi) hi = maxs[x];
+                }
+            }
+            if (lo === Infinity) return;   // solo NaN (null en el JSON)
+            const margin = Math.max((hi - lo) * 0.1, 1e-3);
+            lo -= margin;
+            hi += margin;
+            const top = chart.spark ? 0 : 16 * dpr;
+            const yScale = (h - top) / (hi - lo);
+            
+            ctx.lineWidth = dpr;
+            for (let s = 0; s < chart.series.length; s++) {
+                const mins = chart.cols[s][0], maxs = chart.cols[s][1];
+                ctx.strokeStyle = chart.series[s][1];
+                ctx.beginPath();
+                let started = false;
+                for (let x = 0; x < cols; x++) {
+                    if (mins[x] === Infinity) continue;
+                    const y1 = h - (maxs[x] - lo) * yScale, y0 = h - (mins[x] - lo) * yScale;
+                    if (started) ctx.lineTo(x * dpr, y1); else ctx.moveTo(x * dpr, y1);
+                    ctx.lineTo(x * dpr, y0);
+                    started = true;
+                }
+                ctx.stroke();
+            }
+            if (chart.spark) return;
+            
+            ctx.font = `${11 * dpr}px monospace`;
+            ctx.fillStyle = '#94a3b8';
+            ctx.fillText(chart.title, 4 * dpr, 12 * dpr);
+            let x = ctx.measureText(chart.title).width + 12 * dpr;
+            chart.series.forEach(([field, color]) => {
+                ctx.fillStyle = color;
+                ctx.fillText(field, x, 12 * dpr);
+                x += ctx.measureText(field).width + 8 * dpr;
+            });
+            ctx.fillStyle = '#64748b';
+            ctx.textAlign = 'right';
+            ctx.fillText(hi.toFixed(1), w - 4 * dpr, top + 10 * dpr);
+            ctx.fillText(lo.toFixed(1), w - 4 * dpr, h - 4 * dpr);
+            ctx.textAlign = 'left';
+        }
+        
+        function drawCharts() {
+            if (!ring.count) return;
+            const last = (ring.count - 1) & (RING_SIZE - 1);
+            const tEnd = ring.data.t[last];   // reloj del servidor: sin desfase con el del teléfono
+            const first = firstIndex(tEnd - CHART_SECONDS);
+            CHARTS.forEach(chart => drawChart(chart, first, tEnd));
+            LIVE_TEXT.forEach(([id, field, decimals]) => setText(id, ring.data[field][last].toFixed(decimals)));
+        }
+        
+        // /ws: esquema JSON una vez y después cuadros binarios (protocolo_ws.py) leídos con
+        // DataView: cabecera <BBI (tipo, auto, ms desde t0), y todos los canales (tipo 1) o
+        // una máscara <H y solo los que cambiaron (tipo 2)
+        let wsSchema = null, wsColumns = [], wsState = [];
+        const wsRow = new Array(CHART_FIELDS.length);
+        
+        function useSchema(schema) {
+            wsSchema = schema;
+            wsState = [];
+            wsColumns = schema.channels.map(c => ({
+                scale: c.scale, nullValue: c.null, int32: c.type === 'i',
+                slot: CHART_FIELDS.indexOf(c.name)}));
+        }
+        
+        function decodeFrames(buffer) {
+            const view = new DataView(buffer), cols = wsColumns, full = (1 << cols.length) - 1;
+            let off = 0;
+            while (off < view.byteLength) {
+                const type = view.getUint8(off), car = view.getUint8(off + 1);
+                const t = wsSchema.t0 + view.getUint32(off + 2, true) / 1000;
+                off += 6;
+                let mask = full;
+                if (type === 2) {
+                    mask = view.getUint16(off, true);
+                    off += 2;
+                }
+                const values = wsState[car] || (wsState[car] = new Float64Array(cols.length).fill(NaN));
+                for (let k = 0; k < cols.length; k++) {
+                    if (!(mask & (1 << k))) continue;
+                    const c = cols[k];
+                    const raw = c.int32 ? view.getInt32(off, true) : view.getInt16(off, true);
+                    off += c.int32 ? 4 : 2;
+                    values[k] = raw === c.nullValue ? NaN : raw / c.scale;
+                }
+                if (car !== 0) continue;   // sin car en la URL solo llega el auto principal
+                wsRow[0] = t;
+                for (let k = 0; k < cols.length; k++) if (cols[k].slot > 0) wsRow[cols[k].slot] = values[k];
+                pushRow(wsRow);
+            }
+        }
+        
+        function openSocket() {
+            const proto = location.protocol === 'https:' ? 'wss' : 'ws';
+            const ws = new WebSocket(`${proto}://${location.host}/ws?channels=${CHART_FIELDS.slice(1).join(',')}`);
+            ws.binaryType = 'arraybuffer';
+            let opened = false;
+            ws.onopen = () => { opened = true; };
+            ws.onmessage = ev => {
+                if (typeof ev.data === 'string') {
+                    const msg = JSON.parse(ev.data);
+                    if (msg.type === 'schema') useSchema(msg);
+                    return;
+                }
+                if (!wsSchema) return;
+                decodeFrames(ev.data);
+                chartsDirty = true;
+                scheduleFrame();
+            };
+            // Se reconecta si se cortó; si nunca abrió (proxy, navegador viejo), SSE
+            ws.onclose = () => { if (opened) setTimeout(openSocket, 2000); else openEventSource(); };
+        }
+        
+        function openEventSource() {
+            if (!window.EventSource) return;
+            const stream = new EventSource('/stream?format=rows&fields=' + CHART_FIELDS.join(','));
+            stream.onmessage = ev => {
+                const rows = JSON.parse(ev.data);
+                for (let k = 0; k < rows.length; k++) pushRow(rows[k]);
+                chartsDirty = true;
+                scheduleFrame();
+            };
+        }
+        
+        if (window.WebSocket) openSocket(); else openEventSource();
+        window.addEventListener('resize', () => { chartsDirty = true; scheduleFrame(); });
+        
+        // Trazado: polilínea codificada (formato de Google) -> canvas
+        function decodePolyline(text, precision) {
+            const points = [];
+            const factor = Math.pow(10, precision);
+            let index = 0, lat = 0, lon = 0;
+            while (index < text.length) {
+                const deltas = [];
+                for (let k = 0; k < 2; k++) {
+                    let result = 0, shift = 0, b;
+                    do {
+                        b = text.charCodeAt(index++) - 63;
+                        result |= (b & 0x1f) << shift;
+                        shift += 5;
+                    } while (b >= 0x20);
+                    deltas.push(result & 1 ? ~(result >> 1) : result >> 1);
+                }
+                lat += deltas[0];
+                lon += deltas[1];
+                points.push([lat / factor, lon / factor]);
+            }
+            return points;
+        }
+        
+        function drawTrack(track) {
+            const canvas = document.getElementById('trackCanvas');
+            const ctx = canvas.getContext('2d');
+            canvas.width = canvas.clientWidth;
+            canvas.height = canvas.clientHeight;
+            ctx.clearRect(0, 0, canvas.width, canvas.height);
+            const points = decodePolyline(track.polyline, track.precision);
+            if (!points.length) return;
+            
+            // Plano local en metros (equirectangular alrededor del primer punto)
+            const lat0 = points[0][0] * Math.PI / 180;
+            const xy = points.map(p => [p[1] * 111320 * Math.cos(lat0), p[0] * 110540]);
+            const xs = xy.map(p => p[0]), ys = xy.map(p => p[1]);
+            const minX = Math.min(...xs), maxX = Math.max(...xs);
+            const minY = Math.min(...ys), maxY = Math.max(...ys);
+            const pad = 20;
+            const scale = Math.min((canvas.width - 2 * pad) / Math.max(maxX - minX, 1),
+                                   (canvas.height - 2 * pad) / Math.max(maxY - minY, 1));
+            const px = p => [pad + (p[0] - minX) * scale, canvas.height - pad - (p[1] - minY) * scale];
+            
+            ctx.strokeStyle = '#38bdf8';
+            ctx.lineWidth = 2;
+            ctx.beginPath();
+            xy.forEach((p, i) => {
+                const [x, y] = px(p);
+                if (i === 0) ctx.moveTo(x, y); else ctx.lineTo(x, y);
+            });
+            ctx.stroke();
+            const [lx, ly] = px(xy[xy.length - 1]);
+            ctx.fillStyle = '#f59e0b';
+            ctx.beginPath();
+            ctx.arc(lx, ly, 5, 0, 2 * Math.PI);
+            ctx.fill();
+            
+            document.getElementById('trackInfo').textContent =
+                `${track.points} puntos (de ${track.raw_points}, ${track.fixes} fixes GPS) · ` +
+                `${Math.round(maxX - minX)} x ${Math.round(maxY - minY)} m`;
+        }
+        
+        function fetchTrack() {
+            fetch('/track')
+                .then(response => response.json())
+                .then(track => { if (track.points) drawTrack(track); })
+                .catch(() => {});
+        }
+        setInterval(fetchTrack, 2000);
+        
+        // Tabla de vueltas: el servidor empuja cada cambio por SSE
+        function fmtLap(ms) {
+            return ms === null ? '---' : (ms / 1000).toFixed(3) + 's';
+        }
+        
+        // car_id y team los manda cualquier cliente de /api/lap: van como texto, nunca como HTML
+        function updateLeaderboard(rows) {
+            const body = document.getElementById('leaderboard');
+            if (!rows.length) return;
+            body.replaceChildren(...rows.map(r => {
+                const tr = document.createElement('tr');
+                const celdas = [r.position, r.car_id, r.team, fmtLap(r.best_lap_ms), fmtLap(r.last_lap_ms),
+                                r.laps, r.position === 1 ? '---' : '+' + fmtLap(r.gap_ms)];
+                celdas.forEach((valor, i) => {
+                    const td = tr.insertCell();
+                    td.textContent = valor;
+                    if (i === 3) td.className = 'time';
+                });
+                return tr;
+            }));
+        }
+        
+        if (window.EventSource) {
+            const lapStream = new EventSource('/leaderboard/stream');
+            lapStream.addEventListener('leaderboard', ev => updateLeaderboard(JSON.parse(ev.data)));
+        }
+
+        // Carga inicial
+        fetchData();
+        fetchTrack();
+    </script>
+</body>
+</html>'''
+
+# ============ PERFILADO ============
+# Puntos medidos por /debug/trace; se envuelven solo mientras la traza está activa
+trazador = Trazador()
+for nombre in ("parsear_telemetria", "procesar_datagrama", "publicar", "a_json"):
+    trazador.registrar(sys.modules[__name__], nombre, "pipeline")
+trazador.registrar(TelemetryHandler, "escribir", "http")
+
+def iniciar_servidor_web(host=HOST_WEB, puerto=PUERTO_WEB):
+    try:
+        server = ThreadingHTTPServer((host, puerto), TelemetryHandler)
+        print(f"🚀 Servidor web en: http://localhost:{puerto}")
+        if host not in ('localhost', '127.0.0.1'):
+            print(f"🌐 Escuchando en {host}:{puerto}: también desde otras máquinas de la red")
+        print(f"📊 Velocidad: {BAUDRATE} baudios (objetivo {BAUDRATE_OBJETIVO if NEGOCIAR_BAUDIOS else BAUDRATE})")
+        print("⏳ Esperando datos...")
+        
+        webbrowser.open(f'http://localhost:{puerto}')
+        server.serve_forever()
+    except Exception as e:
+        print(f"❌ Error servidor: {e}")
+
+# ============ MAIN ============
+if __name__ == "__main__":
+    print("=" * 50)
+    print("SERVIDOR WEB TELEMETRÍA")
+    print("=" * 50)
+    print(f"🔧 Enlace: {BAUDRATE} baudios, negociación a {BAUDRATE_OBJETIVO} {'activa' if NEGOCIAR_BAUDIOS else 'desactivada'}")
+    print("📏 Sensor de línea incluido: 0=Sobre línea, 1=Fuera línea")
+    print("=" * 50)
+    
+    iniciar_pipeline()
+    if GRABAR_SESIONES:
+        iniciar_grabador()
+    if TRAZADO_ACTIVO:
+        iniciar_trazado()
+    for puerto in PUERTOS_COM:
+        threading.Thread(target=leer_puerto_serie, args=(puerto,), name=f"serie:{puerto}", daemon=True).start()
+    if UDP_ACTIVO:
+        threading.Thread(target=escuchar_udp, name="udp", daemon=True).start()
+    if SERVIDOR_VUELTAS:
+        threading.Thread(target=servidor_vueltas.iniciar_servidor_vueltas,
+                         kwargs={"puerto": PUERTO_VUELTAS}, name="vueltas", daemon=True).start()
     iniciar_servidor_web()
\ No newline at end of file
@@ -1,95 +1,137 @@
-# ================= TX: NRF24L01 + 2 Joysticks (Servo + Motor) =================
-from machine import Pin, SPI, ADC
-import utime, struct
-from nrf24l01 import NRF24L01
-
-# ---- Radio SPI0 ----
-spi = SPI(0, sck=Pin(6), mosi=Pin(7), miso=Pin(4))
-csn = Pin(15, Pin.OUT, value=1)
-ce  = Pin(14, Pin.OUT, value=0)
-
-TX_ADDR = b'\xE1\xF0\xF0\xF0\xF0'
-RX_ADDR = b'\xD2\xF0\xF0\xF0\xF0'
-
-nrf = None  # se inicializa en iniciar_nrf()
-
-def iniciar_nrf():
-    global nrf
-    try:
-        nrf = NRF24L01(spi, csn, ce, payload_size=8)
-        nrf.open_tx_pipe(TX_ADDR)
-        nrf.open_rx_pipe(1, RX_ADDR)
-        nrf.set_power_speed(3, 1)   # 0 dBm, 1 Mbps (igual que antes)
-        nrf.reg_write(0x01, 0x00)   # No Auto-Ack
-        nrf.reg_write(0x04, 0x00)   # Sin retransmisiones
-        nrf.reg_write(0x05, 100)    # Canal 100
-        nrf.stop_listening()
-        print("🔄 NRF TX inicializado/reiniciado OK")
-    except Exception as e:
-        print("⚠ Error iniciando NRF TX:", e)
-        nrf = None
-
-iniciar_nrf()
-
-# ---- Joysticks ----
-adc_servo = ADC(Pin(26))  # Joystick 1 → Servo (0..60°)
-adc_motor = ADC(Pin(27))  # Joystick 2 → Motor (0..100%)
-
-def leer_servo():
-    raw = adc_servo.read_u16()
-    # Mapear 0..65535 → 0..60 grados
-    ang = int((raw * 60) / 65535)
-    return max(0, min(60, ang))
-
-def leer_motor():
-    raw = adc_motor.read_u16()
-    vel = int((raw * 100) / 65535)
-    return max(0, min(100, vel))
-
-def checksum(sync, ang, vel):
-    return (sync + (ang & 0xFF) + ((ang >> 8) & 0xFF)
-                 + (vel & 0xFF) + ((vel >> 8) & 0xFF)) & 0xFF
-
-SYNC_BYTE = 0xA5
-ultimo_s, ultimo_m = -1, -1
-fallos_consecutivos = 0
-MAX_FALLOS_CONSECUTIVOS = 10  # Aumentamos el umbral
-
-print("🎮 TX Dual Joystick listo (Servo GP26 | Motor GP27)")
-
-while True:
-    s = leer_servo()
-    m = leer_motor()
-    chk = checksum(SYNC_BYTE, s, m)
-    paquete = struct.pack("<BHHB", SYNC_BYTE, s, m, chk)
-
-    if nrf is None:
-        # Intentar recuperar el NRF si quedó en None
-        iniciar_nrf()
-
-    if nrf is not None:
-        try:
-            nrf.send(paquete)
-            # Si cambió algo, lo mostramos (igual que antes)
-            if s != ultimo_s or m != ultimo_m:
-                print(f"📤 Servo:{s:3d}° | Motor:{m:3d}%")
-                ultimo_s, ultimo_m = s, m
-            # Envío exitoso → reset contador de fallos
-            fallos_consecutivos = 0
-
-        except Exception as e:
-            fallos_consecutivos += 1
-            print(f"❌ Error TX ({fallos_consecutivos}): {e}")
-            # Limpiar flags de estado del NRF
-            try:
-                nrf.reg_write(0x07, 0x70)
-            except:
-                pass
-
-            # Si acumula varios fallos seguidos → reinicializar radio
-            if fallos_consecutivos >= MAX_FALLOS_CONSECUTIVOS:
-                print("⚠ Muchos errores seguidos → reiniciando NRF TX...")
-                iniciar_nrf()
-                fallos_consecutivos = 0
-
-    utime.sleep_ms(10) 
\ No newline at end of file
+# ================= TX: NRF24L01 + 2 Joysticks (Servo + Motor) =================
+from machine import Pin, SPI, ADC
+import utime, struct
+from nrf24l01 import NRF24L01
+
+# ---- Radio SPI0 ----
+spi = SPI(0, sck=Pin(6), mosi=Pin(7), miso=Pin(4))
+csn = Pin(15, Pin.OUT, value=1)
+ce  = Pin(14, Pin.OUT, value=0)
+
+TX_ADDR = b'\xE1\xF0\xF0\xF0\xF0'
+RX_ADDR = b'\xD2\xF0\xF0\xF0\xF0'
+
+nrf = None  # se inicializa en iniciar_nrf()
+
+def iniciar_nrf():
+    global nrf
+    try:
+        nrf = NRF24L01(spi, csn, ce, payload_size=8)
+        nrf.open_tx_pipe(TX_ADDR)
+        nrf.open_rx_pipe(1, RX_ADDR)
+        nrf.set_power_speed(3, 1)   # 0 dBm, 1 Mbps (igual que antes)
+        nrf.reg_write(0x01, 0x00)   # No Auto-Ack
+        nrf.reg_write(0x04, 0x00)   # Sin retransmisiones
+        nrf.reg_write(0x05, 100)    # Canal 100
+        nrf.stop_listening()
+        print("🔄 NRF TX inicializado/reiniciado OK")
+    except Exception as e:
+        print("⚠ Error iniciando NRF TX:", e)
+        nrf = None
+
+iniciar_nrf()
+
+# ---- Joysticks ----
+adc_servo = ADC(Pin(26))  # Joystick 1 → Servo (0..60°)
+adc_motor = ADC(Pin(27))  # Joystick 2 → Motor (0..100%)
+
+MUESTRAS_ADC = 8          # sobremuestreo: promedio de N lecturas
+ZONA_MUERTA_RAW = 400     # cambios menores (ruido del ADC) no mueven la salida
+raw_servo = -ZONA_MUERTA_RAW - 1
+raw_motor = -ZONA_MUERTA_RAW - 1
+
+def leer_adc(adc):
+    suma = 0
+    for _ in range(MUESTRAS_ADC):
+        suma += adc.read_u16()
+    return suma // MUESTRAS_ADC
+
+def leer_servo():
+    global raw_servo
+    raw = leer_adc(adc_servo)
+    if abs(raw - raw_servo) > ZONA_MUERTA_RAW:
+        raw_servo = raw
+    # Mapear 0..65535 → 0..60 grados
+    ang = (raw_servo * 60) // 65535
+    return max(0, min(60, ang))
+
+def leer_motor():
+    global raw_motor
+    raw = leer_adc(adc_motor)
+    if abs(raw - raw_motor) > ZONA_MUERTA_RAW:
+        raw_motor = raw
+    vel = (raw_motor * 100) // 65535
+    return max(0, min(100, vel))
+
+# ---- Paquete: <BHHBBx = sync, ángulo, velocidad, secuencia, checksum, relleno (8 bytes) ----
+def checksum(sync, ang, vel, seq):
+    return (sync + (ang & 0xFF) + ((ang >> 8) & 0xFF)
+                 + (vel & 0xFF) + ((vel >> 8) & 0xFF) + seq) & 0xFF
+
+SYNC_BYTE = 0xA5
+paquete = bytearray(8)
+
+# ---- Envío adaptativo ----
+# Mientras los joysticks se mueven se envía cada PERIODO_ACTIVO_MS; quietos,
+# solo un keep-alive cada PERIODO_REPOSO_MS (muy por debajo del failsafe de
+# 2000 ms del receptor). Un cambio se envía siempre en la misma pasada.
+PERIODO_ACTIVO_MS = 10
+PERIODO_REPOSO_MS = 250
+TIEMPO_A_REPOSO_MS = 300  # sin cambios durante este tiempo → modo reposo
+
+ultimo_s, ultimo_m = -1, -1
+seq = 0
+ultimo_envio = utime.ticks_ms()
+ultimo_cambio = ultimo_envio
+fallos_consecutivos = 0
+MAX_FALLOS_CONSECUTIVOS = 10  # Aumentamos el umbral
+
+print("🎮 TX Dual Joystick listo (Servo GP26 | Motor GP27)")
+
+while True:
+    ahora = utime.ticks_ms()
+    s = leer_servo()
+    m = leer_motor()
+
+    cambio = s != ultimo_s or m != ultimo_m
+    if cambio:
+        ultimo_cambio = ahora
+    if utime.ticks_diff(ahora, ultimo_cambio) < TIEMPO_A_REPOSO_MS:
+        periodo = PERIODO_ACTIVO_MS
+    else:
+        periodo = PERIODO_REPOSO_MS
+
+    if nrf is None:
+        # Intentar recuperar el NRF si quedó en None
+        iniciar_nrf()
+
+    if nrf is not None and (cambio or utime.ticks_diff(ahora, ultimo_envio) >= periodo):
+        seq = (seq + 1) & 0xFF
+        struct.pack_into("<BHHBB", paquete, 0, SYNC_BYTE, s, m, seq,
+                         checksum(SYNC_BYTE, s, m, seq))
+        try:
+            nrf.send(paquete)
+            ultimo_envio = ahora
+            # Si cambió algo, lo mostramos (igual que antes)
+            if cambio:
+                print(f"📤 Servo:{s:3d}° | Motor:{m:3d}%")
+                ultimo_s, ultimo_m = s, m
+            # Envío exitoso → reset contador de fallos
+            fallos_consecutivos = 0
+
+        except Exception as e:
+            fallos_consecutivos += 1
+            print(f"❌ Error TX ({fallos_consecutivos}): {e}")
+            # Limpiar flags de estado del NRF
+            try:
+                nrf.reg_write(0x07, 0x70)
+            except:
+                pass
+
+            # Si acumula varios fallos seguidos → reinicializar radio
+            if fallos_consecutivos >= MAX_FALLOS_CONSECUTIVOS:
+                print("⚠ Muchos errores seguidos → reiniciando NRF TX...")
+                iniciar_nrf()
+                fallos_consecutivos = 0
+
+    utime.sleep_ms(PERIODO_ACTIVO_MS)
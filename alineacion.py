@@ -0,0 +1,158 @@
+"""
+Alineación de canales con distinta frecuencia y remuestreo a un reloj común.
+
+La placa 3 arma una trama cada 200 ms con lo último que tiene de cada
+fuente, así que en el CSV cada fila repite valores viejos:
+
+    gps_rmc   gps_lat, gps_lon, velocidad   ~1 Hz ($GPRMC); 0,0 hasta tener fix
+    gps_gga   altitud                       ~1 Hz ($GPGGA, llega aparte del RMC)
+    imu       acc_*, gyro_*                 leído en cada trama (5 Hz)
+    placa3    temperatura, linea            leído en cada trama
+    placa2    servo_pwm, motor_pwm, bateria última trama UART de la placa 2 (cada 20 ms)
+
+actualizaciones() se queda, por fuente, con las filas en que algún canal de
+la fuente cambió (la hora de esa fila es la de la actualización real, con
+la resolución de la trama) y descarta las repeticiones y los ceros sin fix.
+alinear() remuestrea todo a un reloj común: interpolación lineal para las
+señales continuas y el último valor (como merge_asof hacia atrás) para las
+escalonadas; a más de la tolerancia de la fuente desde la última
+actualización queda NaN. Agrega edad_<fuente>: segundos desde la última
+actualización real.
+
+Todo es NumPy vectorizado (diferencias, searchsorted): sin bucles por fila.
+
+    python alineacion.py sesion.csv --hz 5 --salida alineada.csv
+"""
+import numpy as np
+import pandas as pd
+
+PERIODO_TRAMA = 0.2   # s entre tramas de la placa 3 (para los CSV que solo tienen id)
+
+SIN_LIMITE = np.inf
+
+# fuente: (columnas, regla, tolerancia en s, cero = sin dato)
+# Las fuentes que se leen en cada trama no tienen tolerancia: si no cambian es
+# porque el valor es ese (un PWM quieto en 1500). El GPS sin fix deja el último
+# valor congelado, así que más allá de la tolerancia queda NaN.
+FUENTES = {
+    "gps_rmc": (("gps_lat", "gps_lon", "velocidad"), "lineal", 5.0, True),
+    "gps_gga": (("altitud",), "lineal", 5.0, True),
+    "imu": (("acc_x", "acc_y", "acc_z", "gyro_x", "gyro_y"), "lineal", SIN_LIMITE, False),
+    "placa3": (("temperatura", "linea"), "anterior", SIN_LIMITE, False),
+    "placa2": (("servo_pwm", "motor_pwm", "bateria"), "anterior", SIN_LIMITE, False),
+}
+# Dentro de una fuente, la regla de un canal puede ser otra
+REGLA_CANAL = {"temperatura": "lineal", "bateria": "lineal"}
+
+def tiempos(df):
+    """Segundos de cada fila: columna t, o id * PERIODO_TRAMA en los CSV viejos."""
+    if "t" in df.columns:
+        return df["t"].to_numpy(dtype=np.float64)
+    if "id" in df.columns:
+        return df["id"].to_numpy(dtype=np.float64) * PERIODO_TRAMA
+    return np.arange(len(df)) * PERIODO_TRAMA
+
+def actualizaciones(df):
+    """{fuente: DataFrame con t y sus columnas, solo en las filas en que la fuente se actualizó}."""
+    t = tiempos(df)
+    orden = np.argsort(t, kind="stable") if (np.diff(t) < 0).any() else None
+    resultado = {}
+    for fuente, (columnas, _, _, cero_es_nada) in FUENTES.items():
+        columnas = [c for c in columnas if c in df.columns]
+        if not columnas:
+            continue
+        valores = df[columnas].to_numpy(dtype=np.float64)
+        if orden is not None:
+            valores = valores[orden]
+        valida = ~np.isnan(valores).any(axis=1)
+        if cero_es_nada:
+            valida &= (valores != 0).any(axis=1)
+        filas = np.flatnonzero(valida)
+        v = valores[filas]
+        cambio = np.ones(len(filas), dtype=bool)
+        cambio[1:] = (v[1:] != v[:-1]).any(axis=1)
+        filas = filas[cambio]
+        tabla = pd.DataFrame(valores[filas], columns=columnas)
+        tabla.insert(0, "t", (t if orden is None else t[orden])[filas])
+        resultado[fuente] = tabla
+    return resultado
+
+def remuestrear(t_fuente, valores, reloj, reglas, tolerancia):
+    """Columnas de una fuente (filas en t_fuente, ordenado) en los instantes de reloj.
+
+    Una sola búsqueda por fuente; reglas tiene una regla por columna.
+    Devuelve (array columnas x reloj, edad de la última actualización). Más
+    allá de la tolerancia desde la última actualización queda NaN.
+    """
+    salida = np.full((valores.shape[1], len(reloj)), np.nan)
+    if not len(t_fuente):
+        return salida, np.full(len(reloj), np.nan)
+    i = np.searchsorted(t_fuente, reloj, side="right") - 1   # última actualización <= reloj
+    hay = i >= 0
+    np.maximum(i, 0, out=i)
+    edad = reloj - t_fuente[i]
+    edad[~hay] = np.nan
+    sin_dato = ~(edad <= tolerancia)
+    if "lineal" in reglas:   # entre dos actualizaciones a menos de la tolerancia: interpolar
+        siguiente = np.minimum(i + 1, len(t_fuente) - 1)
+        hueco = t_fuente[siguiente] - t_fuente[i]
+        entre = hay & (siguiente > i) & (hueco <= tolerancia)
+        peso = np.divide(edad, hueco, out=np.zeros_like(edad), where=entre)
+    for k, regla in enumerate(reglas):
+        columna = np.ascontiguousarray(valores[:, k])
+        fila = salida[k]
+        np.take(columna, i, out=fila)   # último valor (regla "anterior")
+        if regla == "lineal":
+            fila += peso * (np.take(columna, siguiente) - fila)
+            fila[sin_dato & ~entre] = np.nan
+        else:
+            fila[sin_dato] = np.nan
+    return salida, edad
+
+def alinear(df, hz=1 / PERIODO_TRAMA, inicio=None, fin=None):
+    """DataFrame en un reloj común de hz (t + canales + edad_<fuente>)."""
+    partes = actualizaciones(df)
+    t = tiempos(df)
+    inicio = t.min() if inicio is None else inicio
+    fin = t.max() if fin is None else fin
+    reloj = inicio + np.arange(int(np.floor((fin - inicio) * hz)) + 1) / hz
+    salida = {"t": reloj}
+    edades = {}
+    for fuente, tabla in partes.items():
+        _, regla, tolerancia, _ = FUENTES[fuente]
+        columnas = list(tabla.columns[1:])
+        valores, edades["edad_" + fuente] = remuestrear(
+            tabla["t"].to_numpy(), tabla[columnas].to_numpy(), reloj,
+            [REGLA_CANAL.get(c, regla) for c in columnas], tolerancia)
+        for k, columna in enumerate(columnas):
+            salida[columna] = valores[k]
+    orden = ["t"] + [c for c in df.columns if c in salida and c != "t"]
+    resultado = pd.DataFrame({c: salida[c] for c in orden})
+    for nombre, edad in edades.items():
+        resultado[nombre] = edad
+    return resultado
+
+def resumen(df):
+    """Fracción de filas que eran repeticiones, por fuente."""
+    partes = actualizaciones(df)
+    return {fuente: {"updates": len(tabla), "stale_fraction": round(1 - len(tabla) / max(len(df), 1), 3)}
+            for fuente, tabla in partes.items()}
+
+if __name__ == "__main__":
+    import argparse
+    import time
+    ap = argparse.ArgumentParser(description="Alinea y remuestrea una sesión CSV a un reloj común")
+    ap.add_argument("entrada")
+    ap.add_argument("--hz", type=float, default=1 / PERIODO_TRAMA)
+    ap.add_argument("--salida", help="CSV alineado")
+    args = ap.parse_args()
+
+    df = pd.read_csv(args.entrada)
+    for fuente, datos in resumen(df).items():
+        print(f"📡 {fuente:8s} {datos['updates']:7d} actualizaciones, "
+              f"{100 * datos['stale_fraction']:.0f}% de filas repetidas")
+    t0 = time.perf_counter()
+    alineado = alinear(df, args.hz)
+    print(f"✅ {len(df)} filas -> {len(alineado)} a {args.hz:g} Hz en {time.perf_counter() - t0:.3f} s")
+    if args.salida:
+        alineado.to_csv(args.salida, index=False)
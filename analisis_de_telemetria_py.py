@@ -10,14 +10,62 @@ Original file is located at
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
-from google.colab import files
 import io
+import argparse
+
+EXTENSIONES = ('.csv', '.tlm', '.parquet')
+
+def leer_sesion(ruta, columnas=None, desde=None, hasta=None, limpiar=False):
+    """CSV, .tlm o Parquet -> DataFrame con solo columnas (más la de tiempo) y tiempo entre desde y hasta.
+
+    Con pyarrow pasa por la cache Parquet de sesiones_parquet (la segunda vez
+    no se vuelve a convertir y solo se leen las columnas pedidas); sin
+    pyarrow lee el archivo entero con pandas y recorta después. limpiar=True
+    enmascara los valores inválidos (limpieza.py) y agrega la columna calidad.
+    """
+    try:
+        import sesiones_parquet
+    except ImportError:
+        sesiones_parquet = None
+    if sesiones_parquet is not None:
+        if limpiar:
+            import limpieza
+            parquet = limpieza.en_cache(ruta)
+        else:
+            parquet = ruta if ruta.endswith('.parquet') else sesiones_parquet.en_cache(ruta)
+        if columnas is not None and limpiar:
+            columnas = list(columnas) + ['calidad']
+        return sesiones_parquet.cargar(parquet, columnas, desde, hasta)
+
+    if ruta.endswith('.tlm'):
+        from sesiones import cargar_sesion
+        df = cargar_sesion(ruta)
+    else:
+        df = pd.read_csv(ruta)
+    if limpiar:
+        import limpieza
+        df = limpieza.limpiar(df)
+    tiempo = next((c for c in ('t', 'id') if c in df.columns), None)
+    if tiempo is not None and desde is not None:
+        df = df[df[tiempo] >= desde]
+    if tiempo is not None and hasta is not None:
+        df = df[df[tiempo] <= hasta]
+    if columnas is not None:
+        df = df[[c for c in df.columns if c in columnas or c in (tiempo, 'calidad')]]
+    return df
+
+def cargar_y_mostrar_csv(ruta=None, columnas=None, desde=None, hasta=None, limpiar=False):
+    """Lee la sesión de ruta (ver leer_sesion), o pide el CSV con el diálogo de subida si corre en Colab."""
+    if ruta is not None:
+        df = leer_sesion(ruta, columnas, desde, hasta, limpiar)
+        print(f"📊 Datos cargados: {len(df)} filas x {len(df.columns)} columnas")
+        return df
 
-def cargar_y_mostrar_csv():
     print("📤 SUBIR ARCHIVO CSV DE TELEMETRÍA")
     print("=" * 50)
 
     # Subir archivo
+    from google.colab import files
     uploaded = files.upload()
 
     if not uploaded:
@@ -141,6 +189,82 @@ def crear_graficas_completas(df):
         plt.tight_layout()
         plt.show()
 
+def crear_graficas_espectro(resultado):
+    """Espectrograma de cada canal del IMU con la frecuencia dominante encima, y frecuencia vs acelerador."""
+    import numpy as np
+    print("\n🎛 ESPECTRO DE VIBRACIONES")
+    print("=" * 40)
+    canales = [str(c) for c in resultado['canales']]
+    if not canales or not resultado['potencia'].shape[1]:
+        print("❌ No hay suficientes muestras del IMU para una ventana")
+        return
+
+    fig, axes = plt.subplots(2, 3, figsize=(18, 12))
+    fig.suptitle(f"ESPECTRO DEL IMU ({float(resultado['hz']):g} Hz, ventana de {int(resultado['ventana'])} muestras)",
+                 fontsize=16, fontweight='bold')
+    t, f = resultado['t'], resultado['f']
+    for i, canal in enumerate(canales[:5]):
+        row, col = divmod(i, 3)
+        db = 10 * np.log10(resultado['potencia'][i].T + 1e-12)
+        axes[row, col].pcolormesh(t, f, db, shading='nearest', cmap='magma')
+        axes[row, col].plot(t, resultado['frecuencia'][i], color='cyan', linewidth=1, alpha=0.8)
+        axes[row, col].set_title(f'{canal} (dB)', fontweight='bold')
+        axes[row, col].set_xlabel('t (s)')
+        axes[row, col].set_ylabel('Frecuencia (Hz)')
+
+    axes[1, 2].set_title('Frecuencia dominante vs acelerador', fontweight='bold')
+    for i, canal in enumerate(canales):
+        axes[1, 2].scatter(resultado['acelerador'], resultado['frecuencia'][i], s=4, alpha=0.5, label=canal)
+    axes[1, 2].set_xlabel('|motor_pwm - 1500| (μs)')
+    axes[1, 2].set_ylabel('Frecuencia (Hz)')
+    axes[1, 2].legend()
+    axes[1, 2].grid(True, alpha=0.3)
+    for i in range(len(canales[:5]), 5):
+        row, col = divmod(i, 3)
+        axes[row, col].set_visible(False)
+
+    plt.tight_layout()
+    plt.show()
+
+    from espectro import resumen
+    for canal, datos in resumen(resultado).items():
+        print(f"   • {canal}: dominante {datos['dominant_hz']} Hz, r con acelerador {datos['r_motor']}")
+
+def crear_grafica_trazado(df, tolerancia=None):
+    """Fixes GPS contra el trazado fusionado con el IMU (trazado.py) y su versión simplificada."""
+    import trazado
+    print("\n🛰️ TRAZADO GPS + IMU")
+    print("=" * 40)
+    if not all(col in df.columns for col in ['gps_lat', 'gps_lon']):
+        print("❌ La sesión no tiene gps_lat / gps_lon")
+        return
+    tolerancia = trazado.TOLERANCIA if tolerancia is None else tolerancia
+    fusion = trazado.fusionar(df)
+    if fusion.origen is None:
+        print("❌ No hay ningún fix GPS en la sesión")
+        return
+    puntos = trazado.tabla(fusion)
+    simple = fusion.simplificado(tolerancia)
+    fixes = df[(df['gps_lat'] != 0) | (df['gps_lon'] != 0)].dropna(subset=['gps_lat', 'gps_lon'])
+    x_fix, y_fix = zip(*[fusion.local(lat, lon) for lat, lon in zip(fixes['gps_lat'], fixes['gps_lon'])])
+
+    plt.figure(figsize=(10, 10))
+    plt.scatter(x_fix, y_fix, s=15, color='gray', alpha=0.6, label='Fixes GPS')
+    plt.plot(puntos['x'], puntos['y'], linewidth=1, alpha=0.8, label=f'Fusionado ({len(puntos)} puntos)')
+    plt.plot(*zip(*simple), linewidth=2, color='orange',
+             label=f'Simplificado ({len(simple)} puntos, {tolerancia} m)')
+    plt.gca().set_aspect('equal')
+    plt.title('Trazado GPS + IMU', fontweight='bold')
+    plt.xlabel('Este (m)')
+    plt.ylabel('Norte (m)')
+    plt.legend()
+    plt.grid(True, alpha=0.3)
+    plt.tight_layout()
+    plt.show()
+
+    print(f"   • {fusion.fixes} fixes -> {len(puntos)} puntos fusionados -> {len(simple)} simplificados")
+    print(f"   • Sesgo estimado del acelerómetro: {fusion.sesgo:+.3f} m/s²")
+
 def mostrar_estadisticas(df):
     print("\n📊 ESTADÍSTICAS DESCRIPTIVAS")
     print("=" * 40)
@@ -158,32 +282,93 @@ def mostrar_estadisticas(df):
             print(f"   Min:   {stats['min']:.2f}")
             print(f"   Max:   {stats['max']:.2f}")
 
-# PROGRAMA PRINCIPAL
-print("🚀 ANALIZADOR DE TELEMETRÍA - CSV + GRÁFICAS")
-print("=" * 55)
-
-# Cargar datos
-df = cargar_y_mostrar_csv()
-
-if df is not None:
-    # Mostrar información básica
-    print(f"\n📋 INFORMACIÓN DEL DATASET:")
-    print(f"   • Dimensiones: {df.shape[0]} filas x {df.shape[1]} columnas")
-    print(f"   • Columnas: {list(df.columns)}")
-    print(f"   • Tipos de datos:")
-    print(df.dtypes)
-
-    # Mostrar primeras filas
-    print(f"\n👀 PRIMERAS 5 FILAS:")
-    print(df.head())
-
-    # Crear gráficas
-    crear_graficas_completas(df)
-
-    # Mostrar estadísticas
-    mostrar_estadisticas(df)
-
-    print("\n✅ ANÁLISIS COMPLETADO!")
-
-else:
-    print("❌ No se pudieron cargar los datos para análisis")
\ No newline at end of file
+# PROGRAMA PRINCIPAL (en Colab se sube el archivo; en la PC:
+#   python analisis_de_telemetria_py.py datos.csv|sesion.tlm|sesion.parquet [--columnas acc_x,acc_y,acc_z] [--desde T] [--hasta T]
+#   --limpiar: enmascarar GPS sin fix, MPU ausente, picos, etc. antes de las estadísticas (limpieza.py)
+#   --alinear 5: sacar las repeticiones de cada fuente y remuestrear a 5 Hz antes de graficar (alineacion.py)
+#   --espectro [--ventana 128]: espectrograma del IMU y frecuencia dominante vs acelerador (espectro.py)
+#   --trazado [--tolerancia 0.3]: recorrido fusionado GPS + IMU y simplificado (trazado.py)
+#   a.csv b.csv ... --comparar [--salida carpeta] [--procesos N]: reporte HTML de varias sesiones,
+#   una por proceso (comparacion.py))
+if __name__ == "__main__":
+    print("🚀 ANALIZADOR DE TELEMETRÍA - CSV + GRÁFICAS")
+    print("=" * 55)
+
+    ap = argparse.ArgumentParser()
+    ap.add_argument('rutas', nargs='*')
+    ap.add_argument('--columnas', type=lambda t: t.split(','), help='leer solo estas columnas')
+    ap.add_argument('--desde', type=float, help='t (o id) mínimo')
+    ap.add_argument('--hasta', type=float, help='t (o id) máximo')
+    ap.add_argument('--limpiar', action='store_true', help='enmascarar valores inválidos')
+    ap.add_argument('--alinear', type=float, metavar='HZ', help='remuestrear a un reloj común de HZ')
+    ap.add_argument('--espectro', action='store_true', help='espectrograma de acc_*/gyro_*')
+    ap.add_argument('--ventana', type=int, help='muestras por ventana del espectro')
+    ap.add_argument('--trazado', action='store_true', help='recorrido fusionado GPS + IMU')
+    ap.add_argument('--tolerancia', type=float, help='m, simplificación del trazado')
+    ap.add_argument('--comparar', action='store_true', help='reporte comparando todas las sesiones dadas')
+    ap.add_argument('--salida', default='comparacion', help='carpeta del reporte de --comparar')
+    ap.add_argument('--procesos', type=int, help='procesos de --comparar (por defecto, uno por núcleo)')
+    args, _ = ap.parse_known_args()   # Colab agrega sus propios argumentos (-f kernel.json)
+    rutas = [r for r in args.rutas if r.endswith(EXTENSIONES)]
+
+    if args.comparar:
+        from comparacion import comparar
+        indice, resultados = comparar(rutas, args.salida, args.procesos, args.limpiar)
+        for r in resultados:
+            print(f"📊 {r['nombre']}: {r['filas']} filas, {len(r['vueltas'])} vueltas")
+        print(f"\n✅ REPORTE: {indice}")
+        raise SystemExit
+
+    # Cargar datos
+    ruta = rutas[0] if rutas else None
+    df = cargar_y_mostrar_csv(ruta, args.columnas, args.desde, args.hasta, args.limpiar)
+    if df is not None and 'calidad' in df.columns:
+        from limpieza import resumen as resumen_calidad
+        for bandera, filas in resumen_calidad(df['calidad']).items():
+            if filas:
+                print(f"🧹 {bandera}: {filas} filas")
+        df = df.drop(columns='calidad')   # son bits: no van en estadísticas ni correlaciones
+    espectro = None
+    if df is not None and args.espectro:
+        import espectro as modulo_espectro
+        ventana = args.ventana or modulo_espectro.VENTANA
+        try:   # con la sesión en disco el resultado queda en la cache
+            espectro = modulo_espectro.en_cache(ruta, ventana, limpiar=args.limpiar,
+                                                desde=args.desde, hasta=args.hasta) if ruta else None
+        except ImportError:
+            espectro = None
+        if espectro is None:
+            espectro = modulo_espectro.analizar(df, ventana)
+    if df is not None and args.alinear:
+        from alineacion import alinear, resumen
+        for fuente, datos in resumen(df).items():
+            print(f"📡 {fuente}: {datos['updates']} actualizaciones, "
+                  f"{100 * datos['stale_fraction']:.0f}% de filas repetidas")
+        df = alinear(df, args.alinear)
+
+    if df is not None:
+        # Mostrar información básica
+        print(f"\n📋 INFORMACIÓN DEL DATASET:")
+        print(f"   • Dimensiones: {df.shape[0]} filas x {df.shape[1]} columnas")
+        print(f"   • Columnas: {list(df.columns)}")
+        print(f"   • Tipos de datos:")
+        print(df.dtypes)
+
+        # Mostrar primeras filas
+        print(f"\n👀 PRIMERAS 5 FILAS:")
+        print(df.head())
+
+        # Crear gráficas
+        crear_graficas_completas(df)
+        if espectro is not None:
+            crear_graficas_espectro(espectro)
+        if args.trazado:
+            crear_grafica_trazado(df, args.tolerancia)
+
+        # Mostrar estadísticas
+        mostrar_estadisticas(df)
+
+        print("\n✅ ANÁLISIS COMPLETADO!")
+
+    else:
+        print("❌ No se pudieron cargar los datos para análisis")
\ No newline at end of file
@@ -0,0 +1,162 @@
+"""
+Estado de la batería en vivo: tensión en vacío, tendencia de descarga y
+minutos restantes, actualizado de a una trama (O(1), Python puro).
+
+La placa 2 mide la batería con el ADC una vez por segundo, con el motor
+andando: la tensión cae con la carga por la resistencia interna. No hay
+sensor de corriente, así que la carga es la fracción de acelerador del
+PWM del motor y el modelo es
+
+    V = V_vacio - caida * carga        carga = |motor_pwm - 1500| / 500  (0..1)
+
+ajustado con mínimos cuadrados recursivos (RLS) con olvido: V_vacio sigue
+la descarga y caida es lo que baja la tensión a fondo (resistencia interna
+por la corriente a fondo, en V). Solo entran las lecturas nuevas del ADC
+(cambió el valor o pasó PERIODO_ADC), no las repeticiones de cada trama.
+
+La tendencia es la pendiente de V_vacio contra el tiempo, por regresión
+lineal con pesos exponenciales (TAU_TENDENCIA); los minutos restantes son
+lo que tarda V_vacio en llegar a V_CORTE a esa pendiente.
+
+- Estimador: un auto (SERVICIO_TELEMETRIA, en EstadoAuto.registrar).
+- estimar(df): el mismo Estimador sobre una sesión, fila por fila.
+
+    python bateria.py sesion.csv [--salida bateria.csv]
+"""
+import math
+from collections import namedtuple
+
+PWM_NEUTRO = 1500       # us
+PWM_RANGO = 500         # us de neutro a fondo
+PERIODO_ADC = 1.0       # s entre lecturas de leer_bateria (Rx16-1.py)
+VOLTAJE_VALIDO = (3.0, 13.0)   # V; fuera de esto no es una lectura (0 = no llegó la placa 2)
+V_CORTE = 6.6           # V: 2S LiPo a 3,3 V por celda
+OLVIDO = 0.98           # por lectura (~50 lecturas, casi un minuto de memoria)
+P_INICIAL = 1.0         # covarianza inicial de V_vacio y caida (V²)
+P_MAXIMA = 100.0        # sin excitación (carga constante) se deja de olvidar: no explota
+CAIDA_MAXIMA = 3.0      # V
+TAU_TENDENCIA = 120.0   # s
+LECTURAS_AJUSTE = 30    # lecturas hasta que el RLS se asienta; antes no entran en la tendencia
+TIEMPO_MINIMO = 60.0    # s de tendencia antes de dar pendiente y minutos
+TENDENCIA_MINIMA = 0.001   # V/min: más lento no se estima cuánto queda
+
+Estado = namedtuple("Estado", ("ocv", "sag", "rate", "minutes"))   # V, V, V/min, min
+ESTADO_VACIO = Estado(None, None, None, None)
+COLUMNAS = ("battery_ocv", "battery_sag", "battery_rate", "battery_minutes")
+
+class Estimador:
+    """RLS de la tensión contra la carga del motor y tendencia de la tensión en vacío."""
+
+    def __init__(self, olvido=OLVIDO, tau=TAU_TENDENCIA):
+        self.olvido = olvido
+        self.tau = tau
+        self.estado = ESTADO_VACIO
+        self.lecturas = 0
+        self.vacio = self.caida = 0.0
+        self.p00 = self.p11 = P_INICIAL
+        self.p01 = 0.0
+        self.voltaje = None      # última lectura usada
+        self.t_lectura = None
+        self.t = None            # última lectura de la tendencia (origen de las sumas)
+        self.t_inicio = None
+        # Sumas ponderadas de la tendencia, con el tiempo relativo a la última lectura (t <= 0)
+        self.s0 = self.st = self.sv = self.stt = self.stv = 0.0
+
+    def agregar(self, t, voltaje, motor_pwm):
+        """Una trama (V, us). Devuelve el Estado actual (el mismo objeto si no hubo lectura nueva)."""
+        if voltaje is None or not VOLTAJE_VALIDO[0] < voltaje < VOLTAJE_VALIDO[1]:
+            return self.estado
+        if voltaje == self.voltaje and t - self.t_lectura < PERIODO_ADC:
+            return self.estado
+        carga = min(abs(motor_pwm - PWM_NEUTRO) / PWM_RANGO, 1.0) if motor_pwm else 0.0
+        if self.lecturas == 0:
+            self.vacio = voltaje
+        else:
+            self._ajustar(voltaje, carga)
+        self.lecturas += 1
+        if self.lecturas >= LECTURAS_AJUSTE:
+            self._tendencia(t, self.vacio)
+        self.voltaje = voltaje
+        self.t_lectura = t
+        self.estado = self._estado(t)
+        return self.estado
+
+    def agregar_trama(self, trama):
+        """agregar() con una Trama de SERVICIO_TELEMETRIA."""
+        return self.agregar(trama.t, trama.battery, trama.motor_pwm)
+
+    def _ajustar(self, voltaje, carga):
+        """Un paso de RLS con regresor (1, -carga) y parámetros (vacio, caida)."""
+        p00, p01, p11 = self.p00, self.p01, self.p11
+        olvido = self.olvido if p00 + p11 < P_MAXIMA else 1.0
+        error = voltaje - (self.vacio - self.caida * carga)
+        pf0 = p00 - carga * p01
+        pf1 = p01 - carga * p11
+        den = olvido + pf0 - carga * pf1
+        k0 = pf0 / den
+        k1 = pf1 / den
+        self.vacio += k0 * error
+        self.caida = min(max(self.caida + k1 * error, 0.0), CAIDA_MAXIMA)
+        self.p00 = (p00 - k0 * pf0) / olvido
+        self.p01 = (p01 - k0 * pf1) / olvido
+        self.p11 = (p11 - k1 * pf1) / olvido
+
+    def _tendencia(self, t, vacio):
+        """Suma la lectura a la regresión exponencial, moviendo el origen de tiempo a t."""
+        if self.t_inicio is None:
+            self.t_inicio = t
+        else:
+            d = t - self.t
+            peso = math.exp(-d / self.tau)
+            s0, st = self.s0, self.st
+            self.stt = (self.stt - 2 * d * st + d * d * s0) * peso
+            self.stv = (self.stv - d * self.sv) * peso
+            self.st = (st - d * s0) * peso
+            self.s0 = s0 * peso
+            self.sv *= peso
+        self.s0 += 1.0
+        self.sv += vacio
+        self.t = t
+
+    def _estado(self, t):
+        tendencia = minutos = None
+        if self.t_inicio is not None and t - self.t_inicio >= TIEMPO_MINIMO:
+            det = self.s0 * self.stt - self.st * self.st
+            if det > 0:
+                tendencia = 60.0 * (self.s0 * self.stv - self.st * self.sv) / det
+                if tendencia < -TENDENCIA_MINIMA:
+                    minutos = round(max(self.vacio - V_CORTE, 0.0) / -tendencia, 1)
+                tendencia = round(tendencia, 4)
+        return Estado(round(self.vacio, 3), round(self.caida, 3), tendencia, minutos)
+
+# ---------------- Sesiones (PC) ----------------
+def estimar(df):
+    """Sesión (columnas de los CSV, t o id) -> DataFrame t + COLUMNAS, una fila por fila de df."""
+    import pandas as pd
+    from alineacion import tiempos
+    t = tiempos(df).tolist()
+    estimador = Estimador()
+    filas = [estimador.agregar(*fila)
+             for fila in zip(t, df['bateria'].tolist(), df['motor_pwm'].fillna(PWM_NEUTRO).tolist())]
+    resultado = pd.DataFrame.from_records(filas, columns=COLUMNAS) if filas else pd.DataFrame(columns=COLUMNAS)
+    resultado.insert(0, "t", t)
+    return resultado
+
+if __name__ == "__main__":
+    import argparse
+    import time
+    import pandas as pd
+    ap = argparse.ArgumentParser(description="Estado de la batería a lo largo de una sesión CSV")
+    ap.add_argument("entrada")
+    ap.add_argument("--salida", help="CSV con t y las columnas estimadas")
+    args = ap.parse_args()
+
+    df = pd.read_csv(args.entrada)
+    t0 = time.perf_counter()
+    resultado = estimar(df)
+    segundos = time.perf_counter() - t0
+    print(f"🔋 {len(df)} filas en {segundos:.3f} s ({1e6 * segundos / max(len(df), 1):.2f} us por fila)")
+    if len(resultado):
+        print(resultado.iloc[-1].to_string())
+    if args.salida:
+        resultado.to_csv(args.salida, index=False)
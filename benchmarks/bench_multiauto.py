@@ -0,0 +1,131 @@
+"""
+Benchmark multi-auto de SERVICIO_TELEMETRIA (solo Linux).
+
+Crea N pseudo-terminales (pty), cada una alimentada por un "auto" falso que
+escribe tramas con el formato de RECEPTORR, y arranca un lector del servicio
+por puerto. Reporta tramas/s totales, CPU por auto (tiempo de CPU del hilo
+lector de cada puerto), CPU del parser y descartes del pipeline.
+
+    python benchmarks/bench_multiauto.py --autos 8 --hz 50 --segundos 10
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import SERVICIO_TELEMETRIA as servicio
+import canales
+
+def valores_aleatorios():
+    """Valores físicos plausibles en el orden de canales.CANALES."""
+    return (
+        -34.6 + random.uniform(0, 0.01), -58.4 + random.uniform(0, 0.01),
+        random.randint(20, 40), random.uniform(0, 30),
+        random.uniform(-2, 2), random.uniform(-2, 2), random.uniform(9, 10.5),
+        random.uniform(-50, 50), random.uniform(-50, 50),
+        random.randint(0, 1),
+        random.uniform(7.0, 8.4), random.uniform(30, 50),
+        random.randint(1000, 2000), random.randint(1000, 2000),
+    )
+
+def trama_aleatoria(car_id):
+    # Mismo formato que RECEPTORR (canales.FORMATO_TRAMA)
+    return canales.formatear(car_id, valores_aleatorios()).encode()
+
+def auto_falso(fd, car_id, hz, fin):
+    periodo = 1.0 / hz
+    proximo = time.monotonic()
+    while time.monotonic() < fin:
+        os.write(fd, trama_aleatoria(car_id))
+        proximo += periodo
+        espera = proximo - time.monotonic()
+        if espera > 0:
+            time.sleep(espera)
+
+def cpu_hilo(hilo):
+    return time.clock_gettime(time.pthread_getcpuclockid(hilo.ident))
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument('--autos', type=int, default=8)
+    ap.add_argument('--hz', type=float, default=50.0, help='tramas/s por auto')
+    ap.add_argument('--segundos', type=float, default=10.0)
+    ap.add_argument('--json', action='store_true', help='solo imprimir el resultado en JSON')
+    args = ap.parse_args()
+
+    servicio.NEGOCIAR_BAUDIOS = False   # los autos falsos no responden @BAUD
+    servicio.DEBUG = False
+
+    ptys = [os.openpty() for _ in range(args.autos)]
+    puertos = [os.ttyname(esclavo) for _, esclavo in ptys]
+    servicio.PUERTOS_COM = puertos
+
+    parser = threading.Thread(target=servicio.etapa_parser, daemon=True)
+    parser.start()
+    lectores = {}
+    for puerto in puertos:
+        hilo = threading.Thread(target=servicio.leer_puerto_serie, args=(puerto,), daemon=True)
+        hilo.start()
+        lectores[puerto] = hilo
+    time.sleep(0.5)   # que todos los puertos estén abiertos
+
+    cpu_inicio = {p: cpu_hilo(h) for p, h in lectores.items()}
+    cpu_parser = cpu_hilo(parser)
+    proceso_inicio = time.process_time()
+    inicio = time.monotonic()
+    fin = inicio + args.segundos
+    escritores = []
+    for i, (maestro, _) in enumerate(ptys):
+        hilo = threading.Thread(target=auto_falso, args=(maestro, f"CAR_{i:02d}", args.hz, fin), daemon=True)
+        hilo.start()
+        escritores.append(hilo)
+    for hilo in escritores:
+        hilo.join()
+    time.sleep(0.2)   # vaciar lo que quede en los buffers
+    duracion = time.monotonic() - inicio
+    cpu_parser = cpu_hilo(parser) - cpu_parser
+
+    autos = []
+    for i, puerto in enumerate(puertos):
+        auto = servicio.autos.get(f"CAR_{i:02d}")
+        cpu = cpu_hilo(lectores[puerto]) - cpu_inicio[puerto]
+        tramas = auto.tramas if auto else 0
+        autos.append({
+            "car_id": f"CAR_{i:02d}",
+            "frames": tramas,
+            "frames_per_s": round(tramas / duracion, 1),
+            "cpu_percent": round(100 * cpu / duracion, 2),
+            "cpu_us_per_frame": round(1e6 * cpu / tramas, 1) if tramas else None,
+        })
+    total = sum(a["frames"] for a in autos)
+    resultado = {
+        "benchmark": "multiauto",
+        "cars": args.autos,
+        "hz_per_car": args.hz,
+        "seconds": round(duracion, 2),
+        "frames_total": total,
+        "frames_per_s_total": round(total / duracion, 1),
+        "process_cpu_percent": round(100 * (time.process_time() - proceso_inicio) / duracion, 1),
+        "parser_cpu_percent": round(100 * cpu_parser / duracion, 1),
+        "parser_us_per_frame": round(1e6 * cpu_parser / total, 1) if total else None,
+        "pipeline": servicio.metricas_pipeline(),
+        "per_car": autos,
+    }
+
+    if args.json:
+        print(json.dumps(resultado))
+        return
+    print(f"\n{'Auto':8} {'Tramas':>8} {'Tramas/s':>9} {'CPU %':>7} {'us/trama':>9}")
+    for a in autos:
+        print(f"{a['car_id']:8} {a['frames']:8d} {a['frames_per_s']:9.1f} {a['cpu_percent']:7.2f} "
+              f"{a['cpu_us_per_frame'] or 0:9.1f}")
+    print(f"Total: {resultado['frames_per_s_total']} tramas/s, CPU proceso {resultado['process_cpu_percent']}%")
+    print(f"Parser: CPU {resultado['parser_cpu_percent']}%, {resultado['parser_us_per_frame']} us/trama, "
+          f"descartadas en entrada: {resultado['pipeline']['input']['dropped']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Parser en un hilo vs parser en procesos (memoria compartida) de SERVICIO_TELEMETRIA.
+
+Para cada modo arranca un proceso nuevo con el servicio, N autos falsos que
+encolan líneas como lo haría leer_puerto_serie (un "puerto" por auto) y el
+servidor web. Un proceso cliente aparte consulta /cars/<id>/telemetry sin
+pausa y mide la latencia. Reporta tramas publicadas/s y p50/p99 HTTP.
+
+    python benchmarks/bench_multiproceso.py --autos 8 --hz 500 --procesos 0,2,4 --segundos 10
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from bench_multiauto import trama_aleatoria
+
+def percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(p / 100 * len(valores)))] if valores else None
+
+def cliente_http(puerto, car_id, fin, salida):
+    """Proceso aparte: GET en bucle para no competir por el GIL del servicio."""
+    conexion = http.client.HTTPConnection('127.0.0.1', puerto, timeout=5)
+    latencias = []
+    while time.time() < fin:
+        t0 = time.perf_counter()
+        conexion.request('GET', f'/cars/{car_id}/telemetry')
+        respuesta = conexion.getresponse()
+        respuesta.read()
+        if respuesta.will_close:   # TelemetryHandler habla HTTP/1.0
+            conexion.close()
+            conexion = http.client.HTTPConnection('127.0.0.1', puerto, timeout=5)
+        latencias.append(time.perf_counter() - t0)
+    salida.put(latencias)
+
+def auto_falso(servicio, puerto, car_id, hz, fin):
+    """Encola líneas en la entrada del pipeline, en ráfagas de 10 ms como un lector serie."""
+    lineas = [trama_aleatoria(car_id).rstrip(b'\n') for _ in range(64)]
+    por_rafaga = max(1, int(hz / 100))
+    i = 0
+    proximo = time.monotonic()
+    while time.monotonic() < fin:
+        ahora = time.time()
+        for _ in range(por_rafaga):
+            servicio.entrada.poner((servicio.LINEA, puerto, ahora, lineas[i % 64]))
+            i += 1
+        proximo += 0.01
+        espera = proximo - time.monotonic()
+        if espera > 0:
+            time.sleep(espera)
+
+def correr_modo(args):
+    import SERVICIO_TELEMETRIA as servicio
+    servicio.DEBUG = False
+    puertos = [f"BENCH{i}" for i in range(args.autos)]
+    servicio.PUERTOS_COM = puertos
+    servicio.iniciar_pipeline(args.modo)
+
+    servidor = servicio.ThreadingHTTPServer(('127.0.0.1', 0), servicio.TelemetryHandler)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+
+    # Calentamiento: que existan los autos antes de consultar
+    fin = time.monotonic() + 1.0
+    hilos = [threading.Thread(target=auto_falso, args=(servicio, p, f"CAR_{i:02d}", args.hz, fin), daemon=True)
+             for i, p in enumerate(puertos)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    time.sleep(0.5)
+    # Sin suscriptores, el modo multiproceso no publica: se cuentan las tramas de los autos
+    contar = lambda: sum(auto.tramas for auto in list(servicio.autos.values()))
+    publicadas0 = contar()
+
+    inicio = time.monotonic()
+    fin = inicio + args.segundos
+    salida = multiprocessing.Queue()
+    cliente = multiprocessing.Process(target=cliente_http,
+                                      args=(servidor.server_port, "CAR_00", time.time() + args.segundos, salida))
+    cliente.start()
+    hilos = [threading.Thread(target=auto_falso, args=(servicio, p, f"CAR_{i:02d}", args.hz, fin), daemon=True)
+             for i, p in enumerate(puertos)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    latencias = salida.get()
+    cliente.join()
+    duracion = time.monotonic() - inicio
+    publicadas = contar() - publicadas0
+
+    metricas = servicio.metricas_pipeline()
+    return {
+        "parser_processes": args.modo,
+        "cars": args.autos,
+        "offered_frames_per_s": args.autos * args.hz,
+        "frames_per_s": round(publicadas / duracion, 1),
+        "input_dropped": metricas["input"]["dropped"],
+        "worker_dropped": metricas["parser"]["dropped"],
+        "http_requests": len(latencias),
+        "http_ms_p50": round(1000 * percentil(latencias, 50), 2) if latencias else None,
+        "http_ms_p99": round(1000 * percentil(latencias, 99), 2) if latencias else None,
+    }
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument('--autos', type=int, default=8)
+    ap.add_argument('--hz', type=float, default=500.0, help='líneas/s ofrecidas por auto')
+    ap.add_argument('--segundos', type=float, default=10.0)
+    ap.add_argument('--procesos', default='0,2,4', help='modos a comparar (0 = hilo)')
+    ap.add_argument('--modo', type=int, default=None, help=argparse.SUPPRESS)
+    ap.add_argument('--json', action='store_true', help='solo imprimir el resultado en JSON')
+    args = ap.parse_args()
+
+    if args.modo is not None:
+        print(json.dumps(correr_modo(args)))
+        return
+
+    resultados = []
+    for modo in (int(p) for p in args.procesos.split(',')):
+        salida = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--modo', str(modo), '--autos', str(args.autos),
+             '--hz', str(args.hz), '--segundos', str(args.segundos)],
+            capture_output=True, text=True, check=True).stdout
+        resultados.append(json.loads(salida.strip().splitlines()[-1]))
+
+    resultado = {"benchmark": "multiproceso", "cpus": os.cpu_count(), "modes": resultados}
+    if args.json:
+        print(json.dumps(resultado))
+        return
+    print(f"{'Procesos':>8} {'Ofrecidas/s':>12} {'Tramas/s':>9} {'Descarte':>9} {'HTTP p50':>9} {'HTTP p99':>9}")
+    for r in resultados:
+        print(f"{r['parser_processes']:8d} {r['offered_frames_per_s']:12.0f} {r['frames_per_s']:9.1f} "
+              f"{r['input_dropped'] + r['worker_dropped']:9d} {r['http_ms_p50']:8.2f}ms {r['http_ms_p99']:8.2f}ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Generador de carga para /api/lap (servidor_vueltas.py).
+
+Simula N autos que postean vueltas como RECEPTORR.envio(), con tiempos
+generados igual que gen_progressive_lap_time, y mide posts/s y latencia.
+Con --local levanta el servidor en el mismo proceso.
+
+    python benchmarks/carga_vueltas.py --local --autos 100 --hz 10 --segundos 10
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import servidor_vueltas
+
+def gen_progressive_lap_time(last_lap_ms):
+    # Igual que RECEPTORR: primera vuelta 25-35 s, luego +0-5 s
+    if last_lap_ms is None:
+        return 25000 + random.getrandbits(10) % 10000
+    return last_lap_ms + random.getrandbits(12) % 5001
+
+def auto_simulado(url, car_id, hz, fin, resultados, prob_duplicado):
+    partes = urlsplit(url)
+    conexion = http.client.HTTPConnection(partes.hostname, partes.port, timeout=5)
+    latencias = []
+    errores = 0
+    periodo = 1.0 / hz
+    proximo = time.monotonic()
+    vuelta = 0
+    last_lap_ms = None
+    while time.monotonic() < fin:
+        if vuelta and random.random() < prob_duplicado:
+            numero = vuelta            # reenvío (como un reintento del Pico)
+        else:
+            vuelta += 1
+            numero = vuelta
+            last_lap_ms = gen_progressive_lap_time(last_lap_ms)
+        cuerpo = json.dumps({"car_id": car_id, "team": "Equipo " + car_id,
+                             "lap_time_ms": last_lap_ms, "lap_number_debug": numero})
+        t0 = time.perf_counter()
+        try:
+            conexion.request("POST", partes.path, cuerpo, {"Content-Type": "application/json"})
+            respuesta = conexion.getresponse()
+            respuesta.read()
+            if respuesta.status != 200:
+                errores += 1
+            latencias.append(time.perf_counter() - t0)
+        except (OSError, http.client.HTTPException):
+            errores += 1
+            conexion.close()
+            conexion = http.client.HTTPConnection(partes.hostname, partes.port, timeout=5)
+        proximo += periodo
+        espera = proximo - time.monotonic()
+        if espera > 0:
+            time.sleep(espera)
+    conexion.close()
+    resultados.append((latencias, errores))
+
+def percentil(valores, p):
+    if not valores:
+        return None
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(p / 100 * len(valores)))]
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument('--url', default=f"http://127.0.0.1:{servidor_vueltas.PUERTO_VUELTAS}/api/lap")
+    ap.add_argument('--local', action='store_true', help='levantar el servidor en este proceso')
+    ap.add_argument('--autos', type=int, default=100)
+    ap.add_argument('--hz', type=float, default=10.0, help='posts/s por auto')
+    ap.add_argument('--segundos', type=float, default=10.0)
+    ap.add_argument('--duplicados', type=float, default=0.02, help='probabilidad de reenviar una vuelta')
+    ap.add_argument('--json', action='store_true', help='solo imprimir el resultado en JSON')
+    args = ap.parse_args()
+
+    if args.local:
+        servidor = servidor_vueltas.ServidorVueltas(('127.0.0.1', 0), servidor_vueltas.ManejadorVueltas)
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        args.url = f"http://127.0.0.1:{servidor.server_port}/api/lap"
+
+    resultados = []
+    inicio = time.monotonic()
+    fin = inicio + args.segundos
+    hilos = [threading.Thread(target=auto_simulado,
+                              args=(args.url, f"CAR_{i:03d}", args.hz, fin, resultados, args.duplicados))
+             for i in range(args.autos)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    duracion = time.monotonic() - inicio
+
+    latencias = [l for lat, _ in resultados for l in lat]
+    errores = sum(e for _, e in resultados)
+    resultado = {
+        "benchmark": "carga_vueltas",
+        "cars": args.autos,
+        "hz_per_car": args.hz,
+        "seconds": round(duracion, 2),
+        "posts": len(latencias),
+        "posts_per_s": round(len(latencias) / duracion, 1),
+        "errors": errores,
+        "latency_ms_p50": round(1000 * percentil(latencias, 50), 2) if latencias else None,
+        "latency_ms_p99": round(1000 * percentil(latencias, 99), 2) if latencias else None,
+    }
+    if args.local:
+        tabla = servidor_vueltas.tabla_posiciones
+        resultado["duplicates_rejected"] = tabla.duplicadas
+        resultado["leaderboard_size"] = len(tabla.posiciones())
+
+    if args.json:
+        print(json.dumps(resultado))
+    else:
+        for clave, valor in resultado.items():
+            print(f"{clave:22} {valor}")
+
+if __name__ == "__main__":
+    main()
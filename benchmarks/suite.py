@@ -0,0 +1,679 @@
+"""
+Suite de benchmarks del pipeline de telemetría (Linux, sin hardware).
+
+Secciones (--solo para elegir):
+  parse     tramas/s de parsear_telemetria (texto) y del payload binario NRF
+  json      costo de armar y serializar /telemetry, /state e historial, y
+            bytes por trama de /stream en JSON y en filas (lo de las gráficas)
+  http      requests/s y latencia de TelemetryHandler con clientes concurrentes
+  serial    ingesta por pty con el escritor limitado a cada velocidad en baudios
+  analisis  carga (primera vez, desde la cache Parquet y solo acelerómetro
+            del último 10 %) / estadísticas / gráficas de
+            analisis_de_telemetria_py.py sobre sesiones sintéticas hechas
+            repitiendo telemetria2.csv
+  alinear   filas/s de alineacion.alinear (repeticiones + remuestreo) sobre
+            sesiones sintéticas hechas repitiendo telemetria(contrareloj).csv
+  limpieza  filas/s de limpieza.limpiar en memoria y por tandas desde la cache
+            Parquet (primera vez y ya cacheada)
+  espectro  STFT del IMU (espectro.py) sobre sesiones sintéticas a 1 kHz con
+            la vibración siguiendo al acelerador: una sesión, varias juntas,
+            y la misma sesión desde la cache (.npz y memoria)
+  trazado   muestras/s de la fusión GPS + IMU (trazado.py) y costo de /track
+            con el trazado lleno (simplificación incremental contra completa)
+  bateria   us por trama del estimador de batería (bateria.py) y de
+            EstadoAuto.registrar con él, repitiendo una descarga sintética, y
+            cuánto se aleja de la tensión en vacío y los minutos reales
+  ws        bytes por actualización de /telemetry, /stream y /ws (protocolo_ws.py,
+            completo, delta y solo los canales de las gráficas) y us por
+            trama de codificar, sobre telemetria2.csv
+  comparar  reporte de 8 sesiones (comparacion.py) con 1, 2 y todos los
+            procesos, ya con la cache Parquet hecha
+  sesiones  tamaño y MB/s de decodificación de .tlm (sesiones.py) contra
+            CSV y CSV con gzip, en sesiones sintéticas de varias horas
+
+Imprime un JSON con el commit, la máquina y los resultados para comparar
+entre commits:
+
+    python benchmarks/suite.py --salida resultados.json
+    python benchmarks/suite.py --solo parse,json --json
+    python benchmarks/suite.py --solo analisis --filas 10000,1000000,10000000
+    python benchmarks/suite.py --solo sesiones --horas 1,8
+"""
+import argparse
+import contextlib
+import gzip
+import http.client
+import io
+import json
+import multiprocessing
+import operator
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, RAIZ)
+import SERVICIO_TELEMETRIA as servicio
+import canales
+import sesiones
+from bench_multiauto import trama_aleatoria, valores_aleatorios, cpu_hilo
+
+def percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(p / 100 * len(valores)))] if valores else None
+
+def cronometrar(funcion, repeticiones):
+    """Segundos por llamada (mejor de 3 tandas)."""
+    mejor = None
+    for _ in range(3):
+        t0 = time.perf_counter()
+        for _ in range(repeticiones):
+            funcion()
+        dt = (time.perf_counter() - t0) / repeticiones
+        mejor = dt if mejor is None else min(mejor, dt)
+    return mejor
+
+def auto_de_prueba(car_id="BENCH", muestras=servicio.HISTORIAL_MAX):
+    auto = servicio.EstadoAuto(car_id, "bench")
+    for _ in range(muestras):
+        linea = trama_aleatoria(car_id).decode()
+        auto.registrar(servicio.parsear_telemetria(linea, auto.ultima))
+    return auto
+
+# ============ PARSE ============
+def bench_parse(args):
+    lineas = [trama_aleatoria("CAR_00").decode() for _ in range(2000)]
+    payloads = [canales.empaquetar(*valores_aleatorios()) for _ in range(2000)]
+    anterior = servicio.TRAMA_VACIA
+
+    def texto():
+        for linea in lineas:
+            servicio.parsear_telemetria(linea, anterior, 0.0)
+
+    def binario():
+        for payload in payloads:
+            servicio.trama_paquete_nrf("CAR_00", 0.0, servicio.PAQUETE_NRF.unpack(payload))
+
+    bloque = b"".join(payloads)
+    resultado = {
+        "text_frames_per_s": round(len(lineas) / cronometrar(texto, 3)),
+        "binary_frames_per_s": round(len(payloads) / cronometrar(binario, 3)),
+    }
+    try:
+        resultado["binary_batch_numpy_frames_per_s"] = round(
+            len(payloads) / cronometrar(lambda: canales.decodificar_lote(bloque), 20))
+    except ImportError:
+        resultado["binary_batch_numpy_frames_per_s"] = None
+    return resultado
+
+# ============ JSON ============
+CAMPOS_GRAFICAS = ("t", "speed", "acc_x", "acc_y", "acc_z", "gyro_x", "gyro_y",
+                   "battery", "temperature", "servo_pwm", "motor_pwm")   # CHART_FIELDS de la página
+
+def bench_json(args):
+    auto = auto_de_prueba()
+    columnas = servicio.COLUMNAS_HISTORIAL + servicio.COLUMNAS_BATERIA
+    filas = [trama[1:] + estado for trama, estado in list(auto.historial_bateria)[-300:]]
+    tramas = list(auto.historial)[-50:]   # un lote de /stream?format=rows: 0,1 s a 500 Hz
+    tomar = operator.itemgetter(*[servicio.COLUMNAS_HISTORIAL.index(c) + 1 for c in CAMPOS_GRAFICAS])
+    return {
+        "telemetry_us": round(1e6 * cronometrar(lambda: json.dumps(auto.telemetry), 2000), 2),
+        "state_us": round(1e6 * cronometrar(
+            lambda: json.dumps({"metrics": auto.metricas(), "telemetry": auto.telemetry}), 2000), 2),
+        "history_300_us": round(1e6 * cronometrar(
+            lambda: json.dumps({"columns": columnas,
+                                "rows": [t[1:] + e for t, e in list(auto.historial_bateria)[-300:]]}), 200), 2),
+        "history_300_bytes": len(json.dumps({"columns": columnas, "rows": filas})),
+        "stream_json_bytes_per_frame": round(sum(
+            len(b"data: " + servicio.a_json(t._asdict()) + b"\n\n") for t in tramas) / len(tramas), 1),
+        "stream_rows_bytes_per_frame": round(len(
+            b"data: " + servicio.a_json([tomar(t) for t in tramas]) + b"\n\n") / len(tramas), 1),
+    }
+
+# ============ HTTP ============
+def cliente_http(puerto, ruta, fin, salida):
+    latencias = []
+    errores = 0
+    while time.time() < fin:
+        t0 = time.perf_counter()
+        try:
+            conexion = http.client.HTTPConnection('127.0.0.1', puerto, timeout=5)
+            conexion.request('GET', ruta)
+            conexion.getresponse().read()
+            conexion.close()
+            latencias.append(time.perf_counter() - t0)
+        except (OSError, http.client.HTTPException):
+            errores += 1
+    salida.put((latencias, errores))
+
+def bench_http(args):
+    auto = auto_de_prueba("CAR_HTTP")
+    servicio.autos[auto.car_id] = auto
+    servicio.auto_principal = auto
+    servidor = servicio.ThreadingHTTPServer(('127.0.0.1', 0), servicio.TelemetryHandler)
+    servidor.request_queue_size = 128
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+
+    resultados = []
+    for ruta in ('/telemetry', '/cars/CAR_HTTP/history?n=300'):
+        for clientes in args.clientes:
+            salida = multiprocessing.Queue()
+            fin = time.time() + args.segundos
+            procesos = [multiprocessing.Process(target=cliente_http,
+                                                args=(servidor.server_port, ruta, fin, salida))
+                        for _ in range(clientes)]
+            for proceso in procesos:
+                proceso.start()
+            partes = [salida.get() for _ in procesos]
+            for proceso in procesos:
+                proceso.join()
+            latencias = [l for lat, _ in partes for l in lat]
+            resultados.append({
+                "path": ruta,
+                "clients": clientes,
+                "requests_per_s": round(len(latencias) / args.segundos, 1),
+                "errors": sum(e for _, e in partes),
+                "latency_ms_p50": round(1000 * percentil(latencias, 50), 3) if latencias else None,
+                "latency_ms_p99": round(1000 * percentil(latencias, 99), 3) if latencias else None,
+            })
+    servidor.shutdown()
+    return resultados
+
+# ============ SERIAL (pty) ============
+def escritor_limitado(fd, car_id, baud, fin):
+    """Escribe tramas a la velocidad real de la UART (10 bits por byte)."""
+    bytes_por_s = baud / 10
+    enviados = 0
+    inicio = time.monotonic()
+    while time.monotonic() < fin:
+        trama = trama_aleatoria(car_id)
+        os.write(fd, trama)
+        enviados += len(trama)
+        espera = inicio + enviados / bytes_por_s - time.monotonic()
+        if espera > 0:
+            time.sleep(espera)
+
+def bench_serial(args):
+    servicio.NEGOCIAR_BAUDIOS = False
+    resultados = []
+    for baud in args.baudios:
+        maestro, esclavo = os.openpty()
+        puerto = os.ttyname(esclavo)
+        car_id = f"SER_{baud}"
+        lector = threading.Thread(target=servicio.leer_puerto_serie, args=(puerto,), daemon=True)
+        lector.start()
+        time.sleep(0.3)
+        cpu0 = cpu_hilo(lector)
+        inicio = time.monotonic()
+        escritor_limitado(maestro, car_id, baud, inicio + args.segundos)
+        time.sleep(0.2)
+        duracion = time.monotonic() - inicio
+        cpu = cpu_hilo(lector) - cpu0
+        auto = servicio.autos.get(car_id)
+        tramas = auto.tramas if auto else 0
+        largo = len(trama_aleatoria(car_id))
+        resultados.append({
+            "baud": baud,
+            "frame_bytes": largo,
+            "frames_per_s": round(tramas / duracion, 1),
+            "max_frames_per_s": round(baud / 10 / largo, 1),
+            "reader_cpu_us_per_frame": round(1e6 * cpu / tramas, 1) if tramas else None,
+        })
+    return resultados
+
+# ============ ANÁLISIS ============
+def sesion_sintetica(base, filas):
+    """Repite la sesión real hasta filas, con ruido para que no sea periódica exacta."""
+    import numpy as np
+    import pandas as pd
+    veces = -(-filas // len(base))
+    df = pd.concat([base] * veces, ignore_index=True).iloc[:filas]
+    rng = np.random.default_rng(0)
+    for columna in ("acc_x", "acc_y", "acc_z", "gyro_x", "gyro_y"):
+        df[columna] = df[columna] + rng.normal(0, 0.05, len(df))
+    df["id"] = np.arange(len(df))
+    return df
+
+def bench_analisis(args):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import pandas as pd
+    import analisis_de_telemetria_py as analisis
+
+    base = pd.read_csv(os.path.join(RAIZ, "telemetria2.csv"))
+    resultados = []
+    with tempfile.TemporaryDirectory() as carpeta:
+        try:
+            import sesiones_parquet
+            sesiones_parquet.CARPETA_CACHE = os.path.join(carpeta, "cache")
+        except ImportError:
+            pass
+        for filas in args.filas:
+            ruta = os.path.join(carpeta, f"sesion_{filas}.csv")
+            sesion_sintetica(base, filas).to_csv(ruta, index=False)
+            resultado = {"rows": filas, "csv_mb": round(os.path.getsize(ruta) / 1e6, 1)}
+            with contextlib.redirect_stdout(io.StringIO()):
+                t0 = time.perf_counter()
+                df = analisis.cargar_y_mostrar_csv(ruta)
+                resultado["load_s"] = round(time.perf_counter() - t0, 3)   # incluye pasar a Parquet
+
+                t0 = time.perf_counter()
+                analisis.cargar_y_mostrar_csv(ruta)
+                resultado["load_cached_s"] = round(time.perf_counter() - t0, 3)
+
+                t0 = time.perf_counter()
+                analisis.cargar_y_mostrar_csv(ruta, ["acc_x", "acc_y", "acc_z"], filas * 0.9)
+                resultado["load_acc_last10pct_s"] = round(time.perf_counter() - t0, 3)
+
+                t0 = time.perf_counter()
+                analisis.mostrar_estadisticas(df)
+                resultado["stats_s"] = round(time.perf_counter() - t0, 3)
+
+                t0 = time.perf_counter()
+                analisis.crear_graficas_completas(df)
+                for numero in plt.get_fignums():   # con Agg show() no dibuja
+                    plt.figure(numero).canvas.draw()
+                resultado["plot_s"] = round(time.perf_counter() - t0, 3)
+                plt.close("all")
+            resultados.append(resultado)
+            del df
+    return resultados
+
+# ============ ALINEACIÓN ============
+def bench_alineacion(args):
+    import pandas as pd
+    import alineacion
+    base = pd.read_csv(os.path.join(RAIZ, "telemetria(contrareloj).csv"))
+    resultados = []
+    for filas in args.filas:
+        df = sesion_sintetica(base, filas)
+        t0 = time.perf_counter()
+        alineado = alineacion.alinear(df)
+        segundos = time.perf_counter() - t0
+        resultados.append({"rows": filas, "align_s": round(segundos, 3),
+                           "rows_per_s": round(filas / segundos),
+                           "output_rows": len(alineado),
+                           "stale": {f: d["stale_fraction"] for f, d in alineacion.resumen(df).items()}})
+        del df, alineado
+    return resultados
+
+# ============ LIMPIEZA ============
+def bench_limpieza(args):
+    import pandas as pd
+    import limpieza
+    import sesiones_parquet
+    base = pd.read_csv(os.path.join(RAIZ, "telemetria(contrareloj).csv"))
+    resultados = []
+    with tempfile.TemporaryDirectory() as carpeta:
+        sesiones_parquet.CARPETA_CACHE = os.path.join(carpeta, "cache")
+        for filas in args.filas:
+            df = sesion_sintetica(base, filas)
+            ruta = os.path.join(carpeta, f"sesion_{filas}.csv")
+            df.to_csv(ruta, index=False)
+            t0 = time.perf_counter()
+            limpia = limpieza.limpiar(df)
+            memoria_s = time.perf_counter() - t0
+            sesiones_parquet.en_cache(ruta)   # la conversión a Parquet no es parte de la limpieza
+            t0 = time.perf_counter()
+            limpieza.en_cache(ruta)
+            tandas_s = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            limpieza.en_cache(ruta)
+            cache_s = time.perf_counter() - t0
+            resultados.append({"rows": filas,
+                               "in_memory_rows_per_s": round(filas / memoria_s),
+                               "chunked_rows_per_s": round(filas / tandas_s),
+                               "cached_lookup_ms": round(1000 * cache_s, 2),
+                               "flagged": limpieza.resumen(limpia["calidad"])})
+            del df, limpia
+    return resultados
+
+# ============ ESPECTRO ============
+HZ_IMU = 1000   # IMU sobremuestreado: la vibración del motor queda por debajo de 500 Hz
+
+def sesion_vibracion(muestras, hz=HZ_IMU, semilla=0):
+    """acc/gyro con una vibración de 0,2 Hz por us de acelerador más ruido, y el PWM en escalones de 5 s."""
+    import numpy as np
+    import pandas as pd
+    rng = np.random.default_rng(semilla)
+    t = np.arange(muestras) / hz
+    motor = np.repeat(rng.integers(1550, 2000, size=muestras // (5 * hz) + 1), 5 * hz)[:muestras]
+    fase = 2 * np.pi * np.cumsum(0.2 * (motor - 1500)) / hz
+    ruido = lambda: 0.1 * rng.standard_normal(muestras)
+    return pd.DataFrame({"t": t, "acc_x": 0.5 * np.sin(fase) + ruido(),
+                         "acc_y": 0.3 * np.sin(2 * np.pi * 37 * t) + ruido(),   # resonancia fija
+                         "acc_z": 9.81 + 0.2 * np.sin(fase) + ruido(),
+                         "gyro_x": 10 * ruido(), "gyro_y": np.sin(fase) + ruido(),
+                         "motor_pwm": motor.astype(float)})
+
+def bench_espectro(args):
+    import espectro
+    import sesiones_parquet
+    resultados = []
+    with tempfile.TemporaryDirectory() as carpeta:
+        sesiones_parquet.CARPETA_CACHE = os.path.join(carpeta, "cache")
+        for filas in args.filas:
+            df = sesion_vibracion(filas)
+            t0 = time.perf_counter()
+            resultado = espectro.analizar(df)
+            una_s = time.perf_counter() - t0
+            partes = [df.iloc[i * filas // 4:(i + 1) * filas // 4] for i in range(4)]
+            t0 = time.perf_counter()
+            espectro.analizar_sesiones(partes)
+            juntas_s = time.perf_counter() - t0
+            ruta = os.path.join(carpeta, f"vibracion_{filas}.parquet")
+            df.to_parquet(ruta, index=False)
+            t0 = time.perf_counter()
+            espectro.en_cache(ruta)
+            primera_s = time.perf_counter() - t0
+            espectro._memoria.clear()
+            t0 = time.perf_counter()
+            espectro.en_cache(ruta)
+            disco_s = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            espectro.en_cache(ruta)
+            memoria_s = time.perf_counter() - t0
+            resultados.append({"samples": filas, "stft_s": round(una_s, 3),
+                               "samples_per_s": round(filas / una_s),
+                               "four_sessions_batched_s": round(juntas_s, 3),
+                               "first_report_s": round(primera_s, 3),
+                               "cached_npz_ms": round(1000 * disco_s, 2),
+                               "cached_memory_ms": round(1000 * memoria_s, 3),
+                               "channels": espectro.resumen(resultado)})
+            del df, resultado, partes
+    return resultados
+
+# ============ TRAZADO ============
+def circuito(muestras, hz=5, radio=20.0, velocidad=5.0, semilla=0):
+    """Vueltas a un círculo con fixes a 1 Hz con 1 m de ruido y el IMU con un sesgo de 0,3 m/s²."""
+    import numpy as np
+    import pandas as pd
+    rng = np.random.default_rng(semilla)
+    t = np.arange(muestras) / hz
+    segundo = np.floor(t).astype(int)
+    ruido = rng.standard_normal((2, segundo[-1] + 1))[:, segundo]   # el fix se repite hasta el siguiente
+    x = radio * np.sin(segundo * velocidad / radio) + ruido[0]
+    y = radio * (1 - np.cos(segundo * velocidad / radio)) + ruido[1]
+    return pd.DataFrame({"t": t, "gps_lat": np.round(-34.6 + np.degrees(y / 6371000), 6),
+                         "gps_lon": np.round(-58.4 + np.degrees(x / (6371000 * np.cos(np.radians(-34.6)))), 6),
+                         "velocidad": velocidad * 3.6,
+                         "acc_x": 0.3 + 0.05 * rng.standard_normal(muestras),
+                         "acc_y": velocidad ** 2 / radio + 0.1 * rng.standard_normal(muestras)})
+
+def bench_trazado(args):
+    import trazado
+    resultados = []
+    extra = 10 * 3 * 5   # 10 muestras por consulta, cronometrar(…, 5) hace 3 tandas de 5
+    for filas in args.filas:
+        df = circuito(filas + extra)
+        t0 = time.perf_counter()
+        fusion = trazado.fusionar(df.iloc[:filas], trazado.PUNTOS_MAX)
+        fusion_s = time.perf_counter() - t0
+        simplificados = fusion.trazado()["points"]
+        siguientes = iter(df.iloc[filas:].itertuples(index=False, name=None))
+
+        def consulta():
+            for _ in range(10):   # lo que llega entre dos consultas de la página (2 s a 5 Hz)
+                fusion.agregar(*next(siguientes))
+            fusion.trazado()
+        incremental_s = cronometrar(consulta, 5)
+        xy = [(x, y) for _, x, y in fusion.puntos]
+        completa_s = cronometrar(lambda: trazado.douglas_peucker(xy), 1)
+        resultados.append({"rows": filas, "fusion_rows_per_s": round(filas / fusion_s),
+                           "track_points": len(fusion.puntos), "simplified_points": simplificados,
+                           "track_incremental_ms": round(1000 * incremental_s, 3),
+                           "track_full_dp_ms": round(1000 * completa_s, 2)})
+    return resultados
+
+# ============ BATERÍA ============
+def descarga(muestras, hz=5, caida=0.6, semilla=0):
+    """Tramas con el acelerador en escalones y la batería leída a 1 Hz: en vacío baja lineal de 8,4 a 7 V."""
+    import numpy as np
+    rng = np.random.default_rng(semilla)
+    t = np.arange(muestras) / hz
+    pwm = rng.choice([1300, 1500, 1500, 1600, 1700, 1800, 1900], muestras // 25 + 1).repeat(25)[:muestras]
+    volts_por_minuto = 1.4 / (t[-1] / 60)
+    vacio = 8.4 - volts_por_minuto * t / 60
+    medida = vacio - caida * np.minimum(np.abs(pwm - 1500) / 500, 1) + 0.01 * rng.standard_normal(muestras)
+    lectura = np.searchsorted(t, np.floor(t))   # leer_bateria una vez por segundo
+    tramas = [servicio.TRAMA_VACIA._replace(car_id="BENCH", t=ti, battery=v, motor_pwm=p)
+              for ti, v, p in zip(t.tolist(), np.round(medida[lectura], 2).tolist(), pwm.tolist())]
+    return tramas, vacio, volts_por_minuto
+
+def bench_bateria(args):
+    import bateria
+    resultados = []
+    for filas in args.filas:
+        tramas, vacio, volts_por_minuto = descarga(filas)
+        estimador = bateria.Estimador()
+        t0 = time.perf_counter()
+        for trama in tramas:
+            estimador.agregar(trama.t, trama.battery, trama.motor_pwm)
+        estimador_s = time.perf_counter() - t0
+        auto = servicio.EstadoAuto("BENCH", "bench")
+        t0 = time.perf_counter()
+        for trama in tramas:
+            auto.registrar(trama)
+        registrar_s = time.perf_counter() - t0
+        estado = estimador.estado
+        minutos = (vacio[-1] - bateria.V_CORTE) / volts_por_minuto
+        resultados.append({"frames": filas, "estimator_us_per_frame": round(1e6 * estimador_s / filas, 3),
+                           "register_us_per_frame": round(1e6 * registrar_s / filas, 3),
+                           "ocv_error_v": round(estado.ocv - vacio[-1], 3),
+                           "rate_v_per_min": estado.rate, "rate_real": round(-volts_por_minuto, 4),
+                           "minutes": estado.minutes, "minutes_real": round(minutos, 1)})
+    return resultados
+
+# ============ WEBSOCKET ============
+def tramas_sesion(ruta, hz=5, car_id="BENCH"):
+    """Tramas de SERVICIO_TELEMETRIA con los valores de un CSV de sesión, a hz."""
+    import pandas as pd
+    filas = pd.read_csv(ruta)[list(canales.COLUMNAS_CSV)].itertuples(index=False, name=None)
+    return [servicio.Trama(car_id, 1.7e9 + i / hz, *fila) for i, fila in enumerate(filas)]
+
+def bench_ws(args):
+    import protocolo_ws
+    tramas = tramas_sesion(os.path.join(RAIZ, "telemetria2.csv"))
+    auto = servicio.EstadoAuto("BENCH", "bench")
+    telemetry = 0
+    for trama in tramas:
+        auto.registrar(trama)
+        telemetry += len(servicio.a_json(auto.telemetry))
+    tomar = operator.itemgetter(*[servicio.COLUMNAS_HISTORIAL.index(c) + 1 for c in CAMPOS_GRAFICAS])
+    resultado = {
+        "frames": len(tramas),
+        "telemetry_json_bytes": round(telemetry / len(tramas), 1),
+        "stream_json_bytes": round(sum(len(servicio.a_json(t._asdict())) + 8 for t in tramas) / len(tramas), 1),
+        "stream_rows_bytes": round(len(servicio.a_json([tomar(t) for t in tramas])) / len(tramas), 1),
+    }
+    for nombre, suscripcion in (("full", protocolo_ws.Suscripcion(delta=False)),
+                                ("delta", protocolo_ws.Suscripcion()),
+                                ("charts_delta", protocolo_ws.Suscripcion(canales_=CAMPOS_GRAFICAS[1:]))):
+        def codificar():
+            return protocolo_ws.Codificador(suscripcion, tramas[0].t).codificar(tramas, "BENCH")[1]
+        resultado[f"ws_{nombre}_bytes"] = round(len(codificar()) / len(tramas), 1)
+        resultado[f"ws_{nombre}_encode_us"] = round(1e6 * cronometrar(codificar, 20) / len(tramas), 2)
+    return resultado
+
+# ============ COMPARAR ============
+def bench_comparar(args):
+    import comparacion
+    filas = args.filas[0]
+    resultados = []
+    with tempfile.TemporaryDirectory() as carpeta:
+        rutas = []
+        for i in range(8):
+            ruta = os.path.join(carpeta, f"sesion_{i}.csv")
+            circuito(filas, velocidad=4.0 + 0.5 * i, semilla=i).to_csv(ruta, index=False)
+            rutas.append(ruta)
+        salida = os.path.join(carpeta, "reporte")
+        comparacion.comparar(rutas, salida, procesos=1)   # arma la cache Parquet de todas
+        for procesos in sorted({1, 2, os.cpu_count() or 1}):
+            t0 = time.perf_counter()
+            _, reporte = comparacion.comparar(rutas, salida, procesos=procesos)
+            segundos = time.perf_counter() - t0
+            resultados.append({"sessions": len(rutas), "rows_per_session": filas, "processes": procesos,
+                               "workers_used": len({r["pid"] for r in reporte}),
+                               "seconds": round(segundos, 2)})
+    uno = resultados[0]["seconds"]
+    for r in resultados:
+        r["speedup"] = round(uno / r["seconds"], 2)
+    return resultados
+
+# ============ SESIONES ============
+HZ_SESION = 20
+
+def escalones(rng, filas, valores, largo_medio):
+    """Señal constante a tramos (PWM, sensor de línea): cambia cada ~largo_medio filas."""
+    import numpy as np
+    cambios = np.flatnonzero(rng.random(filas) < 1 / largo_medio)
+    señal = np.empty(filas)
+    señal[:] = valores[0]
+    for inicio, valor in zip(cambios, rng.choice(valores, len(cambios))):
+        señal[inicio:] = valor
+    return señal
+
+def sesion_larga(horas, hz=HZ_SESION, semilla=0):
+    """Sesión sintética con canales que varían lento, ya cuantizados como el payload."""
+    import numpy as np
+    import pandas as pd
+    rng = np.random.default_rng(semilla)
+    filas = int(horas * 3600 * hz)
+    s = np.arange(filas) / hz
+    velocidad = np.clip(15 + 12 * np.sin(s / 40) + rng.normal(0, 0.5, filas), 0, None)
+    rumbo = np.cumsum(rng.normal(0, 0.02, filas))
+    paso = velocidad / 3.6 / hz / 111000
+    fisico = {
+        "lat": -12.05 + np.cumsum(paso * np.cos(rumbo)),
+        "lon": -77.04 + np.cumsum(paso * np.sin(rumbo)),
+        "alt": 150 + 5 * np.sin(s / 600),
+        "speed": velocidad,
+        "acc_x": rng.normal(0, 0.3, filas),
+        "acc_y": rng.normal(0, 0.3, filas),
+        "acc_z": 9.81 + rng.normal(0, 0.2, filas),
+        "gyro_x": rng.normal(0, 5, filas),
+        "gyro_y": rng.normal(0, 5, filas),
+        "line": escalones(rng, filas, [0, 1], 10 * hz),
+        "battery": 8.4 - 1.2 * s / max(s[-1], 1) + rng.normal(0, 0.01, filas),
+        "temperature": 40 + 3 * np.sin(s / 900) + rng.normal(0, 0.05, filas),
+        "servo_pwm": escalones(rng, filas, [1000, 1250, 1500, 1500, 1750, 2000], 2 * hz),
+        "motor_pwm": escalones(rng, filas, [1500, 1500, 1600, 1700, 1800], 5 * hz),
+    }
+    datos = {"t": np.round(1.7e9 + s + rng.normal(0, 0.002, filas), 3)}
+    for nombre, escala, columna in zip(canales.NOMBRES, canales.ESCALAS, canales.COLUMNAS_CSV):
+        datos[columna] = np.round(fisico[nombre] * escala) / escala
+    return pd.DataFrame(datos)
+
+def bench_sesiones(args):
+    import pandas as pd
+    resultados = []
+    with tempfile.TemporaryDirectory() as carpeta:
+        for horas in args.horas:
+            df = sesion_larga(horas)
+            filas = len(df)
+            mb_decodificados = filas * len(df.columns) * 8 / 1e6   # float64
+            ruta_csv = os.path.join(carpeta, "sesion.csv")
+            ruta_gz = ruta_csv + ".gz"
+            ruta_tlm = os.path.join(carpeta, "sesion" + sesiones.EXTENSION)
+            df.to_csv(ruta_csv, index=False)
+            with open(ruta_csv, "rb") as f, gzip.open(ruta_gz, "wb") as g:
+                g.write(f.read())
+
+            t0 = time.perf_counter()
+            with sesiones.CodificadorSesion.crear(ruta_tlm) as codificador:
+                for fila in df.itertuples(index=False):
+                    codificador.agregar(fila)
+            encode_s = time.perf_counter() - t0
+
+            tiempos = {
+                "csv": cronometrar(lambda: pd.read_csv(ruta_csv), 1),
+                "csv_gzip": cronometrar(lambda: pd.read_csv(ruta_gz), 1),
+                "tlm": cronometrar(lambda: sesiones.cargar_sesion(ruta_tlm), 1),
+            }
+
+            tam = {"csv": os.path.getsize(ruta_csv), "csv_gzip": os.path.getsize(ruta_gz),
+                   "tlm": os.path.getsize(ruta_tlm)}
+            resultados.append({
+                "hours": horas,
+                "rows": filas,
+                "file_mb": {k: round(v / 1e6, 2) for k, v in tam.items()},
+                "ratio_vs_csv": {k: round(tam["csv"] / v, 1) for k, v in tam.items()},
+                "bytes_per_row": {k: round(v / filas, 2) for k, v in tam.items()},
+                "decode_s": {k: round(v, 3) for k, v in tiempos.items()},
+                "decode_mb_per_s": {k: round(mb_decodificados / v, 1) for k, v in tiempos.items()},
+                "tlm_encode_rows_per_s": round(filas / encode_s),
+            })
+    return resultados
+
+# ============ MAIN ============
+SECCIONES = {
+    "parse": bench_parse,
+    "json": bench_json,
+    "http": bench_http,
+    "serial": bench_serial,
+    "analisis": bench_analisis,
+    "alinear": bench_alineacion,
+    "limpieza": bench_limpieza,
+    "espectro": bench_espectro,
+    "trazado": bench_trazado,
+    "bateria": bench_bateria,
+    "ws": bench_ws,
+    "comparar": bench_comparar,
+    "sesiones": bench_sesiones,
+}
+
+def commit_actual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def lista_enteros(texto):
+    return [int(x) for x in texto.split(',') if x]
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument('--solo', default=','.join(SECCIONES), help='secciones separadas por coma')
+    ap.add_argument('--segundos', type=float, default=3.0, help='duración de cada corrida http/serial')
+    ap.add_argument('--clientes', type=lista_enteros, default=[1, 4, 16])
+    ap.add_argument('--baudios', type=lista_enteros, default=[1200, 9600, 115200])
+    ap.add_argument('--filas', type=lista_enteros, default=[10000, 100000, 1000000],
+                    help='tamaños de sesión para el análisis (hasta 10000000)')
+    ap.add_argument('--horas', type=lambda t: [float(x) for x in t.split(',') if x], default=[1, 4],
+                    help=f'duración de las sesiones sintéticas ({HZ_SESION} Hz) para sesiones')
+    ap.add_argument('--salida', help='guardar el JSON en este archivo')
+    ap.add_argument('--json', action='store_true', help='solo imprimir el resultado en JSON')
+    args = ap.parse_args()
+
+    servicio.DEBUG = False
+    servicio.iniciar_pipeline(0)
+
+    resultado = {
+        "suite": "telemetria",
+        "commit": commit_actual(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "results": {},
+    }
+    for nombre in args.solo.split(','):
+        if not args.json:
+            print(f"⏱️  {nombre}...", file=sys.stderr)
+        with contextlib.redirect_stdout(sys.stderr):   # los prints del servicio no ensucian el JSON
+            resultado["results"][nombre] = SECCIONES[nombre](args)
+
+    texto = json.dumps(resultado, indent=None if args.json else 2)
+    if args.salida:
+        with open(args.salida, "w") as f:
+            f.write(texto + "\n")
+    print(texto)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# canales.py - esquema único de los canales de telemetría
+#
+# Copiar a la Pico (placa 3 y RECEPTORR) junto con el programa; también lo usan
+# SERVICIO_TELEMETRIA y el análisis en la PC. Todo lo demás se genera de CANALES:
+#
+#   FORMATO_STRUCT / PAQUETE   payload NRF binario (hoy "<ii12h", 32 bytes)
+#   FORMATO_TRAMA              trama de texto RECEPTORR -> PC ("Etiqueta:valor unidad")
+#   ETIQUETAS / POR_ETIQUETA   para parsear esa trama
+#   COLUMNAS_CSV               encabezados de los CSV de analisis_de_telemetria_py.py
+#   dtype_crudo(), dtype_fisico(), decodificar_lote()   NumPy (solo en la PC)
+#
+# Valor en el payload = round(valor físico * escala). El orden es el del payload.
+import struct
+
+# (nombre, tipo struct, escala, unidad, etiqueta en la trama de texto, columna CSV)
+CANALES = (
+    ("lat",         "i", 100000, "",     "Lat",      "gps_lat"),
+    ("lon",         "i", 100000, "",     "Lon",      "gps_lon"),
+    ("alt",         "h", 1,      "m",    "Alt",      "altitud"),
+    ("speed",       "h", 10,     "km/h", "Spd",      "velocidad"),
+    ("acc_x",       "h", 100,    "m/s2", "AccX",     "acc_x"),
+    ("acc_y",       "h", 100,    "m/s2", "AccY",     "acc_y"),
+    ("acc_z",       "h", 100,    "m/s2", "AccZ",     "acc_z"),
+    ("gyro_x",      "h", 100,    "deg/s", "GyroX",   "gyro_x"),
+    ("gyro_y",      "h", 100,    "deg/s", "GyroY",   "gyro_y"),
+    ("line",        "h", 1,      "",     "Linea",    "linea"),        # 0 = sobre la línea
+    ("battery",     "h", 100,    "V",    "Batt",     "bateria"),
+    ("temperature", "h", 10,     "C",    "Temp",     "temperatura"),
+    ("servo_pwm",   "h", 1,      "us",   "ServoPWM", "servo_pwm"),
+    ("motor_pwm",   "h", 1,      "us",   "MotorPWM", "motor_pwm"),
+)
+
+NOMBRES = tuple(c[0] for c in CANALES)
+ESCALAS = tuple(c[2] for c in CANALES)
+UNIDADES = tuple(c[3] for c in CANALES)
+ETIQUETAS = tuple(c[4] for c in CANALES)
+COLUMNAS_CSV = tuple(c[5] for c in CANALES)
+POR_ETIQUETA = {c[4]: i for i, c in enumerate(CANALES)}
+
+FORMATO_STRUCT = "<" + "".join(c[1] for c in CANALES)
+TAM_PAQUETE = struct.calcsize(FORMATO_STRUCT)
+try:
+    PAQUETE = struct.Struct(FORMATO_STRUCT)
+except AttributeError:   # MicroPython: sin struct.Struct, usar FORMATO_STRUCT
+    PAQUETE = None
+
+def _decimales(escala):
+    n = 0
+    while escala >= 10:
+        escala //= 10
+        n += 1
+    return n
+
+# "Car:{} | Lat:{:.5f} | Lon:{:.5f} | Alt:{:.0f}m | ... | MotorPWM:{:.0f}us\n"
+FORMATO_TRAMA = "Car:{} | " + " | ".join(
+    "{}:{{:.{}f}}{}".format(c[4], _decimales(c[2]), c[3]) for c in CANALES) + "\n"
+
+def empaquetar(*valores):
+    """Payload binario a partir de los valores físicos (en el orden de CANALES)."""
+    return struct.pack(FORMATO_STRUCT, *[round(v * e) for v, e in zip(valores, ESCALAS)])
+
+def decodificar(payload, offset=0):
+    """Valores físicos de un payload: un solo unpack_from y el escalado."""
+    return [v / e for v, e in zip(struct.unpack_from(FORMATO_STRUCT, payload, offset), ESCALAS)]
+
+def formatear(car_id, valores):
+    """Trama de texto a partir de los valores físicos."""
+    return FORMATO_TRAMA.format(car_id, *valores)
+
+# ---------------- NumPy (solo PC) ----------------
+def dtype_crudo():
+    """dtype estructurado idéntico al payload (para np.frombuffer)."""
+    import numpy as np
+    return np.dtype([(c[0], "<i4" if c[1] == "i" else "<i2") for c in CANALES])
+
+def dtype_fisico():
+    import numpy as np
+    return np.dtype([(n, np.float64) for n in NOMBRES])
+
+def decodificar_lote(buffer):
+    """Muchos payloads seguidos -> array estructurado con valores físicos (vectorizado)."""
+    import numpy as np
+    crudo = np.frombuffer(buffer, dtype=dtype_crudo())
+    fisico = np.empty(len(crudo), dtype=dtype_fisico())
+    for nombre, escala in zip(NOMBRES, ESCALAS):
+        fisico[nombre] = crudo[nombre] / escala
+    return fisico
@@ -0,0 +1,293 @@
+"""
+Comparación de varias sesiones en un solo reporte (HTML + PNG).
+
+Cada sesión se procesa en un proceso aparte (ProcessPoolExecutor): lectura
+(por la cache Parquet, ver analisis_de_telemetria_py.leer_sesion),
+limpieza opcional, estadísticas, trazado GPS + IMU (trazado.py), vueltas y
+su propia figura PNG. Al proceso principal vuelve solo lo chico: las
+estadísticas, los tiempos de vuelta y los canales reducidos a
+PUNTOS_GRAFICA puntos (mínimo y máximo por tramo, así los picos se ven).
+Con eso arma las gráficas superpuestas y el index.html.
+
+Vueltas: no hay marca de vuelta en la telemetría, así que se cuentan por
+GPS. La meta es META (o el primer punto del trazado); una vuelta termina
+cada vez que el auto vuelve a menos de RADIO_META después de haberse alejado
+más de RADIO_SALIDA, en el punto más cercano de esa pasada.
+
+    python comparacion.py telemetria2.csv "telemetria(contrareloj).csv" [--salida comparacion] [--procesos 4]
+"""
+import html
+import os
+import time
+
+import numpy as np
+
+PUNTOS_GRAFICA = 2000     # puntos por canal y sesión en las gráficas superpuestas
+CANALES_GRAFICA = ("velocidad", "motor_pwm", "servo_pwm", "bateria", "temperatura",
+                   "acc_x", "acc_y", "acc_z", "gyro_x", "gyro_y")
+RADIO_META = 5.0          # m
+RADIO_SALIDA = 15.0       # m
+META = None               # (lat, lon) de la línea de llegada; None = primer punto del trazado
+CARPETA = "comparacion"
+DECIMALES = {"gps_lat": 6, "gps_lon": 6}   # en la tabla de estadísticas; el resto con 2
+
+def vueltas(t, x, y, meta=(0.0, 0.0)):
+    """Instantes en que se pasa por la meta (x, y en metros, vectorizado); las vueltas son sus diferencias."""
+    if not len(t):
+        return []
+    d = np.hypot(x - meta[0], y - meta[1])
+    cerca = d < RADIO_META
+    cambios = np.flatnonzero(np.diff(cerca.astype(np.int8)))
+    inicios = np.concatenate(([0] if cerca[0] else [], cambios[~cerca[cambios]] + 1)).astype(int)
+    finales = np.concatenate((cambios[cerca[cambios]] + 1, [len(d)] if cerca[-1] else [])).astype(int)
+    pasos = []
+    fin_anterior = None
+    for inicio, fin in zip(inicios, finales):
+        if fin_anterior is None or d[fin_anterior:inicio].max(initial=0.0) > RADIO_SALIDA:
+            pasos.append(float(t[inicio + np.argmin(d[inicio:fin])]))
+            fin_anterior = fin
+        # una pasada sin haberse alejado es la misma pasada: se sigue midiendo desde la anterior
+    return pasos
+
+def reducir(t, v, puntos=PUNTOS_GRAFICA):
+    """(t, v) con a lo sumo puntos valores: mínimo y máximo de cada tramo, en orden."""
+    if len(v) <= puntos:
+        return t, v
+    inicios = np.arange(0, len(v), -(-2 * len(v) // puntos))
+    con_datos = np.nan_to_num(v, nan=np.nanmean(v) if np.isfinite(v).any() else 0.0)
+    minimos = np.minimum.reduceat(con_datos, inicios)
+    maximos = np.maximum.reduceat(con_datos, inicios)
+    return np.repeat(t[inicios], 2), np.column_stack((minimos, maximos)).ravel()
+
+def estadisticas(df):
+    """{columna: count, mean, std, min, max} de las columnas numéricas (sin calidad)."""
+    resultado = {}
+    for columna in df.select_dtypes(include=['number']).columns:
+        if columna in ('calidad', 't', 'id'):
+            continue
+        valores = df[columna].to_numpy(dtype=np.float64)
+        validos = valores[np.isfinite(valores)]
+        if not len(validos):
+            resultado[columna] = {"count": 0, "mean": None, "std": None, "min": None, "max": None}
+            continue
+        resultado[columna] = {"count": int(len(validos)), "mean": float(validos.mean()),
+                              "std": float(validos.std(ddof=1)) if len(validos) > 1 else 0.0,
+                              "min": float(validos.min()), "max": float(validos.max())}
+    return resultado
+
+def figura_sesion(nombre, t, df, puntos_trazado, ruta):
+    """PNG de una sesión: trazado, acelerómetro, velocidad y PWM, batería y temperatura."""
+    from matplotlib.figure import Figure   # sin pyplot: nada global, seguro en cada proceso
+    fig = Figure(figsize=(14, 9))
+    axes = fig.subplots(2, 2)
+    fig.suptitle(nombre, fontsize=14, fontweight='bold')
+    if len(puntos_trazado):
+        axes[0, 0].plot(puntos_trazado['x'], puntos_trazado['y'], linewidth=1)
+        axes[0, 0].set_aspect('equal', adjustable='datalim')
+        axes[0, 0].set_title('Trazado GPS + IMU (m)')
+    else:
+        axes[0, 0].text(0.5, 0.5, 'Sin fix GPS', ha='center', va='center')
+        axes[0, 0].set_title('Trazado')
+    for columna in ('acc_x', 'acc_y', 'acc_z'):
+        if columna in df.columns:
+            axes[0, 1].plot(*reducir(t, df[columna].to_numpy(dtype=np.float64)), label=columna, linewidth=0.8)
+    axes[0, 1].set_title('Acelerómetro (m/s²)')
+    for columna, eje in (('velocidad', axes[1, 0]), ('bateria', axes[1, 1])):
+        if columna in df.columns:
+            eje.plot(*reducir(t, df[columna].to_numpy(dtype=np.float64)), label=columna, linewidth=1)
+    if 'motor_pwm' in df.columns:
+        gemelo = axes[1, 0].twinx()
+        gemelo.plot(*reducir(t, df['motor_pwm'].to_numpy(dtype=np.float64)), color='gray',
+                    alpha=0.5, linewidth=0.8, label='motor_pwm')
+        gemelo.set_ylabel('motor_pwm (μs)')
+    if 'temperatura' in df.columns:
+        gemelo = axes[1, 1].twinx()
+        gemelo.plot(*reducir(t, df['temperatura'].to_numpy(dtype=np.float64)), color='orange',
+                    linewidth=1, label='temperatura')
+        gemelo.set_ylabel('temperatura (°C)')
+    axes[1, 0].set_title('Velocidad (km/h) y motor')
+    axes[1, 1].set_title('Batería (V) y temperatura')
+    for eje in axes.flat:
+        eje.grid(True, alpha=0.3)
+        if eje.get_legend_handles_labels()[0]:
+            eje.legend(fontsize=8)
+    fig.tight_layout()
+    fig.savefig(ruta, dpi=90)
+
+def analizar_sesion(tarea):
+    """Trabajo de un proceso: (índice, ruta, carpeta, limpiar, meta) -> dict chico para el reporte."""
+    import trazado
+    from alineacion import tiempos
+    from analisis_de_telemetria_py import leer_sesion
+    indice, ruta, carpeta, limpiar, meta = tarea
+    inicio = time.perf_counter()
+    df = leer_sesion(ruta, limpiar=limpiar)
+    t = tiempos(df)
+    t = t - t[0] if len(t) else t
+    resultado = {"indice": indice, "ruta": ruta, "nombre": os.path.basename(ruta), "filas": len(df),
+                 "duracion_s": float(t[-1]) if len(t) else 0.0, "estadisticas": estadisticas(df),
+                 "vueltas": [], "calidad": None, "pid": os.getpid()}
+    if 'calidad' in df.columns:
+        from limpieza import resumen
+        resultado["calidad"] = resumen(df['calidad'])
+
+    puntos = []
+    if 'gps_lat' in df.columns and 'gps_lon' in df.columns:
+        fusion = trazado.fusionar(df)
+        if fusion.origen is not None:
+            puntos = trazado.tabla(fusion)
+            meta_xy = fusion.local(*meta) if meta else (puntos['x'].iloc[0], puntos['y'].iloc[0])
+            pasos = vueltas(puntos['t'].to_numpy() - (tiempos(df)[0] if len(df) else 0.0),
+                            puntos['x'].to_numpy(), puntos['y'].to_numpy(), meta_xy)
+            resultado["vueltas"] = [b - a for a, b in zip(pasos, pasos[1:])]
+
+    resultado["canales"] = {columna: tuple(a.tolist() for a in reducir(t, df[columna].to_numpy(dtype=np.float64)))
+                            for columna in CANALES_GRAFICA if columna in df.columns}
+    resultado["figura"] = f"sesion_{indice}.png"
+    figura_sesion(resultado["nombre"], t, df, puntos, os.path.join(carpeta, resultado["figura"]))
+    resultado["segundos"] = time.perf_counter() - inicio
+    return resultado
+
+def graficar_canales(resultados, ruta):
+    """Un subplot por canal con todas las sesiones superpuestas (t desde el inicio de cada una)."""
+    from matplotlib.figure import Figure
+    canales = [c for c in CANALES_GRAFICA if any(c in r["canales"] for r in resultados)]
+    if not canales:
+        return False
+    filas = (len(canales) + 1) // 2
+    fig = Figure(figsize=(16, 3.2 * filas))
+    axes = fig.subplots(filas, 2, squeeze=False)
+    for eje, canal in zip(axes.flat, canales):
+        for r in resultados:
+            if canal in r["canales"]:
+                eje.plot(*r["canales"][canal], linewidth=0.8, alpha=0.8, label=r["nombre"])
+        eje.set_title(canal, fontweight='bold')
+        eje.grid(True, alpha=0.3)
+    for eje in list(axes.flat)[len(canales):]:
+        eje.set_visible(False)
+    axes[0, 0].legend(fontsize=8)
+    axes[-1, 0].set_xlabel('t desde el inicio (s)')
+    fig.tight_layout()
+    fig.savefig(ruta, dpi=90)
+    return True
+
+def graficar_vueltas(resultados, ruta):
+    """Tiempo de cada vuelta por sesión."""
+    from matplotlib.figure import Figure
+    con_vueltas = [r for r in resultados if r["vueltas"]]
+    if not con_vueltas:
+        return False
+    fig = Figure(figsize=(12, 5))
+    eje = fig.subplots()
+    for r in con_vueltas:
+        eje.plot(range(1, len(r["vueltas"]) + 1), r["vueltas"], marker='o', label=r["nombre"])
+    eje.set_xlabel('Vuelta')
+    eje.set_ylabel('Tiempo (s)')
+    eje.set_title('Tiempos de vuelta', fontweight='bold')
+    eje.grid(True, alpha=0.3)
+    eje.legend(fontsize=8)
+    fig.tight_layout()
+    fig.savefig(ruta, dpi=90)
+    return True
+
+def _numero(valor, formato="{:.2f}"):
+    return "---" if valor is None else formato.format(valor)
+
+def escribir_html(resultados, carpeta, graficas):
+    """index.html con la tabla de vueltas, las estadísticas lado a lado y las figuras."""
+    e = html.escape
+    partes = ["<!DOCTYPE html><html lang='es'><head><meta charset='UTF-8'>",
+              "<title>Comparación de sesiones</title><style>",
+              "body{font-family:'Segoe UI',sans-serif;background:#0f172a;color:#f1f5f9;padding:20px}",
+              "table{border-collapse:collapse;margin:10px 0 25px}td,th{border:1px solid #334155;padding:4px 8px}",
+              "th{background:#1e293b}img{max-width:100%;background:white;margin:10px 0}</style></head><body>",
+              f"<h1>📊 Comparación de {len(resultados)} sesiones</h1>"]
+
+    partes.append("<h2>🏁 Vueltas</h2><table><tr><th>Sesión</th><th>Filas</th><th>Duración (s)</th>"
+                  "<th>Vueltas</th><th>Mejor (s)</th><th>Promedio (s)</th><th>Parciales (s)</th></tr>")
+    for r in resultados:
+        v = r["vueltas"]
+        partes.append(f"<tr><td>{e(r['nombre'])}</td><td>{r['filas']}</td><td>{r['duracion_s']:.1f}</td>"
+                      f"<td>{len(v)}</td><td>{_numero(min(v) if v else None)}</td>"
+                      f"<td>{_numero(sum(v) / len(v) if v else None)}</td>"
+                      f"<td>{' · '.join(f'{x:.2f}' for x in v) or '---'}</td></tr>")
+    partes.append("</table>")
+
+    columnas = []
+    for r in resultados:
+        columnas += [c for c in r["estadisticas"] if c not in columnas]
+    partes.append("<h2>📈 Estadísticas (media ± desvío [mín, máx])</h2><table><tr><th>Canal</th>")
+    partes += [f"<th>{e(r['nombre'])}</th>" for r in resultados]
+    partes.append("</tr>")
+    for columna in columnas:
+        partes.append(f"<tr><td>{e(columna)}</td>")
+        for r in resultados:
+            s = r["estadisticas"].get(columna)
+            if s is None or not s["count"]:
+                partes.append("<td>---</td>")
+            else:
+                n = DECIMALES.get(columna, 2)
+                partes.append(f"<td>{s['mean']:.{n}f} ± {s['std']:.{n}f} [{s['min']:.{n}f}, {s['max']:.{n}f}]</td>")
+        partes.append("</tr>")
+    partes.append("</table>")
+
+    if any(r["calidad"] for r in resultados):
+        partes.append("<h2>🧹 Limpieza (filas marcadas)</h2><table><tr><th>Sesión</th>")
+        banderas = next(r["calidad"] for r in resultados if r["calidad"])
+        partes += [f"<th>{e(b)}</th>" for b in banderas]
+        partes.append("</tr>")
+        for r in resultados:
+            partes.append(f"<tr><td>{e(r['nombre'])}</td>")
+            partes += [f"<td>{(r['calidad'] or {}).get(b, '---')}</td>" for b in banderas]
+            partes.append("</tr>")
+        partes.append("</table>")
+
+    for titulo, archivo in graficas:
+        partes.append(f"<h2>{e(titulo)}</h2><img src='{e(archivo)}'>")
+    for r in resultados:
+        partes.append(f"<h2>{e(r['nombre'])}</h2><img src='{e(r['figura'])}'>")
+    partes.append("</body></html>")
+    ruta = os.path.join(carpeta, "index.html")
+    with open(ruta, "w", encoding="utf-8") as f:
+        f.write("\n".join(partes))
+    return ruta
+
+def comparar(rutas, carpeta=CARPETA, procesos=None, limpiar=False, meta=META):
+    """Reporte de rutas en carpeta; procesos=None usa todos los núcleos, 1 lo hace todo en este proceso.
+
+    Devuelve (ruta del index.html, resultados por sesión en el orden de rutas).
+    """
+    import analisis_de_telemetria_py  # noqa: F401  (importado antes del fork: los procesos no lo vuelven a cargar)
+    rutas = list(dict.fromkeys(rutas))   # la misma sesión dos veces escribiría la misma cache a la vez
+    os.makedirs(carpeta, exist_ok=True)
+    tareas = [(i, ruta, carpeta, limpiar, meta) for i, ruta in enumerate(rutas)]
+    procesos = min(procesos or os.cpu_count() or 1, len(tareas))
+    if procesos <= 1:
+        resultados = [analizar_sesion(tarea) for tarea in tareas]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            resultados = list(pool.map(analizar_sesion, tareas))
+
+    graficas = []
+    if graficar_canales(resultados, os.path.join(carpeta, "canales.png")):
+        graficas.append(("📉 Canales superpuestos", "canales.png"))
+    if graficar_vueltas(resultados, os.path.join(carpeta, "vueltas.png")):
+        graficas.append(("🏁 Tiempos de vuelta", "vueltas.png"))
+    return escribir_html(resultados, carpeta, graficas), resultados
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Compara varias sesiones (CSV, .tlm o Parquet) en un reporte HTML")
+    ap.add_argument("rutas", nargs="+")
+    ap.add_argument("--salida", default=CARPETA, help="carpeta del reporte")
+    ap.add_argument("--procesos", type=int, help="por defecto, un proceso por núcleo")
+    ap.add_argument("--limpiar", action="store_true", help="pasar cada sesión por limpieza.py")
+    ap.add_argument("--meta", type=lambda t: tuple(float(x) for x in t.split(',')), help="lat,lon de la meta")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    indice, resultados = comparar(args.rutas, args.salida, args.procesos, args.limpiar, args.meta)
+    for r in resultados:
+        print(f"📊 {r['nombre']}: {r['filas']} filas, {len(r['vueltas'])} vueltas ({r['segundos']:.2f} s)")
+    print(f"✅ {indice} en {time.perf_counter() - t0:.2f} s")
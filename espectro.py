@@ -0,0 +1,281 @@
+"""
+Análisis espectral de vibraciones: STFT del acelerómetro y el giroscopio.
+
+Para cada canal (CANALES) se arma el espectrograma con ventanas de Hann de
+VENTANA muestras que avanzan de a PASO, y en cada ventana se busca la
+frecuencia dominante por encima de FRECUENCIA_MINIMA (debajo están las
+maniobras: curvas, frenadas). La frecuencia dominante se compara con el
+acelerador (|motor_pwm - PWM_NEUTRO| promediado en la misma ventana): la
+vibración del motor y la transmisión sube con el acelerador, una resonancia
+del chasis no.
+
+Con la placa 3 mandando una trama cada 200 ms el IMU queda a 5 Hz (se ve
+hasta 2,5 Hz); el análisis toma la frecuencia de la columna t, así que sirve
+igual cuando el IMU se lea más rápido que la trama.
+
+- espectrogramas: una FFT por tanda de cuadros de todos los canales y todas
+  las sesiones juntas (sliding_window_view, sin bucles por ventana).
+- analizar / analizar_sesiones: DataFrame(s) -> dict de arrays.
+- en_cache: el resultado queda en la carpeta de sesiones_parquet como .npz,
+  con la configuración de la ventana en la clave; un reporte repetido no
+  recalcula nada.
+
+    python espectro.py sesion.csv [--ventana 128] [--hz 1000]
+"""
+import hashlib
+import os
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from alineacion import SIN_LIMITE, remuestrear, tiempos
+
+CANALES = ("acc_x", "acc_y", "acc_z", "gyro_x", "gyro_y")
+VENTANA = 128               # muestras por ventana (resolución = hz / VENTANA)
+FRECUENCIA_MINIMA = 0.5     # Hz
+PWM_NEUTRO = 1500           # us, motor quieto (tabla de pulsos de Rx16-1)
+CUADROS_TANDA = 1 << 14     # ventanas por llamada a rfft
+VERSION = 1                 # cambiarla invalida los .npz de la cache
+MEMORIA_MAX = 8             # resultados que quedan además en memoria
+
+_memoria = {}
+
+def senales(df, canales=CANALES, hz=None):
+    """(hz, reloj, canales x muestras) a paso uniforme; las filas con NaN (limpieza) se interpolan."""
+    canales = [c for c in canales if c in df.columns]
+    t = tiempos(df)
+    valores = df[canales].to_numpy(dtype=np.float64)
+    validas = np.isfinite(t) & ~np.isnan(valores).any(axis=1)
+    t, valores = t[validas], valores[validas]
+    if (np.diff(t) < 0).any():
+        orden = np.argsort(t, kind="stable")
+        t, valores = t[orden], valores[orden]
+    pasos = np.diff(t)
+    if hz is None:
+        pasos_reales = pasos[pasos > 0]
+        hz = 1 / np.median(pasos_reales) if len(pasos_reales) else 1.0
+    if not len(t):
+        return hz, t, np.zeros((len(canales), 0))
+    if np.allclose(pasos, 1 / hz):
+        return hz, t, valores.T
+    reloj = t[0] + np.arange(int((t[-1] - t[0]) * hz) + 1) / hz
+    x, _ = remuestrear(t, valores, reloj, ["lineal"] * len(canales), SIN_LIMITE)
+    return hz, reloj, x
+
+def cuadros(x, ventana=VENTANA, paso=None):
+    """Vista (canales x cuadros x ventana) de x (canales x muestras), sin copiar."""
+    paso = paso or ventana // 2
+    if x.shape[-1] < ventana:
+        return np.zeros(x.shape[:-1] + (0, ventana))
+    return sliding_window_view(x, ventana, axis=-1)[..., ::paso, :]
+
+def espectrogramas(lista, ventana=VENTANA, paso=None):
+    """[canales x muestras] -> [canales x cuadros x (ventana // 2 + 1)] de potencia (float32, unidades²).
+
+    Los cuadros de todas las sesiones y canales se copian a un mismo búfer
+    y se transforman juntos, de a CUADROS_TANDA.
+    """
+    vistas = [cuadros(x, ventana, paso) for x in lista]
+    salidas = [np.empty(v.shape[:-1] + (ventana // 2 + 1,), dtype=np.float32) for v in vistas]
+    hann = np.hanning(ventana)
+    # Un solo lado (se duplica todo menos DC y Nyquist), normalizado para que
+    # la suma de un cuadro sea el valor cuadrático medio de la ventana
+    escala = np.full(ventana // 2 + 1, 2 / (ventana * (hann ** 2).sum()))
+    escala[0] /= 2
+    if ventana % 2 == 0:
+        escala[-1] /= 2
+    bufer = np.empty((CUADROS_TANDA, ventana))
+    destinos, lleno = [], 0
+
+    def transformar():
+        datos = bufer[:lleno]
+        datos -= datos.mean(axis=1, keepdims=True)   # sin la componente continua (gravedad en acc_z)
+        datos *= hann
+        espectro = np.fft.rfft(datos, axis=1)
+        potencia = espectro.real ** 2
+        potencia += espectro.imag ** 2
+        potencia *= escala
+        inicio = 0
+        for salida, canal, desde, hasta in destinos:
+            salida[canal, desde:hasta] = potencia[inicio:inicio + hasta - desde]
+            inicio += hasta - desde
+
+    for vista, salida in zip(vistas, salidas):
+        for canal in range(vista.shape[0]):
+            total = vista.shape[1]
+            desde = 0
+            while desde < total:
+                hasta = min(total, desde + CUADROS_TANDA - lleno)
+                bufer[lleno:lleno + hasta - desde] = vista[canal, desde:hasta]
+                destinos.append((salida, canal, desde, hasta))
+                lleno += hasta - desde
+                desde = hasta
+                if lleno == CUADROS_TANDA:
+                    transformar()
+                    destinos, lleno = [], 0
+    if lleno:
+        transformar()
+    return salidas
+
+def dominante(potencia, f, fmin=FRECUENCIA_MINIMA):
+    """(frecuencia, potencia) del pico de cada cuadro por encima de fmin, con interpolación parabólica."""
+    desde = int(np.searchsorted(f, fmin))
+    if potencia.shape[-1] - desde < 3:
+        vacio = np.full(potencia.shape[:-1], np.nan)
+        return vacio, vacio.copy()
+    banda = potencia[..., desde:]
+    k = np.argmax(banda, axis=-1)
+    k = np.clip(k, 1, banda.shape[-1] - 2)[..., None]
+    a, b, c = (np.log(np.take_along_axis(banda, k + d, axis=-1)[..., 0].astype(np.float64) + 1e-20)
+               for d in (-1, 0, 1))
+    curvatura = a - 2 * b + c
+    delta = np.divide(0.5 * (a - c), curvatura, out=np.zeros_like(b), where=curvatura < 0)
+    np.clip(delta, -0.5, 0.5, out=delta)
+    paso_f = f[1] - f[0]
+    frecuencia = f[desde] + (k[..., 0] + delta) * paso_f
+    return frecuencia, np.exp(b - 0.25 * (a - c) * delta)
+
+def media_por_cuadro(x, ventana=VENTANA, paso=None):
+    """Promedio de x (1D) en cada ventana, con una suma acumulada."""
+    paso = paso or ventana // 2
+    n = (len(x) - ventana) // paso + 1 if len(x) >= ventana else 0
+    acumulada = np.concatenate(([0.0], np.cumsum(x)))
+    inicios = np.arange(n) * paso
+    return (acumulada[inicios + ventana] - acumulada[inicios]) / ventana
+
+def correlacion_motor(frecuencia, acelerador):
+    """[(r de Pearson, Hz por us de acelerador)] por canal, entre la frecuencia dominante y el acelerador."""
+    resultado = []
+    for fila in np.atleast_2d(frecuencia):
+        validos = np.isfinite(fila) & np.isfinite(acelerador)
+        x, y = acelerador[validos], fila[validos]
+        if len(x) < 3 or x.std() == 0 or y.std() == 0:
+            resultado.append((np.nan, np.nan))
+            continue
+        r = np.corrcoef(x, y)[0, 1]
+        resultado.append((r, r * y.std() / x.std()))
+    return resultado
+
+def analizar_sesiones(dfs, ventana=VENTANA, paso=None, hz=None, canales=CANALES, fmin=FRECUENCIA_MINIMA):
+    """Lista de DataFrames -> lista de resultados (ver analizar), con las FFT de todas juntas."""
+    paso = paso or ventana // 2
+    preparadas = [senales(df, canales, hz) for df in dfs]
+    potencias = espectrogramas([x for _, _, x in preparadas], ventana, paso)
+    resultados = []
+    for df, (hz_sesion, reloj, x), potencia in zip(dfs, preparadas, potencias):
+        f = np.fft.rfftfreq(ventana, 1 / hz_sesion)
+        frecuencia, pico = dominante(potencia, f, fmin)
+        centros = reloj[np.arange(potencia.shape[1]) * paso + ventana // 2] if len(reloj) else reloj
+        acelerador = np.full(len(centros), np.nan)
+        if "motor_pwm" in df.columns and len(reloj):
+            motor = df["motor_pwm"].to_numpy(dtype=np.float64)
+            t_motor = tiempos(df)
+            validos = ~np.isnan(motor)
+            motor, t_motor = motor[validos], t_motor[validos]
+            if len(motor):   # el PWM es escalonado: último valor en cada instante del reloj
+                orden = np.argsort(t_motor, kind="stable")
+                i = np.searchsorted(t_motor[orden], reloj, side="right") - 1
+                en_reloj = motor[orden][np.maximum(i, 0)]
+                acelerador = media_por_cuadro(np.abs(en_reloj - PWM_NEUTRO), ventana, paso)
+        correlaciones = correlacion_motor(frecuencia, acelerador)
+        resultados.append({
+            "canales": np.array([c for c in canales if c in df.columns]),
+            "hz": np.float64(hz_sesion), "ventana": np.int64(ventana), "paso": np.int64(paso),
+            "f": f, "t": centros, "potencia": potencia,
+            "frecuencia": frecuencia, "pico": pico, "acelerador": acelerador,
+            "r_motor": np.array([r for r, _ in correlaciones]),
+            "hz_por_us": np.array([p for _, p in correlaciones]),
+        })
+    return resultados
+
+def analizar(df, ventana=VENTANA, paso=None, hz=None, canales=CANALES, fmin=FRECUENCIA_MINIMA):
+    """DataFrame -> dict con f, t (centro de cada ventana), potencia (canales x cuadros x f),
+    frecuencia y pico dominantes (canales x cuadros), acelerador por cuadro y la
+    correlación de cada canal con el motor (r_motor, hz_por_us)."""
+    return analizar_sesiones([df], ventana, paso, hz, canales, fmin)[0]
+
+def clave(ventana, paso, hz, canales, fmin, limpiar, desde, hasta):
+    """Parte del nombre del .npz en la cache: cambia con cualquier parámetro del análisis."""
+    reglas = ""
+    if limpiar:
+        import limpieza
+        reglas = limpieza.version_reglas()
+    texto = repr((VERSION, ventana, paso or ventana // 2, hz, tuple(canales), fmin, reglas, desde, hasta))
+    return hashlib.sha1(texto.encode("utf-8")).hexdigest()[:8]
+
+def _recordar(destino, resultado):
+    _memoria.pop(destino, None)
+    if len(_memoria) >= MEMORIA_MAX:
+        _memoria.pop(next(iter(_memoria)))   # el más viejo
+    _memoria[destino] = resultado
+    return resultado
+
+def en_cache_sesiones(origenes, ventana=VENTANA, paso=None, hz=None, canales=CANALES,
+                      fmin=FRECUENCIA_MINIMA, limpiar=False, desde=None, hasta=None, carpeta=None):
+    """Resultado de analizar para cada origen (CSV, .tlm o Parquet); solo calcula los que no están en la cache."""
+    import sesiones_parquet
+    sufijo = ".espectro-" + clave(ventana, paso, hz, canales, fmin, limpiar, desde, hasta)
+    resultados, faltan = [None] * len(origenes), []
+    for i, origen in enumerate(origenes):
+        destino, existe = sesiones_parquet.ruta_cache(origen, sufijo, carpeta, extension=".npz")
+        if destino in _memoria:
+            resultados[i] = _recordar(destino, _memoria[destino])
+        elif existe:
+            with np.load(destino) as datos:
+                resultados[i] = _recordar(destino, dict(datos))
+        else:
+            faltan.append((i, destino))
+    if not faltan:
+        return resultados
+
+    columnas = list(canales) + ["motor_pwm"]
+    dfs = []
+    for i, _ in faltan:
+        origen = origenes[i]
+        if limpiar:
+            import limpieza
+            parquet = limpieza.en_cache(origen, carpeta=carpeta)
+        else:
+            parquet = origen if origen.endswith(".parquet") else sesiones_parquet.en_cache(origen, carpeta)
+        dfs.append(sesiones_parquet.cargar(parquet, columnas, desde, hasta))
+    for (i, destino), resultado in zip(faltan, analizar_sesiones(dfs, ventana, paso, hz, canales, fmin)):
+        temporal = destino + ".tmp"
+        with open(temporal, "wb") as archivo:   # con un archivo abierto np.savez no agrega ".npz"
+            np.savez(archivo, **resultado)
+        os.replace(temporal, destino)
+        resultados[i] = _recordar(destino, resultado)
+    return resultados
+
+def en_cache(origen, ventana=VENTANA, paso=None, hz=None, canales=CANALES,
+             fmin=FRECUENCIA_MINIMA, limpiar=False, desde=None, hasta=None, carpeta=None):
+    """Como analizar, pero leyendo origen y guardando el resultado en la cache."""
+    return en_cache_sesiones([origen], ventana, paso, hz, canales, fmin, limpiar, desde, hasta, carpeta)[0]
+
+def resumen(resultado):
+    """{canal: frecuencia dominante mediana, r con el acelerador, Hz por us}."""
+    return {str(canal): {"dominant_hz": round(float(np.nanmedian(fila)), 3) if np.isfinite(fila).any() else None,
+                         "r_motor": round(float(r), 3) if np.isfinite(r) else None,
+                         "hz_per_us": round(float(p), 5) if np.isfinite(p) else None}
+            for canal, fila, r, p in zip(resultado["canales"], resultado["frecuencia"],
+                                         resultado["r_motor"], resultado["hz_por_us"])}
+
+if __name__ == "__main__":
+    import argparse
+    import time
+    ap = argparse.ArgumentParser(description="Espectro de vibraciones del IMU de una o varias sesiones")
+    ap.add_argument("entradas", nargs="+")
+    ap.add_argument("--ventana", type=int, default=VENTANA, help="muestras por ventana")
+    ap.add_argument("--paso", type=int, help="muestras entre ventanas (por defecto, media ventana)")
+    ap.add_argument("--hz", type=float, help="frecuencia de muestreo (por defecto, la de la columna t)")
+    ap.add_argument("--limpiar", action="store_true", help="pasar antes por limpieza.py")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    resultados = en_cache_sesiones(args.entradas, args.ventana, args.paso, args.hz, limpiar=args.limpiar)
+    print(f"✅ {len(resultados)} sesiones en {time.perf_counter() - t0:.3f} s")
+    for entrada, resultado in zip(args.entradas, resultados):
+        print(f"📈 {entrada}: {resultado['potencia'].shape[1]} ventanas a {float(resultado['hz']):g} Hz, "
+              f"resolución {float(resultado['f'][1]):.3f} Hz")
+        for canal, datos in resumen(resultado).items():
+            print(f"   • {canal:7s} dominante {datos['dominant_hz']} Hz | "
+                  f"r con acelerador {datos['r_motor']} | {datos['hz_per_us']} Hz/us")
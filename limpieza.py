@@ -0,0 +1,302 @@
+"""
+Limpieza de sesiones: marca y enmascara (NaN) los valores que no son medidas.
+
+Reglas, en este orden, todas vectorizadas por columna:
+
+    SIN_FIX          gps_lat = gps_lon = 0 (todavía sin fix): lat, lon y velocidad
+    ALTITUD_INVALIDA altitud = 0 antes del primer $GPGGA
+    MPU_AUSENTE      (0, 0, 9.81, 0, 0): valor por defecto de leer_mpu sin MPU6050
+    PLACA2_MUDA      bateria / servo_pwm / motor_pwm = 0: no llegó trama de la placa 2
+    LM35_SIN_LECTURA temperatura = 0 (leer_lm35 sin ninguna lectura válida)
+    FUERA_DE_RANGO   fuera de lo que el sensor puede medir (RANGOS)
+    PICO             filtro de Hampel: lejos de la mediana móvil en más de
+                     3 MAD (y de un mínimo por canal, para señales cuantizadas)
+    SALTO            cambio más rápido de lo físicamente posible (VARIACION_MAXIMA por
+                     segundo, más RUIDO_SALTO), medido desde que apareció el valor
+                     anterior, así las repeticiones del GPS no achican el tiempo
+
+La columna calidad lleva los bits de cada fila (0 = limpia).
+
+limpiar_tandas() procesa un archivo por tandas en una sola pasada, con
+2 * VENTANA filas de contexto de cada lado para el filtro de Hampel y el
+último valor válido de cada canal para SALTO; en_cache()
+guarda el resultado como Parquet junto a la cache de sesiones_parquet.
+
+    python limpieza.py sesion.csv [--salida limpia.csv]
+"""
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+from alineacion import PERIODO_TRAMA, tiempos
+
+SIN_FIX = 1
+ALTITUD_INVALIDA = 2
+MPU_AUSENTE = 4
+PLACA2_MUDA = 8
+LM35_SIN_LECTURA = 16
+FUERA_DE_RANGO = 32
+PICO = 64
+SALTO = 128
+BANDERAS = {"SIN_FIX": SIN_FIX, "ALTITUD_INVALIDA": ALTITUD_INVALIDA, "MPU_AUSENTE": MPU_AUSENTE,
+            "PLACA2_MUDA": PLACA2_MUDA, "LM35_SIN_LECTURA": LM35_SIN_LECTURA,
+            "FUERA_DE_RANGO": FUERA_DE_RANGO, "PICO": PICO, "SALTO": SALTO}
+
+G = 9.81
+IMU = ("acc_x", "acc_y", "acc_z", "gyro_x", "gyro_y")
+MPU_POR_DEFECTO = (0.0, 0.0, G, 0.0, 0.0)
+METROS_POR_GRADO = 111000
+
+RANGOS = {                        # MPU6050 en ±2 g y ±250 °/s (lo que configura mpu_init)
+    "acc_x": (-2 * G, 2 * G), "acc_y": (-2 * G, 2 * G), "acc_z": (-2 * G, 2 * G),
+    "gyro_x": (-250, 250), "gyro_y": (-250, 250),
+    "gps_lat": (-90, 90), "gps_lon": (-180, 180),
+    "altitud": (-500, 6000), "velocidad": (0, 150),
+    "bateria": (3.0, 13.0), "temperatura": (-10, 120),
+    "servo_pwm": (500, 2500), "motor_pwm": (1000, 2000),   # tablas de pulsos de Rx16-1
+}
+VENTANA = 7                       # filas a cada lado para el filtro de Hampel
+BLOQUE_MEDIANA = 1 << 18          # filas por bloque al ordenar ventanas (acota la memoria)
+SIGMAS_HAMPEL = 3.0
+HAMPEL = {                        # canal: diferencia mínima para ser pico
+    "altitud": 15.0, "velocidad": 15.0,
+    "temperatura": 10.0,          # el LM35 por el ADC de la Pico oscila ±5 °C con el motor andando
+    "bateria": 1.5,               # la batería 2S cae ~1 V bajo carga del motor y vuelve: no es pico
+}
+VARIACION_MAXIMA = {              # por segundo
+    "gps_lat": 40 / METROS_POR_GRADO, "gps_lon": 40 / METROS_POR_GRADO,   # 40 m/s
+    "altitud": 30.0, "velocidad": 40.0, "bateria": 0.5, "temperatura": 2.0,
+}
+RUIDO_SALTO = {                   # cambio que siempre se acepta (ruido del sensor, caída bajo carga)
+    "altitud": 10.0, "bateria": 1.5, "temperatura": 10.0,
+}
+
+def _marcar(df, calidad, bandera, filas, columnas):
+    columnas = [c for c in columnas if c in df.columns]
+    if columnas and filas.any():
+        df.loc[filas, columnas] = np.nan
+        calidad[filas] |= bandera
+
+def mediana_movil(x, ventana=VENTANA):
+    """Mediana centrada de 2 * ventana + 1 filas sin contar los NaN.
+
+    Igual que rolling(center=True, min_periods=1).median() de pandas, pero
+    ordenando todas las ventanas de un bloque de una vez (más rápido para
+    ventanas cortas).
+    """
+    largo = 2 * ventana + 1
+    relleno = np.full(ventana, np.nan)
+    x = np.concatenate([relleno, np.asarray(x, dtype=np.float64), relleno])
+    nan_acumulados = np.concatenate([[0], np.cumsum(np.isnan(x))])
+    validos = largo - (nan_acumulados[largo:] - nan_acumulados[:-largo])   # no NaN por ventana
+    salida = np.empty(len(x) - 2 * ventana)
+    for inicio in range(0, len(salida), BLOQUE_MEDIANA):
+        ventanas = np.lib.stride_tricks.sliding_window_view(x[inicio:inicio + BLOQUE_MEDIANA + 2 * ventana], largo)
+        ordenadas = np.sort(ventanas, axis=1)   # los NaN quedan al final
+        n = validos[inicio:inicio + len(ordenadas)]
+        filas = np.arange(len(ordenadas))
+        mediana = (ordenadas[filas, (np.maximum(n, 1) - 1) // 2] + ordenadas[filas, n // 2]) / 2
+        mediana[n == 0] = np.nan
+        salida[inicio:inicio + len(mediana)] = mediana
+    return salida
+
+def hampel(serie, minimo, ventana=VENTANA, sigmas=SIGMAS_HAMPEL):
+    """Filas donde |x - mediana móvil| > max(sigmas * 1.4826 * MAD, minimo)."""
+    x = serie.to_numpy(dtype=np.float64)
+    desvio = np.abs(x - mediana_movil(x, ventana))
+    mad = mediana_movil(desvio, ventana)
+    with np.errstate(invalid="ignore"):
+        return desvio > np.maximum(sigmas * 1.4826 * mad, minimo)
+
+def _rachas(serie, t, previo=None):
+    """(valores, tiempos, filas donde empieza cada racha de valores válidos iguales).
+
+    previo = (valor, desde, antes) va delante como dos filas más: la racha
+    anterior a la serie y la de antes de esa.
+    """
+    x = serie.to_numpy(dtype=np.float64)
+    t = np.asarray(t, dtype=np.float64)
+    if previo is not None:
+        x = np.concatenate([[previo[2], previo[0]], x])
+        t = np.concatenate([[np.nan, previo[1]], t])
+    validos = np.flatnonzero(~np.isnan(x))
+    cambia = np.ones(len(validos), dtype=bool)
+    cambia[1:] = x[validos[1:]] != x[validos[:-1]]
+    return x, t, validos[cambia]
+
+def saltos(serie, t, limite, previo=None, ruido=0.0):
+    """Filas cuyo valor cambia más de ruido + limite por segundo respecto del valor válido anterior.
+
+    El tiempo se mide desde que apareció el valor anterior. Volver al valor
+    de antes del salto no es otro salto (el final de un pico de varias filas).
+    previo = (valor, desde, antes) de _ultimo_valido, para seguir una serie
+    cortada en tandas.
+    """
+    x, t, filas = _rachas(serie, t, previo)
+    salto = np.zeros(len(x), dtype=bool)
+    if len(filas) > 1:
+        valores, desde = x[filas], t[filas]
+        dt = desde[1:] - desde[:-1]
+        tolerancia = ruido + limite * dt
+        with np.errstate(invalid="ignore"):
+            lejos = (dt > 0) & (np.abs(valores[1:] - valores[:-1]) > tolerancia)
+            vuelve = np.zeros(len(lejos), dtype=bool)
+            vuelve[1:] = np.abs(valores[2:] - valores[:-2]) <= tolerancia[1:]
+        salto[filas[1:]] = lejos & ~vuelve
+    return salto if previo is None else salto[2:]
+
+def _ultimo_valido(serie, t, previo=None):
+    """(valor, desde, antes): último valor válido, cuándo apareció y el valor anterior a ese."""
+    x, t, filas = _rachas(serie, t, previo)
+    if not len(filas):
+        return previo
+    antes = x[filas[-2]] if len(filas) > 1 else np.nan
+    return x[filas[-1]], t[filas[-1]], antes
+
+def limpiar(df):
+    """Copia de df con los valores inválidos en NaN y la columna calidad (bits de BANDERAS)."""
+    return _limpiar(df, tiempos(df))[0]
+
+def _limpiar(df, t, desde=0, hasta=None, previos=None):
+    """limpiar() con los SALTO medidos solo en las filas desde:hasta.
+
+    previos: {canal: (valor, desde, antes)} del último valor válido antes
+    de la fila desde. Devuelve (df limpio, previos en la fila hasta).
+    """
+    hasta = len(df) if hasta is None else hasta
+    previos = dict(previos or {})
+    df = df.copy()
+    for columna in RANGOS:
+        if columna in df.columns:
+            df[columna] = df[columna].astype(np.float64)
+    calidad = np.zeros(len(df), dtype=np.uint16)
+
+    if {"gps_lat", "gps_lon"} <= set(df.columns):
+        _marcar(df, calidad, SIN_FIX, ((df["gps_lat"] == 0) & (df["gps_lon"] == 0)).to_numpy(),
+                ("gps_lat", "gps_lon", "velocidad"))
+    if "altitud" in df.columns:
+        _marcar(df, calidad, ALTITUD_INVALIDA, (df["altitud"] == 0).to_numpy(), ("altitud",))
+    if set(IMU) <= set(df.columns):
+        ausente = np.logical_and.reduce([np.isclose(df[c].to_numpy(), v, atol=1e-9)
+                                         for c, v in zip(IMU, MPU_POR_DEFECTO)])
+        _marcar(df, calidad, MPU_AUSENTE, ausente, IMU)
+    for columna in ("bateria", "servo_pwm", "motor_pwm"):
+        if columna in df.columns:
+            _marcar(df, calidad, PLACA2_MUDA, (df[columna] == 0).to_numpy(), (columna,))
+    if "temperatura" in df.columns:
+        _marcar(df, calidad, LM35_SIN_LECTURA, (df["temperatura"] == 0).to_numpy(), ("temperatura",))
+
+    for columna, (minimo, maximo) in RANGOS.items():
+        if columna in df.columns:
+            valores = df[columna].to_numpy()
+            with np.errstate(invalid="ignore"):
+                _marcar(df, calidad, FUERA_DE_RANGO, (valores < minimo) | (valores > maximo), (columna,))
+    for columna, minimo in HAMPEL.items():
+        if columna in df.columns:
+            _marcar(df, calidad, PICO, hampel(df[columna], minimo), (columna,))
+    for columna, limite in VARIACION_MAXIMA.items():
+        if columna in df.columns:
+            serie, t_serie = df[columna].iloc[desde:hasta].reset_index(drop=True), t[desde:hasta]
+            filas = np.zeros(len(df), dtype=bool)
+            filas[desde:hasta] = saltos(serie, t_serie, limite, previos.get(columna), RUIDO_SALTO.get(columna, 0.0))
+            previos[columna] = _ultimo_valido(serie, t_serie, previos.get(columna))
+            _marcar(df, calidad, SALTO, filas, (columna,))
+
+    df["calidad"] = calidad
+    return df, previos
+
+def limpiar_tandas(tandas, ventana=VENTANA):
+    """Iterable de DataFrames crudos (en orden) -> DataFrames limpios, en una pasada.
+
+    El filtro de Hampel de una fila mira 2 * ventana filas de cada lado (la
+    mediana móvil del desvío, que a su vez es contra una mediana móvil), así
+    que cada tanda se limpia junto con las últimas 4 * ventana filas de la
+    anterior: 2 * ventana de contexto y 2 * ventana que quedaron pendientes
+    porque les faltaba el futuro. Para SALTO se lleva de tanda en tanda el
+    último valor válido de cada canal y cuándo apareció. El resultado es el
+    mismo que limpiar() sobre todo el archivo.
+    """
+    margen = 2 * ventana
+    pendiente = None
+    contexto = 0   # filas al principio de pendiente que ya se entregaron
+    primera = 0    # número de fila (en el archivo) de la primera de pendiente
+    previos = {}
+    for tanda in tandas:
+        df = tanda if pendiente is None else pd.concat([pendiente, tanda], ignore_index=True)
+        if len(df) <= contexto + margen:
+            pendiente = df
+            continue
+        fin = len(df) - margen
+        limpia, previos = _limpiar(df, _tiempos_tanda(df, primera), contexto, fin, previos)
+        yield limpia.iloc[contexto:fin]
+        inicio = max(0, fin - margen)
+        pendiente = df.iloc[inicio:].reset_index(drop=True)
+        primera += inicio
+        contexto = fin - inicio
+    if pendiente is not None and len(pendiente) > contexto:
+        yield _limpiar(pendiente, _tiempos_tanda(pendiente, primera), contexto, None, previos)[0].iloc[contexto:]
+
+def _tiempos_tanda(df, primera):
+    """tiempos() de una tanda que empieza en la fila primera del archivo."""
+    t = tiempos(df)
+    if "t" not in df.columns and "id" not in df.columns:
+        t = t + primera * PERIODO_TRAMA
+    return t
+
+def resumen(calidad):
+    """{bandera: filas marcadas} para la columna calidad."""
+    calidad = np.asarray(calidad)
+    return {nombre: int(np.count_nonzero(calidad & bit)) for nombre, bit in BANDERAS.items()}
+
+def version_reglas():
+    """Cambia si cambian las reglas: parte de la clave de la cache."""
+    texto = repr((RANGOS, VENTANA, SIGMAS_HAMPEL, HAMPEL, VARIACION_MAXIMA, RUIDO_SALTO, MPU_POR_DEFECTO))
+    return hashlib.sha1(texto.encode("utf-8")).hexdigest()[:8]
+
+def en_cache(origen, filas_tanda=None, carpeta=None):
+    """Parquet limpio de origen (CSV, .tlm o Parquet), en la cache; lo genera si hace falta."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    import sesiones_parquet
+
+    destino, existe = sesiones_parquet.ruta_cache(origen, ".limpia-" + version_reglas(), carpeta)
+    if existe:
+        return destino
+    fuente = origen if origen.endswith(".parquet") else sesiones_parquet.en_cache(origen, carpeta)
+    filas_tanda = filas_tanda or sesiones_parquet.FILAS_GRUPO
+    temporal = destino + ".tmp"
+    archivo = pq.ParquetFile(fuente)
+    tandas = (lote.to_pandas() for lote in archivo.iter_batches(batch_size=filas_tanda))
+    escritor = None
+    try:
+        for limpia in limpiar_tandas(tandas):
+            tabla = pa.Table.from_pandas(limpia, preserve_index=False)
+            if escritor is None:
+                escritor = sesiones_parquet.abrir_escritor(temporal, tabla.schema)
+            escritor.write_table(tabla, row_group_size=filas_tanda)
+    finally:
+        if escritor is not None:
+            escritor.close()
+    if escritor is None:   # sesión vacía
+        return fuente
+    os.replace(temporal, destino)
+    return destino
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Marca y enmascara valores inválidos de una sesión CSV")
+    ap.add_argument("entrada")
+    ap.add_argument("--salida", help="CSV limpio (con la columna calidad)")
+    ap.add_argument("--tanda", type=int, default=100000, help="filas por tanda")
+    args = ap.parse_args()
+
+    partes = list(limpiar_tandas(pd.read_csv(args.entrada, chunksize=args.tanda)))
+    limpia = pd.concat(partes, ignore_index=True) if partes else pd.DataFrame()
+    print(f"🧹 {len(limpia)} filas, {np.count_nonzero(limpia['calidad'])} con algún problema")
+    for nombre, filas in resumen(limpia["calidad"]).items():
+        if filas:
+            print(f"   • {nombre}: {filas}")
+    if args.salida:
+        limpia.to_csv(args.salida, index=False)
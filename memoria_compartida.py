@@ -0,0 +1,112 @@
+"""
+Anillo de muestras en memoria compartida para el modo multiproceso de SERVICIO_TELEMETRIA.
+
+Un bloque multiprocessing.shared_memory con dos arrays estructurados de numpy:
+
+    control[auto]           version (seqlock), escritas, car_id, origen
+    muestras[auto, i]       una fila por muestra (COLUMNAS_HISTORIAL), anillo de largo fijo
+
+Cada auto lo escribe un solo proceso. El escritor pone version impar, copia
+las filas, suma escritas y deja version par; el lector repite la lectura si
+vio version impar o si cambió mientras copiaba. La asignación de filas de
+control a autos nueva usa un lock (pasa una vez por auto).
+"""
+from multiprocessing import shared_memory
+
+import numpy as np
+
+DTYPE_CONTROL = np.dtype([("version", np.uint64), ("escritas", np.uint64),
+                          ("car_id", "S16"), ("origen", "S32")])
+
+class AnilloCompartido:
+
+    def __init__(self, columnas, max_autos=32, muestras=1024, nombre=None, lock=None):
+        self.columnas = tuple(columnas)
+        self.dtype_muestra = np.dtype([(c, np.float64) for c in self.columnas])
+        self.max_autos = max_autos
+        self.largo = muestras
+        self.lock = lock
+        tam_usados = 8
+        tam_control = DTYPE_CONTROL.itemsize * max_autos
+        tam_muestras = self.dtype_muestra.itemsize * max_autos * muestras
+        if nombre is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=tam_usados + tam_control + tam_muestras)
+            self.shm.buf[:tam_usados + tam_control] = bytes(tam_usados + tam_control)
+            self.dueno = True
+        else:
+            self.shm = shared_memory.SharedMemory(name=nombre)
+            self.dueno = False
+        self.usados = np.ndarray((1,), np.int64, self.shm.buf, 0)
+        self.control = np.ndarray((max_autos,), DTYPE_CONTROL, self.shm.buf, tam_usados)
+        self.muestras = np.ndarray((max_autos, muestras), self.dtype_muestra, self.shm.buf,
+                                   tam_usados + tam_control)
+
+    def parametros(self):
+        """Lo necesario para abrir el mismo anillo desde otro proceso."""
+        return {"columnas": self.columnas, "max_autos": self.max_autos,
+                "muestras": self.largo, "nombre": self.shm.name, "lock": self.lock}
+
+    # ---------------- ESCRITURA (un proceso por auto) ----------------
+    def asignar(self, car_id, origen):
+        """Fila de control de car_id (la crea si no existe). None si no hay lugar."""
+        clave = car_id.encode()[:16]
+        with self.lock:
+            n = int(self.usados[0])
+            for i in range(n):
+                if self.control["car_id"][i] == clave:
+                    return i
+            if n == self.max_autos:
+                return None
+            self.control["car_id"][n] = clave
+            self.control["origen"][n] = origen.encode()[:32]
+            self.usados[0] = n + 1
+            return n
+
+    def escribir(self, fila_auto, filas):
+        """Agrega filas (secuencias de valores en el orden de columnas) al anillo del auto."""
+        control = self.control[fila_auto:fila_auto + 1]
+        escritas = int(control["escritas"][0])
+        control["version"] += 1                       # impar: escribiendo
+        anillo = self.muestras[fila_auto]
+        for i, fila in enumerate(filas[-self.largo:], escritas + max(0, len(filas) - self.largo)):
+            anillo[i % self.largo] = fila
+        control["escritas"] = escritas + len(filas)
+        control["version"] += 1                       # par: consistente
+
+    # ---------------- LECTURA ----------------
+    def autos(self):
+        """[(fila, car_id, origen)] de los autos asignados."""
+        n = int(self.usados[0])
+        return [(i, self.control["car_id"][i].decode(), self.control["origen"][i].decode())
+                for i in range(n)]
+
+    def leer_desde(self, fila_auto, desde, hasta=None, intentos=100):
+        """(filas desde la muestra número desde, número de la siguiente). Copia solo lo pedido.
+
+        Sin hasta, lee todo lo escrito. Si el anillo ya pisó parte del pedido,
+        las filas empiezan más adelante: la primera es la número siguiente - len(filas).
+        """
+        control = self.control[fila_auto:fila_auto + 1]
+        for _ in range(intentos):
+            v1 = int(control["version"][0])
+            if v1 & 1:
+                continue
+            escritas = int(control["escritas"][0])
+            desde = max(desde, escritas - self.largo)   # lo anterior ya está pisado
+            if hasta is not None:
+                escritas = max(desde, min(escritas, hasta))
+            if desde >= escritas:
+                filas = self.muestras[fila_auto, :0].copy()
+            else:
+                indices = np.arange(desde, escritas) % self.largo
+                filas = self.muestras[fila_auto, indices]   # indexado avanzado: ya es copia
+            if int(control["version"][0]) == v1:
+                return filas, escritas
+        return self.muestras[fila_auto, :0].copy(), desde
+
+    def cerrar(self):
+        # Soltar las vistas antes de cerrar el bloque
+        self.usados = self.control = self.muestras = None
+        self.shm.close()
+        if self.dueno:
+            self.shm.unlink()
@@ -0,0 +1,129 @@
+"""
+Perfilado de SERVICIO_TELEMETRIA en marcha, sin costo mientras está apagado.
+
+- muestrear_pilas: cada 1/hz s toma sys._current_frames() de todos los
+  hilos y cuenta las pilas. colapsadas() las deja en el formato de
+  flamegraph.pl / speedscope / inferno ("hilo;archivo:funcion;... cuenta").
+  Es tiempo de pared: un hilo bloqueado en una lectura aparece en la
+  función Python que la llamó.
+- Trazador: mide tramos de funciones elegidas (registrar) y los exporta como
+  Chrome trace (chrome://tracing, ui.perfetto.dev). activar() reemplaza esas
+  funciones por un envoltorio que mide y desactivar() vuelve a poner las
+  originales: apagado, el camino caliente es el mismo código de siempre.
+"""
+import functools
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+
+MAX_PROFUNDIDAD = 64
+_muestreo = threading.Lock()   # un muestreo a la vez
+
+def _nombres_hilos():
+    return {hilo.ident: hilo.name for hilo in threading.enumerate()}
+
+def _marco(frame):
+    codigo = frame.f_code
+    return "{}:{}".format(os.path.basename(codigo.co_filename), codigo.co_name)
+
+def muestrear_pilas(segundos, hz=100, excluir=()):
+    """Counter {pila colapsada: muestras}. RuntimeError si ya hay otro muestreo en curso."""
+    if not _muestreo.acquire(blocking=False):
+        raise RuntimeError("ya hay un muestreo en curso")
+    try:
+        yo = threading.get_ident()
+        excluir = set(excluir) | {yo}
+        muestras = Counter()
+        periodo = 1.0 / hz
+        proxima = time.monotonic()
+        fin = proxima + segundos
+        while proxima < fin:
+            nombres = _nombres_hilos()
+            for ident, frame in sys._current_frames().items():
+                if ident in excluir:
+                    continue
+                pila = []
+                while frame is not None and len(pila) < MAX_PROFUNDIDAD:
+                    pila.append(_marco(frame))
+                    frame = frame.f_back
+                pila.append(nombres.get(ident, str(ident)).replace(";", ":"))
+                muestras[";".join(reversed(pila))] += 1
+            del frame
+            proxima += periodo
+            espera = proxima - time.monotonic()
+            if espera > 0:
+                time.sleep(espera)
+        return muestras
+    finally:
+        _muestreo.release()
+
+def colapsadas(muestras):
+    """Texto de pilas colapsadas, de la más frecuente a la menos."""
+    return "".join("{} {}\n".format(pila, n) for pila, n in muestras.most_common())
+
+class Trazador:
+    """Tramos de tiempo de funciones elegidas, exportables como Chrome trace."""
+
+    def __init__(self, capacidad=200000):
+        self.activo = False
+        self.eventos = deque(maxlen=capacidad)   # (nombre, categoría, inicio_ns, duración_ns, hilo)
+        self.capacidad = capacidad
+        self._puntos = []
+        self._originales = []
+        self._lock = threading.Lock()
+        self._inicio = 0
+
+    def registrar(self, objeto, nombre, categoria):
+        """Agrega objeto.nombre (función de un módulo o método de una clase) a lo que se mide."""
+        self._puntos.append((objeto, nombre, categoria))
+
+    def activar(self):
+        """False si ya estaba activo."""
+        with self._lock:
+            if self.activo:
+                return False
+            self.eventos.clear()
+            self._inicio = time.perf_counter_ns()
+            for objeto, nombre, categoria in self._puntos:
+                original = getattr(objeto, nombre)
+                self._originales.append((objeto, nombre, original))
+                setattr(objeto, nombre, self._envolver(original, nombre, categoria))
+            self.activo = True
+            return True
+
+    def desactivar(self):
+        with self._lock:
+            for objeto, nombre, original in self._originales:
+                setattr(objeto, nombre, original)
+            self._originales = []
+            self.activo = False
+
+    def _envolver(self, funcion, nombre, categoria):
+        eventos = self.eventos
+        reloj = time.perf_counter_ns
+        hilo = threading.get_ident
+
+        @functools.wraps(funcion)
+        def medida(*args, **kwargs):
+            inicio = reloj()
+            try:
+                return funcion(*args, **kwargs)
+            finally:
+                eventos.append((nombre, categoria, inicio, reloj() - inicio, hilo()))
+        return medida
+
+    def chrome_trace(self):
+        """Dict listo para json.dumps (formato "Trace Event" de Chrome, eventos completos "X")."""
+        pid = os.getpid()
+        eventos = list(self.eventos)
+        nombres = _nombres_hilos()
+        traza = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid,
+                  "args": {"name": nombres.get(tid, str(tid))}}
+                 for tid in sorted({e[4] for e in eventos})]
+        traza += [{"name": nombre, "cat": categoria, "ph": "X", "pid": pid, "tid": tid,
+                   "ts": (inicio - self._inicio) / 1000, "dur": duracion / 1000}
+                  for nombre, categoria, inicio, duracion, tid in eventos]
+        return {"traceEvents": traza, "displayTimeUnit": "ms",
+                "otherData": {"events": len(eventos), "capacity": self.capacidad}}
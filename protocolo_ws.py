@@ -0,0 +1,284 @@
+"""
+WebSocket binario para los clientes del tablero (/ws de SERVICIO_TELEMETRIA).
+
+Solo biblioteca estándar: el handshake y los marcos de RFC 6455 sobre el
+BaseHTTPRequestHandler que ya atiende la página.
+
+Protocolo (todo little-endian):
+
+1. Al conectar, y cada vez que cambia la suscripción, el servidor manda un
+   mensaje de texto "schema" (JSON) con los canales elegidos, su tipo
+   ("i" int32 / "h" int16), escala y el valor que significa "sin dato", t0
+   y los autos conocidos. Un auto nuevo llega como un mensaje "car".
+2. Después, mensajes binarios con uno o más cuadros seguidos:
+
+       cabecera  <BBI   tipo (1 completo, 2 delta), índice del auto, ms desde t0
+       completo  los canales elegidos, en el orden de canales.CANALES, como
+                 round(valor * escala) (con todos es el payload "<ii12h" del NRF)
+       delta     <H máscara de los canales que cambiaron (bit k = k-ésimo canal
+                 elegido) y solo esos valores
+
+   El primer cuadro de cada auto y uno cada CUADROS_CLAVE son completos.
+3. El cliente puede cambiar la suscripción mandando un texto JSON
+   {"car": "A1" | "*", "channels": ["acc_x", ...], "max_hz": 10, "delta": true};
+   lo mismo se acepta en la query de /ws (channels separados por coma).
+   Sin car, el auto principal; "*" son todos.
+"""
+import base64
+import hashlib
+import json
+import struct
+import threading
+
+import canales
+
+GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"   # RFC 6455, sección 1.3
+TEXTO, BINARIO, CIERRE, PING, PONG, CONTINUACION = 0x1, 0x2, 0x8, 0x9, 0xA, 0x0
+MENSAJE_MAX = 65536          # bytes de un mensaje del cliente (las suscripciones son chicas)
+CUADROS_CLAVE = 100          # cada tantos cuadros de un auto se manda uno completo
+COMPLETO, DELTA = 1, 2
+CABECERA = struct.Struct("<BBI")
+MASCARA = struct.Struct("<H")
+NULO = {"i": -2 ** 31, "h": -2 ** 15}
+LIMITES = {"i": (-2 ** 31 + 1, 2 ** 31 - 1), "h": (-2 ** 15 + 1, 2 ** 15 - 1)}
+TIPOS = {c[0]: c[1] for c in canales.CANALES}
+VERSION = 1
+
+# ---------------- WebSocket (RFC 6455) ----------------
+def aceptar(handler):
+    """Responde el handshake si el request es un upgrade a WebSocket. Devuelve False si no lo es."""
+    clave = handler.headers.get('Sec-WebSocket-Key')
+    if handler.headers.get('Upgrade', '').lower() != 'websocket' or not clave:
+        return False
+    respuesta = base64.b64encode(hashlib.sha1(clave.encode() + GUID).digest())
+    # A mano: BaseHTTPRequestHandler contesta HTTP/1.0 y el 101 tiene que ser HTTP/1.1
+    handler.wfile.write(b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\n"
+                        b"Connection: Upgrade\r\nSec-WebSocket-Accept: " + respuesta + b"\r\n\r\n")
+    handler.wfile.flush()
+    return True
+
+def marco(opcode, datos):
+    """Marco del servidor (sin máscara, FIN)."""
+    n = len(datos)
+    if n < 126:
+        cabecera = struct.pack("!BB", 0x80 | opcode, n)
+    elif n < 65536:
+        cabecera = struct.pack("!BBH", 0x80 | opcode, 126, n)
+    else:
+        cabecera = struct.pack("!BBQ", 0x80 | opcode, 127, n)
+    return cabecera + datos
+
+class Conexion:
+    """Un WebSocket ya aceptado: un hilo lee (recibir) y otro escribe; el lock ordena las escrituras."""
+
+    def __init__(self, rfile, wfile):
+        self.rfile = rfile
+        self.wfile = wfile
+        self.cerrada = False
+        self._lock = threading.Lock()
+
+    def enviar(self, opcode, datos):
+        with self._lock:
+            self.wfile.write(marco(opcode, datos))
+            self.wfile.flush()
+
+    def enviar_texto(self, texto):
+        self.enviar(TEXTO, texto.encode('utf-8'))
+
+    def _leer(self, n):
+        datos = self.rfile.read(n)
+        if len(datos) < n:
+            raise ConnectionResetError("WebSocket cerrado a mitad de un marco")
+        return datos
+
+    def recibir(self):
+        """Próximo mensaje de texto o binario del cliente; None cuando se cierra.
+
+        Contesta los ping y el cierre; junta los fragmentos.
+        """
+        partes = []
+        while True:
+            b0, b1 = self._leer(2)
+            opcode, n = b0 & 0x0F, b1 & 0x7F
+            if n == 126:
+                n, = struct.unpack("!H", self._leer(2))
+            elif n == 127:
+                n, = struct.unpack("!Q", self._leer(8))
+            if n + sum(map(len, partes)) > MENSAJE_MAX:
+                self.cerrar(1009)
+                return None
+            mascara = self._leer(4) if b1 & 0x80 else None
+            datos = self._leer(n)
+            if mascara:
+                datos = bytes(b ^ mascara[i & 3] for i, b in enumerate(datos))
+            if opcode == CIERRE:
+                self.cerrar()
+                return None
+            if opcode == PING:
+                self.enviar(PONG, datos)
+            elif opcode in (TEXTO, BINARIO, CONTINUACION):
+                partes.append(datos)
+                if b0 & 0x80:
+                    return b"".join(partes)
+
+    def cerrar(self, codigo=1000):
+        if self.cerrada:
+            return
+        self.cerrada = True
+        try:
+            self.enviar(CIERRE, struct.pack("!H", codigo))
+        except OSError:
+            pass
+
+# ---------------- Suscripción y codificación ----------------
+class Suscripcion:
+    """Qué quiere un cliente: car (None = principal, "*" = todos), canales, max_hz (0 = todos) y delta."""
+
+    def __init__(self, car=None, canales_=None, max_hz=0.0, delta=True):
+        canales_ = list(canales_ or canales.NOMBRES)
+        desconocidos = set(canales_) - set(canales.NOMBRES)
+        if desconocidos:
+            raise ValueError(f"canales desconocidos: {', '.join(sorted(desconocidos))}")
+        self.car = car or None
+        self.canales = [n for n in canales.NOMBRES if n in canales_]   # siempre en el orden del payload
+        self.max_hz = max(float(max_hz or 0.0), 0.0)
+        self.delta = bool(delta)
+
+    @classmethod
+    def desde_query(cls, query):
+        """De parse_qs de /ws?car=&channels=a,b&max_hz=&delta=0|1."""
+        try:
+            max_hz = float(query.get('max_hz', ['0'])[0])
+        except ValueError:
+            raise ValueError("max_hz debe ser un número")
+        canales_ = query.get('channels', [''])[0]
+        return cls(query.get('car', [None])[0], canales_.split(',') if canales_ else None, max_hz,
+                   query.get('delta', ['1'])[0] not in ('0', 'false'))
+
+    @classmethod
+    def desde_mensaje(cls, texto, anterior):
+        """De un mensaje JSON del cliente; lo que no trae queda como en anterior."""
+        try:
+            pedido = json.loads(texto)
+        except ValueError:
+            raise ValueError("se esperaba JSON")
+        if not isinstance(pedido, dict):
+            raise ValueError("se esperaba un objeto JSON")
+        try:
+            max_hz = float(pedido.get('max_hz', anterior.max_hz) or 0.0)
+        except (TypeError, ValueError):
+            raise ValueError("max_hz debe ser un número")
+        canales_ = pedido.get('channels', anterior.canales)
+        if not isinstance(canales_, list):
+            raise ValueError("channels debe ser una lista")
+        return cls(pedido.get('car', anterior.car), canales_, max_hz, pedido.get('delta', anterior.delta))
+
+class Codificador:
+    """Tramas (SERVICIO_TELEMETRIA.Trama) -> cuadros binarios de una suscripción, con el estado por auto."""
+
+    def __init__(self, suscripcion, t0):
+        self.suscripcion = suscripcion
+        self.t0 = int(t0)
+        nombres = suscripcion.canales
+        self._indices = [canales.NOMBRES.index(n) + 2 for n in nombres]   # Trama: car_id, t, canales...
+        self._escalas = [canales.ESCALAS[canales.NOMBRES.index(n)] for n in nombres]
+        self._tipos = [TIPOS[n] for n in nombres]
+        self._nulos = [NULO[tipo] for tipo in self._tipos]
+        self._limites = [LIMITES[tipo] for tipo in self._tipos]
+        self._completo = struct.Struct("<" + "".join(self._tipos))
+        self._deltas = {}         # máscara -> Struct con esos canales
+        self._periodo = 1.0 / suscripcion.max_hz if suscripcion.max_hz else 0.0
+        self.autos = {}           # car_id -> índice en los cuadros
+        self._previos = {}        # índice -> últimos enteros mandados
+        self._cuadros = {}        # índice -> cuadros desde el último completo
+        self._enviado = {}        # índice -> t del último cuadro mandado
+        self.cuadros = 0
+        self.bytes = 0
+
+    def esquema(self):
+        s = self.suscripcion
+        return {
+            "type": "schema", "version": VERSION, "t0": self.t0, "endian": "little",
+            "header": "<BBI", "frame_types": {"full": COMPLETO, "delta": DELTA},
+            "car": s.car, "max_hz": s.max_hz, "delta": s.delta,
+            "channels": [{"name": n, "type": tipo, "scale": e, "unit": canales.UNIDADES[canales.NOMBRES.index(n)],
+                          "null": NULO[tipo]}
+                         for n, tipo, e in zip(s.canales, self._tipos, self._escalas)],
+            "cars": list(self.autos),
+        }
+
+    def _enteros(self, trama):
+        enteros = []
+        for i, e, nulo, (minimo, maximo) in zip(self._indices, self._escalas, self._nulos, self._limites):
+            v = trama[i]
+            enteros.append(nulo if v is None else min(max(round(v * e), minimo), maximo))
+        return enteros
+
+    def codificar(self, tramas, principal=None):
+        """(avisos de autos nuevos como dicts JSON, bytes de los cuadros) de las tramas que pasan el filtro."""
+        car = self.suscripcion.car or principal
+        avisos = []
+        partes = []
+        for trama in tramas:
+            if car != "*" and trama.car_id != car:
+                continue
+            indice = self.autos.get(trama.car_id)
+            if indice is None:
+                if len(self.autos) >= 256:   # el índice va en un byte
+                    continue
+                indice = self.autos[trama.car_id] = len(self.autos)
+                avisos.append({"type": "car", "index": indice, "car_id": trama.car_id})
+            elif self._periodo and trama.t - self._enviado[indice] < self._periodo:
+                continue
+            self._enviado[indice] = trama.t
+            ms = min(max(round((trama.t - self.t0) * 1000), 0), 2 ** 32 - 1)
+            enteros = self._enteros(trama)
+            previos = self._previos.get(indice)
+            if not self.suscripcion.delta or previos is None or self._cuadros[indice] >= CUADROS_CLAVE:
+                partes.append(CABECERA.pack(COMPLETO, indice, ms) + self._completo.pack(*enteros))
+                self._cuadros[indice] = 0
+            else:
+                mascara = 0
+                cambios = []
+                for k, (v, p) in enumerate(zip(enteros, previos)):
+                    if v != p:
+                        mascara |= 1 << k
+                        cambios.append(v)
+                formato = self._deltas.get(mascara)
+                if formato is None:
+                    formato = self._deltas[mascara] = struct.Struct(
+                        "<H" + "".join(t for k, t in enumerate(self._tipos) if mascara >> k & 1))
+                partes.append(CABECERA.pack(DELTA, indice, ms) + formato.pack(mascara, *cambios))
+                self._cuadros[indice] += 1
+            self._previos[indice] = enteros
+        datos = b"".join(partes)
+        self.cuadros += len(partes)
+        self.bytes += len(datos)
+        return avisos, datos
+
+def decodificar(datos, esquema, estado=None):
+    """Inverso de Codificador.codificar (lo mismo que hace la página con DataView).
+
+    estado: dict índice -> últimos valores, para aplicar los deltas; se
+    actualiza. Devuelve [(índice del auto, t, {canal: valor físico o None})].
+    """
+    estado = {} if estado is None else estado
+    columnas = esquema["channels"]
+    tamanos = [struct.calcsize(c["type"]) for c in columnas]
+    cuadros = []
+    offset = 0
+    while offset < len(datos):
+        tipo, indice, ms = CABECERA.unpack_from(datos, offset)
+        offset += CABECERA.size
+        mascara = (1 << len(columnas)) - 1
+        if tipo == DELTA:
+            mascara, = MASCARA.unpack_from(datos, offset)
+            offset += MASCARA.size
+        valores = estado.setdefault(indice, [None] * len(columnas))
+        for k, (c, tam) in enumerate(zip(columnas, tamanos)):
+            if mascara >> k & 1:
+                crudo, = struct.unpack_from("<" + c["type"], datos, offset)
+                offset += tam
+                valores[k] = None if crudo == c["null"] else crudo / c["scale"]
+        cuadros.append((indice, esquema["t0"] + ms / 1000, dict(zip((c["name"] for c in columnas), valores))))
+    return cuadros
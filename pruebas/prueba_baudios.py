@@ -0,0 +1,203 @@
+"""
+Negociación de baudios entre SERVICIO_TELEMETRIA y RECEPTORR sobre un pty
+(os.openpty). La PC usa pyserial sobre el esclavo, como con el COM real; la
+sección NEGOCIACIÓN DE BAUDIOS de RECEPTORR.py corre en un hilo con una UART
+sobre el maestro. La velocidad de la PC se lee del termios del pty: si no
+coincide con la de la UART, los bytes llegan como basura.
+
+    python pruebas/prueba_baudios.py
+"""
+import os
+import sys
+import termios
+import threading
+import time
+import types
+
+RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, RAIZ)
+import serial
+import SERVICIO_TELEMETRIA as servicio
+
+TIMEOUT_CONFIRMACION_MS = 500
+ESPERA_TX_MS = 300
+VELOCIDADES = {getattr(termios, "B{}".format(b)): b for b in servicio.BAUDIOS_PERMITIDOS}
+
+def seccion_negociacion():
+    with open(os.path.join(RAIZ, "RECEPTORR.py"), encoding="utf-8") as f:
+        texto = f.read()
+    inicio = texto.index("# =================== NEGOCIACIÓN DE BAUDIOS")
+    return compile(texto[inicio:texto.index("# =================== PROGRAMA PRINCIPAL")], "RECEPTORR.py", "exec")
+
+class UARTPty:
+    """machine.UART de la Pico sobre el maestro del pty.
+
+    Lo escrito llega a la PC recién cuando terminó de salir a los baudios de la UART.
+    """
+
+    def __init__(self, fd, baudrate):
+        self.fd = fd
+        self.baudrate = baudrate
+        self.fin_tx = 0.0
+        self.saliendo = []   # (t en que termina de salir, datos, baudios al escribir)
+        self.rx = bytearray()
+        os.set_blocking(fd, False)
+
+    def init(self, baudrate=None, **kwargs):
+        if baudrate:
+            self.baudrate = baudrate
+
+    def _baud_pc(self):
+        return VELOCIDADES.get(termios.tcgetattr(self.fd)[5])
+
+    def write(self, datos):
+        self.fin_tx = max(self.fin_tx, time.monotonic()) + len(datos) * 10 / self.baudrate
+        self.saliendo.append((self.fin_tx, bytes(datos), self.baudrate))
+        return len(datos)
+
+    def txdone(self):
+        return time.monotonic() >= self.fin_tx
+
+    def entregar(self):
+        ahora = time.monotonic()
+        while self.saliendo and self.saliendo[0][0] <= ahora:
+            _, datos, baud = self.saliendo.pop(0)
+            os.write(self.fd, datos if self._baud_pc() == baud else b"\xff" * len(datos))
+
+    def any(self):
+        self.entregar()
+        try:
+            datos = os.read(self.fd, 4096)
+        except BlockingIOError:
+            datos = b""
+        self.rx += datos if self._baud_pc() == self.baudrate else b"\xff" * len(datos)
+        return len(self.rx)
+
+    def read(self, n):
+        datos = bytes(self.rx[:n])
+        del self.rx[:n]
+        return datos or None
+
+class Receptor:
+    """El bucle de RECEPTORR reducido a atender_pc(), en un hilo."""
+
+    def __init__(self, fd):
+        self.uart = UARTPty(fd, servicio.BAUDRATE)
+        reloj = types.SimpleNamespace(ticks_ms=lambda: int(time.monotonic() * 1000),
+                                      ticks_diff=lambda a, b: a - b)
+        self.g = {"uart_pc": self.uart, "Pin": lambda *a, **k: None, "time": reloj,
+                  "BAUD_BASE": servicio.BAUDRATE, "BAUDIOS_PERMITIDOS": servicio.BAUDIOS_PERMITIDOS,
+                  "TIMEOUT_CONFIRMACION_MS": TIMEOUT_CONFIRMACION_MS, "ESPERA_TX_MS": ESPERA_TX_MS,
+                  "print": lambda *a, **k: None}
+        exec(seccion_negociacion(), self.g)
+        self.activo = True
+        self.vuelta_max = 0.0
+        self._fin = False
+        self._hilo = threading.Thread(target=self._bucle, daemon=True)
+        self._hilo.start()
+
+    def _bucle(self):
+        while not self._fin:
+            if self.activo:
+                t0 = time.monotonic()
+                self.g["atender_pc"]()
+                self.vuelta_max = max(self.vuelta_max, time.monotonic() - t0)
+            time.sleep(0.001)
+
+    @property
+    def baud(self):
+        return self.g["baud_actual"]
+
+    def detener(self):
+        self._fin = True
+        self._hilo.join()
+
+def enlace(prueba):
+    """Corre prueba(pc, receptor, esclavo) con un pty nuevo y la PC a BAUDRATE."""
+    def correr():
+        maestro, esclavo = os.openpty()
+        receptor = Receptor(maestro)
+        pc = serial.Serial(os.ttyname(esclavo), servicio.BAUDRATE, timeout=0.05)
+        try:
+            prueba(pc, receptor, esclavo)
+        finally:
+            receptor.detener()
+            pc.close()
+            os.close(maestro)
+            os.close(esclavo)
+    correr.__name__ = prueba.__name__
+    return correr
+
+def esperar(condicion, segundos=2.0):
+    limite = time.monotonic() + segundos
+    while not condicion() and time.monotonic() < limite:
+        time.sleep(0.01)
+    return condicion()
+
+@enlace
+def prueba_negocia_la_velocidad_objetivo(pc, receptor, esclavo):
+    assert servicio.negociar_baudios(pc) == servicio.BAUDRATE_OBJETIVO
+    assert pc.baudrate == receptor.baud == servicio.BAUDRATE_OBJETIVO
+    assert not receptor.g["baud_sin_confirmar"]
+    receptor.uart.write(b"Car:A1 AccX:1.00\n")
+    assert esperar(lambda: pc.in_waiting)
+    assert pc.readline() == b"Car:A1 AccX:1.00\n"
+
+@enlace
+def prueba_pc_reiniciada_encuentra_la_velocidad(pc, receptor, esclavo):
+    assert servicio.negociar_baudios(pc) == servicio.BAUDRATE_OBJETIVO
+    pc.close()
+    pc.open()
+    pc.baudrate = servicio.BAUDRATE   # la PC arranca de nuevo en la base; el receptor sigue en 115200
+    assert servicio.negociar_baudios(pc) == servicio.BAUDRATE_OBJETIVO
+    assert receptor.baud == servicio.BAUDRATE_OBJETIVO
+
+@enlace
+def prueba_receptor_viejo_queda_en_la_base(pc, receptor, esclavo):
+    receptor.activo = False   # firmware sin negociación: no contesta nada
+    assert servicio.negociar_baudios(pc) == servicio.BAUDRATE
+    assert pc.baudrate == servicio.BAUDRATE
+
+@enlace
+def prueba_sin_ping_vuelve_a_la_base(pc, receptor, esclavo):
+    pc.write(b"@BAUD 57600\n")
+    assert servicio.esperar_respuesta(pc, "@ACK 57600")
+    assert esperar(lambda: receptor.baud == 57600)
+    assert esperar(lambda: receptor.baud == servicio.BAUDRATE)   # vence TIMEOUT_CONFIRMACION_MS
+    assert not receptor.g["baud_sin_confirmar"]
+
+@enlace
+def prueba_velocidad_no_soportada(pc, receptor, esclavo):
+    pc.write(b"@BAUD 12345\n")
+    assert servicio.esperar_respuesta(pc, "@NAK 12345")
+    assert receptor.baud == servicio.BAUDRATE
+
+def prueba_espera_alcanza_para_una_trama_a_1200():
+    assert servicio.timeout_negociacion(1200) >= 3.0
+    assert servicio.timeout_negociacion(1200) > servicio.LARGO_TRAMA_MAX * 10 / 1200 * 2
+
+@enlace
+def prueba_ack_detras_de_una_trama_no_frena_el_bucle(pc, receptor, esclavo):
+    # La trama de texto más larga tarda ~2,3 s en salir a 1200 baudios: el @ACK va detrás,
+    # la PC lo espera con timeout_negociacion() y el cambio espera a txdone() sin trabar atender_pc
+    receptor.g["ESPERA_TX_MS"] = 2500   # el de RECEPTORR: alcanza para vaciar el búfer a 1200
+    receptor.uart.write(b"x" * (servicio.LARGO_TRAMA_MAX - 1) + b"\n")
+    inicio = time.monotonic()
+    assert servicio.negociar_baudios(pc) == servicio.BAUDRATE_OBJETIVO
+    assert time.monotonic() - inicio > servicio.LARGO_TRAMA_MAX * 10 / servicio.BAUDRATE
+    assert receptor.vuelta_max < 0.05, receptor.vuelta_max
+
+@enlace
+def prueba_uart_trabada_cambia_al_vencer_la_espera(pc, receptor, esclavo):
+    receptor.uart.txdone = lambda: False
+    pc.write(b"@BAUD 57600\n")
+    assert servicio.esperar_respuesta(pc, "@ACK 57600")
+    assert receptor.baud == servicio.BAUDRATE
+    assert esperar(lambda: receptor.baud == 57600, ESPERA_TX_MS / 1000 + 0.5)
+    assert receptor.vuelta_max < 0.05, receptor.vuelta_max
+
+if __name__ == "__main__":
+    for nombre, prueba in list(globals().items()):
+        if nombre.startswith("prueba_") and callable(prueba):
+            prueba()
+            print(f"✅ {nombre}")
@@ -0,0 +1,84 @@
+"""
+/debug/profile y /debug/trace de SERVICIO_TELEMETRIA contra un servidor real
+en 127.0.0.1: solo se atienden desde esta PC (salvo DEBUG_REMOTO), y
+seconds / hz fuera de rango o no finitos no tiran el manejador.
+
+    python pruebas/prueba_debug.py
+"""
+import http.client
+import os
+import sys
+import threading
+from http.server import ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import SERVICIO_TELEMETRIA as servicio
+
+class Servidor:
+    """TelemetryHandler en un puerto libre; remoto=True lo hace ver como un cliente de la red."""
+
+    def __init__(self, remoto=False):
+        class Manejador(servicio.TelemetryHandler):
+            def setup(self):
+                super().setup()
+                if remoto:
+                    self.client_address = ("192.168.4.23", self.client_address[1])
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Manejador)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def get(self, ruta):
+        conexion = http.client.HTTPConnection("127.0.0.1", self.server.server_address[1], timeout=10)
+        try:
+            conexion.request("GET", ruta)
+            respuesta = conexion.getresponse()
+            return respuesta.status, respuesta.read()
+        finally:
+            conexion.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *error):
+        self.server.shutdown()
+        self.server.server_close()
+
+def prueba_debug_desde_la_red_se_rechaza():
+    with Servidor(remoto=True) as s:
+        for ruta in ("/debug/profile?seconds=0.1", "/debug/trace/start", "/debug/trace?seconds=0.1",
+                     "/debug/trace/stop"):
+            assert s.get(ruta)[0] == 403, ruta
+        assert not servicio.trazador.activo
+        assert s.get("/pipeline")[0] == 200      # el resto de la página sigue abierto
+
+def prueba_debug_remoto_configurado():
+    servicio.DEBUG_REMOTO = True
+    try:
+        with Servidor(remoto=True) as s:
+            assert s.get("/debug/profile?seconds=0.1")[0] == 200
+    finally:
+        servicio.DEBUG_REMOTO = False
+
+def prueba_debug_desde_esta_pc():
+    with Servidor() as s:
+        estado, cuerpo = s.get("/debug/profile?seconds=0.1")
+        assert estado == 200, estado
+        assert s.get("/debug/trace/start") == (200, b'{"tracing": true}')
+        assert s.get("/debug/trace/stop")[0] == 200
+        assert not servicio.trazador.activo
+
+def prueba_seconds_y_hz_invalidos():
+    with Servidor() as s:
+        for ruta in ("/debug/profile?seconds=nan", "/debug/profile?seconds=inf", "/debug/profile?hz=nan",
+                     "/debug/profile?seconds=x", "/debug/trace?seconds=nan", "/debug/trace?seconds=-inf"):
+            assert s.get(ruta)[0] == 400, ruta
+        # Negativos quedan en 0: responde enseguida, sin ValueError de time.sleep
+        assert s.get("/debug/profile?seconds=-1")[0] == 200
+        assert s.get("/debug/trace?seconds=-1")[0] == 200
+        assert not servicio.trazador.activo
+
+if __name__ == "__main__":
+    for nombre, prueba in list(globals().items()):
+        if nombre.startswith("prueba_") and callable(prueba):
+            prueba()
+            print(f"✅ {nombre}")
@@ -0,0 +1,82 @@
+"""
+Enlace del joystick sobre el simulador: Tx control.py y Rx16-1.py
+con el medio de radio virtual. Cuenta de perdidos por secuencia del Rx contra
+lo que realmente se perdió, y tasa de envío del Tx con la zona muerta
+(joystick quieto con ruido), sin ella (ruido mayor que la zona muerta) y con
+el joystick moviéndose.
+
+    python pruebas/prueba_enlace_control.py
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'simulador'))
+import simular
+
+QUIETO_DESDE_US = simular.CALENTAMIENTO_US + 500000   # el joystick da un paso al terminar el calentamiento
+
+def correr(segundos=10.0, perdida=0.0, paso_joystick_ms=500.0, ruido_adc=simular.RUIDO_ADC):
+    args = argparse.Namespace(segundos=segundos, perdida=perdida, latencia_us=0, jitter_us=0, interferencia=[],
+                              perdida_wifi=0.0, latencia_wifi_ms=5.0, paso_joystick_ms=paso_joystick_ms,
+                              param=[], semilla=1, eco=False)
+    ruido, simular.RUIDO_ADC = simular.RUIDO_ADC, ruido_adc
+    try:
+        resultado, placas = simular.simular(args)
+    finally:
+        simular.RUIDO_ADC = ruido
+    for nombre in ("tx", "rx"):
+        assert placas[nombre].error is None, placas[nombre].error
+    return resultado, placas
+
+def envios_por_segundo(placa, desde_us, hasta_us):
+    tiempos = [t for t, _ in placa.chip.registro_tx if desde_us <= t < hasta_us]
+    huecos = [b - a for a, b in zip(tiempos, tiempos[1:])]
+    return len(tiempos) * 1e6 / (hasta_us - desde_us), max(huecos) / 1000
+
+def prueba_perdidos_por_secuencia():
+    _, placas = correr(segundos=12.0, perdida=0.1)
+    tx, rx = placas["tx"], placas["rx"]
+    g = rx.globales
+    assert not any("FAILSAFE" in texto for t, texto in rx.log if t > simular.CALENTAMIENTO_US)
+    # Lo que leyó el firmware (los primeros paquetes_ok de lo que llegó al chip), ubicado
+    # en la lista de lo enviado: los que faltan entre el primero y el último son los perdidos
+    recibidos = [payload for _, payload in rx.chip.registro_rx[:g["paquetes_ok"]]]
+    enviados = [payload for _, payload in tx.chip.registro_tx]
+    posiciones = []
+    k = 0
+    for payload in recibidos:
+        while enviados[k] != payload:
+            k += 1
+        posiciones.append(k)
+        k += 1
+    perdidos = posiciones[-1] - posiciones[0] + 1 - len(posiciones)
+    assert perdidos > 0.05 * len(posiciones)
+    assert g["paquetes_perdidos"] == perdidos, (g["paquetes_perdidos"], perdidos)
+
+def prueba_quieto_solo_keep_alive():
+    # Joystick quieto (salvo el paso al terminar el calentamiento) con ruido de ±150 LSB:
+    # la zona muerta (400) lo absorbe
+    _, placas = correr(paso_joystick_ms=1e9)
+    tasa, hueco = envios_por_segundo(placas["tx"], QUIETO_DESDE_US, 10000000)
+    assert 3.5 <= tasa <= 4.5, tasa
+    assert hueco <= placas["tx"].globales["PERIODO_REPOSO_MS"] + 15, hueco
+
+def prueba_ruido_mayor_que_la_zona_muerta():
+    _, placas = correr(paso_joystick_ms=1e9, ruido_adc=6000)
+    tasa, _ = envios_por_segundo(placas["tx"], QUIETO_DESDE_US, 10000000)
+    assert tasa > 20, tasa
+
+def prueba_en_movimiento_manda_seguido():
+    resultado, placas = correr(paso_joystick_ms=50.0)
+    tasa, hueco = envios_por_segundo(placas["tx"], simular.CALENTAMIENTO_US, 10000000)
+    assert tasa > 50, tasa
+    assert hueco <= 3 * placas["tx"].globales["PERIODO_ACTIVO_MS"], hueco
+    servo = resultado["control_latency_ms"]["servo"]
+    assert servo["p95"] < 20 and servo["no_response"] == 0, servo
+
+if __name__ == "__main__":
+    for nombre, prueba in list(globals().items()):
+        if nombre.startswith("prueba_") and callable(prueba):
+            prueba()
+            print(f"✅ {nombre}")
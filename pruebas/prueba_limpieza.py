@@ -0,0 +1,82 @@
+"""
+limpieza.py: limpiar_tandas() por tandas de distintos tamaños tiene que dar
+lo mismo que limpiar() sobre la sesión entera, en las banderas y en los valores.
+
+    python pruebas/prueba_limpieza.py
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, RAIZ)
+import limpieza
+
+def sesion_sucia(filas=3000, semilla=5):
+    """telemetria2.csv repetida con ruido, picos, saltos y huecos largos (más que una tanda)."""
+    rng = np.random.default_rng(semilla)
+    base = pd.read_csv(os.path.join(RAIZ, "telemetria2.csv"))
+    df = base.iloc[np.arange(filas) % len(base)].reset_index(drop=True)
+    df["id"] = np.arange(filas)
+    for columna in ("altitud", "velocidad", "bateria", "temperatura", "gps_lat", "gps_lon"):
+        x = df[columna].to_numpy(dtype=np.float64)
+        x = x + np.cumsum(rng.normal(0, 0.02, filas)) * np.abs(x).mean()
+        picos = rng.random(filas) < 0.02
+        x[picos] += rng.choice([-1, 1], picos.sum()) * np.abs(x).mean()
+        for inicio in rng.integers(0, filas, 6):
+            x[inicio:inicio + rng.integers(1, 400)] = np.nan
+        df[columna] = x
+    return df
+
+def comparar(entera, partes):
+    tandas = pd.concat(partes, ignore_index=True)
+    assert len(tandas) == len(entera), (len(tandas), len(entera))
+    distintas = np.count_nonzero(tandas["calidad"].to_numpy() != entera["calidad"].to_numpy())
+    assert distintas == 0, distintas
+    for columna in entera.columns:
+        a, b = entera[columna].to_numpy(dtype=np.float64), tandas[columna].to_numpy(dtype=np.float64)
+        assert ((a == b) | (np.isnan(a) & np.isnan(b))).all(), columna
+
+def prueba_tandas_igual_a_entera():
+    df = sesion_sucia()
+    entera = limpieza.limpiar(df)
+    assert np.count_nonzero(entera["calidad"] & (limpieza.PICO | limpieza.SALTO))
+    for filas_tanda in (1, 13, 50, 100, 137, 500, 5000):
+        tandas = (df.iloc[i:i + filas_tanda] for i in range(0, len(df), filas_tanda))
+        comparar(entera, list(limpieza.limpiar_tandas(tandas)))
+
+def prueba_tandas_sin_columna_de_tiempo():
+    # Sin t ni id el tiempo sale del número de fila: tiene que seguir de una tanda a la otra
+    df = sesion_sucia(1000, 7).drop(columns="id")
+    entera = limpieza.limpiar(df)
+    for filas_tanda in (50, 137):
+        tandas = (df.iloc[i:i + filas_tanda] for i in range(0, len(df), filas_tanda))
+        comparar(entera, list(limpieza.limpiar_tandas(tandas)))
+
+def marcadas(archivo, bandera):
+    """{canal: filas enmascaradas por bandera} de limpiar() sobre un CSV del repo."""
+    df = pd.read_csv(os.path.join(RAIZ, archivo))
+    limpia = limpieza.limpiar(df)
+    filas = (limpia["calidad"].to_numpy() & bandera) != 0
+    resultado = {}
+    for columna in df.columns:
+        enmascaradas = np.flatnonzero(filas & df[columna].notna().to_numpy() & limpia[columna].isna().to_numpy())
+        if len(enmascaradas):
+            resultado[columna] = enmascaradas.tolist()
+    return resultado
+
+def prueba_umbrales_con_sesiones_reales():
+    # telemetria2.csv: solo las lecturas locas del LM35 (60, 70.5, 104.3, 36.2, 60.8, 60.6, 99.7, 77.2 °C);
+    # la batería que cae a ~7.2 V con el motor y vuelve a 8.00 / 7.99 V no es pico ni salto
+    assert marcadas("telemetria2.csv", limpieza.PICO | limpieza.SALTO) == {
+        "temperatura": [6, 7, 19, 21, 35, 36, 41, 42]}
+    # contrarreloj: la altitud con un dígito de menos (257 entre 2577 y 2578)
+    assert marcadas("telemetria(contrareloj).csv", limpieza.PICO | limpieza.SALTO) == {"altitud": [49]}
+
+if __name__ == "__main__":
+    for nombre, prueba in list(globals().items()):
+        if nombre.startswith("prueba_") and callable(prueba):
+            prueba()
+            print(f"✅ {nombre}")
@@ -0,0 +1,101 @@
+"""
+Modo multiproceso de SERVICIO_TELEMETRIA: proceso_parser (en un hilo, sobre
+el mismo bloque de memoria compartida) escribe el anillo y recolectar lo lleva
+a los autos. /history, /telemetry y lo publicado tienen que dar lo mismo que
+el parser de un hilo con las mismas líneas.
+
+    python pruebas/prueba_memoria_compartida.py
+"""
+import multiprocessing
+import os
+import queue
+import random
+import re
+import sys
+import threading
+
+RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.join(RAIZ, 'benchmarks'))
+import SERVICIO_TELEMETRIA as servicio
+from memoria_compartida import AnilloCompartido
+from bench_multiauto import trama_aleatoria
+
+LARGO = 256
+
+def lineas(car_id, n, semilla):
+    random.seed(semilla)
+    salida = [trama_aleatoria(car_id).rstrip(b"\n") for _ in range(n)]
+    for i in range(3):   # las primeras sin sensor de línea: line queda sin dato (NaN en el anillo)
+        salida[i] = re.sub(rb" \| Linea:\d+", b"", salida[i])
+    return [(f"P_{car_id}", 1000.0 + i / 100, linea) for i, linea in enumerate(salida)]
+
+def por_hilo(car_id, entrada):
+    for puerto, t, linea in entrada:
+        servicio.procesar_linea(linea, puerto, t)
+    return servicio.autos[car_id]
+
+def por_anillo(car_id, entrada, lote=37):
+    """Las líneas pasan por proceso_parser y recolectar, de a lotes como etapa_multiproceso."""
+    anillo = AnilloCompartido(servicio.COLUMNAS_HISTORIAL, 4, LARGO, lock=multiprocessing.Lock())
+    cola = queue.Queue()
+    hilo = threading.Thread(target=servicio.proceso_parser, args=(anillo.parametros(), cola))
+    hilo.start()
+    leidas, conocidos = {}, []
+    try:
+        for i in range(0, len(entrada), lote):
+            cola.put(entrada[i:i + lote])
+            esperado = min(len(entrada), i + lote)
+            while leidas.get(0, 0) < esperado:
+                conocidos = servicio.recolectar(anillo, leidas, conocidos)
+        return servicio.autos[car_id], anillo
+    finally:
+        cola.put(None)
+        hilo.join()
+
+def prueba_history_y_telemetry_como_el_hilo():
+    hilo = por_hilo("HILO", lineas("HILO", 200, 1))
+    anillo_auto, anillo = por_anillo("ANILLO", lineas("ANILLO", 200, 1))
+    try:
+        assert anillo_auto.tramas == hilo.tramas == 200
+        assert anillo_auto.telemetry == hilo.telemetry
+        for n in (1, 10, 200):
+            assert anillo_auto.historial_filas(n) == hilo.historial_filas(n), n
+        # line sin dato sale como None (JSON válido), no como NaN
+        assert anillo_auto.historial_filas(200)[0][servicio.COLUMNAS_HISTORIAL.index("line")] is None
+        assert not anillo_auto.historial       # no se armó una Trama por fila
+    finally:
+        anillo.cerrar()
+
+def prueba_history_con_el_anillo_dado_vuelta():
+    hilo = por_hilo("HILO_LARGO", lineas("HILO_LARGO", 600, 3))
+    anillo_auto, anillo = por_anillo("ANILLO_LARGO", lineas("ANILLO_LARGO", 600, 3))
+    try:
+        # El anillo guarda LARGO muestras: no devuelve más que esas
+        assert anillo_auto.historial_filas(1000) == hilo.historial_filas(LARGO)
+        assert anillo_auto.historial_filas(LARGO - 1) == hilo.historial_filas(LARGO - 1)
+    finally:
+        anillo.cerrar()
+
+def prueba_solo_arma_tramas_con_suscriptores():
+    publicadas = servicio.publicador.publicadas
+    _, anillo = por_anillo("SIN_SUSCRIPTOR", lineas("SIN_SUSCRIPTOR", 100, 2))
+    anillo.cerrar()
+    assert servicio.publicador.publicadas == publicadas
+
+    cola = servicio.publicador.suscribir("prueba", 1000)
+    try:
+        _, anillo = por_anillo("SUSCRIPTOR", lineas("SUSCRIPTOR", 100, 2))
+        anillo.cerrar()
+    finally:
+        servicio.publicador.desuscribir(cola)
+    recibidas = cola.sacar_todo(timeout=0)
+    hilo = por_hilo("SUSCRIPTOR_HILO", lineas("SUSCRIPTOR_HILO", 100, 2))
+    assert len(recibidas) == 100
+    assert recibidas == [trama._replace(car_id="SUSCRIPTOR") for trama in hilo.historial]
+
+if __name__ == "__main__":
+    for nombre, prueba in list(globals().items()):
+        if nombre.startswith("prueba_") and callable(prueba):
+            prueba()
+            print(f"✅ {nombre}")
@@ -0,0 +1,80 @@
+"""
+RECEPTORR.py sobre el simulador: las tres placas y el receptor con el reloj
+virtual, y la UART hacia la PC a BAUD_BASE (1200). El write de la UART
+simulada espera a que entre la trama en el búfer, como en rp2.
+
+    python pruebas/prueba_receptor.py
+"""
+import argparse
+import os
+import struct
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'simulador'))
+import simular
+
+SEGUNDOS = 10.0
+LATENCIA_WIFI_MS = 5.0
+
+def correr_placas(**receptor):
+    """simular.simular con estas constantes de RECEPTORR cambiadas: (resultado, placas)."""
+    args = argparse.Namespace(segundos=SEGUNDOS, perdida=0.0, latencia_us=0, jitter_us=0, interferencia=[],
+                              perdida_wifi=0.0, latencia_wifi_ms=LATENCIA_WIFI_MS, paso_joystick_ms=500.0,
+                              param=["receptor.{}={!r}".format(k, v) for k, v in receptor.items()],
+                              semilla=1, eco=False)
+    resultado, placas = simular.simular(args)
+    assert resultado["boards"]["receptor"]["error"] is None, resultado["boards"]["receptor"]["error"]
+    return resultado, placas
+
+def correr(**receptor):
+    return correr_placas(**receptor)[0]
+
+def prueba_reenvio_por_defecto_no_frena_la_radio():
+    resultado = correr()
+    radio = resultado["hops"]["radio_telemetry"]
+    assert radio["loss_pct"] == 0.0 and radio["rx_overflow"] == 0, radio
+    assert resultado["hops"]["udp_to_pc"]["loss_pct"] == 0.0, resultado["hops"]["udp_to_pc"]
+    edad_udp = resultado["telemetry_age_ms"]["pc_udp"]
+    assert edad_udp["p99"] < 300, edad_udp
+    # A 1200 baudios entra una trama de texto cada ~1,9 s, siempre la más nueva
+    uart = resultado["hops"]["uart_to_pc"]
+    assert uart["received"] >= SEGUNDOS / 2.5, uart
+    assert resultado["telemetry_age_ms"]["pc_uart"]["max"] < 2500, resultado["telemetry_age_ms"]["pc_uart"]
+
+def prueba_todas_a_1200_baudios_pierde_radio():
+    # Lo que evita el modo por defecto: cada write espera ~1,9 s y la FIFO del NRF se llena
+    resultado = correr(MODO_REENVIO="todas")
+    assert resultado["hops"]["radio_telemetry"]["loss_pct"] > 10, resultado["hops"]["radio_telemetry"]
+
+def prueba_todas_con_enlace_rapido():
+    resultado = correr(MODO_REENVIO="todas", BAUD_BASE=115200)
+    assert resultado["hops"]["radio_telemetry"]["loss_pct"] == 0.0, resultado["hops"]["radio_telemetry"]
+    assert resultado["hops"]["uart_to_pc"]["loss_pct"] == 0.0, resultado["hops"]["uart_to_pc"]
+
+def prueba_udp_lleva_la_hora_de_cada_paquete():
+    # Llegada del datagrama - latencia del WiFi - edad = cuando el NRF entregó ese payload
+    _, placas = correr_placas()
+    receptor = placas["receptor"]
+    servicio = simular.servicio
+    cabecera, paquete = servicio.CABECERA_UDP.size, servicio.PAQUETE_NRF.size
+    llegada_nrf = {}
+    for t, payload in receptor.chip.registro_rx:
+        llegada_nrf.setdefault(bytes(payload), t)
+    errores_ms = []
+    for t, _, datagrama in receptor.red.datagramas:
+        cantidad = servicio.CABECERA_UDP.unpack_from(datagrama)[3]
+        fin = cabecera + cantidad * paquete
+        assert len(datagrama) == fin + 2 * cantidad
+        edades = struct.unpack_from("<{}H".format(cantidad), datagrama, fin)
+        for k, edad in enumerate(edades):
+            payload = datagrama[cabecera + k * paquete:cabecera + (k + 1) * paquete]
+            estimada = t - LATENCIA_WIFI_MS * 1000 - edad * 1000
+            errores_ms.append((estimada - llegada_nrf[payload]) / 1000)
+    assert len(errores_ms) > SEGUNDOS * 2, len(errores_ms)
+    assert max(map(abs, errores_ms)) < 3, (min(errores_ms), max(errores_ms))
+
+if __name__ == "__main__":
+    for nombre, prueba in list(globals().items()):
+        if nombre.startswith("prueba_") and callable(prueba):
+            prueba()
+            print(f"✅ {nombre}")
@@ -0,0 +1,137 @@
+"""
+servidor_vueltas.py: la tabla incremental contra una recalculada desde cero,
+y los POST con datos rotos contra un servidor real en un puerto libre.
+
+    python pruebas/prueba_servidor_vueltas.py
+"""
+import http.client
+import json
+import os
+import random
+import socket
+import sys
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import servidor_vueltas
+
+def tabla_desde_cero(autos):
+    orden = sorted((a["best_ms"], car_id) for car_id, a in autos.items())
+    filas = []
+    for i, (mejor, car_id) in enumerate(orden):
+        filas.append({"position": i + 1, "car_id": car_id, "team": autos[car_id]["team"],
+                      "best_lap_ms": mejor, "last_lap_ms": autos[car_id]["last_ms"],
+                      "laps": autos[car_id]["laps"], "gap_ms": mejor - orden[0][0],
+                      "interval_ms": mejor - orden[i - 1][0] if i else 0})
+    return filas
+
+def prueba_tabla_incremental_igual_a_recalculada():
+    rng = random.Random(3)
+    tabla = servidor_vueltas.TablaPosiciones()
+    autos = {}
+    for n in range(3000):
+        car_id = "A{}".format(rng.randrange(40))
+        lap_ms = rng.randrange(60000, 90000)
+        assert tabla.registrar(car_id, "E" + car_id, lap_ms, n)
+        auto = autos.setdefault(car_id, {"team": "E" + car_id, "best_ms": lap_ms, "laps": 0})
+        auto.update(best_ms=min(auto["best_ms"], lap_ms), last_ms=lap_ms, laps=auto["laps"] + 1)
+        if n % 7 == 0 or n < 100:
+            assert json.loads(tabla.json()[1]) == tabla_desde_cero(autos), n
+    assert tabla.posiciones() == tabla_desde_cero(autos)
+    assert not tabla.registrar(car_id, "", 1, n)   # (car_id, lap_number) repetido
+    assert tabla.posiciones()[0]["best_lap_ms"] > 1
+
+class Servidor:
+    def __enter__(self):
+        self.tabla = servidor_vueltas.TablaPosiciones()
+        tabla = self.tabla
+
+        class Manejador(servidor_vueltas.ManejadorVueltas):
+            def do_POST(self):
+                servidor_vueltas.atender_post_vuelta(self, tabla)
+
+        self.server = servidor_vueltas.ServidorVueltas(("127.0.0.1", 0), Manejador)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.conexion = http.client.HTTPConnection("127.0.0.1", self.server.server_address[1], timeout=5)
+        return self
+
+    def post(self, cuerpo, ruta="/api/lap"):
+        if not isinstance(cuerpo, bytes):
+            cuerpo = json.dumps(cuerpo).encode('utf-8')
+        self.conexion.request("POST", ruta, cuerpo, {"Content-Type": "application/json"})
+        respuesta = self.conexion.getresponse()
+        return respuesta.status, json.loads(respuesta.read())
+
+    def __exit__(self, *error):
+        self.conexion.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+def prueba_post_invalido_responde_400():
+    buena = {"car_id": "A1", "team": "E1", "lap_time_ms": 65000, "lap_number_debug": 1}
+    malas = [
+        dict(buena, lap_number_debug=[1, 2]),   # no se puede usar en el set de vistas
+        dict(buena, lap_number_debug={"n": 1}),
+        dict(buena, lap_time_ms=0),
+        dict(buena, lap_time_ms=-5),
+        dict(buena, lap_time_ms=65000.5),
+        dict(buena, lap_time_ms="65000"),
+        dict(buena, lap_time_ms=True),
+        dict(buena, lap_time_ms=10 ** 12),
+        dict(buena, car_id=""),
+        dict(buena, car_id=None),
+        dict(buena, car_id="x" * 100),
+        dict(buena, team=["E1"]),
+        {"team": "E1", "lap_time_ms": 65000},
+        [buena, dict(buena, lap_time_ms=0)],     # una mala rechaza el lote entero
+        [],
+        "vuelta",
+    ]
+    with Servidor() as s:
+        for mala in malas:
+            estado, cuerpo = s.post(mala, "/api/laps" if isinstance(mala, list) else "/api/lap")
+            assert estado == 400 and cuerpo["ok"] is False, (mala, estado, cuerpo)
+        for crudo in (b"{", b"\xff\xfe", b"NaN"):
+            assert s.post(crudo)[0] == 400, crudo
+        assert s.tabla.recibidas == 0
+        # La misma conexión sigue sirviendo después de los 400
+        assert s.post(buena) == (200, {"ok": True, "duplicate": False})
+        assert s.post(buena) == (200, {"ok": True, "duplicate": True})
+        assert s.post(dict(buena, lap_time_ms=64000.0, lap_number_debug=2))[0] == 200
+        assert s.tabla.posiciones()[0]["best_lap_ms"] == 64000
+
+def crudo(puerto, peticion):
+    """Manda bytes tal cual por un socket nuevo; devuelve todo lo recibido hasta que el servidor cierra."""
+    with socket.create_connection(("127.0.0.1", puerto), timeout=5) as s:
+        s.sendall(peticion)
+        recibido = b""
+        try:
+            while True:
+                datos = s.recv(65536)
+                if not datos:
+                    return recibido
+                recibido += datos
+        except socket.timeout:
+            return recibido + b"<sigue abierta>"
+
+def prueba_content_length_malo_cierra_la_conexion():
+    cuerpo = json.dumps({"car_id": "A1", "team": "E1", "lap_time_ms": 65000}).encode('utf-8')
+    # El cuerpo sin leer no puede quedar como la próxima petición de la conexión
+    encabezados = (b"",                                                   # sin Content-Length
+                   b"Content-Length: 0\r\n",
+                   b"Content-Length: abc\r\n",
+                   b"Content-Length: %d\r\n" % (servidor_vueltas.MAX_CUERPO + 1))
+    with Servidor() as s:
+        for encabezado in encabezados:
+            respuesta = crudo(s.server.server_address[1],
+                              b"POST /api/lap HTTP/1.1\r\nHost: x\r\n" + encabezado + b"\r\n" + cuerpo)
+            assert respuesta.startswith(b"HTTP/1.1 400"), respuesta
+            assert b"Connection: close" in respuesta and respuesta.count(b"HTTP/1.1") == 1, respuesta
+            assert not respuesta.endswith(b"<sigue abierta>"), respuesta
+        assert s.tabla.recibidas == 0
+
+if __name__ == "__main__":
+    for nombre, prueba in list(globals().items()):
+        if nombre.startswith("prueba_") and callable(prueba):
+            prueba()
+            print(f"✅ {nombre}")
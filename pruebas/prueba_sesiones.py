@@ -0,0 +1,70 @@
+"""
+sesiones.py: ida y vuelta CSV -> .tlm -> DataFrame con celdas vacías, y
+filas en vivo con canales sin dato (None, NaN, inf).
+
+    python pruebas/prueba_sesiones.py
+"""
+import math
+import os
+import random
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, RAIZ)
+import canales
+import sesiones
+
+def prueba_csv_con_celdas_vacias():
+    df = pd.read_csv(os.path.join(RAIZ, "telemetria2.csv"))
+    rng = random.Random(1)
+    for _ in range(40):
+        df.loc[rng.randrange(len(df)), rng.choice(canales.COLUMNAS_CSV)] = np.nan
+    df.loc[0, "linea"] = np.nan     # primera fila de un bloque
+    with tempfile.TemporaryDirectory() as carpeta:
+        csv, tlm = os.path.join(carpeta, "s.csv"), os.path.join(carpeta, "s.tlm")
+        df.to_csv(csv, index=False)
+        codificador = sesiones.convertir_csv(csv, tlm)
+        assert codificador.filas == len(df)
+        leido = sesiones.cargar_sesion(tlm)
+    for columna, escala in zip(canales.COLUMNAS_CSV, canales.ESCALAS):
+        original, vuelta = df[columna].to_numpy(), leido[columna].to_numpy()
+        assert (np.isnan(original) == np.isnan(vuelta)).all(), columna
+        validos = ~np.isnan(original)
+        assert np.abs(original[validos] - vuelta[validos]).max(initial=0) <= 0.5 / escala + 1e-9, columna
+
+def prueba_filas_en_vivo_sin_dato():
+    filas = []
+    for i in range(300):
+        fila = [1700000000.0 + i / 50] + [float(i % 7)] * len(canales.NOMBRES)
+        if i % 10 == 3:
+            fila[1 + canales.NOMBRES.index("line")] = None    # la línea antes de su sensor
+        if i % 17 == 5:
+            fila[1 + canales.NOMBRES.index("battery")] = math.nan
+        if i == 42:
+            fila[1 + canales.NOMBRES.index("speed")] = math.inf
+        filas.append(fila)
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta = os.path.join(carpeta, "vivo.tlm")
+        with sesiones.CodificadorSesion.crear(ruta, "A1", filas_bloque=64) as codificador:
+            for fila in filas:
+                codificador.agregar(fila)
+        with open(ruta, "rb") as f:
+            car_id, columnas = sesiones.leer_sesion(f.read())
+    assert car_id == "A1"
+    for j, nombre in enumerate(sesiones.COLUMNAS):
+        for i, fila in enumerate(filas):
+            esperado = fila[j]
+            if esperado is None or not math.isfinite(esperado):
+                assert math.isnan(columnas[nombre][i]), (nombre, i)
+            else:
+                assert abs(columnas[nombre][i] - esperado) < 1e-6, (nombre, i)
+
+if __name__ == "__main__":
+    for nombre, prueba in list(globals().items()):
+        if nombre.startswith("prueba_") and callable(prueba):
+            prueba()
+            print(f"✅ {nombre}")
@@ -0,0 +1,202 @@
+"""
+subida_vueltas.py contra un servidor HTTP de mentira en 127.0.0.1: una vuelta
+por POST, caída del servidor con desborde a un archivo, vueltas que quedaron
+en el archivo al reiniciar y respuestas 4xx/5xx.
+
+    python pruebas/prueba_subida_vueltas.py
+"""
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import subida_vueltas
+from subida_vueltas import SubidaVueltas
+
+class Servidor:
+    """Anota cada POST y contesta lo que diga estado(registros) (200 por defecto)."""
+
+    def __init__(self, puerto=0, estado=None):
+        self.pedidos = []        # (ruta, cuerpo JSON)
+        self.aceptadas = []      # lap_number_debug de lo contestado con 2xx, en orden
+        self.conexiones = set()
+        self.abiertas = []       # sockets de las conexiones, para cortarlas al apagar
+        servidor = self
+        estado = estado or (lambda registros: 200)
+
+        class Manejador(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def setup(self):
+                super().setup()
+                servidor.abiertas.append(self.connection)
+
+            def do_POST(self):
+                cuerpo = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                servidor.pedidos.append((self.path, cuerpo))
+                servidor.conexiones.add(self.client_address)
+                codigo = estado(cuerpo if isinstance(cuerpo, list) else [cuerpo])
+                if 200 <= codigo < 300:
+                    registros = cuerpo if isinstance(cuerpo, list) else [cuerpo]
+                    servidor.aceptadas += [r["lap_number_debug"] for r in registros]
+                respuesta = b'{"ok": true}'
+                self.send_response(codigo)
+                self.send_header('Content-Length', str(len(respuesta)))
+                self.end_headers()
+                self.wfile.write(respuesta)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", puerto), Manejador)
+        self.puerto = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def apagar(self):
+        """Como un servidor que se cae: también corta las conexiones keep-alive."""
+        self.server.shutdown()
+        self.server.server_close()
+        for conexion in self.abiertas:
+            try:
+                conexion.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+def vuelta(n):
+    return {"car_id": "A1", "team": "E1", "lap_time_ms": 60000 + n, "lap_number_debug": n}
+
+def bombear(subida, hasta, segundos=10.0):
+    """Llama atender() como el bucle de RECEPTORR hasta que hasta() dé True."""
+    limite = time.monotonic() + segundos
+    while not hasta() and time.monotonic() < limite:
+        subida.atender()
+        time.sleep(0.001)
+    return hasta()
+
+def prueba_una_vuelta_por_post_en_el_mismo_socket():
+    servidor = Servidor()
+    try:
+        subida = SubidaVueltas("127.0.0.1", servidor.puerto)
+        for n in range(1, 11):
+            subida.encolar(vuelta(n))
+            assert bombear(subida, lambda: not subida.pendientes())
+        assert [ruta for ruta, _ in servidor.pedidos] == ["/api/lap"] * 10
+        assert all(isinstance(cuerpo, dict) for _, cuerpo in servidor.pedidos)
+        assert servidor.aceptadas == list(range(1, 11))
+        assert len(servidor.conexiones) == 1
+        assert subida.enviadas == 10 and subida.fallos == 0
+    finally:
+        servidor.apagar()
+
+def prueba_caida_del_servidor_desborda_a_flash():
+    with tempfile.TemporaryDirectory() as carpeta:
+        archivo = os.path.join(carpeta, "cola_vueltas.txt")
+        servidor = Servidor()
+        puerto = servidor.puerto
+        subida = SubidaVueltas("127.0.0.1", puerto, capacidad=4, archivo_desborde=archivo)
+        subida.encolar(vuelta(1))
+        assert bombear(subida, lambda: not subida.pendientes())
+        servidor.apagar()
+
+        # Sin servidor: la cola se llena y el resto va al archivo, sin perder nada
+        for n in range(2, 31):
+            subida.encolar(vuelta(n))
+            subida.atender()
+        assert bombear(subida, lambda: subida.fallos >= 2, 3.0)
+        assert subida.pendientes() == 29 and subida.en_flash == 25 and subida.perdidas == 0
+
+        servidor = Servidor(puerto)
+        try:
+            assert bombear(subida, lambda: not subida.pendientes(), 20.0), subida.pendientes()
+            assert servidor.aceptadas == list(range(2, 31))
+            assert subida.perdidas == 0 and subida.rechazadas == 0
+            assert not os.path.getsize(archivo)
+        finally:
+            servidor.apagar()
+
+def prueba_arranque_cuenta_lo_que_quedo_en_flash():
+    with tempfile.TemporaryDirectory() as carpeta:
+        archivo = os.path.join(carpeta, "cola_vueltas.txt")
+        with open(archivo, "wb") as f:
+            for n in range(1, 8):
+                f.write(json.dumps(vuelta(n)).encode() + b"\n")
+        servidor = Servidor()
+        try:
+            subida = SubidaVueltas("127.0.0.1", servidor.puerto, capacidad=4, archivo_desborde=archivo)
+            assert subida.pendientes() == 7
+            subida.encolar(vuelta(8))    # va detrás de las del archivo
+            assert subida.en_flash == 8
+            assert bombear(subida, lambda: not subida.pendientes())
+            assert servidor.aceptadas == list(range(1, 9))
+        finally:
+            servidor.apagar()
+
+def prueba_flash_que_falla_no_adelanta_vueltas():
+    with tempfile.TemporaryDirectory() as carpeta:
+        archivo = os.path.join(carpeta, "cola_vueltas.txt")
+        servidor = Servidor()
+        puerto = servidor.puerto
+        servidor.apagar()
+        subida = SubidaVueltas("127.0.0.1", puerto, capacidad=4, archivo_desborde=archivo)
+        for n in range(1, 7):
+            subida.encolar(vuelta(n))
+        assert subida.cantidad == 4 and subida.en_flash == 2
+
+        servidor = Servidor(puerto)
+        try:
+            assert bombear(subida, lambda: subida.enviadas == 1)
+            assert subida.cantidad == 3 and subida.en_flash == 2   # hay lugar en RAM, pero 5 y 6 siguen en flash
+
+            def abrir(ruta, modo="r", *args, **kwargs):
+                if "a" in modo:
+                    raise OSError(28, "flash llena")
+                return open(ruta, modo, *args, **kwargs)
+            subida_vueltas.open = abrir
+            try:
+                assert subida.encolar(vuelta(7)) is False
+            finally:
+                del subida_vueltas.open
+            assert subida.perdidas == 1 and subida.pendientes() == 5
+            subida.encolar(vuelta(8))
+
+            assert bombear(subida, lambda: not subida.pendientes())
+            assert servidor.aceptadas == [1, 2, 3, 4, 5, 6, 8], servidor.aceptadas
+        finally:
+            servidor.apagar()
+
+def prueba_4xx_se_descarta_y_no_traba_la_cola():
+    rechazar = lambda registros: 400 if any(r["lap_number_debug"] == 3 for r in registros) else 200
+    for lote_max, ruta in ((1, "/api/lap"), (4, "/api/laps")):
+        servidor = Servidor(estado=rechazar)
+        try:
+            subida = SubidaVueltas("127.0.0.1", servidor.puerto, ruta, lote_max=lote_max)
+            for n in range(1, 11):
+                subida.encolar(vuelta(n))
+            assert bombear(subida, lambda: not subida.pendientes()), lote_max
+            assert servidor.aceptadas == [1, 2, 4, 5, 6, 7, 8, 9, 10], (lote_max, servidor.aceptadas)
+            assert subida.rechazadas == 1 and subida.enviadas == 9 and subida.fallos == 0
+        finally:
+            servidor.apagar()
+
+def prueba_5xx_y_429_se_reintentan():
+    respuestas = [503, 429, 500]
+    servidor = Servidor(estado=lambda registros: respuestas.pop(0) if respuestas else 200)
+    try:
+        subida = SubidaVueltas("127.0.0.1", servidor.puerto)
+        subida.encolar(vuelta(1))
+        assert bombear(subida, lambda: not subida.pendientes())
+        assert servidor.aceptadas == [1]
+        assert subida.fallos == 3 and subida.rechazadas == 0
+    finally:
+        servidor.apagar()
+
+if __name__ == "__main__":
+    for nombre, prueba in list(globals().items()):
+        if nombre.startswith("prueba_") and callable(prueba):
+            prueba()
+            print(f"✅ {nombre}")
@@ -0,0 +1,129 @@
+"""
+Trama binaria Placa 2 -> Placa 3: armar_trama_uart de Rx16-1.py contra el
+LectorTramas de Rx2-15-1.py y de la placa 3, con un flujo de bytes con bits
+cambiados, tramas cortadas y ráfagas de basura, leído de a trozos al azar.
+
+    python pruebas/prueba_tramas_uart.py
+"""
+import ast
+import os
+import random
+import struct
+
+RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+LECTORES = ("Rx2-15-1.py", "codigo placa3-seonsores telemetria")
+TRAMAS = 5000
+
+def cargar(archivo, nombres):
+    """Solo las definiciones de primer nivel con esos nombres (sin el bucle del firmware)."""
+    with open(os.path.join(RAIZ, archivo), encoding="utf-8") as f:
+        arbol = ast.parse(f.read(), archivo)
+
+    def define(nodo):
+        if isinstance(nodo, (ast.ClassDef, ast.FunctionDef)):
+            return nodo.name in nombres
+        if isinstance(nodo, ast.Assign):
+            for destino in nodo.targets:
+                while isinstance(destino, ast.Subscript):
+                    destino = destino.value
+                if isinstance(destino, ast.Name) and destino.id in nombres:
+                    return True
+        return False
+
+    espacio = {"struct": struct}
+    exec(compile(ast.Module([n for n in arbol.body if define(n)], []), archivo, "exec"), espacio)
+    return espacio
+
+PLACA2 = cargar("Rx16-1.py", ("SYNC_UART_1", "SYNC_UART_2", "TAM_TRAMA_UART", "trama_uart", "armar_trama_uart"))
+
+class UARTTrozos:
+    """readinto de a 0..13 bytes: en cada leer() se completa a lo sumo una trama."""
+
+    def __init__(self, datos, rng):
+        self.datos = datos
+        self.pos = 0
+        self.rng = rng
+
+    def readinto(self, mv, n):
+        k = min(n, self.rng.randrange(14), len(self.datos) - self.pos)
+        if k <= 0:
+            return None
+        mv[:k] = self.datos[self.pos:self.pos + k]
+        self.pos += k
+        return k
+
+def flujo(rng, cambiadas=0.0, cortadas=0.0, basura=0.0):
+    """(bytes, valores de las tramas sanas en orden, tramas cortadas seguidas de basura)."""
+    datos = bytearray()
+    sanas = []
+    corte_y_basura = 0
+    cortada_antes = False
+    for i in range(TRAMAS):
+        valores = (rng.randrange(61), rng.randrange(101), 1000 + i % 1000, 1000 + i // 1000, rng.randrange(600, 850))
+        trama = bytearray(PLACA2["armar_trama_uart"](*valores))
+        if rng.random() < basura:
+            datos += bytes(rng.randrange(256) for _ in range(rng.randrange(1, 40)))
+            corte_y_basura += cortada_antes
+        azar = rng.random()
+        cortada_antes = False
+        if azar < cambiadas:
+            trama[rng.randrange(len(trama))] ^= 1 << rng.randrange(8)
+        elif azar < cambiadas + cortadas:
+            trama = trama[:rng.randrange(1, len(trama))]
+            cortada_antes = True
+        else:
+            sanas.append(valores)
+        datos += trama
+    return bytes(datos), sanas, corte_y_basura
+
+def leer_todo(archivo, datos, rng):
+    lector = cargar(archivo, ("SYNC_UART_1", "SYNC_UART_2", "TAM_TRAMA_UART", "LectorTramas"))["LectorTramas"]
+    uart = UARTTrozos(datos, rng)
+    lector = lector(uart)
+    aceptadas = []
+    while uart.pos < len(datos):
+        antes = lector.validas
+        valores = lector.leer()
+        assert lector.validas - antes <= 1
+        if valores is not None:
+            aceptadas.append(valores)
+    return aceptadas, lector
+
+def prueba_flujo_limpio():
+    for archivo in LECTORES:
+        rng = random.Random(1)
+        datos, sanas, _ = flujo(rng)
+        aceptadas, _ = leer_todo(archivo, datos, rng)
+        assert aceptadas == sanas, archivo
+
+def prueba_bits_cambiados_y_tramas_cortadas():
+    # Un bit cambiado siempre rompe la suma; una trama cortada deja el 0xAA 0x55 de
+    # la siguiente adentro de la candidata y se salta
+    for archivo in LECTORES:
+        for semilla in range(5):
+            rng = random.Random(semilla)
+            datos, sanas, _ = flujo(rng, cambiadas=0.05, cortadas=0.05)
+            aceptadas, lector = leer_todo(archivo, datos, rng)
+            assert aceptadas == sanas, (archivo, semilla, len(aceptadas), len(sanas))
+            assert lector.descartados > 0
+
+def prueba_rafagas_de_basura():
+    # Una trama cortada seguida de basura al azar pasa la suma de 8 bits 1 de cada 256
+    # veces: esa trama falsa puede tapar una sana. Con eso, todo lo demás llega en orden.
+    for archivo in LECTORES:
+        for semilla in range(5):
+            rng = random.Random(semilla)
+            datos, sanas, corte_y_basura = flujo(rng, cambiadas=0.05, cortadas=0.05, basura=0.05)
+            aceptadas, _ = leer_todo(archivo, datos, rng)
+            indice = {v: k for k, v in enumerate(sanas)}
+            reales = [indice[v] for v in aceptadas if v in indice]
+            falsas = len(aceptadas) - len(reales)
+            assert reales == sorted(reales), (archivo, semilla)
+            assert falsas <= 1 + corte_y_basura // 64, (archivo, semilla, falsas, corte_y_basura)
+            assert len(reales) >= len(sanas) - falsas, (archivo, semilla, len(reales), len(sanas))
+
+if __name__ == "__main__":
+    for nombre, prueba in list(globals().items()):
+        if nombre.startswith("prueba_") and callable(prueba):
+            prueba()
+            print(f"✅ {nombre}")
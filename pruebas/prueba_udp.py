@@ -0,0 +1,130 @@
+"""
+Ingesta UDP de SERVICIO_TELEMETRIA por un socket real en 127.0.0.1:
+escuchar_udp en un hilo, datagramas con el formato de RECEPTORR y
+procesar_datagrama sobre lo que dejó en la cola de entrada.
+
+    python pruebas/prueba_udp.py
+"""
+import os
+import socket
+import struct
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import SERVICIO_TELEMETRIA as servicio
+
+def abrir_escucha():
+    sondeo = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sondeo.bind(("127.0.0.1", 0))
+    puerto = sondeo.getsockname()[1]
+    sondeo.close()
+    threading.Thread(target=servicio.escuchar_udp, args=("127.0.0.1", puerto), daemon=True).start()
+    time.sleep(0.1)
+    return ("127.0.0.1", puerto)
+
+DESTINO = abrir_escucha()
+ENVIO = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+def datagrama(car_id, seq, cantidad=4, edades=None):
+    """Como enviar_lote_udp de RECEPTORR; AccX lleva seq (mód 1000) y el número de muestra."""
+    cuerpo = b"".join(servicio.PAQUETE_NRF.pack(0, 0, 0, 0, seq % 1000 * 10 + k, *[0] * 9) for k in range(cantidad))
+    if edades is None:
+        edades = [0] * cantidad
+    return (servicio.CABECERA_UDP.pack(servicio.MAGIA_UDP, car_id.encode(), seq, cantidad) + cuerpo
+            + struct.pack(f"<{len(edades)}H", *edades))
+
+def enviar(car_id, secuencias, **kwargs):
+    for seq in secuencias:
+        ENVIO.sendto(datagrama(car_id, seq, **kwargs), DESTINO)
+        time.sleep(0.0005)
+
+def procesar(esperados, segundos=2.0):
+    """procesar_datagrama sobre lo que llegue; devuelve cuántos datagramas se aplicaron."""
+    aplicados = recibidos = 0
+    limite = time.monotonic() + segundos
+    while recibidos < esperados and time.monotonic() < limite:
+        for tipo, origen, t, dato in servicio.entrada.sacar_todo(timeout=0.1):
+            recibidos += 1
+            aplicados += servicio.procesar_datagrama(dato, origen, t) > 0
+    assert recibidos == esperados, (recibidos, esperados)
+    return aplicados
+
+def prueba_reinicio_del_receptor_tras_un_silencio():
+    enviar("REINICIO", range(50))
+    assert procesar(50) == 50
+    time.sleep(servicio.SecuenciaUDP.SILENCIO_REINICIO + 0.2)   # la Pico reinicia y reconecta
+    enviar("REINICIO", range(50))
+    assert procesar(50) == 50
+    metricas = servicio.secuencias_udp["REINICIO"].metricas()
+    assert metricas["restarts"] == 1 and metricas["lost"] == 0 and metricas["duplicates"] == 0, metricas
+    assert servicio.autos["REINICIO"].ultima.acc_x == (49 * 10 + 3) / 100   # la última del segundo arranque
+
+def prueba_reinicio_por_salto_hacia_atras():
+    enviar("SALTO", range(5000, 5050))
+    enviar("SALTO", range(20))
+    assert procesar(70) == 70
+    metricas = servicio.secuencias_udp["SALTO"].metricas()
+    assert metricas["restarts"] == 1 and metricas["lost"] == 0, metricas
+
+def prueba_duplicados_y_reordenados_sin_reinicio():
+    enviar("ORDEN", [0, 1, 2, 4, 3, 4, 2, 5])
+    assert procesar(8) == 5     # 3 llegó tarde; 4 y 2 repetidos
+    metricas = servicio.secuencias_udp["ORDEN"].metricas()
+    assert metricas == {"datagrams": 6, "lost": 0, "reordered": 1, "duplicates": 2, "stale": 0,
+                        "restarts": 0}, metricas
+
+def prueba_auto_principal_llega_por_udp():
+    # Sin nada por los puertos serie: el primer auto UDP es el de /telemetry, /state, /ws y /track
+    servicio.auto_principal = None
+    enviar("PRINCIPAL", range(3))
+    procesar(3)
+    assert servicio.auto_principal is servicio.autos["PRINCIPAL"]
+    assert servicio.principal_conectado()
+    assert servicio.telemetria_principal()["accelerometer"]["x"] == 23 / 100, servicio.telemetria_principal()
+
+def prueba_auto_principal_configurado():
+    servicio.auto_principal = None
+    servicio.AUTO_PRINCIPAL = "ELEGIDO"
+    try:
+        enviar("OTRO", range(3))
+        enviar("ELEGIDO", range(3))
+        procesar(6)
+        assert servicio.auto_principal is servicio.autos["ELEGIDO"]
+    finally:
+        servicio.AUTO_PRINCIPAL = None
+
+def tiempos_del_lote(car_id, t_llegada, **kwargs):
+    """Tiempos de las tramas que publica un datagrama que llegó en t_llegada."""
+    auto = servicio.obtener_auto(car_id, "prueba")
+    dato = datagrama(car_id, 0, **kwargs)
+    servicio.procesar_datagrama(dato, "prueba", t_llegada)
+    return [trama.t - t_llegada for trama in list(auto.historial)[-4:]]
+
+def prueba_cada_trama_con_su_hora():
+    # Un lote de 4 payloads a 20 ms: RECEPTORR manda la edad de cada uno
+    tiempos = tiempos_del_lote("EDADES", 1000.0, edades=[60, 40, 20, 0])
+    assert [round(t, 3) for t in tiempos] == [-0.06, -0.04, -0.02, 0.0], tiempos
+
+def prueba_receptor_sin_edades_reparte_el_lote():
+    # Receptor viejo: sin edades al final; las tramas se reparten en ESPERA_LOTE_UDP
+    tiempos = tiempos_del_lote("SIN_EDADES", 1000.0, edades=[])
+    paso = servicio.ESPERA_LOTE_UDP / 4
+    assert [round(t, 4) for t in tiempos] == [round(-paso * k, 4) for k in (3, 2, 1, 0)], tiempos
+
+def prueba_lote_nuevo_no_va_antes_que_el_anterior():
+    car_id = "PISO"
+    auto = servicio.obtener_auto(car_id, "prueba")
+    servicio.procesar_datagrama(datagrama(car_id, 0, edades=[30, 20, 10, 0]), "prueba", 1000.0)
+    # El siguiente llega antes de lo esperado (latencia del WiFi más corta) con edades grandes
+    servicio.procesar_datagrama(datagrama(car_id, 1, edades=[50, 30, 10, 0]), "prueba", 1000.02)
+    t = [trama.t for trama in auto.historial]
+    assert t == sorted(t), t
+    assert t[-1] == 1000.02
+
+if __name__ == "__main__":
+    for nombre, prueba in list(globals().items()):
+        if nombre.startswith("prueba_") and callable(prueba):
+            prueba()
+            print(f"✅ {nombre}")
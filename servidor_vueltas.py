@@ -0,0 +1,244 @@
+"""
+Servidor de vueltas para el protocolo /api/lap que usa RECEPTORR (send_lap).
+
+POST /api/lap           {"car_id", "team", "lap_time_ms", "lap_number_debug"}
+POST /api/laps          [vuelta, vuelta, ...]  lote (subida_vueltas.py con lote_max > 1)
+GET  /leaderboard       tabla de posiciones en JSON
+GET  /leaderboard/stream  Server-Sent Events: un evento por cada cambio de la tabla
+
+Se puede correr solo (python servidor_vueltas.py) o dentro de SERVICIO_TELEMETRIA.
+"""
+import bisect
+import json
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# ============ CONFIGURACIÓN ============
+HOST_VUELTAS = '0.0.0.0'
+PUERTO_VUELTAS = 5000       # el PUERTO de RECEPTORR
+MAX_CUERPO = 65536          # bytes máximos de un POST (lotes incluidos)
+MAX_VUELTA_MS = 3600000     # una vuelta de más de una hora es un dato roto
+MAX_TEXTO = 64              # largo máximo de car_id y team
+
+# ============ TABLA DE POSICIONES ============
+class TablaPosiciones:
+    """Tabla incremental: cada vuelta nueva reescribe solo las filas que cambiaron.
+
+    _orden es una lista ordenada de (mejor_ms, car_id) y _filas tiene el JSON
+    de cada fila en el mismo orden. Una vuelta que no mejora toca una sola fila;
+    una que mejora, las posiciones entre el lugar viejo y el nuevo (todas solo
+    si cambia el líder, porque cambia gap_ms).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cambio = threading.Condition(self._lock)
+        self.autos = {}          # car_id -> {"team", "best_ms", "last_ms", "laps", "vistas"}
+        self._orden = []         # [(mejor_ms, car_id)] ordenada
+        self._filas = []         # [bytes] JSON de cada fila, alineada con _orden
+        self.version = 0
+        self.recibidas = 0
+        self.duplicadas = 0
+        self._cache = (-1, b"[]")   # (versión, JSON) para no serializar por cliente
+
+    def registrar(self, car_id, team, lap_ms, lap_number=None):
+        """Agrega una vuelta ya validada. Devuelve False si (car_id, lap_number) ya estaba."""
+        with self._lock:
+            self.recibidas += 1
+            auto = self.autos.get(car_id)
+            if auto is None:
+                auto = {"team": team, "best_ms": None, "last_ms": None, "laps": 0, "vistas": set()}
+                self.autos[car_id] = auto
+            if lap_number is not None:
+                if lap_number in auto["vistas"]:
+                    self.duplicadas += 1
+                    return False
+                auto["vistas"].add(lap_number)
+
+            auto["team"] = team or auto["team"]
+            auto["last_ms"] = lap_ms
+            auto["laps"] += 1
+            mejor = auto["best_ms"]
+            if mejor is None or lap_ms < mejor:
+                if mejor is None:
+                    viejo = len(self._orden)   # auto nuevo: se corren todos los de atrás
+                else:
+                    viejo = bisect.bisect_left(self._orden, (mejor, car_id))
+                    del self._orden[viejo]
+                    del self._filas[viejo]
+                nuevo = bisect.bisect_left(self._orden, (lap_ms, car_id))
+                self._orden.insert(nuevo, (lap_ms, car_id))
+                self._filas.insert(nuevo, b"")
+                auto["best_ms"] = lap_ms
+                if nuevo == 0:
+                    self._reescribir(0, len(self._orden))
+                else:
+                    # viejo + 1: el que quedó detrás del lugar viejo cambia de intervalo
+                    self._reescribir(nuevo, min(viejo + 2, len(self._orden)) if mejor is not None
+                                     else len(self._orden))
+            else:
+                i = bisect.bisect_left(self._orden, (mejor, car_id))
+                self._reescribir(i, i + 1)
+
+            self.version += 1
+            self._cambio.notify_all()
+            return True
+
+    def _fila(self, i):
+        mejor, car_id = self._orden[i]
+        auto = self.autos[car_id]
+        return {
+            "position": i + 1,
+            "car_id": car_id,
+            "team": auto["team"],
+            "best_lap_ms": mejor,
+            "last_lap_ms": auto["last_ms"],
+            "laps": auto["laps"],
+            "gap_ms": mejor - self._orden[0][0],                       # al líder
+            "interval_ms": mejor - self._orden[i - 1][0] if i else 0,  # al auto de adelante
+        }
+
+    def _reescribir(self, desde, hasta):
+        for i in range(desde, hasta):
+            self._filas[i] = json.dumps(self._fila(i)).encode('utf-8')
+
+    def posiciones(self):
+        with self._lock:
+            return [self._fila(i) for i in range(len(self._orden))]
+
+    def json(self):
+        """Tabla serializada, cacheada por versión (solo se unen las filas ya armadas)."""
+        with self._lock:
+            version, datos = self._cache
+            if version != self.version:
+                datos = b"[" + b", ".join(self._filas) + b"]"
+                self._cache = (self.version, datos)
+            return self.version, datos
+
+    def esperar_cambio(self, version, timeout=15.0):
+        """Bloquea hasta que la versión sea distinta de version (o timeout)."""
+        with self._cambio:
+            self._cambio.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+tabla_posiciones = TablaPosiciones()
+
+# ============ MANEJO HTTP (compartido con SERVICIO_TELEMETRIA) ============
+def responder_json(handler, cuerpo, estado=200):
+    handler.send_response(estado)
+    handler.send_header('Content-type', 'application/json')
+    handler.send_header('Content-Length', str(len(cuerpo)))
+    handler.send_header('Cache-Control', 'no-cache')
+    handler.send_header('Access-Control-Allow-Origin', '*')
+    if handler.close_connection:
+        handler.send_header('Connection', 'close')
+    handler.end_headers()
+    handler.wfile.write(cuerpo)
+
+def validar_vuelta(v):
+    """(car_id, team, lap_ms, lap_number) de una vuelta, o ValueError si algo no cierra."""
+    if not isinstance(v, dict):
+        raise ValueError("cada vuelta debe ser un objeto")
+    car_id, team = v.get("car_id"), v.get("team", "")
+    lap_ms, lap_number = v.get("lap_time_ms"), v.get("lap_number_debug")
+    if isinstance(car_id, bool) or not isinstance(car_id, (str, int)) \
+            or not 0 < len(str(car_id)) <= MAX_TEXTO:
+        raise ValueError("car_id inválido")
+    if not isinstance(team, str):
+        raise ValueError("team inválido")
+    # bool es int en Python; un float entero (90000.0) se acepta
+    if isinstance(lap_ms, bool) or not isinstance(lap_ms, (int, float)) or lap_ms != lap_ms:
+        raise ValueError("lap_time_ms inválido")
+    if not 0 < lap_ms <= MAX_VUELTA_MS or lap_ms != int(lap_ms):
+        raise ValueError("lap_time_ms fuera de rango")
+    if lap_number is not None and (isinstance(lap_number, bool) or not isinstance(lap_number, (str, int))):
+        raise ValueError("lap_number_debug inválido")
+    return str(car_id), team[:MAX_TEXTO], int(lap_ms), lap_number
+
+def leer_vueltas(handler):
+    """Lee el cuerpo JSON (una vuelta o una lista) y lo valida entero: una vuelta mala rechaza el lote."""
+    try:
+        largo = int(handler.headers.get('Content-Length', 0))
+    except ValueError:
+        largo = -1
+    if largo <= 0 or largo > MAX_CUERPO:
+        # El cuerpo queda sin leer: sus bytes serían la "próxima petición" de esta conexión
+        handler.close_connection = True
+        raise ValueError("Content-Length inválido")
+    cuerpo = json.loads(handler.rfile.read(largo))
+    vueltas = cuerpo if isinstance(cuerpo, list) else [cuerpo]
+    if not vueltas:
+        raise ValueError("lote vacío")
+    return [validar_vuelta(v) for v in vueltas]
+
+def atender_post_vuelta(handler, tabla=tabla_posiciones):
+    """POST /api/lap (una vuelta) y POST /api/laps (lote)."""
+    try:
+        vueltas = leer_vueltas(handler)
+    except ValueError as e:   # JSONDecodeError y UnicodeDecodeError incluidos
+        responder_json(handler, json.dumps({"ok": False, "error": str(e)}).encode('utf-8'), 400)
+        return
+    nuevas = sum(tabla.registrar(*v) for v in vueltas)
+    if len(vueltas) == 1:
+        responder_json(handler, b'{"ok": true, "duplicate": false}' if nuevas
+                       else b'{"ok": true, "duplicate": true}')
+    else:
+        responder_json(handler, json.dumps(
+            {"ok": True, "accepted": nuevas, "duplicates": len(vueltas) - nuevas}).encode('utf-8'))
+
+def servir_tabla(handler, tabla=tabla_posiciones):
+    responder_json(handler, tabla.json()[1])
+
+def servir_stream_tabla(handler, tabla=tabla_posiciones):
+    """SSE: envía la tabla completa en cada cambio (y un comentario cada 15 s)."""
+    handler.send_response(200)
+    handler.send_header('Content-type', 'text/event-stream')
+    handler.send_header('Cache-Control', 'no-cache')
+    handler.send_header('Access-Control-Allow-Origin', '*')
+    handler.end_headers()
+    handler.close_connection = True
+    version = -1
+    try:
+        while True:
+            actual, datos = tabla.json()
+            if actual != version:
+                handler.wfile.write(b"event: leaderboard\ndata: " + datos + b"\n\n")
+                version = actual
+            else:
+                handler.wfile.write(b": ping\n\n")
+            handler.wfile.flush()
+            tabla.esperar_cambio(version)
+    except (BrokenPipeError, ConnectionResetError):
+        pass
+
+class ManejadorVueltas(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'   # conexiones persistentes para autos que envían seguido
+
+    def do_POST(self):
+        if self.path in ('/api/lap', '/api/laps'):
+            atender_post_vuelta(self)
+        else:
+            self.send_error(404)
+
+    def do_GET(self):
+        if self.path == '/leaderboard':
+            servir_tabla(self)
+        elif self.path == '/leaderboard/stream':
+            servir_stream_tabla(self)
+        else:
+            self.send_error(404)
+
+    def log_message(self, format, *args):
+        pass
+
+class ServidorVueltas(ThreadingHTTPServer):
+    request_queue_size = 128    # muchos autos conectando a la vez
+
+def iniciar_servidor_vueltas(host=HOST_VUELTAS, puerto=PUERTO_VUELTAS):
+    server = ServidorVueltas((host, puerto), ManejadorVueltas)
+    print(f"🏁 Servidor de vueltas en http://{host}:{puerto}/api/lap")
+    server.serve_forever()
+
+# ============ MAIN ============
+if __name__ == "__main__":
+    iniciar_servidor_vueltas()
@@ -0,0 +1,234 @@
+"""
+Sesiones de telemetría comprimidas (.tlm): delta + zigzag + varint por columna.
+
+Cada columna se guarda como entero escalado, igual que en el payload NRF
+(canales.ESCALAS; t en milisegundos). Se codifica la diferencia con la fila
+anterior en zigzag (0, -1, 1, -2... -> 0, 1, 2, 3...) y en varint (7 bits
+por byte, el bit alto indica que sigue otro). Un PWM quieto en 1500 o una
+batería que cambia de a centésimas ocupan 1 byte por muestra.
+
+Un valor sin dato (None, NaN o infinito: una celda vacía del CSV, la línea
+antes de que llegue su sensor) se guarda como el entero NULO, igual que en
+protocolo_ws, y se lee de vuelta como NaN. Ningún canal escalado llega a -2^31.
+
+Formato:
+
+    b"TLM1"  varint(largo)  JSON {"car_id", "columns", "scales", "null"}
+    bloques: varint(filas)  varint(bytes)  datos
+
+Los datos de un bloque van por columna (todas las filas de la primera
+columna, después la segunda...). Las diferencias siguen de un bloque al
+otro, así que un archivo cortado a mitad de un bloque se lee hasta el último
+bloque completo.
+
+- CodificadorSesion: escritura en streaming, Python puro (lo usa
+  SERVICIO_TELEMETRIA para grabar en vivo).
+- leer_sesion / cargar_sesion: decodificación vectorizada con NumPy.
+
+    python sesiones.py telemetria2.csv          # convierte a telemetria2.tlm
+    python sesiones.py sesion.tlm --csv out.csv # vuelve a CSV
+"""
+import json
+import math
+import os
+
+import canales
+
+MAGICO = b"TLM1"
+EXTENSION = ".tlm"
+COLUMNAS = ("t",) + canales.NOMBRES
+ESCALAS = (1000,) + canales.ESCALAS     # t en ms
+FILAS_BLOQUE = 4096
+NULO = -2 ** 31                         # sin dato (el "null" de protocolo_ws para "i")
+
+def _varint(n, salida):
+    while n >= 0x80:
+        salida.append((n & 0x7F) | 0x80)
+        n >>= 7
+    salida.append(n)
+
+def _leer_varint(datos, pos):
+    n = desplazamiento = 0
+    while True:
+        if pos >= len(datos):
+            raise EOFError
+        b = datos[pos]
+        pos += 1
+        n |= (b & 0x7F) << desplazamiento
+        if b < 0x80:
+            return n, pos
+        desplazamiento += 7
+
+class CodificadorSesion:
+    """Escribe filas (t, valores físicos en el orden de canales.NOMBRES) en un archivo .tlm."""
+
+    def __init__(self, archivo, car_id="", filas_bloque=FILAS_BLOQUE):
+        self.archivo = archivo
+        self.filas_bloque = filas_bloque
+        self.columnas = [[] for _ in COLUMNAS]
+        self.anteriores = [0] * len(COLUMNAS)
+        self.filas = 0
+        self.bytes = 0
+        encabezado = json.dumps({"car_id": car_id, "columns": COLUMNAS,
+                                 "scales": ESCALAS, "null": NULO}).encode('utf-8')
+        salida = bytearray(MAGICO)
+        _varint(len(encabezado), salida)
+        self._escribir(salida + encabezado)
+
+    @classmethod
+    def crear(cls, ruta, car_id="", **kwargs):
+        return cls(open(ruta, "wb"), car_id, **kwargs)
+
+    def agregar(self, fila):
+        try:
+            enteros = [round(valor * escala) for valor, escala in zip(fila, ESCALAS)]
+        except (TypeError, ValueError, OverflowError):   # None, NaN o inf en algún canal
+            enteros = [NULO if valor is None or not math.isfinite(valor) else round(valor * escala)
+                       for valor, escala in zip(fila, ESCALAS)]
+        for columna, entero in zip(self.columnas, enteros):
+            columna.append(entero)
+        if len(self.columnas[0]) >= self.filas_bloque:
+            self.volcar()
+
+    def volcar(self):
+        """Escribe las filas pendientes como un bloque (también lo hace agregar cada filas_bloque)."""
+        n = len(self.columnas[0])
+        if not n:
+            return
+        datos = bytearray()
+        for i, columna in enumerate(self.columnas):
+            anterior = self.anteriores[i]
+            for valor in columna:
+                delta = valor - anterior
+                anterior = valor
+                n_zz = delta << 1 if delta >= 0 else (-delta << 1) - 1
+                if n_zz < 0x80:
+                    datos.append(n_zz)
+                else:
+                    _varint(n_zz, datos)
+            self.anteriores[i] = anterior
+            columna.clear()
+        salida = bytearray()
+        _varint(n, salida)
+        _varint(len(datos), salida)
+        self._escribir(salida + datos)
+        self.filas += n
+        self.archivo.flush()
+
+    def _escribir(self, datos):
+        self.archivo.write(datos)
+        self.bytes += len(datos)
+
+    def cerrar(self):
+        if self.archivo.closed:
+            return
+        self.volcar()
+        self.archivo.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+# ---------------- Lectura (NumPy, solo PC) ----------------
+def decodificar_varints(datos):
+    """uint8 con varints seguidos -> uint64, vectorizado: un paso por cada byte extra, no por valor."""
+    import numpy as np
+    datos = np.frombuffer(datos, dtype=np.uint8)
+    finales = np.flatnonzero(datos < 0x80)
+    if not len(finales):
+        return np.zeros(0, dtype=np.uint64)
+    inicios = np.empty_like(finales)
+    inicios[0] = 0
+    np.add(finales[:-1], 1, out=inicios[1:])
+    valores = (datos[inicios] & 0x7F).astype(np.uint64)
+    largos = np.flatnonzero(finales != inicios)   # casi todos ocupan 1 byte: se sigue solo con estos
+    i = 1
+    while len(largos):
+        valores[largos] |= (datos[inicios[largos] + i] & 0x7F).astype(np.uint64) << np.uint64(7 * i)
+        largos = largos[finales[largos] - inicios[largos] > i]
+        i += 1
+    return valores
+
+def leer_sesion(datos):
+    """Bytes de un .tlm -> (car_id, {columna: array float64 de valores físicos}), con t primero."""
+    import numpy as np
+    datos = memoryview(datos)
+    if bytes(datos[:4]) != MAGICO:
+        raise ValueError("no es una sesión .tlm")
+    largo, pos = _leer_varint(datos, 4)
+    encabezado = json.loads(bytes(datos[pos:pos + largo]))
+    pos += largo
+    columnas, escalas = encabezado["columns"], encabezado["scales"]
+
+    bloques, filas = [], []
+    while pos < len(datos):
+        try:
+            n, p = _leer_varint(datos, pos)
+            tam, p = _leer_varint(datos, p)
+        except EOFError:
+            break
+        if p + tam > len(datos):   # bloque cortado (se cerró mal el archivo)
+            break
+        bloques.append(datos[p:p + tam])
+        filas.append(n)
+        pos = p + tam
+
+    valores = decodificar_varints(b"".join(bloques))
+    if len(valores) != sum(filas) * len(columnas):
+        raise ValueError("sesión .tlm corrupta")
+    partes, inicio = [], 0
+    for n in filas:
+        partes.append(valores[inicio:inicio + n * len(columnas)].reshape(len(columnas), n))
+        inicio += n * len(columnas)
+    zz = np.concatenate(partes, axis=1) if len(partes) > 1 else (
+        partes[0] if partes else np.zeros((len(columnas), 0), np.uint64))
+    deltas = (zz >> np.uint64(1)).view(np.int64) ^ -(zz & np.uint64(1)).view(np.int64)
+    enteros = np.cumsum(deltas, axis=1, out=deltas)
+
+    fisicos = enteros / np.array(escalas, dtype=np.float64)[:, None]
+    if "null" in encabezado:   # los .tlm de antes no tenían valores sin dato
+        fisicos[enteros == encabezado["null"]] = np.nan
+    return encabezado["car_id"], dict(zip(columnas, fisicos))
+
+def cargar_sesion(ruta):
+    """.tlm -> DataFrame con las columnas de los CSV (canales.COLUMNAS_CSV) más t."""
+    import pandas as pd
+    with open(ruta, "rb") as f:
+        _, columnas = leer_sesion(f.read())
+    nombres = dict(zip(canales.NOMBRES, canales.COLUMNAS_CSV))
+    return pd.DataFrame({nombres.get(c, c): valores for c, valores in columnas.items()}, copy=False)
+
+def convertir_csv(ruta_csv, ruta_tlm, car_id=""):
+    """CSV de telemetría (columnas canales.COLUMNAS_CSV, t opcional) -> .tlm."""
+    import pandas as pd
+    df = pd.read_csv(ruta_csv)
+    filas = len(df)
+    t = df["t"] if "t" in df.columns else [0.0] * filas
+    columnas = [df[c] if c in df.columns else [0.0] * filas for c in canales.COLUMNAS_CSV]
+    with CodificadorSesion.crear(ruta_tlm, car_id) as codificador:
+        for fila in zip(t, *columnas):
+            codificador.agregar(fila)
+    return codificador
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Convierte sesiones CSV <-> .tlm")
+    ap.add_argument("entrada")
+    ap.add_argument("--csv", help="(.tlm) escribir este CSV")
+    ap.add_argument("--car", default="", help="(.csv) car_id del encabezado")
+    args = ap.parse_args()
+
+    if args.entrada.endswith(EXTENSION):
+        df = cargar_sesion(args.entrada)
+        print(f"📊 {len(df)} filas x {len(df.columns)} columnas")
+        if args.csv:
+            df.to_csv(args.csv, index=False)
+            print(f"✅ {args.csv}")
+    else:
+        destino = os.path.splitext(args.entrada)[0] + EXTENSION
+        codificador = convertir_csv(args.entrada, destino, args.car)
+        tam_csv = os.path.getsize(args.entrada)
+        print(f"✅ {destino}: {codificador.filas} filas, {tam_csv} -> {codificador.bytes} bytes "
+              f"({tam_csv / max(codificador.bytes, 1):.1f}x)")
@@ -0,0 +1,128 @@
+"""
+Sesiones en Parquet para el análisis: solo se leen las columnas y el rango
+de tiempo que hacen falta.
+
+- convertir: CSV (analisis_de_telemetria_py / RECEPTORR) o .tlm (sesiones.py)
+  -> Parquet con grupos de FILAS_GRUPO filas y estadísticas min/max por
+  columna. El CSV se lee por tandas, así que no tiene que entrar en memoria.
+- cargar: lee columnas=[...] y desde/hasta sobre la columna de tiempo
+  ("t", o "id" en los CSV viejos). pyarrow descarta los grupos cuyo min/max
+  queda fuera del rango sin leerlos.
+- en_cache: la conversión queda en CARPETA_CACHE con nombre según la ruta,
+  la fecha de modificación y el tamaño del original; la segunda vez que se
+  analiza la sesión no se vuelve a convertir.
+
+    python sesiones_parquet.py sesion.csv [--salida sesion.parquet]
+"""
+import hashlib
+import os
+
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+import canales
+import sesiones
+
+FILAS_GRUPO = 128 * 1024      # filas por grupo (row group) del Parquet
+COMPRESION = "zstd"
+CARPETA_CACHE = os.path.join(os.path.expanduser("~"), ".cache", "telemetria_parquet")
+COLUMNAS_TIEMPO = ("t", "id")  # la primera que exista se usa para desde/hasta
+
+def abrir_escritor(ruta, esquema):
+    return pq.ParquetWriter(ruta, esquema, compression=COMPRESION, write_statistics=True)
+
+def convertir(origen, destino, filas_grupo=FILAS_GRUPO):
+    """CSV o .tlm -> Parquet. Devuelve la cantidad de filas."""
+    temporal = destino + ".tmp"
+    filas = 0
+    if origen.endswith(sesiones.EXTENSION):
+        tabla = pa.Table.from_pandas(sesiones.cargar_sesion(origen), preserve_index=False)
+        with abrir_escritor(temporal, tabla.schema) as escritor:
+            escritor.write_table(tabla, row_group_size=filas_grupo)
+        filas = tabla.num_rows
+    else:
+        # Tipos fijos: si pyarrow los adivinara por tanda, un PWM entero que más
+        # adelante viene con decimales rompería la conversión a mitad de camino
+        tipos = {c: pa.float64() for c in canales.COLUMNAS_CSV + ("t",)}
+        tipos["id"] = pa.int64()
+        lector = pa_csv.open_csv(origen, convert_options=pa_csv.ConvertOptions(column_types=tipos))
+        escritor = None
+        pendientes, en_espera = [], 0
+        try:
+            for lote in lector:
+                if escritor is None:
+                    escritor = abrir_escritor(temporal, lote.schema)
+                pendientes.append(lote)
+                en_espera += lote.num_rows
+                while en_espera >= filas_grupo:
+                    tabla = pa.Table.from_batches(pendientes)
+                    escritor.write_table(tabla.slice(0, filas_grupo), row_group_size=filas_grupo)
+                    resto = tabla.slice(filas_grupo)
+                    pendientes, en_espera = resto.to_batches(), resto.num_rows
+                    filas += filas_grupo
+            if escritor is None:
+                escritor = abrir_escritor(temporal, lector.schema)
+            if en_espera:
+                escritor.write_table(pa.Table.from_batches(pendientes, lector.schema),
+                                     row_group_size=filas_grupo)
+                filas += en_espera
+        finally:
+            if escritor is not None:
+                escritor.close()
+    os.replace(temporal, destino)   # nunca queda un Parquet a medio escribir con el nombre final
+    return filas
+
+def ruta_cache(origen, sufijo="", carpeta=None, extension=".parquet"):
+    """(ruta en la cache para origen + sufijo, si ya existe). Borra las de versiones viejas de origen."""
+    carpeta = carpeta or CARPETA_CACHE
+    os.makedirs(carpeta, exist_ok=True)
+    info = os.stat(origen)
+    prefijo = hashlib.sha1(os.path.abspath(origen).encode("utf-8")).hexdigest()[:16] + sufijo + "_"
+    destino = os.path.join(carpeta, f"{prefijo}{info.st_mtime_ns}_{info.st_size}{extension}")
+    if os.path.exists(destino):
+        return destino, True
+    for viejo in os.listdir(carpeta):
+        if viejo.startswith(prefijo):
+            os.remove(os.path.join(carpeta, viejo))
+    return destino, False
+
+def en_cache(origen, carpeta=None):
+    """Ruta del Parquet de origen en la cache; lo convierte si cambió o no existe."""
+    destino, existe = ruta_cache(origen, "", carpeta)
+    if not existe:
+        convertir(origen, destino)
+    return destino
+
+def columna_tiempo(esquema):
+    return next((c for c in COLUMNAS_TIEMPO if c in esquema.names), None)
+
+def cargar(ruta, columnas=None, desde=None, hasta=None):
+    """Parquet -> DataFrame con solo esas columnas (y la de tiempo) y filas con desde <= tiempo <= hasta."""
+    esquema = pq.read_schema(ruta)
+    tiempo = columna_tiempo(esquema)
+    filtros = []
+    if tiempo is not None:
+        if desde is not None:
+            filtros.append((tiempo, ">=", desde))
+        if hasta is not None:
+            filtros.append((tiempo, "<=", hasta))
+    elif desde is not None or hasta is not None:
+        raise ValueError(f"la sesión no tiene columna de tiempo ({', '.join(COLUMNAS_TIEMPO)})")
+    if columnas is not None:
+        columnas = [c for c in esquema.names if c in set(columnas) | {tiempo}]
+    return pq.read_table(ruta, columns=columnas, filters=filtros or None).to_pandas()
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Convierte una sesión CSV o .tlm a Parquet")
+    ap.add_argument("origen")
+    ap.add_argument("--salida", help="por defecto, el mismo nombre con .parquet")
+    ap.add_argument("--filas-grupo", type=int, default=FILAS_GRUPO)
+    args = ap.parse_args()
+
+    destino = args.salida or os.path.splitext(args.origen)[0] + ".parquet"
+    filas = convertir(args.origen, destino, args.filas_grupo)
+    metadatos = pq.ParquetFile(destino).metadata
+    print(f"✅ {destino}: {filas} filas en {metadatos.num_row_groups} grupos, "
+          f"{os.path.getsize(args.origen)} -> {os.path.getsize(destino)} bytes")
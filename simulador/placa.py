@@ -0,0 +1,798 @@
+"""
+Una Pico simulada: módulos machine / utime / nrf24l01 / network / socket /
+urandom de mentira y el firmware original corriendo encima.
+
+Cada placa arma sus propios módulos (las clases quedan atadas a la placa) y
+ejecuta el archivo del firmware con un __import__ que los entrega en lugar
+de los de CPython. canales.py y subida_vueltas.py se cargan de nuevo por
+placa con el mismo __import__, como si estuvieran copiados en la Pico.
+
+Lo que el firmware toca del mundo sale de la placa:
+    adc[pin]       función(t_us) -> 0..65535
+    entradas[pin]  función(t_us) -> 0/1
+    i2c[dir]       dispositivo con leer(reg, n) / escribir(reg, datos)
+    puertos[id]    PuertoUART (se conectan entre placas con conectar_uart)
+    chip           ChipNRF en el SPI, con CSN y CE en los pines de conectar_nrf
+y lo que hace queda registrado en pwm[pin] = [(t_us, duty_ns)] y en log.
+"""
+import ast
+import builtins
+import os
+import random
+import sys
+import types
+from collections import deque
+
+from reloj import FinSimulacion
+
+RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+MODULOS_FIRMWARE = ("canales", "subida_vueltas")   # los que se copian a la Pico
+
+COSTO_LLAMADA_US = 2       # llamada a un periférico (Pin, ADC, ticks...)
+SPI_BAUDIOS = 1000000      # SPI por defecto de MicroPython
+TICKS_PERIODO = 1 << 30    # ticks_ms / ticks_us dan la vuelta acá, como en la Pico
+TXBUF_UART = 256           # búfer de la UART de rp2 (tx y rx)
+RXBUF_UART = 256
+
+def parametros_desde_texto(pares):
+    """["tx.PERIODO_ACTIVO_MS=5", ...] -> {"tx": {"PERIODO_ACTIVO_MS": 5}}."""
+    resultado = {}
+    for par in pares:
+        clave, _, texto = par.partition("=")
+        placa, _, nombre = clave.partition(".")
+        try:
+            valor = ast.literal_eval(texto)
+        except (ValueError, SyntaxError):
+            valor = texto
+        resultado.setdefault(placa, {})[nombre] = valor
+    return resultado
+
+def aplicar_parametros(arbol, parametros, archivo):
+    """Cambia el valor de asignaciones de primer nivel (NOMBRE = ...) del firmware."""
+    faltan = set(parametros)
+    for nodo in arbol.body:
+        if (isinstance(nodo, ast.Assign) and len(nodo.targets) == 1
+                and isinstance(nodo.targets[0], ast.Name) and nodo.targets[0].id in faltan):
+            nombre = nodo.targets[0].id
+            nodo.value = ast.copy_location(ast.Constant(parametros[nombre]), nodo.value)
+            faltan.discard(nombre)
+    if faltan:
+        raise ValueError("{}: no hay asignación de primer nivel para {}".format(
+            os.path.basename(archivo), ", ".join(sorted(faltan))))
+    return ast.fix_missing_locations(arbol)
+
+# ============ UART ============
+class PuertoUART:
+    """Un extremo de UART: 10 bits por byte a los baudios de quien escribe."""
+
+    def __init__(self, nombre):
+        self.nombre = nombre
+        self.baudios = 115200
+        self.destino = None
+        self.rx = bytearray()
+        self._llegando = deque()     # [t_inicio, us_por_byte, datos, entregados]
+        self._fin_tx = 0
+        self.escrituras = 0
+        self.bytes_escritos = 0
+        self.bytes_truncados = 0     # no entraron en el búfer de tx
+        self.bytes_desbordados = 0   # llegaron con el búfer de rx lleno
+
+    def pendientes_tx(self, ahora):
+        us_por_byte = 10e6 / self.baudios
+        return max(0, int((self._fin_tx - ahora) / us_por_byte + 0.999))
+
+    def espera_tx(self, n, ahora):
+        """µs hasta que haya lugar para n bytes en el búfer de tx."""
+        sobran = self.pendientes_tx(ahora) + min(n, TXBUF_UART) - TXBUF_UART
+        return int(sobran * 10e6 / self.baudios) + 1 if sobran > 0 else 0
+
+    def escribir(self, datos, ahora):
+        """Copia al búfer lo que entra y devuelve cuánto (None si nada)."""
+        self.escrituras += 1
+        n = min(len(datos), TXBUF_UART - self.pendientes_tx(ahora))
+        self.bytes_truncados += len(datos) - n
+        if n <= 0:
+            return None
+        us_por_byte = 10e6 / self.baudios
+        inicio = max(ahora, self._fin_tx)
+        self._fin_tx = inicio + n * us_por_byte
+        self.bytes_escritos += n
+        if self.destino is not None:
+            self.destino.llegar(inicio, us_por_byte, bytes(datos[:n]))
+        return n
+
+    def llegar(self, t_inicio, us_por_byte, datos):
+        self._llegando.append([t_inicio, us_por_byte, datos, 0])
+
+    def actualizar(self, ahora):
+        while self._llegando:
+            trozo = self._llegando[0]
+            t0, us_por_byte, datos, entregados = trozo
+            hasta = min(len(datos), int((ahora - t0) / us_por_byte)) if ahora > t0 else 0
+            if hasta > entregados:
+                nuevos = datos[entregados:hasta]
+                libre = RXBUF_UART - len(self.rx)
+                self.rx += nuevos[:libre]
+                self.bytes_desbordados += max(0, len(nuevos) - libre)
+                trozo[3] = hasta
+            if hasta < len(datos):
+                break
+            self._llegando.popleft()
+
+class CapturaUART(PuertoUART):
+    """Extremo de la PC: guarda todo lo que llega con su tiempo (sin límite de búfer)."""
+
+    def __init__(self, nombre):
+        super().__init__(nombre)
+        self.trozos = []
+
+    def llegar(self, t_inicio, us_por_byte, datos):
+        self.trozos.append((t_inicio, us_por_byte, datos))
+
+    def lineas(self):
+        """[(t_us de llegada del \\n, línea sin el \\n)]."""
+        resultado = []
+        actual = bytearray()
+        for t0, us_por_byte, datos in self.trozos:
+            inicio = 0
+            while True:
+                fin = datos.find(b"\n", inicio)
+                if fin < 0:
+                    actual += datos[inicio:]
+                    break
+                actual += datos[inicio:fin]
+                resultado.append((t0 + (fin + 1) * us_por_byte, bytes(actual)))
+                actual = bytearray()
+                inicio = fin + 1
+        return resultado
+
+def conectar_uart(origen, destino):
+    """Lo que escribe el puerto origen llega al puerto destino (un sentido)."""
+    origen.destino = destino
+
+# ============ RED (WiFi + UDP) ============
+class RedVirtual:
+    """WiFi de la Pico W: los datagramas llegan a la PC tras la latencia, o se pierden."""
+
+    def __init__(self, conectada=True, perdida=0.0, latencia_us=5000, jitter_us=0, semilla=1):
+        self.conectada = conectada
+        self.perdida = perdida
+        self.latencia = latencia_us
+        self.jitter = jitter_us
+        self.rng = random.Random(semilla)
+        self.datagramas = []          # (t_llegada_us, destino, datos)
+        self.enviados = 0
+        self.perdidos = 0
+
+    def enviar(self, ahora, datos, destino):
+        self.enviados += 1
+        if self.rng.random() < self.perdida:
+            self.perdidos += 1
+            return
+        demora = self.latencia + (self.rng.randrange(self.jitter + 1) if self.jitter else 0)
+        self.datagramas.append((ahora + demora, destino, bytes(datos)))
+
+# ============ PLACA ============
+class Placa:
+
+    def __init__(self, nombre, archivo, reloj, parametros=None, eco=False, semilla=1):
+        self.nombre = nombre
+        self.archivo = archivo
+        self.reloj = reloj
+        self.parametros = parametros or {}
+        self.eco = eco
+        self.semilla = semilla
+        self.chip = None
+        self.pines_nrf = {}
+        self.red = None
+        self.puertos = {}
+        self.adc = {}
+        self.entradas = {}
+        self.i2c = {}
+        self.pwm = {}
+        self.timers = []
+        self.log = []
+        self.globales = None
+        self.error = None
+        self.modulos = {}
+
+    # ---------------- CABLEADO ----------------
+    def conectar_nrf(self, chip, csn, ce):
+        self.chip = chip
+        self.pines_nrf = {csn: chip.csn, ce: chip.ce}
+
+    def puerto(self, id_uart):
+        puerto = self.puertos.get(id_uart)
+        if puerto is None:
+            puerto = self.puertos[id_uart] = PuertoUART("{}.uart{}".format(self.nombre, id_uart))
+        return puerto
+
+    # ---------------- TIEMPO ----------------
+    @property
+    def ahora(self):
+        return self.reloj.ahora
+
+    def consumir(self, us=COSTO_LLAMADA_US):
+        self.reloj.consumir(us)
+
+    def dormir(self, us):
+        self.reloj.dormir(us)
+        self.atender_timers()
+
+    def atender_timers(self):
+        ahora = self.reloj.ahora
+        for timer in [t for t in self.timers if t.vence <= ahora]:
+            if timer.periodo:
+                timer.vence += timer.periodo
+            else:
+                self.timers.remove(timer)
+            if timer.callback:
+                timer.callback(timer)
+
+    # ---------------- FIRMWARE ----------------
+    def _print(self, *args, sep=" ", end="\n", file=None, flush=False):
+        texto = sep.join(str(a) for a in args) + end
+        self.log.append((self.reloj.ahora, texto))
+        if self.eco:
+            sys.stdout.write("[{:10.3f} ms] {:<9} {}".format(self.reloj.ahora / 1000, self.nombre,
+                                                            texto if texto.endswith("\n") else texto + "\n"))
+
+    def _importar(self, nombre, globales=None, locales=None, fromlist=(), level=0):
+        modulo = self.modulos.get(nombre)
+        if modulo is not None:
+            return modulo
+        if nombre in MODULOS_FIRMWARE:
+            modulo = types.ModuleType(nombre)
+            ruta = os.path.join(RAIZ, nombre + ".py")
+            modulo.__file__ = ruta
+            modulo.__builtins__ = self.builtins
+            self.modulos[nombre] = modulo
+            with open(ruta, encoding="utf-8") as f:
+                exec(compile(f.read(), ruta, "exec"), modulo.__dict__)
+            return modulo
+        return builtins.__import__(nombre, globales, locales, fromlist, level)
+
+    def preparar(self):
+        """Compila el firmware con los parámetros y arma los módulos de mentira."""
+        with open(self.archivo, encoding="utf-8") as f:
+            arbol = ast.parse(f.read(), self.archivo)
+        if self.parametros:
+            arbol = aplicar_parametros(arbol, self.parametros, self.archivo)
+        self._codigo = compile(arbol, self.archivo, "exec")
+        self.builtins = dict(vars(builtins), __import__=self._importar, print=self._print)
+        tiempo = modulo_tiempo(self)
+        self.modulos = {
+            "machine": modulo_machine(self),
+            "utime": tiempo,
+            "time": tiempo,
+            "nrf24l01": modulo_nrf24l01(self, tiempo),
+            "network": modulo_network(self),
+            "socket": modulo_socket(self),
+            "urandom": modulo_urandom(self),
+        }
+
+    def ejecutar(self):
+        """Corre el firmware (en el hilo de la placa) hasta que termine la simulación."""
+        self.globales = {"__name__": "__main__", "__file__": self.archivo, "__builtins__": self.builtins}
+        try:
+            exec(self._codigo, self.globales)
+        except FinSimulacion:
+            raise
+        except BaseException as e:
+            self.error = "{}: {}".format(type(e).__name__, e)
+            self._print("💥 Firmware detenido:", self.error)
+
+# ============ MÓDULOS DE MENTIRA ============
+def modulo_tiempo(placa):
+    m = types.ModuleType("utime")
+
+    def ticks_us():
+        placa.consumir(1)
+        return placa.ahora % TICKS_PERIODO
+
+    def ticks_ms():
+        placa.consumir(1)
+        return (placa.ahora // 1000) % TICKS_PERIODO
+
+    def ticks_diff(a, b):
+        return ((a - b + TICKS_PERIODO // 2) % TICKS_PERIODO) - TICKS_PERIODO // 2
+
+    def ticks_add(a, b):
+        return (a + b) % TICKS_PERIODO
+
+    m.ticks_us = ticks_us
+    m.ticks_ms = ticks_ms
+    m.ticks_cpu = ticks_us
+    m.ticks_diff = ticks_diff
+    m.ticks_add = ticks_add
+    m.sleep_us = lambda us: placa.dormir(us)
+    m.sleep_ms = lambda ms: placa.dormir(ms * 1000)
+    m.sleep = lambda s: placa.dormir(s * 1000000)
+    m.time = lambda: placa.ahora // 1000000
+    m.time_ns = lambda: placa.ahora * 1000
+    return m
+
+def modulo_machine(placa):
+    m = types.ModuleType("machine")
+
+    class Pin:
+        IN, OUT, OPEN_DRAIN = 0, 1, 2
+        PULL_UP, PULL_DOWN = 1, 2
+        IRQ_FALLING, IRQ_RISING = 4, 8
+
+        def __init__(self, id, mode=-1, pull=-1, value=None, **kwargs):
+            self.id = id
+            self._valor = 0
+            if value is not None:
+                self.value(value)
+
+        def init(self, mode=-1, pull=-1, value=None, **kwargs):
+            if value is not None:
+                self.value(value)
+
+        def value(self, valor=None):
+            placa.consumir()
+            if valor is None:
+                entrada = placa.entradas.get(self.id)
+                return entrada(placa.ahora) if entrada else self._valor
+            self._valor = 1 if valor else 0
+            conexion = placa.pines_nrf.get(self.id)
+            if conexion:
+                conexion(self._valor)
+
+        __call__ = value
+
+        def on(self):
+            self.value(1)
+
+        def off(self):
+            self.value(0)
+
+        def high(self):
+            self.value(1)
+
+        def low(self):
+            self.value(0)
+
+        def toggle(self):
+            self.value(not self._valor)
+
+        def irq(self, handler=None, trigger=None, **kwargs):
+            return None
+
+    def _id_pin(pin):
+        return pin.id if isinstance(pin, Pin) else pin
+
+    class ADC:
+        def __init__(self, pin, **kwargs):
+            self.id = _id_pin(pin)
+
+        def read_u16(self):
+            placa.consumir()
+            fuente = placa.adc.get(self.id)
+            return max(0, min(65535, int(fuente(placa.ahora)))) if fuente else 0
+
+    class PWM:
+        def __init__(self, pin, freq=None, duty_u16=None, duty_ns=None, **kwargs):
+            self.id = _id_pin(pin)
+            self._freq = freq or 1000
+            self._ns = 0
+            self.registro = placa.pwm.setdefault(self.id, [])
+            if duty_ns is not None:
+                self.duty_ns(duty_ns)
+            elif duty_u16 is not None:
+                self.duty_u16(duty_u16)
+
+        def freq(self, valor=None):
+            if valor is None:
+                return self._freq
+            self._freq = valor
+
+        def duty_ns(self, valor=None):
+            placa.consumir()
+            if valor is None:
+                return self._ns
+            self._ns = int(valor)
+            self.registro.append((placa.ahora, self._ns))
+
+        def duty_u16(self, valor=None):
+            periodo_ns = 1e9 / self._freq
+            if valor is None:
+                return int(self._ns / periodo_ns * 65535)
+            self.duty_ns(valor * periodo_ns / 65535)
+
+        def deinit(self):
+            pass
+
+    class UART:
+        def __init__(self, id, baudrate=115200, **kwargs):
+            self.puerto = placa.puerto(id)
+            self.puerto.baudios = baudrate
+
+        def init(self, baudrate=None, **kwargs):
+            placa.consumir()
+            if baudrate:
+                self.puerto.baudios = baudrate
+
+        def deinit(self):
+            pass
+
+        def write(self, datos):
+            # Como rp2: si no entra ni el primer byte vuelve enseguida (timeout=0); si
+            # entra, espera a que se vacíe el búfer (timeout_char >= un carácter) hasta
+            # copiar todo, así que un write largo a pocos baudios frena el bucle
+            placa.consumir()
+            if isinstance(datos, str):
+                datos = datos.encode()
+            puerto = self.puerto
+            espera = puerto.espera_tx(len(datos), placa.ahora)
+            if espera and puerto.pendientes_tx(placa.ahora) < TXBUF_UART:
+                placa.dormir(espera)
+            return puerto.escribir(datos, placa.ahora)
+
+        def txdone(self):
+            placa.consumir()
+            return self.puerto.pendientes_tx(placa.ahora) == 0
+
+        def flush(self):
+            while not self.txdone():
+                placa.dormir(100)
+
+        def any(self):
+            placa.consumir()
+            self.puerto.actualizar(placa.ahora)
+            return len(self.puerto.rx)
+
+        def read(self, n=None):
+            placa.consumir()
+            self.puerto.actualizar(placa.ahora)
+            rx = self.puerto.rx
+            if not rx:
+                return None
+            n = len(rx) if n is None else min(n, len(rx))
+            datos = bytes(rx[:n])
+            del rx[:n]
+            return datos
+
+        def readinto(self, buf, n=None):
+            datos = self.read(len(buf) if n is None else min(n, len(buf)))
+            if not datos:
+                return None
+            buf[:len(datos)] = datos
+            return len(datos)
+
+        def readline(self):
+            placa.consumir()
+            self.puerto.actualizar(placa.ahora)
+            rx = self.puerto.rx
+            if not rx:
+                return None
+            fin = rx.find(b"\n")
+            n = len(rx) if fin < 0 else fin + 1
+            datos = bytes(rx[:n])
+            del rx[:n]
+            return datos
+
+    class SPI:
+        def __init__(self, id, baudrate=SPI_BAUDIOS, **kwargs):
+            self.baudios = baudrate
+
+        def init(self, baudrate=None, **kwargs):
+            if baudrate:
+                self.baudios = baudrate
+
+        def deinit(self):
+            pass
+
+        def _transferir(self, salida):
+            placa.consumir(COSTO_LLAMADA_US + len(salida) * 8000000 // self.baudios // 1000)
+            chip = placa.chip
+            if chip is None:
+                return bytes(len(salida))
+            return bytes(chip.byte_spi(b) for b in salida)
+
+        def write(self, datos):
+            self._transferir(datos)
+
+        def read(self, n, write=0x00):
+            return self._transferir(bytes((write,)) * n)
+
+        def readinto(self, buf, write=0x00):
+            buf[:] = self._transferir(bytes((write,)) * len(buf))
+
+        def write_readinto(self, salida, buf):
+            buf[:] = self._transferir(salida)
+
+    class I2C:
+        def __init__(self, id, freq=400000, **kwargs):
+            self.freq = freq
+
+        def _costo(self, n):
+            placa.consumir(COSTO_LLAMADA_US + (n + 2) * 9 * 1000000 // self.freq)
+
+        def scan(self):
+            self._costo(len(placa.i2c))
+            return sorted(placa.i2c)
+
+        def _dispositivo(self, direccion):
+            dispositivo = placa.i2c.get(direccion)
+            if dispositivo is None:
+                raise OSError(5)   # EIO: nadie respondió el ACK
+            return dispositivo
+
+        def readfrom_mem(self, direccion, reg, n, **kwargs):
+            self._costo(n)
+            return bytes(self._dispositivo(direccion).leer(reg, n, placa.ahora))
+
+        def readfrom_mem_into(self, direccion, reg, buf, **kwargs):
+            buf[:] = self.readfrom_mem(direccion, reg, len(buf))
+
+        def writeto_mem(self, direccion, reg, datos, **kwargs):
+            self._costo(len(datos))
+            self._dispositivo(direccion).escribir(reg, bytes(datos))
+
+    class Timer:
+        ONE_SHOT, PERIODIC = 0, 1
+
+        def __init__(self, id=-1, **kwargs):
+            self.vence = 0
+            self.periodo = 0
+            self.callback = None
+            if kwargs:
+                self.init(**kwargs)
+
+        def init(self, mode=PERIODIC, period=-1, freq=-1, callback=None, **kwargs):
+            self.deinit()
+            periodo_us = 1000000 // freq if freq > 0 else max(0, period) * 1000
+            self.periodo = periodo_us if mode == Timer.PERIODIC else 0
+            self.vence = placa.ahora + periodo_us
+            self.callback = callback
+            placa.timers.append(self)
+
+        def deinit(self):
+            if self in placa.timers:
+                placa.timers.remove(self)
+
+    m.Pin, m.ADC, m.PWM, m.UART, m.SPI, m.I2C, m.Timer = Pin, ADC, PWM, UART, SPI, I2C, Timer
+    m.freq = lambda *args: 125000000
+    m.reset = lambda: None
+    return m
+
+def modulo_nrf24l01(placa, tiempo):
+    """El driver nrf24l01.py de MicroPython, hablando por SPI con el ChipNRF de la placa."""
+    m = types.ModuleType("nrf24l01")
+    from radio import (CONFIG, EN_RXADDR, SETUP_AW, SETUP_RETR, RF_CH, RF_SETUP, STATUS,
+                       RX_ADDR_P0, TX_ADDR, RX_PW_P0, FIFO_STATUS, DYNPD, PRIM_RX, PWR_UP, CRCO,
+                       EN_CRC, RX_DR, TX_DS, MAX_RT, RX_EMPTY, R_RX_PAYLOAD, W_TX_PAYLOAD,
+                       FLUSH_TX, FLUSH_RX)
+    POWER_0, POWER_1, POWER_2, POWER_3 = 0x00, 0x02, 0x04, 0x06
+    SPEED_2M, SPEED_1M, SPEED_250K = 0x08, 0x00, 0x20
+
+    class NRF24L01:
+        def __init__(self, spi, cs, ce, channel=46, payload_size=16):
+            assert payload_size <= 32
+            self.buf = bytearray(1)
+            self.spi = spi
+            self.cs = cs
+            self.ce = ce
+            ce.init(ce.OUT, value=0)
+            cs.init(cs.OUT, value=1)
+            self.payload_size = payload_size
+            self.pipe0_read_addr = None
+            tiempo.sleep_ms(5)
+            self.reg_write(SETUP_AW, 0b11)
+            if self.reg_read(SETUP_AW) != 0b11:
+                raise OSError("nRF24L01+ Hardware not responding")
+            self.reg_write(DYNPD, 0)
+            self.reg_write(SETUP_RETR, (6 << 4) | 8)
+            self.set_power_speed(POWER_3, SPEED_250K)
+            self.set_crc(2)
+            self.reg_write(STATUS, RX_DR | TX_DS | MAX_RT)
+            self.set_channel(channel)
+            self.flush_rx()
+            self.flush_tx()
+
+        def reg_read(self, reg):
+            self.cs(0)
+            self.spi.readinto(self.buf, reg)
+            self.spi.readinto(self.buf)
+            self.cs(1)
+            return self.buf[0]
+
+        def reg_write_bytes(self, reg, buf):
+            self.cs(0)
+            self.spi.readinto(self.buf, 0x20 | reg)
+            self.spi.write(buf)
+            self.cs(1)
+            return self.buf[0]
+
+        def reg_write(self, reg, value):
+            self.cs(0)
+            self.spi.readinto(self.buf, 0x20 | reg)
+            ret = self.buf[0]
+            self.spi.readinto(self.buf, value)
+            self.cs(1)
+            return ret
+
+        def flush_rx(self):
+            self.cs(0)
+            self.spi.readinto(self.buf, FLUSH_RX)
+            self.cs(1)
+
+        def flush_tx(self):
+            self.cs(0)
+            self.spi.readinto(self.buf, FLUSH_TX)
+            self.cs(1)
+
+        def set_power_speed(self, power, speed):
+            setup = self.reg_read(RF_SETUP) & 0b11010001
+            self.reg_write(RF_SETUP, setup | power | speed)
+
+        def set_crc(self, length):
+            config = self.reg_read(CONFIG) & ~(CRCO | EN_CRC)
+            if length == 1:
+                config |= EN_CRC
+            elif length == 2:
+                config |= EN_CRC | CRCO
+            self.reg_write(CONFIG, config)
+
+        def set_channel(self, channel):
+            self.reg_write(RF_CH, min(channel, 125))
+
+        def open_tx_pipe(self, address):
+            assert len(address) == 5
+            self.reg_write_bytes(RX_ADDR_P0, address)
+            self.reg_write_bytes(TX_ADDR, address)
+            self.reg_write(RX_PW_P0, self.payload_size)
+
+        def open_rx_pipe(self, pipe_id, address):
+            assert len(address) == 5
+            assert 0 <= pipe_id <= 5
+            if pipe_id == 0:
+                self.pipe0_read_addr = address
+            if pipe_id < 2:
+                self.reg_write_bytes(RX_ADDR_P0 + pipe_id, address)
+            else:
+                self.reg_write(RX_ADDR_P0 + pipe_id, address[0])
+            self.reg_write(RX_PW_P0 + pipe_id, self.payload_size)
+            self.reg_write(EN_RXADDR, self.reg_read(EN_RXADDR) | (1 << pipe_id))
+
+        def start_listening(self):
+            self.reg_write(CONFIG, self.reg_read(CONFIG) | PWR_UP | PRIM_RX)
+            self.reg_write(STATUS, RX_DR | TX_DS | MAX_RT)
+            if self.pipe0_read_addr is not None:
+                self.reg_write_bytes(RX_ADDR_P0, self.pipe0_read_addr)
+            self.flush_rx()
+            self.flush_tx()
+            self.ce(1)
+            tiempo.sleep_us(130)
+
+        def stop_listening(self):
+            self.ce(0)
+            self.flush_tx()
+            self.flush_rx()
+
+        def any(self):
+            return not bool(self.reg_read(FIFO_STATUS) & RX_EMPTY)
+
+        def recv(self):
+            self.cs(0)
+            self.spi.readinto(self.buf, R_RX_PAYLOAD)
+            buf = self.spi.read(self.payload_size)
+            self.cs(1)
+            self.reg_write(STATUS, RX_DR)
+            return buf
+
+        def send(self, buf, timeout=500):
+            self.send_start(buf)
+            start = tiempo.ticks_ms()
+            result = None
+            while result is None and tiempo.ticks_diff(tiempo.ticks_ms(), start) < timeout:
+                result = self.send_done()
+            if result == 2:
+                raise OSError("send failed")
+
+        def send_start(self, buf):
+            self.reg_write(CONFIG, (self.reg_read(CONFIG) | PWR_UP) & ~PRIM_RX)
+            tiempo.sleep_us(150)
+            self.cs(0)
+            self.spi.readinto(self.buf, W_TX_PAYLOAD)
+            self.spi.write(buf)
+            if len(buf) < self.payload_size:
+                self.spi.write(b"\x00" * (self.payload_size - len(buf)))
+            self.cs(1)
+            self.ce(1)
+            tiempo.sleep_us(15)
+            self.ce(0)
+
+        def send_done(self):
+            if not (self.reg_read(STATUS) & (TX_DS | MAX_RT)):
+                return None
+            status = self.reg_write(STATUS, RX_DR | TX_DS | MAX_RT)
+            self.reg_write(CONFIG, self.reg_read(CONFIG) & ~PWR_UP)
+            return 1 if status & TX_DS else 2
+
+    m.NRF24L01 = NRF24L01
+    m.POWER_0, m.POWER_1, m.POWER_2, m.POWER_3 = POWER_0, POWER_1, POWER_2, POWER_3
+    m.SPEED_250K, m.SPEED_1M, m.SPEED_2M = SPEED_250K, SPEED_1M, SPEED_2M
+    return m
+
+def modulo_network(placa):
+    m = types.ModuleType("network")
+    m.STA_IF, m.AP_IF = 0, 1
+
+    class WLAN:
+        def __init__(self, interfaz=0):
+            self._activa = False
+
+        def active(self, valor=None):
+            if valor is None:
+                return self._activa
+            self._activa = bool(valor)
+
+        def connect(self, ssid=None, clave=None, **kwargs):
+            placa.consumir()
+
+        def isconnected(self):
+            placa.consumir()
+            return self._activa and placa.red is not None and placa.red.conectada
+
+        def ifconfig(self):
+            return ("10.10.10.20", "255.255.255.0", "10.10.10.1", "10.10.10.1")
+
+        def status(self, *args):
+            return 3 if self.isconnected() else 0
+
+    m.WLAN = WLAN
+    return m
+
+def modulo_socket(placa):
+    """Solo lo que usa RECEPTORR: UDP no bloqueante hacia la RedVirtual."""
+    m = types.ModuleType("socket")
+    m.AF_INET, m.SOCK_STREAM, m.SOCK_DGRAM = 2, 1, 2
+    m.SOL_SOCKET, m.SO_REUSEADDR = 1, 4
+
+    def getaddrinfo(host, puerto, *args):
+        return [(m.AF_INET, m.SOCK_STREAM, 0, "", (host, puerto))]
+
+    class socket:
+        def __init__(self, af=2, tipo=1, proto=0):
+            self.tipo = tipo
+
+        def setblocking(self, valor):
+            pass
+
+        def settimeout(self, valor):
+            pass
+
+        def setsockopt(self, *args):
+            pass
+
+        def sendto(self, datos, destino):
+            placa.consumir(20)
+            if placa.red is None or not placa.red.conectada:
+                raise OSError(113)   # EHOSTUNREACH
+            placa.red.enviar(placa.ahora, datos, destino)
+            return len(datos)
+
+        def connect(self, destino):
+            raise OSError(113)      # sin servidor de vueltas en la simulación
+
+        def close(self):
+            pass
+
+    m.getaddrinfo = getaddrinfo
+    m.socket = socket
+    return m
+
+def modulo_urandom(placa):
+    m = types.ModuleType("urandom")
+    rng = random.Random(placa.semilla)
+    m.getrandbits = rng.getrandbits
+    m.randint = rng.randint
+    m.randrange = rng.randrange
+    m.random = rng.random
+    m.uniform = rng.uniform
+    m.choice = rng.choice
+    m.seed = rng.seed
+    return m
@@ -0,0 +1,372 @@
+"""
+Medio de radio virtual y modelo del NRF24L01+ para las placas simuladas.
+
+MedioRadio guarda cada transmisión (canal, velocidad, dirección, inicio y
+fin en µs) y la resuelve cuando el reloj pasa su fin: se pierde si se solapa
+con otra en el mismo canal (colisión) o por la pérdida aleatoria; si no,
+llega a los chips que escuchan ese canal a la misma velocidad y con esa
+dirección en un pipe habilitado, después de la latencia extra. El ACK
+automático y los reintentos (EN_AA / SETUP_RETR) se modelan como en el chip:
+cada intento es otra transmisión y el ACK también se puede perder.
+
+ChipNRF atiende los comandos SPI byte a byte (lo que usan el driver
+nrf24l01 de MicroPython y NRF24L01Simple de la placa 3) y el pin CE.
+"""
+import random
+from collections import deque
+
+# Registros y bits (hoja de datos del nRF24L01+)
+CONFIG, EN_AA, EN_RXADDR, SETUP_AW, SETUP_RETR, RF_CH, RF_SETUP, STATUS = range(8)
+RX_ADDR_P0, RX_ADDR_P1, TX_ADDR, RX_PW_P0, FIFO_STATUS, DYNPD = 0x0A, 0x0B, 0x10, 0x11, 0x17, 0x1C
+PRIM_RX, PWR_UP, CRCO, EN_CRC = 0x01, 0x02, 0x04, 0x08
+RX_DR, TX_DS, MAX_RT, TX_FULL = 0x40, 0x20, 0x10, 0x01
+RX_EMPTY, FIFO_TX_EMPTY, FIFO_TX_FULL = 0x01, 0x10, 0x20
+R_RX_PAYLOAD, W_TX_PAYLOAD, FLUSH_TX, FLUSH_RX, NOP = 0x61, 0xA0, 0xE1, 0xE2, 0xFF
+
+T_PLL_US = 130          # arranque del PLL antes de transmitir / cambio TX<->RX
+TAM_FIFO = 3
+
+def velocidad_kbps(rf_setup):
+    if rf_setup & 0x20:
+        return 250
+    return 2000 if rf_setup & 0x08 else 1000
+
+def tiempo_aire_us(payload, kbps, ancho_dir=5, crc=2):
+    """Preámbulo + dirección + 9 bits de control + payload + CRC."""
+    bits = 8 * (1 + ancho_dir + payload + crc) + 9
+    return bits * 1000 // kbps
+
+class Transmision:
+    __slots__ = ("emisor", "canal", "kbps", "direccion", "payload", "pid", "pide_ack",
+                 "t0", "t1", "colision", "resultado")
+
+    def __init__(self, emisor, canal, kbps, direccion, payload, pid, pide_ack, t0, t1):
+        self.emisor = emisor
+        self.canal = canal
+        self.kbps = kbps
+        self.direccion = direccion
+        self.payload = payload
+        self.pid = pid
+        self.pide_ack = pide_ack
+        self.t0 = t0
+        self.t1 = t1
+        self.colision = False
+        self.resultado = None     # None = sin resolver; True/False = llegó (y con ACK si lo pidió)
+
+class Interferencia:
+    """Otro transmisor en el canal (p. ej. otro auto): una ráfaga de duracion_us cada periodo_us."""
+
+    def __init__(self, canal, periodo_us, duracion_us, fase_us=0):
+        self.canal = canal
+        self.periodo = periodo_us
+        self.duracion = duracion_us
+        self.proxima = fase_us
+
+class MedioRadio:
+    HORIZONTE_US = 100000      # las interferencias se generan con esta anticipación
+
+    def __init__(self, reloj, perdida=0.0, latencia_us=0, jitter_us=0, semilla=1):
+        self.reloj = reloj
+        self.perdida = perdida
+        self.latencia = latencia_us
+        self.jitter = jitter_us
+        self.rng = random.Random(semilla)
+        self.chips = []
+        self.interferencias = []
+        self._pendientes = []
+        self._recientes = deque()   # resueltas hace poco: para ver solapes con las nuevas
+        self.por_canal = {}
+
+    def _stats(self, canal):
+        s = self.por_canal.get(canal)
+        if s is None:
+            s = self.por_canal[canal] = {"transmissions": 0, "delivered": 0, "collisions": 0,
+                                         "random_loss": 0, "no_receiver": 0, "acks_lost": 0}
+        return s
+
+    def transmitir(self, tx):
+        for otra in self._pendientes + list(self._recientes):
+            if otra.canal == tx.canal and otra.t0 < tx.t1 and tx.t0 < otra.t1:
+                tx.colision = True
+                if otra.resultado is None:
+                    otra.colision = True
+        self._pendientes.append(tx)
+
+    def _generar_interferencias(self, hasta):
+        for inter in self.interferencias:
+            while inter.proxima <= hasta:
+                t0 = inter.proxima + self.rng.randrange(max(1, inter.periodo // 10))
+                self.transmitir(Transmision(None, inter.canal, 0, b"", b"", 0, False,
+                                            t0, t0 + inter.duracion))
+                inter.proxima += inter.periodo
+
+    def resolver(self, ahora):
+        """Resuelve las transmisiones que terminaron hasta ahora."""
+        self._generar_interferencias(ahora + self.HORIZONTE_US)
+        listas = [tx for tx in self._pendientes if tx.t1 <= ahora]
+        if not listas:
+            return
+        self._pendientes = [tx for tx in self._pendientes if tx.t1 > ahora]
+        for tx in sorted(listas, key=lambda t: t.t1):
+            self._entregar(tx)
+            self._recientes.append(tx)
+        while self._recientes and self._recientes[0].t1 < ahora - self.HORIZONTE_US:
+            self._recientes.popleft()
+
+    def _entregar(self, tx):
+        if tx.emisor is None:      # interferencia: solo ocupa el canal
+            tx.resultado = False
+            return
+        s = self._stats(tx.canal)
+        s["transmissions"] += 1
+        if tx.colision:
+            s["collisions"] += 1
+            tx.resultado = False
+            return
+        if self.rng.random() < self.perdida:
+            s["random_loss"] += 1
+            tx.resultado = False
+            return
+        ack = False
+        hubo_receptor = False
+        demora = self.latencia + (self.rng.randrange(self.jitter + 1) if self.jitter else 0)
+        for chip in self.chips:
+            if chip is tx.emisor:
+                continue
+            pipe = chip.pipe_para(tx)
+            if pipe is None:
+                continue
+            hubo_receptor = True
+            if chip.recibir(tx, pipe, tx.t1 + demora) and chip.regs[EN_AA] & (1 << pipe):
+                ack = True
+        if not hubo_receptor:
+            s["no_receiver"] += 1
+            tx.resultado = False
+            return
+        s["delivered"] += 1
+        if tx.pide_ack and ack and self.rng.random() < self.perdida:
+            s["acks_lost"] += 1
+            ack = False
+        tx.resultado = ack if tx.pide_ack else True
+
+class ChipNRF:
+    """Registros, FIFOs y máquina de transmisión de un nRF24L01+."""
+
+    def __init__(self, nombre, reloj, medio):
+        self.nombre = nombre
+        self.reloj = reloj
+        self.medio = medio
+        medio.chips.append(self)
+        self.regs = bytearray(0x20)
+        for reg, valor in ((CONFIG, 0x08), (EN_AA, 0x3F), (EN_RXADDR, 0x03), (SETUP_AW, 0x03),
+                           (SETUP_RETR, 0x03), (RF_CH, 0x02), (RF_SETUP, 0x0E), (STATUS, 0x0E)):
+            self.regs[reg] = valor
+        self.direcciones = {RX_ADDR_P0: b"\xE7" * 5, RX_ADDR_P1: b"\xC2" * 5, TX_ADDR: b"\xE7" * 5}
+        for pipe in range(2, 6):
+            self.regs[RX_ADDR_P0 + pipe] = 0xC1 + pipe
+        self.ce_alto = False
+        self.fifo_tx = deque()
+        self.fifo_rx = deque()       # (t_disponible, pipe, payload)
+        self._envio = None           # Transmision del intento en curso
+        self._intentos = 0
+        self._pid = 0
+        self._ultimo_pid = {}        # pipe -> (emisor, pid, payload): descarta reintentos ya recibidos
+        self._cmd = None
+        self._pos = 0
+        self._datos = bytearray()
+        self._leyendo = b""
+        self.registro_rx = []        # (t, payload) de lo recibido, para las métricas
+        self.registro_tx = []        # (t, payload) de lo que el firmware cargó en la FIFO de tx
+        self.stats = {"tx_payloads": 0, "tx_attempts": 0, "tx_ok": 0, "tx_max_rt": 0,
+                      "tx_fifo_full": 0, "rx_ok": 0, "rx_duplicates": 0, "rx_overflow": 0,
+                      "rx_width_mismatch": 0}
+
+    # ---------------- ESTADO ----------------
+    @property
+    def canal(self):
+        return self.regs[RF_CH] & 0x7F
+
+    @property
+    def kbps(self):
+        return velocidad_kbps(self.regs[RF_SETUP])
+
+    def escuchando(self):
+        config = self.regs[CONFIG]
+        return self.ce_alto and config & PWR_UP and config & PRIM_RX
+
+    def direccion_pipe(self, pipe):
+        if pipe < 2:
+            return self.direcciones[RX_ADDR_P0 + pipe]
+        return bytes((self.regs[RX_ADDR_P0 + pipe],)) + self.direcciones[RX_ADDR_P1][1:]
+
+    def pipe_para(self, tx):
+        """Pipe que recibiría la transmisión, o None."""
+        if not self.escuchando() or tx.canal != self.canal or tx.kbps != self.kbps:
+            return None
+        for pipe in range(6):
+            if self.regs[EN_RXADDR] & (1 << pipe) and self.direccion_pipe(pipe) == tx.direccion:
+                return pipe
+        return None
+
+    def recibir(self, tx, pipe, t_disponible):
+        """Llamado por el medio. True si el chip responde con ACK (lo guardó o era un reintento)."""
+        if len(tx.payload) != self.regs[RX_PW_P0 + pipe]:
+            self.stats["rx_width_mismatch"] += 1   # ancho fijo distinto: el CRC no cierra
+            return False
+        clave = (id(tx.emisor), tx.pid, tx.payload)
+        if self._ultimo_pid.get(pipe) == clave:
+            self.stats["rx_duplicates"] += 1
+            return True
+        if len(self.fifo_rx) >= TAM_FIFO:
+            self.stats["rx_overflow"] += 1
+            return False
+        self._ultimo_pid[pipe] = clave
+        self.fifo_rx.append((t_disponible, pipe, bytes(tx.payload)))
+        self.registro_rx.append((t_disponible, bytes(tx.payload)))
+        self.stats["rx_ok"] += 1
+        return True
+
+    def _rx_disponibles(self, ahora):
+        n = 0
+        for t, _, _ in self.fifo_rx:
+            if t > ahora:
+                break
+            n += 1
+        return n
+
+    def _status(self):
+        ahora = self.reloj.ahora
+        status = self.regs[STATUS] & (RX_DR | TX_DS | MAX_RT)
+        if self._rx_disponibles(ahora):
+            status |= RX_DR | (self.fifo_rx[0][1] << 1)
+        else:
+            status |= 0x0E
+        if len(self.fifo_tx) >= TAM_FIFO:
+            status |= TX_FULL
+        return status
+
+    def _fifo_status(self):
+        valor = 0
+        if not self._rx_disponibles(self.reloj.ahora):
+            valor |= RX_EMPTY
+        if not self.fifo_tx:
+            valor |= FIFO_TX_EMPTY
+        if len(self.fifo_tx) >= TAM_FIFO:
+            valor |= FIFO_TX_FULL
+        return valor
+
+    # ---------------- TRANSMISIÓN ----------------
+    def _intento(self, t0):
+        ancho = (self.regs[SETUP_AW] & 0x03) + 2
+        crc = 0 if not self.regs[CONFIG] & EN_CRC else (2 if self.regs[CONFIG] & CRCO else 1)
+        payload = self.fifo_tx[0]
+        dur = tiempo_aire_us(len(payload), self.kbps, ancho, crc)
+        self._intentos += 1
+        self.stats["tx_attempts"] += 1
+        self._envio = Transmision(self, self.canal, self.kbps, self.direcciones[TX_ADDR], payload,
+                                  self._pid, bool(self.regs[EN_AA] & 0x01), t0, t0 + dur)
+        self.medio.transmitir(self._envio)
+
+    def actualizar(self):
+        """Avanza la transmisión en curso hasta el tiempo actual."""
+        ahora = self.reloj.ahora
+        self.medio.resolver(ahora)
+        while self._envio is not None:
+            tx = self._envio
+            if tx.resultado is None:
+                return
+            if tx.pide_ack:
+                fin = tx.t1 + T_PLL_US + tiempo_aire_us(0, tx.kbps)
+                if not tx.resultado:
+                    fin = tx.t1 + ((self.regs[SETUP_RETR] >> 4) + 1) * 250
+            else:
+                fin = tx.t1
+            if fin > ahora:
+                return
+            self._envio = None
+            if tx.resultado or not tx.pide_ack:
+                self.fifo_tx.popleft()
+                self.regs[STATUS] |= TX_DS
+                self.stats["tx_ok"] += 1
+            elif self._intentos <= (self.regs[SETUP_RETR] & 0x0F):
+                self._intento(fin)
+                self.medio.resolver(ahora)
+            else:
+                self.regs[STATUS] |= MAX_RT    # el payload queda en la FIFO, como en el chip
+                self.stats["tx_max_rt"] += 1
+
+    def ce(self, valor):
+        subida = valor and not self.ce_alto
+        self.ce_alto = bool(valor)
+        if not subida:
+            return
+        self.actualizar()
+        config = self.regs[CONFIG]
+        if (config & PWR_UP and not config & PRIM_RX and self.fifo_tx
+                and self._envio is None and not self.regs[STATUS] & MAX_RT):
+            self._pid = (self._pid + 1) & 0x03
+            self._intentos = 0
+            self._intento(self.reloj.ahora + T_PLL_US)
+
+    # ---------------- SPI ----------------
+    def csn(self, valor):
+        if not valor:
+            self._cmd = None
+            self._pos = 0
+            self._datos = bytearray()
+            self.actualizar()
+            return
+        cmd = self._cmd
+        self._cmd = None
+        if cmd is None:
+            return
+        if 0x20 <= cmd < 0x40 and self._datos:
+            self._escribir_registro(cmd & 0x1F, bytes(self._datos))
+        elif cmd == W_TX_PAYLOAD:
+            self.stats["tx_payloads"] += 1
+            if len(self.fifo_tx) >= TAM_FIFO:
+                self.stats["tx_fifo_full"] += 1
+            else:
+                self.fifo_tx.append(bytes(self._datos))
+                self.registro_tx.append((self.reloj.ahora, bytes(self._datos)))
+        elif cmd == R_RX_PAYLOAD and self._pos and self.fifo_rx:
+            self.fifo_rx.popleft()
+
+    def byte_spi(self, b):
+        """Un byte full-duplex: devuelve lo que el chip pone en MISO."""
+        if self._cmd is None:
+            self._cmd = b
+            if b == FLUSH_TX:
+                self.fifo_tx.clear()
+                self._envio = None
+            elif b == FLUSH_RX:
+                self.fifo_rx.clear()
+            elif b < 0x20:
+                self._leyendo = self._leer_registro(b)
+            elif b == R_RX_PAYLOAD:
+                self._leyendo = self.fifo_rx[0][2] if self._rx_disponibles(self.reloj.ahora) else b""
+            return self._status()
+        pos = self._pos
+        self._pos += 1
+        if self._cmd < 0x20 or self._cmd == R_RX_PAYLOAD:
+            return self._leyendo[pos] if pos < len(self._leyendo) else 0
+        if 0x20 <= self._cmd < 0x40 or self._cmd == W_TX_PAYLOAD:
+            self._datos.append(b)
+        return 0
+
+    def _leer_registro(self, reg):
+        if reg in self.direcciones:
+            return self.direcciones[reg]
+        if reg == STATUS:
+            return bytes((self._status(),))
+        if reg == FIFO_STATUS:
+            return bytes((self._fifo_status(),))
+        return bytes((self.regs[reg],))
+
+    def _escribir_registro(self, reg, datos):
+        if reg in self.direcciones:
+            self.direcciones[reg] = datos[:5]
+        elif reg == STATUS:
+            self.regs[STATUS] &= ~(datos[0] & (RX_DR | TX_DS | MAX_RT)) & 0xFF
+        else:
+            self.regs[reg] = datos[0]
@@ -0,0 +1,94 @@
+"""
+Reloj virtual y turnos entre los hilos de las placas simuladas.
+
+Cada placa corre su firmware en un hilo propio, pero avanza uno solo a la
+vez: el que tiene el menor tiempo de despertar. sleep/sleep_ms/sleep_us
+ceden el turno; las demás llamadas al hardware suman un costo fijo
+(consumir) y ceden cada MAX_SIN_CEDER_US para que un bucle de espera activa
+(while not uart.txdone(): pass) no congele al resto. El resultado no depende
+de la carga de la PC y corre más rápido que el tiempo real.
+
+El tiempo de CPU del propio código Python del firmware no se cuenta: solo
+las esperas, la E/S y el costo fijo por llamada.
+"""
+import threading
+
+class FinSimulacion(KeyboardInterrupt):
+    """Se lanza en el hilo de una placa al cumplirse la duración (RECEPTORR lo trata como Ctrl+C)."""
+
+class Reloj:
+    MAX_SIN_CEDER_US = 200
+
+    def __init__(self, duracion_us):
+        self.ahora = 0                # µs virtuales
+        self.duracion = duracion_us
+        self._despertar = {}          # hilo -> µs en que quiere seguir
+        self._eventos = {}            # hilo -> Event para pasarle el turno
+        self._orden = {}              # hilo -> orden de alta (desempate)
+        self._ultimo_turno = 0
+
+    # ---------------- ALTA Y ARRANQUE (hilo principal) ----------------
+    def agregar(self, nombre, objetivo):
+        """Crea el hilo de una placa; objetivo corre recién cuando le toca el turno."""
+        evento = threading.Event()
+
+        def correr():
+            evento.wait()
+            evento.clear()
+            try:
+                if self.ahora < self.duracion:
+                    objetivo()
+            except FinSimulacion:
+                pass
+            finally:
+                self._salir()
+
+        hilo = threading.Thread(target=correr, name=nombre, daemon=True)
+        self._eventos[hilo] = evento
+        self._despertar[hilo] = 0
+        self._orden[hilo] = len(self._orden)
+        return hilo
+
+    def correr(self):
+        """Arranca todos los hilos y espera a que terminen (al cumplirse la duración)."""
+        hilos = list(self._eventos)
+        for hilo in hilos:
+            hilo.start()
+        if hilos:
+            self._eventos[self._siguiente()].set()
+        for hilo in hilos:
+            while hilo.is_alive():
+                hilo.join(0.5)
+
+    # ---------------- DESDE LOS HILOS DE LAS PLACAS ----------------
+    def dormir(self, us):
+        yo = threading.current_thread()
+        self._despertar[yo] = self.ahora + max(0, int(us))
+        self._ceder(yo)
+
+    def consumir(self, us):
+        """Costo de una llamada al hardware sin ceder el turno (salvo cada MAX_SIN_CEDER_US)."""
+        self.ahora += us
+        if self.ahora - self._ultimo_turno >= self.MAX_SIN_CEDER_US:
+            self.dormir(0)
+
+    def _siguiente(self):
+        return min(self._despertar, key=lambda h: (self._despertar[h], self._orden[h]))
+
+    def _ceder(self, yo):
+        siguiente = self._siguiente()
+        self.ahora = max(self.ahora, self._despertar[siguiente])
+        if siguiente is not yo:
+            self._eventos[siguiente].set()
+            self._eventos[yo].wait()
+            self._eventos[yo].clear()
+        self._ultimo_turno = self.ahora
+        if self.ahora >= self.duracion:
+            raise FinSimulacion()
+
+    def _salir(self):
+        del self._despertar[threading.current_thread()]
+        if self._despertar:
+            siguiente = self._siguiente()
+            self.ahora = max(self.ahora, self._despertar[siguiente])
+            self._eventos[siguiente].set()
@@ -0,0 +1,406 @@
+"""
+Simulación de las tres placas y RECEPTORR con radio NRF y UARTs virtuales.
+
+Corre sin cambios Tx control.py, Rx16-1.py, la placa 3 y RECEPTORR.py sobre
+el reloj virtual (reloj.py), el medio de radio (radio.py) y los módulos de
+mentira (placa.py), y mide:
+
+  joystick -> PWM     desde que cambia el ADC del joystick hasta el duty_ns del servo / ESC
+  edad telemetría     desde que la placa 3 lee el MPU hasta que la muestra llega a
+                      RECEPTORR por radio y a la PC (UART de RECEPTORR y UDP)
+  pérdida por salto   radio control, UART Rx -> placa 3, radio telemetría, UART y UDP a la PC
+
+Para seguir cada muestra el MPU simulado devuelve su número de lectura n en
+la aceleración (acc_x = (n // 1000) / 100, acc_y = (n % 1000) / 100 m/s2).
+
+Las constantes de primer nivel del firmware se cambian con --param
+placa.NOMBRE=valor (placas: tx, rx, sensores, receptor); lo que está escrito
+como número dentro del bucle (los 200 ms de la placa 3) no.
+
+    python simulador/simular.py --segundos 30
+    python simulador/simular.py --perdida 0.05 --interferencia 76:200:1400
+    python simulador/simular.py --param tx.PERIODO_ACTIVO_MS=5 --param receptor.BAUD_BASE=115200 --json
+"""
+import argparse
+import bisect
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from placa import Placa, CapturaUART, RedVirtual, conectar_uart, parametros_desde_texto, RAIZ
+from radio import ChipNRF, Interferencia, MedioRadio
+from reloj import Reloj
+
+sys.path.insert(0, RAIZ)
+import SERVICIO_TELEMETRIA as servicio
+import canales
+
+PLACAS = (
+    ("tx", "Tx control.py"),
+    ("rx", "Rx16-1.py"),
+    ("sensores", "codigo placa3-seonsores telemetria"),
+    ("receptor", "RECEPTORR.py"),
+)
+CALENTAMIENTO_US = 3000000   # el Rx arranca con 2 s de failsafe: el joystick se mueve después
+RUIDO_ADC = 150              # LSB, menor que la zona muerta del TX
+LAT_PISTA, LON_PISTA = 4.63700, -74.08300
+
+# ============ ENTORNO ============
+class Joystick:
+    """Dos ejes que saltan a posiciones al azar cada paso_us (ángulo y velocidad cambian >= 5)."""
+
+    def __init__(self, paso_us, duracion_us, rng):
+        self.rng = rng
+        self.pasos = [0]
+        self.servo = [32768]
+        self.motor = [32768]
+        t = CALENTAMIENTO_US
+        while t < duracion_us:
+            self.pasos.append(t)
+            self.servo.append(self._nuevo(self.servo[-1], 60))
+            self.motor.append(self._nuevo(self.motor[-1], 100))
+            t += paso_us
+
+    def _nuevo(self, anterior, escala):
+        while True:
+            raw = self.rng.randrange(2000, 63500)
+            if abs(raw * escala // 65535 - anterior * escala // 65535) >= 5:
+                return raw
+
+    def _valor(self, valores, t):
+        return valores[bisect.bisect_right(self.pasos, t) - 1] + self.rng.randint(-RUIDO_ADC, RUIDO_ADC)
+
+    def leer_servo(self, t):
+        return self._valor(self.servo, t)
+
+    def leer_motor(self, t):
+        return self._valor(self.motor, t)
+
+class MPU6050:
+    """Responde WHO_AM_I y devuelve el número de lectura codificado en acc_x / acc_y."""
+
+    def __init__(self):
+        self.lecturas = []     # t_us de cada lectura de 0x3B (la n-ésima es lecturas[n - 1])
+
+    def leer(self, reg, n, ahora):
+        if reg == 0x75:
+            return bytes((0x68,))[:n]
+        if reg != 0x3B:
+            return bytes(n)
+        self.lecturas.append(ahora)
+        numero = len(self.lecturas)
+        crudos = (round(numero // 1000 * 16384 / 981), round(numero % 1000 * 16384 / 981), 16384,
+                  0, 40, -25, 8)
+        datos = bytearray()
+        for v in crudos:
+            datos += (v & 0xFFFF).to_bytes(2, "big")
+        return bytes(datos[:n])
+
+    def escribir(self, reg, datos):
+        pass
+
+def numero_de_muestra(acc_x, acc_y):
+    return round(acc_x * 100) * 1000 + round(acc_y * 100)
+
+def nmea(cuerpo):
+    chk = 0
+    for c in cuerpo.encode():
+        chk ^= c
+    return "${}*{:02X}\r\n".format(cuerpo, chk).encode()
+
+def grados_nmea(valor, positivo, negativo, ancho):
+    hemi = positivo if valor >= 0 else negativo
+    valor = abs(valor)
+    grados = int(valor)
+    return "{:0{}d}{:07.4f}".format(grados, ancho, (valor - grados) * 60), hemi
+
+def alimentar_gps(puerto, duracion_us, baudios=9600):
+    """NEO-6M a 1 Hz: $GPRMC + $GPGGA dando vueltas a un círculo de 15 m."""
+    us_por_byte = 10e6 / baudios
+    for s in range(1, int(duracion_us // 1000000) + 1):
+        angulo = s * 2 * math.pi / 30
+        lat = LAT_PISTA + 15 / 111320 * math.sin(angulo)
+        lon = LON_PISTA + 15 / 111320 * math.cos(angulo)
+        lat_txt, ns = grados_nmea(lat, "N", "S", 2)
+        lon_txt, ew = grados_nmea(lon, "E", "W", 3)
+        rmc = nmea("GPRMC,{:06d}.00,A,{},{},{},{},{:.2f},0.0,010125,,,A".format(
+            s % 240000, lat_txt, ns, lon_txt, ew, 3.14 / 1.852))
+        gga = nmea("GPGGA,{:06d}.00,{},{},{},{},1,08,1.0,{:.1f},M,0.0,M,,".format(
+            s % 240000, lat_txt, ns, lon_txt, ew, 2600.0))
+        puerto.llegar(s * 1000000, us_por_byte, rmc + gga)
+
+# ============ MÉTRICAS ============
+def percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(p / 100 * len(valores)))] if valores else None
+
+def resumen_ms(valores_us, **extra):
+    resultado = {"n": len(valores_us)}
+    for nombre, p in (("p50", 50), ("p95", 95), ("p99", 99), ("max", 100)):
+        v = percentil(valores_us, p)
+        resultado[nombre] = None if v is None else round(v / 1000, 2)
+    resultado.update(extra)
+    return resultado
+
+def latencia_control(joystick, registro):
+    """Desde cada paso del joystick hasta el primer cambio de duty_ns (antes del paso siguiente)."""
+    tiempos = [t for t, _ in registro]
+    latencias = []
+    sin_respuesta = 0
+    for k in range(1, len(joystick.pasos)):
+        t_paso = joystick.pasos[k]
+        t_fin = joystick.pasos[k + 1] if k + 1 < len(joystick.pasos) else float("inf")
+        i = bisect.bisect_right(tiempos, t_paso)
+        previo = registro[i - 1][1] if i else None
+        for t, valor in registro[i:]:
+            if t >= t_fin:
+                break
+            if valor != previo:
+                latencias.append(t - t_paso)
+                break
+        else:
+            if t_fin != float("inf"):
+                sin_respuesta += 1
+    return resumen_ms(latencias, no_response=sin_respuesta)
+
+def edades(llegadas, lecturas):
+    """llegadas = [(t_us, n)] -> edad en µs de cada muestra distinta (la primera vez que llega)."""
+    resultado = []
+    vistas = set()
+    for t, n in llegadas:
+        if 1 <= n <= len(lecturas) and n not in vistas:
+            vistas.add(n)
+            resultado.append(t - lecturas[n - 1])
+    return resultado
+
+def llegadas_radio(chip):
+    for t, payload in chip.registro_rx:
+        valores = canales.decodificar(payload)
+        yield t, numero_de_muestra(valores[4], valores[5])
+
+def llegadas_uart(captura):
+    lineas = captura.lineas()
+    completas = []
+    for t, linea in lineas:
+        campos = dict(servicio.CAMPO_RE.findall(linea.decode("ascii", errors="ignore")))
+        if all(etiqueta in campos for etiqueta in canales.ETIQUETAS):
+            completas.append((t, numero_de_muestra(float(campos["AccX"]), float(campos["AccY"]))))
+    return len(lineas), completas
+
+def llegadas_udp(red):
+    secuencia = servicio.SecuenciaUDP()
+    tam = servicio.CABECERA_UDP.size
+    payloads = []
+    for t, _, datagrama in sorted(red.datagramas):
+        magia, _, seq, cantidad = servicio.CABECERA_UDP.unpack_from(datagrama)
+        if magia != servicio.MAGIA_UDP:
+            continue
+        secuencia.registrar(seq, t / 1e6)
+        for valores in servicio.PAQUETE_NRF.iter_unpack(datagrama[tam:tam + cantidad * servicio.PAQUETE_NRF.size]):
+            payloads.append((t, valores[4] * 1000 + valores[5]))   # crudos: acc * 100
+    return secuencia.metricas(), payloads
+
+def perdida(enviados, recibidos):
+    return round(100 * (1 - recibidos / enviados), 2) if enviados else None
+
+# ============ MAIN ============
+def commit_actual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def interferencia(texto):
+    canal, periodo_ms, duracion_us = texto.split(":")
+    return int(canal), int(float(periodo_ms) * 1000), int(duracion_us)
+
+def simular(args):
+    duracion = int(args.segundos * 1000000)
+    rng = random.Random(args.semilla)
+    reloj = Reloj(duracion)
+    medio = MedioRadio(reloj, args.perdida, args.latencia_us, args.jitter_us, args.semilla)
+    for canal, periodo, dur in args.interferencia:
+        medio.interferencias.append(Interferencia(canal, periodo, dur, rng.randrange(periodo)))
+    red = RedVirtual(True, args.perdida_wifi, int(args.latencia_wifi_ms * 1000), 0, args.semilla)
+
+    parametros = parametros_desde_texto(args.param)
+    desconocidas = set(parametros) - {nombre for nombre, _ in PLACAS}
+    if desconocidas:
+        raise SystemExit("Placas desconocidas en --param: " + ", ".join(sorted(desconocidas)))
+    placas = {nombre: Placa(nombre, os.path.join(RAIZ, archivo), reloj, parametros.get(nombre),
+                            args.eco, args.semilla + i)
+              for i, (nombre, archivo) in enumerate(PLACAS)}
+    tx, rx, sensores, receptor = (placas[n] for n, _ in PLACAS)
+
+    # ---- Cableado (pines de cada firmware) ----
+    joystick = Joystick(int(args.paso_joystick_ms * 1000), duracion, rng)
+    tx.conectar_nrf(ChipNRF("tx", reloj, medio), csn=15, ce=14)
+    tx.adc[26] = joystick.leer_servo
+    tx.adc[27] = joystick.leer_motor
+
+    rx.conectar_nrf(ChipNRF("rx", reloj, medio), csn=5, ce=14)
+    rx.adc[26] = lambda t: (8.2 - 0.8 * t / 600e6) / 3.0 / 3.3 * 65535   # 2S descargándose
+    conectar_uart(rx.puerto(0), sensores.puerto(0))
+
+    mpu = MPU6050()
+    sensores.conectar_nrf(ChipNRF("sensores", reloj, medio), csn=14, ce=13)
+    sensores.adc[28] = lambda t: (25.0 + t / 60e6) / 100 / 3.3 * 65535   # LM35: 10 mV/°C
+    sensores.entradas[15] = lambda t: 1 if (t // 100000) % 20 == 0 else 0
+    sensores.i2c[0x68] = mpu
+    alimentar_gps(sensores.puerto(1), duracion)
+
+    receptor.conectar_nrf(ChipNRF("receptor", reloj, medio), csn=14, ce=13)
+    receptor.red = red
+    pc = CapturaUART("pc")
+    conectar_uart(receptor.puerto(0), pc)
+
+    for nombre, placa in placas.items():
+        try:
+            placa.preparar()
+        except ValueError as e:
+            raise SystemExit(str(e))
+        reloj.agregar(nombre, placa.ejecutar)
+    t0 = time.perf_counter()
+    reloj.correr()
+    segundos_reales = time.perf_counter() - t0
+
+    # ---- Métricas ----
+    lineas, completas = llegadas_uart(pc)
+    secuencia, por_udp = llegadas_udp(red)
+    edad_radio = edades(llegadas_radio(receptor.chip), mpu.lecturas)
+    edad_uart = edades(completas, mpu.lecturas)
+    edad_udp = edades(por_udp, mpu.lecturas)
+
+    g_rx = rx.globales or {}
+    g_sensores = sensores.globales or {}
+    g_receptor = receptor.globales or {}
+    lector = g_sensores.get("lector_placa2")
+    canal_control = tx.chip.canal
+    canal_telemetria = sensores.chip.canal
+    recibidas_receptor = g_receptor.get("counter", 0)
+
+    saltos = {
+        "radio_control": {
+            "sent": tx.chip.stats["tx_ok"],
+            "received": rx.chip.stats["rx_ok"],
+            "loss_pct": perdida(tx.chip.stats["tx_ok"], rx.chip.stats["rx_ok"]),
+            "firmware_seq_lost": g_rx.get("paquetes_perdidos"),
+            "channel": dict(medio.por_canal.get(canal_control, {}), number=canal_control),
+        },
+        "uart_rx_to_sensors": {
+            "sent": rx.puertos[0].escrituras if 0 in rx.puertos else 0,
+            "received": lector.validas if lector else 0,
+            "loss_pct": perdida(rx.puertos[0].escrituras if 0 in rx.puertos else 0,
+                                lector.validas if lector else 0),
+            "tx_bytes_truncated": rx.puerto(0).bytes_truncados,
+            "rx_bytes_overflow": sensores.puerto(0).bytes_desbordados,
+        },
+        "radio_telemetry": {
+            "sent": sensores.chip.stats["tx_payloads"],
+            "received": receptor.chip.stats["rx_ok"],
+            "loss_pct": perdida(sensores.chip.stats["tx_payloads"], receptor.chip.stats["rx_ok"]),
+            "attempts": sensores.chip.stats["tx_attempts"],
+            "max_rt": sensores.chip.stats["tx_max_rt"],
+            "tx_fifo_full": sensores.chip.stats["tx_fifo_full"],
+            "rx_overflow": receptor.chip.stats["rx_overflow"],
+            "channel": dict(medio.por_canal.get(canal_telemetria, {}), number=canal_telemetria),
+        },
+        "uart_to_pc": {
+            "sent": g_receptor.get("reenviadas", 0),
+            "lines": lineas,
+            "received": len(completas),
+            "loss_pct": perdida(recibidas_receptor, len(completas)),
+            "baud": receptor.puerto(0).baudios,
+            "tx_bytes_truncated": receptor.puerto(0).bytes_truncados,
+        },
+        "udp_to_pc": {
+            "sent": recibidas_receptor,
+            "received": len(por_udp),
+            "loss_pct": perdida(recibidas_receptor, len(por_udp)),
+            "datagrams": dict(secuencia, sent=red.enviados),
+        },
+    }
+    return {
+        "simulation": "placas",
+        "commit": commit_actual(),
+        "virtual_s": args.segundos,
+        "wall_s": round(segundos_reales, 2),
+        "params": {"loss": args.perdida, "latency_us": args.latencia_us, "jitter_us": args.jitter_us,
+                   "interference": args.interferencia, "wifi_loss": args.perdida_wifi,
+                   "wifi_latency_ms": args.latencia_wifi_ms, "joystick_step_ms": args.paso_joystick_ms,
+                   "firmware": parametros, "seed": args.semilla},
+        "control_latency_ms": {
+            "servo": latencia_control(joystick, rx.pwm.get(15, [])),
+            "motor": latencia_control(joystick, rx.pwm.get(9, [])),
+        },
+        "telemetry_age_ms": {
+            "radio": resumen_ms(edad_radio),
+            "pc_uart": resumen_ms(edad_uart),
+            "pc_udp": resumen_ms(edad_udp),
+            "samples": len(mpu.lecturas),
+        },
+        "hops": saltos,
+        "boards": {nombre: {"error": placa.error, "log_lines": len(placa.log),
+                            "radio": placa.chip.stats if placa.chip else None}
+                   for nombre, placa in placas.items()},
+    }, placas
+
+def imprimir(resultado):
+    print(f"🧪 {resultado['virtual_s']} s simulados en {resultado['wall_s']} s")
+    for nombre, datos in resultado["boards"].items():
+        if datos["error"]:
+            print(f"💥 {nombre}: {datos['error']}")
+    print(f"\n{'Latencia / edad':<22} {'n':>6} {'p50':>9} {'p95':>9} {'p99':>9} {'máx':>9}")
+    filas = [("joystick -> servo", resultado["control_latency_ms"]["servo"]),
+             ("joystick -> motor", resultado["control_latency_ms"]["motor"]),
+             ("muestra -> receptor", resultado["telemetry_age_ms"]["radio"]),
+             ("muestra -> PC (UART)", resultado["telemetry_age_ms"]["pc_uart"]),
+             ("muestra -> PC (UDP)", resultado["telemetry_age_ms"]["pc_udp"])]
+    for nombre, r in filas:
+        valores = ["{:8.2f}ms".format(r[k]) if r[k] is not None else "{:>10}".format("-")
+                   for k in ("p50", "p95", "p99", "max")]
+        print(f"{nombre:<22} {r['n']:6d} " + "".join(valores))
+    print(f"\n{'Salto':<22} {'Enviadas':>9} {'Llegaron':>9} {'Pérdida':>9}")
+    for nombre, r in resultado["hops"].items():
+        pct = "-" if r["loss_pct"] is None else f"{r['loss_pct']:.2f}%"
+        print(f"{nombre:<22} {r['sent']:9d} {r['received']:9d} {pct:>9}")
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument('--segundos', type=float, default=20.0, help='tiempo simulado')
+    ap.add_argument('--perdida', type=float, default=0.0, help='probabilidad de perder cada paquete de radio')
+    ap.add_argument('--latencia-us', type=int, default=0, help='demora extra de cada paquete de radio')
+    ap.add_argument('--jitter-us', type=int, default=0)
+    ap.add_argument('--interferencia', type=interferencia, action='append', default=[],
+                    metavar='CANAL:PERIODO_MS:DURACION_US', help='otro transmisor en el canal (repetible)')
+    ap.add_argument('--perdida-wifi', type=float, default=0.0)
+    ap.add_argument('--latencia-wifi-ms', type=float, default=5.0)
+    ap.add_argument('--paso-joystick-ms', type=float, default=500.0, help='cada cuánto se mueve el joystick')
+    ap.add_argument('--param', action='append', default=[], metavar='PLACA.NOMBRE=VALOR',
+                    help='constante del firmware (repetible), p. ej. tx.PERIODO_ACTIVO_MS=5')
+    ap.add_argument('--semilla', type=int, default=1)
+    ap.add_argument('--eco', action='store_true', help='mostrar la consola de cada placa')
+    ap.add_argument('--salida', help='guardar el JSON en este archivo')
+    ap.add_argument('--json', action='store_true', help='solo imprimir el resultado en JSON')
+    args = ap.parse_args()
+    if args.segundos * 1000000 <= CALENTAMIENTO_US:
+        raise SystemExit("--segundos tiene que ser mayor que {} s".format(CALENTAMIENTO_US / 1e6))
+
+    resultado, _ = simular(args)
+    texto = json.dumps(resultado, indent=None if args.json else 2)
+    if args.salida:
+        with open(args.salida, "w") as f:
+            f.write(texto + "\n")
+    if args.json:
+        print(texto)
+    else:
+        imprimir(resultado)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+# subida_vueltas.py - cola de vueltas + subida por lotes para la Pico W
+#
+# Copiar a la Pico junto con RECEPTORR.py. También corre en CPython para
+# probarlo en la PC contra servidor_vueltas.py.
+#
+# - Las vueltas se guardan en un anillo fijo en RAM (opcional: desborde a flash)
+# - Se envía una por POST /api/lap (lo que acepta el servidor de la carrera) por un
+#   socket HTTP/1.1 reutilizado; con lote_max > 1, en lotes a /api/laps
+#   (solo servidor_vueltas.py los entiende)
+# - Todo es no bloqueante: atender() se llama en cada pasada del bucle principal
+#   y nunca frena la recepción NRF
+# - Si el WiFi o el servidor caen, las vueltas quedan en cola y se vacían solas
+#   al reconectar (el servidor descarta duplicados por car_id + número de vuelta)
+# - Una vuelta que el servidor rechaza con 4xx se descarta: si no, tapa la cola
+import json
+import os
+import socket
+import select
+
+try:
+    from time import ticks_ms, ticks_diff, ticks_add
+except ImportError:  # CPython (pruebas en la PC)
+    import time as _time
+
+    def ticks_ms():
+        return int(_time.monotonic() * 1000)
+
+    def ticks_diff(a, b):
+        return a - b
+
+    def ticks_add(a, b):
+        return a + b
+
+try:
+    from errno import EAGAIN, EINPROGRESS
+except ImportError:
+    EAGAIN = 11
+    EINPROGRESS = 115
+
+# Estados de la conexión
+INACTIVO = 0
+CONECTANDO = 1
+LISTO = 2
+ENVIANDO = 3
+ESPERANDO = 4
+
+class SubidaVueltas:
+
+    def __init__(self, host, puerto, ruta="/api/lap", capacidad=64, lote_max=1,
+                 archivo_desborde=None, timeout_ms=3000):
+        self.host = host
+        self.puerto = puerto
+        self.ruta = ruta
+        self.lote_max = lote_max
+        self.timeout_ms = timeout_ms
+        self.archivo_desborde = archivo_desborde
+
+        # Anillo de registros ya serializados
+        self.cola = [None] * capacidad
+        self.inicio = 0
+        self.cantidad = 0
+        self.en_flash = self._contar_flash()   # lo que quedó de antes de reiniciar
+
+        self.estado = INACTIVO
+        self.sock = None
+        self.poller = None
+        self.direccion = None
+        self.t_estado = 0
+        self.reintento = ticks_ms()
+        self.espera_ms = 500
+        self.salida = None
+        self.enviado = 0
+        self.entrada = b""
+        self.lote_n = 0
+        self.de_a_uno = 0   # registros a mandar sueltos tras un 4xx de un lote
+
+        # Métricas
+        self.enviadas = 0
+        self.perdidas = 0
+        self.rechazadas = 0
+        self.fallos = 0
+
+    # ---------------- COLA ----------------
+    def pendientes(self):
+        return self.cantidad + self.en_flash
+
+    def encolar(self, registro):
+        """Agrega un registro (dict). Nunca bloquea; si no hay lugar va a flash o se pierde el más viejo.
+
+        False si el registro se perdió: con vueltas en flash no puede ir a la RAM
+        (saldría antes que ellas), así que si el archivo falla se descarta.
+        """
+        dato = json.dumps(registro).encode()
+        capacidad = len(self.cola)
+        if self.cantidad == capacidad or self.en_flash:
+            if self.archivo_desborde:
+                try:
+                    with open(self.archivo_desborde, "ab") as f:
+                        f.write(dato + b"\n")
+                    self.en_flash += 1
+                    return True
+                except OSError:
+                    pass
+            if self.en_flash:
+                self.perdidas += 1
+                return False
+            if self.cantidad == capacidad:
+                # Sin flash: descartar el más viejo
+                self.inicio = (self.inicio + 1) % capacidad
+                self.cantidad -= 1
+                self.perdidas += 1
+        self.cola[(self.inicio + self.cantidad) % capacidad] = dato
+        self.cantidad += 1
+        return True
+
+    def _descartar(self, n):
+        capacidad = len(self.cola)
+        for _ in range(n):
+            self.cola[self.inicio] = None
+            self.inicio = (self.inicio + 1) % capacidad
+        self.cantidad -= n
+        self.de_a_uno = max(0, self.de_a_uno - n)
+        # Recargar con media cola libre: el archivo se reescribe una vez cada
+        # capacidad / 2 vueltas y no en cada una
+        if self.en_flash and (self.cantidad <= capacidad // 2):
+            self._recargar_de_flash()
+
+    def _contar_flash(self):
+        n = 0
+        if self.archivo_desborde:
+            try:
+                with open(self.archivo_desborde, "rb") as f:
+                    for linea in f:
+                        if linea.strip():
+                            n += 1
+            except OSError:
+                pass
+        return n
+
+    def _recargar_de_flash(self):
+        """Pasa las primeras vueltas del archivo a la cola, de a una línea (sin leerlo entero)."""
+        libres = len(self.cola) - self.cantidad
+        if not libres:
+            return
+        capacidad = len(self.cola)
+        temporal = self.archivo_desborde + ".tmp"
+        quedan = 0
+        try:
+            with open(self.archivo_desborde, "rb") as f, open(temporal, "wb") as resto:
+                for linea in f:
+                    dato = linea.strip()
+                    if not dato:
+                        continue
+                    if libres:
+                        self.cola[(self.inicio + self.cantidad) % capacidad] = dato
+                        self.cantidad += 1
+                        libres -= 1
+                    else:
+                        resto.write(dato + b"\n")
+                        quedan += 1
+            os.rename(temporal, self.archivo_desborde)
+        except OSError:
+            # El archivo quedó como estaba: lo ya pasado a la cola se reenvía y el
+            # servidor lo descarta como duplicado
+            quedan = self._contar_flash()
+        self.en_flash = quedan
+
+    def _armar_lote(self):
+        lote_max = 1 if self.de_a_uno else self.lote_max
+        n = min(self.cantidad, lote_max)
+        capacidad = len(self.cola)
+        datos = [self.cola[(self.inicio + i) % capacidad] for i in range(n)]
+        if self.lote_max == 1:
+            cuerpo = datos[0]    # /api/lap: un objeto, no una lista
+        else:
+            cuerpo = b"[" + b",".join(datos) + b"]"
+        cabecera = ("POST {} HTTP/1.1\r\nHost: {}:{}\r\nContent-Type: application/json\r\n"
+                    "Content-Length: {}\r\n\r\n").format(self.ruta, self.host, self.puerto, len(cuerpo))
+        self.lote_n = n
+        self.salida = memoryview(cabecera.encode() + cuerpo)
+        self.enviado = 0
+
+    # ---------------- CONEXIÓN ----------------
+    def _cambiar(self, estado):
+        self.estado = estado
+        self.t_estado = ticks_ms()
+
+    def _cerrar(self):
+        if self.sock is not None:
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+        self.sock = None
+        self.poller = None
+        self._cambiar(INACTIVO)
+
+    def _fallo(self):
+        self.fallos += 1
+        self._cerrar()
+        self.reintento = ticks_add(ticks_ms(), self.espera_ms)
+        self.espera_ms = min(self.espera_ms * 2, 10000)
+
+    def _conectar(self):
+        if self.direccion is None:
+            self.direccion = socket.getaddrinfo(self.host, self.puerto)[0][-1]
+        self.sock = socket.socket()
+        self.sock.setblocking(False)
+        try:
+            self.sock.connect(self.direccion)
+        except OSError as e:
+            if e.args[0] not in (EINPROGRESS, EAGAIN):
+                raise
+        self.poller = select.poll()
+        self.poller.register(self.sock, select.POLLOUT)
+        self._cambiar(CONECTANDO)
+
+    def _vencido(self):
+        return ticks_diff(ticks_ms(), self.t_estado) > self.timeout_ms
+
+    def atender(self, red_ok=True):
+        """Avanza la máquina de estados sin bloquear. Llamar en cada pasada del loop."""
+        try:
+            if self.estado == INACTIVO:
+                if not self.pendientes() or not red_ok or ticks_diff(ticks_ms(), self.reintento) < 0:
+                    return
+                self._conectar()
+
+            if self.estado == CONECTANDO:
+                for _, ev in self.poller.poll(0):
+                    if ev & (select.POLLERR | select.POLLHUP):
+                        self._fallo()
+                        return
+                    if ev & select.POLLOUT:
+                        self.poller.modify(self.sock, select.POLLIN)
+                        self._cambiar(LISTO)
+                if self.estado == CONECTANDO:
+                    if self._vencido():
+                        self._fallo()
+                    return
+
+            if self.estado == LISTO:
+                # Un socket ocioso legible significa que el servidor lo cerró
+                if self.poller.poll(0):
+                    self._cerrar()
+                    return
+                if not self.cantidad:
+                    if self.en_flash:
+                        self._recargar_de_flash()
+                    return
+                self._armar_lote()
+                self._cambiar(ENVIANDO)
+
+            if self.estado == ENVIANDO:
+                try:
+                    n = self.sock.send(self.salida[self.enviado:])
+                except OSError as e:
+                    if e.args[0] != EAGAIN:
+                        raise
+                    n = 0
+                self.enviado += n or 0
+                if self.enviado >= len(self.salida):
+                    self.salida = None
+                    self.entrada = b""
+                    self._cambiar(ESPERANDO)
+                elif self._vencido():
+                    self._fallo()
+                return
+
+            if self.estado == ESPERANDO:
+                if not self.poller.poll(0):
+                    if self._vencido():
+                        self._fallo()
+                    return
+                datos = self.sock.recv(512)
+                if not datos:
+                    self._fallo()
+                    return
+                self.entrada += datos
+                self._leer_respuesta()
+        except OSError:
+            self._fallo()
+
+    def _leer_respuesta(self):
+        fin = self.entrada.find(b"\r\n\r\n")
+        if fin < 0:
+            return
+        cabecera = self.entrada[:fin].lower()
+        largo = 0
+        i = cabecera.find(b"content-length:")
+        if i >= 0:
+            largo = int(cabecera[i + 15:].split(b"\r\n")[0])
+        if len(self.entrada) < fin + 4 + largo:
+            return
+
+        try:
+            estado = int(self.entrada[9:12])
+        except ValueError:
+            estado = 0
+        if 400 <= estado < 500 and estado not in (408, 429):
+            # El servidor no la va a aceptar nunca: reintentarla frena a todas las de atrás.
+            # Un lote se rechaza entero por una sola mala: se reenvían de a una para
+            # encontrarla y no perder las buenas.
+            if self.lote_n > 1:
+                self.de_a_uno = self.lote_n
+            else:
+                self.rechazadas += 1
+                self._descartar(1)
+        elif 200 <= estado < 300:
+            self.enviadas += self.lote_n
+            self._descartar(self.lote_n)
+        else:
+            self._fallo()
+            return
+        self.espera_ms = 500
+        if b"connection: close" in cabecera:
+            self._cerrar()
+        else:
+            self._cambiar(LISTO)
@@ -0,0 +1,340 @@
+"""
+Trazado del auto: fusión GPS + IMU y polilínea simplificada para dibujarla
+sin servicios de mapas.
+
+El GPS da una posición por segundo; entre fixes se estima a ciegas (dead
+reckoning) con el IMU, en cada trama:
+
+    velocidad  += (aceleración longitudinal - sesgo) * dt
+    rumbo      += velocidad de giro * dt
+    x, y       += velocidad * (cos rumbo, sin rumbo) * dt
+
+La velocidad de giro sale de GUINADA si el MPU está montado de forma que un
+giróscopo del payload mida la guiñada (gyro_z no entra en los 32 bytes del
+NRF), y si no de la aceleración lateral: giro = a_lateral / velocidad.
+
+Con cada fix nuevo, un filtro complementario corrige: posición y velocidad
+hacia las del GPS, rumbo hacia el del desplazamiento entre fixes y el sesgo
+del acelerómetro según cuánto se desvió la velocidad integrada (GANANCIA_*).
+Las posiciones son metros en un plano local (este, norte) centrado en el
+primer fix.
+
+- Fusion: Python puro, una muestra a la vez (SERVICIO_TELEMETRIA, en vivo).
+- fusionar(df): la misma Fusion sobre una sesión (analizador).
+- douglas_peucker + codificar_polyline: lo que sirve /track.
+
+    python trazado.py sesion.csv [--tolerancia 0.3] [--salida trazado.json]
+"""
+import math
+import threading
+from collections import deque
+
+RADIO_TIERRA = 6371000.0
+PUNTOS_MAX = 20000            # puntos fusionados que guarda cada auto en vivo
+TOLERANCIA = 0.3              # m, Douglas-Peucker
+PRECISION = 6                 # decimales de la polilínea (1e-6 grados = 0,11 m)
+
+LONGITUDINAL = ("acc_x", 1.0)   # (canal, signo): positivo hacia adelante
+LATERAL = ("acc_y", 1.0)        # positivo hacia la izquierda
+GUINADA = None                  # ("gyro_x", 1.0) si ese eje quedó vertical; deg/s, positivo a la izquierda
+
+GANANCIA_POSICION = 0.5
+GANANCIA_VELOCIDAD = 0.5
+GANANCIA_RUMBO = 0.5
+GANANCIA_SESGO = 0.2
+SESGO_MAXIMO = 2.0            # m/s²
+GIRO_MAXIMO = 3.0             # rad/s
+VELOCIDAD_MINIMA = 0.5        # m/s: más lento no se confía en el rumbo ni en a_lateral / v
+DESPLAZAMIENTO_MINIMO = 0.5   # m entre fixes para tomar el rumbo del GPS
+SIN_FIX_MAXIMO = 5.0          # s sin fix después de los cuales se deja de estimar
+DT_MAXIMO = 1.0               # s: un hueco mayor en las tramas no se integra entero
+
+def _angulo(a):
+    """Ángulo en (-pi, pi]."""
+    return (a + math.pi) % (2 * math.pi) - math.pi
+
+class Fusion:
+    """Filtro complementario GPS + IMU de un auto; puntos (t, x, y) en metros desde el primer fix."""
+
+    def __init__(self, puntos_max=PUNTOS_MAX):
+        self.puntos = deque(maxlen=puntos_max)
+        self.origen = None
+        self._cos_origen = 1.0
+        self.x = self.y = self.v = self.rumbo = self.sesgo = 0.0
+        self.t = None
+        self.fix = None          # (lat, lon, velocidad) del último fix
+        self.t_fix = None
+        self.pos_fix = None
+        self.fixes = 0
+        self.version = 0         # puntos agregados desde el principio (índice absoluto del próximo)
+        self._memo = None
+        self._fijos = []         # (índice absoluto, x, y) ya simplificados que no van a cambiar
+        self._texto = ""         # polilínea de los fijos
+        self._ultimo = (0, 0)    # último punto de _texto, en enteros (la polilínea va por diferencias)
+        self._clave_fijos = None
+        self._lock = threading.Lock()
+
+    def local(self, lat, lon):
+        lat0, lon0 = self.origen
+        return (math.radians(lon - lon0) * RADIO_TIERRA * self._cos_origen,
+                math.radians(lat - lat0) * RADIO_TIERRA)
+
+    def latlon(self, x, y):
+        lat0, lon0 = self.origen
+        return (lat0 + math.degrees(y / RADIO_TIERRA),
+                lon0 + math.degrees(x / (RADIO_TIERRA * self._cos_origen)))
+
+    def agregar(self, t, lat, lon, velocidad, acc_long, acc_lat, guinada=None):
+        """Una muestra (velocidad GPS en km/h, aceleraciones en m/s², guiñada en deg/s).
+
+        Devuelve (x, y) fusionado, o None mientras no haya un primer fix.
+        """
+        dt = 0.0 if self.t is None else min(max(t - self.t, 0.0), DT_MAXIMO)
+        self.t = t
+        nuevo = (lat or lon) and (lat, lon, velocidad) != self.fix
+        estimando = self.origen is not None and t - self.t_fix <= SIN_FIX_MAXIMO
+        if estimando:
+            self._predecir(dt, acc_long, acc_lat, guinada)
+        if nuevo:
+            self._corregir(t, lat, lon, velocidad)
+        if not (nuevo or estimando):
+            return None if self.origen is None else (self.x, self.y)
+        self.puntos.append((t, self.x, self.y))
+        self.version += 1
+        return self.x, self.y
+
+    def agregar_trama(self, trama):
+        """agregar() con una Trama de SERVICIO_TELEMETRIA (o cualquier objeto con los canales como atributos)."""
+        guinada = getattr(trama, GUINADA[0]) * GUINADA[1] if GUINADA else None
+        return self.agregar(trama.t, trama.lat, trama.lon, trama.speed,
+                            getattr(trama, LONGITUDINAL[0]) * LONGITUDINAL[1],
+                            getattr(trama, LATERAL[0]) * LATERAL[1], guinada)
+
+    def _predecir(self, dt, acc_long, acc_lat, guinada):
+        self.v = max(0.0, self.v + (acc_long - self.sesgo) * dt)
+        if guinada is not None:
+            giro = math.radians(guinada)
+        elif self.v > VELOCIDAD_MINIMA:
+            giro = acc_lat / self.v
+        else:
+            giro = 0.0
+        self.rumbo = _angulo(self.rumbo + max(-GIRO_MAXIMO, min(GIRO_MAXIMO, giro)) * dt)
+        self.x += self.v * math.cos(self.rumbo) * dt
+        self.y += self.v * math.sin(self.rumbo) * dt
+
+    def _corregir(self, t, lat, lon, velocidad):
+        v_gps = velocidad / 3.6
+        if self.origen is None:
+            self.origen = (lat, lon)
+            self._cos_origen = math.cos(math.radians(lat))
+            self.x = self.y = 0.0
+            self.v = v_gps
+        else:
+            x_fix, y_fix = self.local(lat, lon)
+            dx, dy = x_fix - self.pos_fix[0], y_fix - self.pos_fix[1]
+            if v_gps > VELOCIDAD_MINIMA and dx * dx + dy * dy > DESPLAZAMIENTO_MINIMO ** 2:
+                ganancia = 1.0 if self.fixes == 1 else GANANCIA_RUMBO   # el primer rumbo se toma entero
+                self.rumbo = _angulo(self.rumbo + ganancia * _angulo(math.atan2(dy, dx) - self.rumbo))
+            transcurrido = t - self.t_fix
+            if transcurrido > 0:
+                self.sesgo += GANANCIA_SESGO * (self.v - v_gps) / transcurrido
+                self.sesgo = max(-SESGO_MAXIMO, min(SESGO_MAXIMO, self.sesgo))
+            self.v += GANANCIA_VELOCIDAD * (v_gps - self.v)
+            self.x += GANANCIA_POSICION * (x_fix - self.x)
+            self.y += GANANCIA_POSICION * (y_fix - self.y)
+        self.fix = (lat, lon, velocidad)
+        self.t_fix = t
+        self.pos_fix = self.local(lat, lon)
+        self.fixes += 1
+
+    def _actualizar_fijos(self, tolerancia, precision):
+        """Simplifica desde el último punto fijo; devuelve (final provisorio [(x, y)], puntos crudos).
+
+        Los puntos que Douglas-Peucker conserva antes del final de un tramo ya
+        no cambian: quedan en self._fijos y su polilínea codificada en
+        self._texto. Así el costo en vivo es el de los puntos nuevos y no el de
+        toda la sesión, y cada tramo cumple la tolerancia igual que una sola
+        pasada. Los fijos que se cayeron del deque se recortan de a tandas (más
+        de 1/8 del total), por eso el trazado puede empezar un poco antes.
+        """
+        puntos = list(self.puntos)
+        base = self.version - len(puntos)   # índice absoluto de puntos[0]
+        if (tolerancia, precision) != self._clave_fijos:
+            self._fijos, self._texto, self._ultimo = [], "", (0, 0)
+            self._clave_fijos = (tolerancia, precision)
+        fijos = self._fijos
+        viejos = 0
+        while viejos < len(fijos) and fijos[viejos][0] < base:
+            viejos += 1
+        if viejos > len(fijos) // 8:
+            del fijos[:viejos]
+            self._texto, self._ultimo = _codificar([self.latlon(x, y) for _, x, y in fijos], precision)
+        inicio = max(fijos[-1][0] - base, 0) if fijos else 0
+        tramo = [(x, y) for _, x, y in puntos[inicio:]]
+        conservados = douglas_peucker(tramo, tolerancia)
+        nuevos = [(base + inicio + i, tramo[i][0], tramo[i][1]) for i in conservados[:-1]
+                  if not (fijos and base + inicio + i == fijos[-1][0])]
+        if nuevos:
+            fijos.extend(nuevos)
+            texto, self._ultimo = _codificar([self.latlon(x, y) for _, x, y in nuevos], precision, self._ultimo)
+            self._texto += texto
+        final = []
+        if conservados and (not fijos or base + inicio + conservados[-1] > fijos[-1][0]):
+            final.append(tramo[conservados[-1]])
+        return final, puntos
+
+    def simplificado(self, tolerancia=TOLERANCIA, precision=PRECISION):
+        """Puntos [(x, y)] del trazado simplificado (ver _actualizar_fijos)."""
+        with self._lock:
+            final, _ = self._actualizar_fijos(tolerancia, precision)
+            return [(x, y) for _, x, y in self._fijos] + final
+
+    def trazado(self, tolerancia=TOLERANCIA, precision=PRECISION):
+        """Lo que sirve /track: polilínea simplificada (formato de Google) y contadores.
+
+        Se memoriza hasta que llega otro punto, así varios clientes consultando
+        no repiten el trabajo.
+        """
+        with self._lock:
+            clave = (self.version, tolerancia, precision)
+            if self._memo is not None and self._memo[0] == clave:
+                return self._memo[1]
+            final, puntos = self._actualizar_fijos(tolerancia, precision)
+            latlon_final = [self.latlon(x, y) for x, y in final]
+            texto, _ = _codificar(latlon_final, precision, self._ultimo)
+            if latlon_final:
+                ultimo = latlon_final[-1]
+            else:
+                ultimo = self.latlon(*self._fijos[-1][1:]) if self._fijos else None
+            resultado = {
+                "points": len(self._fijos) + len(final),
+                "raw_points": len(puntos),
+                "fixes": self.fixes,
+                "tolerance_m": tolerancia,
+                "precision": precision,
+                "polyline": self._texto + texto,
+                "time_range": [puntos[0][0], puntos[-1][0]] if puntos else None,
+                "last": list(ultimo) if ultimo else None,
+            }
+            self._memo = (clave, resultado)
+            return resultado
+
+def douglas_peucker(puntos, tolerancia=TOLERANCIA):
+    """Índices de [(x, y)] que quedan al simplificar con esa tolerancia (iterativo, sin recursión)."""
+    n = len(puntos)
+    if n < 3:
+        return list(range(n))
+    conservar = [False] * n
+    conservar[0] = conservar[-1] = True
+    limite = tolerancia * tolerancia
+    pila = [(0, n - 1)]
+    while pila:
+        a, b = pila.pop()
+        xa, ya = puntos[a]
+        dx, dy = puntos[b][0] - xa, puntos[b][1] - ya
+        largo = dx * dx + dy * dy
+        peor, indice = limite, -1
+        for i in range(a + 1, b):
+            x, y = puntos[i]
+            if largo:
+                cruz = (x - xa) * dy - (y - ya) * dx
+                distancia = cruz * cruz / largo      # al cuadrado, a la recta a-b
+            else:
+                distancia = (x - xa) ** 2 + (y - ya) ** 2
+            if distancia > peor:
+                peor, indice = distancia, i
+        if indice >= 0:
+            conservar[indice] = True
+            pila.append((a, indice))
+            pila.append((indice, b))
+    return [i for i in range(n) if conservar[i]]
+
+def codificar_polyline(latlon, precision=PRECISION):
+    """[(lat, lon)] -> texto en el formato de polilínea codificada de Google."""
+    return _codificar(latlon, precision)[0]
+
+def _codificar(latlon, precision, anterior=(0, 0)):
+    """(texto, último punto en enteros), continuando desde anterior para poder concatenar."""
+    factor = 10 ** precision
+    salida = []
+    lat_anterior, lon_anterior = anterior
+    for lat, lon in latlon:
+        lat_entera, lon_entera = round(lat * factor), round(lon * factor)
+        for delta in (lat_entera - lat_anterior, lon_entera - lon_anterior):
+            delta = ~(delta << 1) if delta < 0 else delta << 1
+            while delta >= 0x20:
+                salida.append(chr((0x20 | (delta & 0x1F)) + 63))
+                delta >>= 5
+            salida.append(chr(delta + 63))
+        lat_anterior, lon_anterior = lat_entera, lon_entera
+    return "".join(salida), (lat_anterior, lon_anterior)
+
+def decodificar_polyline(texto, precision=PRECISION):
+    """Inversa de codificar_polyline."""
+    valores, actual, desplazamiento = [], 0, 0
+    for caracter in texto:
+        b = ord(caracter) - 63
+        actual |= (b & 0x1F) << desplazamiento
+        desplazamiento += 5
+        if b < 0x20:
+            valores.append(~(actual >> 1) if actual & 1 else actual >> 1)
+            actual = desplazamiento = 0
+    puntos, lat, lon = [], 0, 0
+    for i in range(0, len(valores) - 1, 2):
+        lat += valores[i]
+        lon += valores[i + 1]
+        puntos.append((lat / 10 ** precision, lon / 10 ** precision))
+    return puntos
+
+# ---------------- Sesiones (PC) ----------------
+def fusionar(df, puntos_max=None):
+    """Sesión (columnas de los CSV, t o id) -> Fusion con todos los puntos."""
+    import canales
+    from alineacion import tiempos
+    nombres = dict(zip(canales.NOMBRES, canales.COLUMNAS_CSV))
+    columnas = [nombres["lat"], nombres["lon"], nombres["speed"], nombres[LONGITUDINAL[0]], nombres[LATERAL[0]]]
+    if GUINADA:
+        columnas.append(nombres[GUINADA[0]])
+    fusion = Fusion(puntos_max)
+    filas = df[columnas].fillna(0.0).itertuples(index=False, name=None)
+    s_long, s_lat = LONGITUDINAL[1], LATERAL[1]
+    s_guinada = GUINADA[1] if GUINADA else 0.0
+    for t, fila in zip(tiempos(df).tolist(), filas):
+        fusion.agregar(t, fila[0], fila[1], fila[2], fila[3] * s_long, fila[4] * s_lat,
+                       fila[5] * s_guinada if GUINADA else None)
+    return fusion
+
+def tabla(fusion):
+    """DataFrame t, x, y, lat, lon con los puntos de una Fusion."""
+    import numpy as np
+    import pandas as pd
+    t, x, y = (np.array(c, dtype=np.float64) for c in zip(*fusion.puntos)) if fusion.puntos else (np.zeros(0),) * 3
+    lat0, lon0 = fusion.origen or (0.0, 0.0)
+    return pd.DataFrame({"t": t, "x": x, "y": y,
+                         "lat": lat0 + np.degrees(y / RADIO_TIERRA),
+                         "lon": lon0 + np.degrees(x / (RADIO_TIERRA * fusion._cos_origen))})
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    import time
+    import pandas as pd
+    ap = argparse.ArgumentParser(description="Trazado fusionado GPS + IMU de una sesión CSV")
+    ap.add_argument("entrada")
+    ap.add_argument("--tolerancia", type=float, default=TOLERANCIA, help="m (Douglas-Peucker)")
+    ap.add_argument("--salida", help="JSON como el de /track")
+    args = ap.parse_args()
+
+    df = pd.read_csv(args.entrada)
+    t0 = time.perf_counter()
+    fusion = fusionar(df)
+    t1 = time.perf_counter()
+    resultado = fusion.trazado(args.tolerancia)
+    t2 = time.perf_counter()
+    print(f"🛰️ {len(df)} filas, {fusion.fixes} fixes -> {resultado['raw_points']} puntos fusionados "
+          f"en {t1 - t0:.3f} s")
+    print(f"✂️ {resultado['points']} puntos con tolerancia {args.tolerancia} m "
+          f"({len(resultado['polyline'])} caracteres) en {t2 - t1:.3f} s")
+    if args.salida:
+        with open(args.salida, "w") as f:
+            json.dump(resultado, f)
@@ -0,0 +1,86 @@
+"""
+Piezas del pipeline de SERVICIO_TELEMETRIA: lectores -> parser -> publicador -> suscriptores.
+
+- ColaAcotada: cola de tamaño fijo que nunca bloquea al productor; si está
+  llena descarta la entrada más vieja y lo cuenta. deque.append/popleft son
+  atómicos en CPython, así que no hace falta lock entre productor y consumidor.
+- Publicador: reparte cada trama (inmutable) a una ColaAcotada por
+  suscriptor. Un suscriptor lento solo pierde tramas propias y nunca frena
+  al hilo que publica.
+"""
+import threading
+from collections import deque
+
+class ColaAcotada:
+    """Cola de un productor/consumidor con descarte del más viejo."""
+
+    def __init__(self, nombre, capacidad=1024):
+        self.nombre = nombre
+        self.capacidad = capacidad
+        self._items = deque(maxlen=capacidad)
+        self._hay_datos = threading.Event()
+        self.recibidos = 0
+        self.descartados = 0
+        self.entregados = 0
+
+    def poner(self, item):
+        """No bloquea nunca."""
+        if len(self._items) >= self.capacidad:
+            self.descartados += 1   # deque(maxlen) tira el más viejo
+        self._items.append(item)
+        self.recibidos += 1
+        if not self._hay_datos.is_set():
+            self._hay_datos.set()
+
+    def sacar_todo(self, timeout=None):
+        """Espera hasta timeout a que haya datos y devuelve la lista de pendientes."""
+        if not self._items:
+            self._hay_datos.clear()
+            if not self._items:   # pudo llegar algo entre el chequeo y el clear
+                self._hay_datos.wait(timeout)
+        lote = []
+        items = self._items
+        while items:
+            try:
+                lote.append(items.popleft())
+            except IndexError:
+                break
+        self.entregados += len(lote)
+        return lote
+
+    def __len__(self):
+        return len(self._items)
+
+    def metricas(self):
+        return {"depth": len(self._items), "capacity": self.capacidad, "received": self.recibidos,
+                "delivered": self.entregados, "dropped": self.descartados}
+
+class Publicador:
+    """Reparto de tramas a suscriptores."""
+
+    def __init__(self):
+        self._suscriptores = ()     # tupla: se reemplaza entera al suscribir/desuscribir
+        self._lock = threading.Lock()
+        self.publicadas = 0
+
+    def suscribir(self, nombre, capacidad=256):
+        cola = ColaAcotada(nombre, capacidad)
+        with self._lock:
+            self._suscriptores = self._suscriptores + (cola,)
+        return cola
+
+    def desuscribir(self, cola):
+        with self._lock:
+            self._suscriptores = tuple(c for c in self._suscriptores if c is not cola)
+
+    def hay_suscriptores(self):
+        return bool(self._suscriptores)
+
+    def publicar(self, trama):
+        self.publicadas += 1
+        for cola in self._suscriptores:
+            cola.poner(trama)
+
+    def metricas(self):
+        return {"published": self.publicadas,
+                "subscribers": [dict(c.metricas(), name=c.nombre) for c in self._suscriptores]}